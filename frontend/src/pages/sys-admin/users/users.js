@@ -11,6 +11,7 @@ import SysAdminImportUserDialog from '../../../components/dialog/sysadmin-dialog
 import SysAdminAddUserDialog from '../../../components/dialog/sysadmin-dialog/sysadmin-add-user-dialog';
 import SysAdminBatchAddAdminDialog from '../../../components/dialog/sysadmin-dialog/sysadmin-batch-add-admin-dialog';
 import CommonOperationConfirmationDialog from '../../../components/dialog/common-operation-confirmation-dialog';
+import SeahubIODialog from '../../../components/dialog/seahub-io-dialog';
 import SysAdminUser from '../../../models/sysadmin-user';
 import SysAdminAdminUser from '../../../models/sysadmin-admin-user';
 import MainPanelTopbar from '../main-panel-topbar';
@@ -44,6 +45,7 @@ class Users extends Component {
       isBatchSetQuotaDialogOpen: false,
       isBatchDeleteUserDialogOpen: false,
       isBatchAddAdminDialogOpen: false,
+      isExportingUsers: false,
       is_active: null,
       role: null,
     };
@@ -72,6 +74,39 @@ class Users extends Component {
     }
   }
 
+  exportUsers = () => {
+    this.setState({ isExportingUsers: true });
+    systemAdminAPI.sysAdminExportUsersExcel().then(res => {
+      this.queryUsersExportStatus(res.data.task_id);
+    }).catch(error => {
+      this.setState({ isExportingUsers: false });
+      toaster.danger(Utils.getErrorMsg(error));
+    });
+  };
+
+  queryUsersExportStatus = (taskId) => {
+    if (!this.state.isExportingUsers) {
+      return;
+    }
+    systemAdminAPI.sysAdminQueryUsersExportStatus(taskId).then(res => {
+      if (res.data.is_finished) {
+        this.setState({ isExportingUsers: false });
+        location.href = siteRoot + 'sys/useradmin/export-excel/?task_id=' + taskId;
+      } else {
+        setTimeout(() => {
+          this.queryUsersExportStatus(taskId);
+        }, 1000);
+      }
+    }).catch(error => {
+      this.setState({ isExportingUsers: false });
+      toaster.danger(Utils.getErrorMsg(error));
+    });
+  };
+
+  toggleExportingUsers = () => {
+    this.setState({ isExportingUsers: !this.state.isExportingUsers });
+  };
+
   toggleImportUserDialog = () => {
     this.setState({ isImportUserDialogOpen: !this.state.isImportUserDialogOpen });
   };
@@ -407,7 +442,7 @@ class Users extends Component {
     }
 
     if (isLDAPImported) {
-      return <a className="btn btn-secondary operation-item" href={`${siteRoot}sys/useradmin/export-excel/`}>{gettext('Export Excel')}</a>;
+      return <Button className="btn btn-secondary operation-item" onClick={this.exportUsers}>{gettext('Export Excel')}</Button>;
     }
 
     // 'database'
@@ -415,7 +450,7 @@ class Users extends Component {
       <Fragment>
         <Button className="btn btn-secondary operation-item" onClick={this.toggleImportUserDialog}>{gettext('Import Users')}</Button>
         <Button className="btn btn-secondary operation-item" onClick={this.toggleAddUserDialog}>{gettext('Add User')}</Button>
-        <a className="btn btn-secondary operation-item" href={`${siteRoot}sys/useradmin/export-excel/`}>{gettext('Export Excel')}</a>
+        <Button className="btn btn-secondary operation-item" onClick={this.exportUsers}>{gettext('Export Excel')}</Button>
       </Fragment>
     );
   };
@@ -476,7 +511,8 @@ class Users extends Component {
       isAddUserDialogOpen,
       isBatchDeleteUserDialogOpen,
       isBatchSetQuotaDialogOpen,
-      isBatchAddAdminDialogOpen
+      isBatchAddAdminDialogOpen,
+      isExportingUsers
     } = this.state;
     return (
       <Fragment>
@@ -559,6 +595,11 @@ class Users extends Component {
             toggle={this.toggleBatchAddAdminDialog}
           />
         }
+        {isExportingUsers &&
+          <SeahubIODialog
+            toggle={this.toggleExportingUsers}
+          />
+        }
       </Fragment>
     );
   }
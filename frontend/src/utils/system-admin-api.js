@@ -927,6 +927,19 @@ class SystemAdminAPI {
     return this._sendPostRequest(url, formData);
   }
 
+  sysAdminExportUsersExcel() {
+    const url = this.server + '/api/v2.1/admin/users/export-excel/';
+    return this.req.post(url);
+  }
+
+  sysAdminQueryUsersExportStatus(taskId) {
+    const url = this.server + '/api/v2.1/admin/users/export-excel/';
+    const params = {
+      task_id: taskId
+    };
+    return this.req.get(url, { params: params });
+  }
+
   sysAdminListAdmins() {
     const url = this.server + '/api/v2.1/admin/admin-users/';
     return this.req.get(url);
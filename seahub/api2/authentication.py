@@ -1,6 +1,7 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 import datetime
 import logging
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.authentication import BaseAuthentication, SessionAuthentication
 from rest_framework.exceptions import APIException
@@ -9,12 +10,13 @@ from seaserv import ccnet_api
 
 from seahub.auth.models import AnonymousUser
 from seahub.base.accounts import User
-from seahub.api2.models import Token, TokenV2
+from seahub.api2.models import Token, TokenV2, get_token_auth_cache_key
 from seahub.api2.utils import get_client_ip
 from seahub.repo_api_tokens.models import RepoAPITokens
 from seahub.ocm.models import OCMShare
 from seahub.utils import within_time_range
 from seahub.utils.auth import AUTHORIZATION_PREFIX
+from seahub.settings import TOKEN_AUTH_CACHE_TIMEOUT, TOKEN_V2_UPDATE_INTERVAL
 try:
     from seahub.settings import MULTI_TENANCY
 except ImportError:
@@ -26,6 +28,76 @@ logger = logging.getLogger(__name__)
 HEADER_CLIENT_VERSION = 'HTTP_X_SEAFILE_CLIENT_VERSION'
 HEADER_PLATFORM_VERSION = 'HTTP_X_SEAFILE_PLATFORM_VERSION'
 
+TOKEN_V2_UPDATE_PREFIX = 'UPDATE_'
+
+class CachedOrg(object):
+    """Picklable copy of the org returned by ``get_orgs_by_user``.
+    """
+
+    def __init__(self, org):
+        self.org_id = org.org_id
+        self.org_name = org.org_name
+        self.url_prefix = org.url_prefix
+        self.creator = org.creator
+        self.ctime = org.ctime
+        self.is_staff = org.is_staff
+
+
+def get_user_info(username):
+    """Return a picklable dict of the user attributes needed to build
+    ``request.user``, or ``None`` if user does not exist.
+    """
+    try:
+        user = User.objects.get(email=username)
+    except User.DoesNotExist:
+        return None
+
+    org = None
+    if MULTI_TENANCY:
+        orgs = ccnet_api.get_orgs_by_user(username)
+        if orgs:
+            org = CachedOrg(orgs[0])
+
+    return {
+        'email': user.email,
+        'id': user.id,
+        'is_staff': user.is_staff,
+        'is_active': user.is_active,
+        'ctime': user.ctime,
+        'source': user.source,
+        'role': user.role,
+        'admin_role': user.admin_role,
+        'org': org,
+    }
+
+
+class CachedUser(User):
+    """User built from cached user info. The password hash is not cached,
+    it is got from ccnet when first asked for.
+    """
+
+    _enc_password = None
+
+    @property
+    def enc_password(self):
+        if self._enc_password is None:
+            emailuser = ccnet_api.get_emailuser(self.username)
+            self._enc_password = emailuser.password if emailuser else ''
+        return self._enc_password
+
+    @enc_password.setter
+    def enc_password(self, value):
+        self._enc_password = value
+
+
+def build_user(user_info):
+    user = CachedUser(user_info['email'])
+    for attr, value in user_info.items():
+        if attr != 'email':
+            setattr(user, attr, value)
+    return user
+
+
 class AuthenticationFailed(APIException):
     status_code = status.HTTP_401_UNAUTHORIZED
     default_detail = 'Incorrect authentication credentials.'
@@ -64,82 +136,114 @@ class TokenAuthentication(BaseAuthentication):
             raise AuthenticationFailed(msg)
 
         key = auth[1]
-        ret = self.authenticate_v2(request, key)
-        if ret:
-            return ret
+        auth_info = self.get_auth_info(key)
+        if auth_info['version'] == 2:
+            return self.authenticate_v2(request, auth_info)
 
-        return self.authenticate_v1(request, key)
-
-    def authenticate_v1(self, request, key):
-        try:
-            token = Token.objects.get(key=key)
-        except Token.DoesNotExist:
-            raise AuthenticationFailed('Invalid token')
-
-        try:
-            user = User.objects.get(email=token.user)
-        except User.DoesNotExist:
-            raise AuthenticationFailed('User inactive or deleted')
+        return self.authenticate_v1(request, auth_info)
 
-        if MULTI_TENANCY:
-            orgs = ccnet_api.get_orgs_by_user(token.user)
-            if orgs:
-                user.org = orgs[0]
+    def get_auth_info(self, key):
+        """Return token, token version, user and org of ``key``.
 
-        if user.is_active:
-            return (user, token)
+        The result is cached for ``TOKEN_AUTH_CACHE_TIMEOUT`` seconds, and
+        cleared when the token is deleted (logout, unlink device, user
+        deleted or inactivated), set to be remote wiped, or the user is
+        updated (see ``clear_user_token_auth_cache``).
+        """
+        cache_key = get_token_auth_cache_key(key)
+        if TOKEN_AUTH_CACHE_TIMEOUT > 0:
+            auth_info = cache.get(cache_key)
+            if auth_info is not None:
+                return auth_info
 
-    def authenticate_v2(self, request, key):
         try:
             token = TokenV2.objects.get(key=key)
+            version = 2
         except TokenV2.DoesNotExist:
             # Continue authentication in token v1
-            return None
+            try:
+                token = Token.objects.get(key=key)
+                version = 1
+            except Token.DoesNotExist:
+                raise AuthenticationFailed('Invalid token')
+
+        if version == 2 and token.wiped_at:
+            user_info = None
+        else:
+            user_info = get_user_info(token.user)
+
+        auth_info = {
+            'version': version,
+            'token': token,
+            'user': user_info,
+        }
+        if TOKEN_AUTH_CACHE_TIMEOUT > 0:
+            cache.set(cache_key, auth_info, TOKEN_AUTH_CACHE_TIMEOUT)
+        return auth_info
+
+    def authenticate_v1(self, request, auth_info):
+        if auth_info['user'] is None:
+            raise AuthenticationFailed('User inactive or deleted')
+
+        user = build_user(auth_info['user'])
+        if user.is_active:
+            return (user, auth_info['token'])
 
+    def authenticate_v2(self, request, auth_info):
+        token = auth_info['token']
         if token.wiped_at:
             raise DeviceRemoteWipedException('Device set to be remote wiped')
 
-        try:
-            user = User.objects.get(email=token.user)
-        except User.DoesNotExist:
+        if auth_info['user'] is None:
             raise AuthenticationFailed('User inactive or deleted')
 
-        if MULTI_TENANCY:
-            orgs = ccnet_api.get_orgs_by_user(token.user)
-            if orgs:
-                user.org = orgs[0]
-
+        user = build_user(auth_info['user'])
         if user.is_active:
-            need_save = False
+            update_fields = []
 
             # We update the device's last_login_ip, client_version, platform_version if changed
             ip = get_client_ip(request)
             if ip and ip != token.last_login_ip:
                 token.last_login_ip = ip
-                need_save = True
+                update_fields.append('last_login_ip')
 
             client_version = request.META.get(HEADER_CLIENT_VERSION, '')
             if client_version and client_version != token.client_version:
                 token.client_version = client_version
-                need_save = True
+                update_fields.append('client_version')
 
             platform_version = request.META.get(HEADER_PLATFORM_VERSION, '')
             if platform_version and platform_version != token.platform_version:
                 token.platform_version = platform_version
-                need_save = True
+                update_fields.append('platform_version')
 
-            if not within_time_range(token.last_accessed, datetime.datetime.now(), 10 * 60):
+            if update_fields or not within_time_range(token.last_accessed,
+                                                      datetime.datetime.now(), 10 * 60):
                 # We only need 10min precision for the last_accessed field
-                need_save = True
-
-            if need_save:
-                try:
-                    token.save()
-                except:
-                    logger.exception('error when save token v2:')
+                update_fields.append('last_accessed')
+                self.update_token_v2(token, update_fields)
 
             return (user, token)
 
+    def update_token_v2(self, token, update_fields):
+        """Save device info of ``token``, at most once per
+        ``TOKEN_V2_UPDATE_INTERVAL`` seconds.
+
+        Changes made by requests in between are not lost: the cached token
+        still holds the old values, so the next request after the interval
+        writes the latest ones.
+        """
+        if TOKEN_V2_UPDATE_INTERVAL > 0 and \
+           not cache.add(TOKEN_V2_UPDATE_PREFIX + get_token_auth_cache_key(token.key),
+                         1, TOKEN_V2_UPDATE_INTERVAL):
+            return
+
+        try:
+            # also clears the cached token
+            token.save(update_fields=update_fields)
+        except Exception:
+            logger.exception('error when save token v2:')
+
 
 class RepoAPITokenAuthentication(BaseAuthentication):
     """
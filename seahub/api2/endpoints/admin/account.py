@@ -23,9 +23,11 @@ from seahub.base.accounts import User
 from seahub.base.templatetags.seahub_tags import email2nickname
 from seahub.profile.models import Profile, DetailedProfile
 from seahub.institutions.models import Institution
-from seahub.share.models import UploadLinkShare, FileShare
+from seahub.share.models import UploadLinkShare, FileShare, \
+    clear_share_link_token_cache_by
 from seahub.utils import is_valid_username, is_org_context
 from seahub.utils.file_size import get_file_size_unit
+from seahub.utils.repo_cache import invalidate_repo_meta
 from seahub.group.utils import is_group_member
 
 
@@ -94,6 +96,7 @@ class Account(APIView):
             # transfer owned repos to new user
             for r in seafile_api.get_owned_repo_list(from_user):
                 seafile_api.set_repo_owner(r.id, user2.username)
+                invalidate_repo_meta(r.id)
 
             # transfer shared repos to new user
             for r in seafile_api.get_share_in_repo_list(from_user, -1, -1):
@@ -114,6 +117,7 @@ class Account(APIView):
             try:
                 UploadLinkShare.objects.filter(username=from_user).update(username=to_user)
                 FileShare.objects.filter(username=from_user).update(username=to_user)
+                clear_share_link_token_cache_by(username=to_user)
             except Exception as e:
                 logger.error(e)
                 error_msg = 'Internal Server Error'
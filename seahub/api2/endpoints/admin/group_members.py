@@ -10,6 +10,7 @@ from rest_framework import status
 from seaserv import seafile_api, ccnet_api
 
 from seahub.group.utils import get_group_member_info, is_group_member, get_group_members_info
+from seahub.profile.utils import UserInfoResolver
 from seahub.group.signals import add_user_to_group
 from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
 from seahub.base.accounts import User
@@ -69,7 +70,10 @@ class AdminGroupMembers(APIView):
 
         
         member_usernames = [m.user_name for m in members]
-        members_info = get_group_members_info(group_id, member_usernames)
+        admin_usernames = [m.user_name for m in members if m.is_staff]
+        members_info = get_group_members_info(group_id, member_usernames,
+                                              UserInfoResolver.for_request(request),
+                                              admin_usernames)
         group_members = {
             'group_id': group_id,
             'group_name': group.group_name,
@@ -15,15 +15,17 @@ from seahub.api2.authentication import TokenAuthentication
 from seahub.api2.throttling import UserRateThrottle
 from seahub.api2.utils import api_error
 from seahub.base.accounts import User
-from seahub.signals import repo_deleted
+from seahub.signals import repo_deleted, repo_renamed
 from seahub.views import get_system_default_repo_id
 from seahub.admin_log.signals import admin_operation
 from seahub.admin_log.models import REPO_CREATE, REPO_DELETE, REPO_TRANSFER
-from seahub.share.models import FileShare, UploadLinkShare
+from seahub.share.models import FileShare, UploadLinkShare, \
+    clear_share_link_token_cache_by
 from seahub.base.templatetags.seahub_tags import email2nickname, email2contact_email
 from seahub.group.utils import is_group_member, group_id_to_name
 from seahub.utils.repo import get_related_users_by_repo, normalize_repo_status_code, normalize_repo_status_str
 from seahub.utils import is_valid_dirent_name, is_valid_email, transfer_repo
+from seahub.utils.repo_cache import invalidate_repo_meta
 from seahub.utils.timeutils import timestamp_to_isoformat_timestr
 
 from seahub.api2.endpoints.group_owned_libraries import get_group_id_by_repo_owner
@@ -364,6 +366,8 @@ class AdminLibrary(APIView):
                 error_msg = 'Internal Server Error'
                 return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+            invalidate_repo_meta(repo_id)
+
         if new_repo_name:
             try:
                 res = seafile_api.edit_repo(repo_id, new_repo_name, '', None)
@@ -379,6 +383,8 @@ class AdminLibrary(APIView):
                 error_msg = 'Internal Server Error'
                 return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+            repo_renamed.send(sender=None, repo_id=repo_id)
+
         if new_owner:
             try:
                 new_owner_obj = User.objects.get(email=new_owner)
@@ -438,6 +444,7 @@ class AdminLibrary(APIView):
             try:
                 UploadLinkShare.objects.filter(username=repo_owner, repo_id=repo_id).update(username=new_owner)
                 FileShare.objects.filter(username=repo_owner, repo_id=repo_id).update(username=new_owner)
+                clear_share_link_token_cache_by(username=new_owner, repo_id=repo_id)
             except Exception as e:
                 logger.error(e)
                 error_msg = 'Internal Server Error'
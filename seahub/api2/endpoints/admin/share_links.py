@@ -25,6 +25,7 @@ from seahub.api2.utils import api_error
 from seahub.base.templatetags.seahub_tags import email2nickname, \
         email2contact_email
 from seahub.share.models import FileShare
+from seahub.share.view_counter import get_view_cnt, get_view_cnts
 from seahub.utils import gen_file_get_url, gen_dir_zip_download_url, \
         is_windows_operating_system, gen_shared_link
 from seahub.utils.timeutils import timestamp_to_isoformat_timestr, \
@@ -75,7 +76,7 @@ def get_share_link_info(fileshare):
 
     data['token'] = token
     data['link'] = gen_shared_link(token, fileshare.s_type)
-    data['view_cnt'] = fileshare.view_cnt
+    data['view_cnt'] = get_view_cnt(fileshare)
     data['ctime'] = ctime
     data['expire_date'] = expire_date
     data['is_expired'] = fileshare.is_expired()
@@ -149,6 +150,8 @@ class AdminShareLinks(APIView):
             if e not in nickname_dict:
                 nickname_dict[e] = email2nickname(e)
 
+        view_cnt_dict = get_view_cnts(share_links)
+
         share_links_info = []
         for link in share_links:
 
@@ -165,7 +168,7 @@ class AdminShareLinks(APIView):
             link_info['creator_email'] = owner_email
             link_info['creator_name'] = nickname_dict.get(owner_email, '')
             link_info['ctime'] = datetime_to_isoformat_timestr(link.ctime)
-            link_info['view_cnt'] = link.view_cnt
+            link_info['view_cnt'] = view_cnt_dict[link.pk]
             link_info['expire_date'] = expire_date
             link_info['is_expired'] = link.is_expired()
             share_links_info.append(link_info)
@@ -10,7 +10,6 @@ from rest_framework.views import APIView
 from rest_framework import status
 from django.utils import timezone
 from django.utils.translation import gettext as _
-from django.http import HttpResponse
 
 from seaserv import ccnet_api
 
@@ -19,11 +18,11 @@ from seahub.utils import get_file_ops_stats_by_day, IS_DB_SQLITE3, \
         is_pro_version, EVENTS_ENABLED, get_system_traffic_by_day, \
         get_all_users_traffic_by_month, get_all_orgs_traffic_by_month
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
-from seahub.utils.ms_excel import write_xls
+from seahub.utils.ms_excel import export_response
 from seahub.utils.file_size import byte_to_mb
-from seahub.views.sysadmin import _populate_user_quota_usage
-from seahub.base.templatetags.seahub_tags import email2nickname, \
-        email2contact_email
+from seahub.utils.user_report import get_all_users, iter_user_report, \
+    get_user_storage_head, gen_user_storage_rows
+from seahub.base.templatetags.seahub_tags import email2nickname
 
 from seahub.api2.authentication import TokenAuthentication
 from seahub.api2.throttling import UserRateThrottle
@@ -393,38 +392,36 @@ class SystemUserTrafficExcelView(APIView):
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        data_list = []
         head = [_("Time"), _("User"), _("Web Download") + ('(MB)'), \
                 _("Sync Download") + ('(MB)'), _("Link Download") + ('(MB)'), \
                 _("Web Upload") + ('(MB)'), _("Sync Upload") + ('(MB)'), \
                 _("Link Upload") + ('(MB)')]
 
-        for data in res_data:
-            web_download = byte_to_mb(data['web_file_download'])
-            sync_download = byte_to_mb(data['sync_file_download'])
-            link_download = byte_to_mb(data['link_file_download'])
-            web_upload = byte_to_mb(data['web_file_upload'])
-            sync_upload = byte_to_mb(data['sync_file_upload'])
-            link_upload = byte_to_mb(data['link_file_upload'])
+        def gen_rows():
+            for data in res_data:
+                web_download = byte_to_mb(data['web_file_download'])
+                sync_download = byte_to_mb(data['sync_file_download'])
+                link_download = byte_to_mb(data['link_file_download'])
+                web_upload = byte_to_mb(data['web_file_upload'])
+                sync_upload = byte_to_mb(data['sync_file_upload'])
+                link_upload = byte_to_mb(data['link_file_upload'])
 
-            row = [month, data['user'], web_download, sync_download, \
-                    link_download, web_upload, sync_upload, link_upload]
+                row = [month, data['user'], web_download, sync_download, \
+                        link_download, web_upload, sync_upload, link_upload]
 
-            data_list.append(row)
+                yield row
 
         excel_name = "User Traffic %s" % month
-
         try:
-            wb = write_xls(excel_name, head, data_list)
+            response = export_response(request, excel_name, head, gen_rows(), excel_name)
         except Exception as e:
             logger.error(e)
+            response = None
+
+        if not response:
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        response = HttpResponse(content_type='application/ms-excel')
-        response['Content-Disposition'] = 'attachment; filename="%s.xlsx"' % excel_name
-        wb.save(response)
-
         return response
 
 
@@ -438,39 +435,18 @@ class SystemUserStorageExcelView(APIView):
         if not request.user.admin_permissions.can_view_statistic():
             return api_error(status.HTTP_403_FORBIDDEN, 'Permission denied.')
 
-        db_users = ccnet_api.get_emailusers('DB', -1, -1)
-        ldap_import_users = ccnet_api.get_emailusers('LDAPImport', -1, -1)
-        all_users = db_users + ldap_import_users
-
-        head = [_("Email"), _("Name"), _("Contact Email"),
-                _("Space Usage") + "(MB)", _("Space Quota") + "(MB)"]
-
-        data_list = []
-        for user in all_users:
-
-            user_email = user.email
-            user_name = email2nickname(user_email)
-            user_contact_email = email2contact_email(user_email)
-
-            _populate_user_quota_usage(user)
-            space_usage_MB = byte_to_mb(user.space_usage)
-            space_quota_MB = byte_to_mb(user.space_quota)
-
-            row = [user_email, user_name, user_contact_email,
-                    space_usage_MB, space_quota_MB]
-
-            data_list.append(row)
+        head = get_user_storage_head()
+        rows = gen_user_storage_rows(iter_user_report(get_all_users()))
 
         excel_name = 'User Storage'
         try:
-            wb = write_xls('users', head, data_list)
+            response = export_response(request, 'users', head, rows, excel_name)
         except Exception as e:
             logger.error(e)
+            response = None
+
+        if not response:
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        response = HttpResponse(content_type='application/ms-excel')
-        response['Content-Disposition'] = 'attachment; filename="%s.xlsx"' % excel_name
-        wb.save(response)
-
         return response
@@ -23,6 +23,7 @@ from seahub.utils import gen_file_upload_url, gen_shared_upload_link
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 
 from seahub.share.models import UploadLinkShare
+from seahub.share.view_counter import get_view_cnt, get_view_cnts
 
 logger = logging.getLogger(__name__)
 
@@ -52,7 +53,7 @@ def get_upload_link_info(uls):
     data['repo_name'] = repo.repo_name if repo else ''
     data['path'] = path
     data['obj_name'] = obj_name
-    data['view_cnt'] = uls.view_cnt
+    data['view_cnt'] = get_view_cnt(uls)
     data['ctime'] = ctime
     data['link'] = gen_shared_upload_link(token)
     data['token'] = token
@@ -124,6 +125,8 @@ class AdminUploadLinks(APIView):
             if e not in nickname_dict:
                 nickname_dict[e] = email2nickname(e)
 
+        view_cnt_dict = get_view_cnts(upload_links)
+
         upload_links_info = []
         for link in upload_links:
 
@@ -140,7 +143,7 @@ class AdminUploadLinks(APIView):
             link_info['creator_email'] = owner_email
             link_info['creator_name'] = nickname_dict.get(owner_email, '')
             link_info['ctime'] = datetime_to_isoformat_timestr(link.ctime)
-            link_info['view_cnt'] = link.view_cnt
+            link_info['view_cnt'] = view_cnt_dict[link.pk]
             link_info['expire_date'] = expire_date
             link_info['is_expired'] = link.is_expired()
             upload_links_info.append(link_info)
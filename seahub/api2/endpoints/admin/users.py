@@ -11,7 +11,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from django.db import connection
-from django.db.models import Q
+from django.db.models import Q, Max
 from django.core.cache import cache
 from django.utils.translation import gettext as _
 from django.utils.timezone import make_naive, is_aware
@@ -37,6 +37,7 @@ from seahub.base.accounts import User
 from seahub.base.models import UserLastLogin
 from seahub.two_factor.models import default_device
 from seahub.profile.models import Profile
+from seahub.profile.utils import UserInfoResolver
 from seahub.profile.settings import CONTACT_CACHE_TIMEOUT, CONTACT_CACHE_PREFIX, \
     NICKNAME_CACHE_PREFIX, NICKNAME_CACHE_TIMEOUT
 from seahub.utils import is_valid_username2, is_org_context, \
@@ -44,6 +45,7 @@ from seahub.utils import is_valid_username2, is_org_context, \
         IS_EMAIL_CONFIGURED, send_html_email, get_site_name, \
         gen_shared_link, gen_shared_upload_link
 from seahub.utils.db_api import SeafileDB
+from seahub.utils.user_quota_usage import list_users_order_by_quota_usage
 
 from seahub.utils.file_size import get_file_size_unit, byte_to_kb
 from seahub.utils.timeutils import timestamp_to_isoformat_timestr, \
@@ -67,6 +69,7 @@ from seahub.auth.models import SocialAuthUser
 
 from seahub.options.models import UserOptions
 from seahub.share.models import FileShare, UploadLinkShare
+from seahub.share.view_counter import get_view_cnt
 from seahub.utils.ldap import ENABLE_LDAP, LDAP_FILTER, ENABLE_SASL, SASL_MECHANISM, ENABLE_SSO_USER_CHANGE_PASSWORD, \
     LDAP_PROVIDER, LDAP_SERVER_URL, LDAP_BASE_DN, LDAP_ADMIN_DN, LDAP_ADMIN_PASSWORD, LDAP_LOGIN_ATTR, LDAP_USER_OBJECT_CLASS, \
     ENABLE_MULTI_LDAP, MULTI_LDAP_1_SERVER_URL, MULTI_LDAP_1_BASE_DN, MULTI_LDAP_1_ADMIN_DN, \
@@ -206,12 +209,21 @@ def get_ldap_users(server_url, admin_dn, admin_password, enable_sasl, sasl_mecha
     return users
 
 
-def get_user_last_access_time(email, last_login_time):
+def get_users_device_last_access(emails):
+    """Return a dict of email to the last time a device of the user accessed.
+    """
+    devices = TokenV2.objects.filter(user__in=emails).values('user') \
+        .annotate(last_accessed=Max('last_accessed'))
+    return {d['user']: d['last_accessed'] for d in devices}
 
-    device_last_access = ''
-    devices = TokenV2.objects.filter(user=email).order_by('-last_accessed')
-    if devices:
-        device_last_access = devices[0].last_accessed
+
+def get_user_last_access_time(email, last_login_time, device_last_access=None):
+
+    if device_last_access is None:
+        device_last_access = ''
+        devices = TokenV2.objects.filter(user=email).order_by('-last_accessed')
+        if devices:
+            device_last_access = devices[0].last_accessed
 
     # before make_naive
     # 2021-04-09 05:32:30+00:00
@@ -258,7 +270,7 @@ def get_user_upload_link_info(uls):
     data['token'] = uls.token
     data['link'] = gen_shared_upload_link(uls.token)
     data['obj_name'] = obj_name
-    data['view_cnt'] = uls.view_cnt
+    data['view_cnt'] = get_view_cnt(uls)
 
     return data
 
@@ -287,7 +299,7 @@ def get_user_share_link_info(fileshare):
     data['obj_name'] = obj_name
     data['is_dir'] = True if fileshare.s_type == 'd' else False
 
-    data['view_cnt'] = fileshare.view_cnt
+    data['view_cnt'] = get_view_cnt(fileshare)
 
     if fileshare.s_type == 'f':
         obj_id = seafile_api.get_file_id_by_path(repo_id, path)
@@ -519,57 +531,46 @@ class AdminUsers(APIView):
     permission_classes = (IsAdminUser, )
     throttle_classes = (UserRateThrottle, )
 
-    def get_info_of_users_order_by_quota_usage(self, source, direction,
+    def get_info_of_users_order_by_quota_usage(self, request, source, direction,
                                                page, per_page, is_active=None, role=None):
 
-        # get user's quota usage info
-        user_usage_dict = {}
-        users_with_usage = seafile_api.list_user_quota_usage()
-        for user in users_with_usage:
-            email = user.user
-            if email not in user_usage_dict:
-                user_usage_dict[email] = user.usage
-
-        # get all users and map quota usage to user
-        if source == 'db':
-            users = ccnet_api.get_emailusers('DB', -1, -1)
-        else:
-            email_list = list()
+        # get one page of users sorted by quota usage
+        emails = None
+        if source != 'db':
+            emails = list()
             if ENABLE_LDAP:
                 ldap_users = SocialAuthUser.objects.filter(provider=LDAP_PROVIDER)
-                email_list.extend([user.username for user in ldap_users])
+                emails.extend([user.username for user in ldap_users])
             if ENABLE_MULTI_LDAP:
                 multi_ldap_users = SocialAuthUser.objects.filter(provider=MULTI_LDAP_1_PROVIDER)
-                email_list.extend([user.username for user in multi_ldap_users])
-            users, error = get_user_objs_from_ccnet(email_list)
-            if error:
-                return error
+                emails.extend([user.username for user in multi_ldap_users])
 
-        for user in users:
-            email = user.email
-            user.quota_usage = user_usage_dict.get(email, -1)
+        users, total_count = list_users_order_by_quota_usage(direction,
+                                                             (page - 1) * per_page,
+                                                             per_page,
+                                                             is_active, role,
+                                                             emails)
 
-        # sort
-        users.sort(key=lambda item: item.quota_usage,
-                   reverse=direction == 'desc')
-        if is_active == '1':
-            users = [u for u in users if u.is_active]
-        elif is_active == '0':
-            users = [u for u in users if not u.is_active]
-
-        if role:
-            users = [u for u in users if get_user_role(u) == role]
+        # get info of users in this page at once
+        email_list = [user.email for user in users]
+        user_info = UserInfoResolver.for_request(request)
+        user_info.resolve(email_list)
+        profile_dict = {p.user: p for p in Profile.objects.filter(user__in=email_list)}
+        last_login_dict = {}
+        for last_login_obj in UserLastLogin.objects.filter(username__in=email_list):
+            last_login_dict.setdefault(last_login_obj.username, last_login_obj.last_login)
+        device_last_access_dict = get_users_device_last_access(email_list)
 
         data = []
         MULTI_INSTITUTION = getattr(settings, 'MULTI_INSTITUTION', False)
-        for user in users[(page-1)*per_page: page*per_page]:
+        for user in users:
 
             info = {}
             info['email'] = user.email
-            info['name'] = email2nickname(user.email)
-            info['contact_email'] = email2contact_email(user.email)
+            info['name'] = user_info.get_nickname(user.email)
+            info['contact_email'] = user_info.get_contact_email(user.email)
 
-            profile = Profile.objects.get_profile_by_user(user.email)
+            profile = profile_dict.get(user.email)
             info['login_id'] = profile.login_id if profile and profile.login_id else ''
 
             info['is_staff'] = user.is_staff
@@ -579,14 +580,17 @@ class AdminUsers(APIView):
             info['quota_usage'] = user.quota_usage
             info['quota_total'] = seafile_api.get_user_quota(user.email)
 
-            last_login_obj = UserLastLogin.objects.get_by_username(user.email)
-            if last_login_obj:
-                info['last_login'] = datetime_to_isoformat_timestr(last_login_obj.last_login)
+            last_login = last_login_dict.get(user.email)
+            device_last_access = device_last_access_dict.get(user.email, '')
+            if last_login:
+                info['last_login'] = datetime_to_isoformat_timestr(last_login)
                 info['last_access_time'] = get_user_last_access_time(user.email,
-                                                                     last_login_obj.last_login)
+                                                                     last_login,
+                                                                     device_last_access)
             else:
                 info['last_login'] = ''
-                info['last_access_time'] = get_user_last_access_time(user.email, '')
+                info['last_access_time'] = get_user_last_access_time(user.email, '',
+                                                                     device_last_access)
 
             info['role'] = get_user_role(user)
 
@@ -595,7 +599,7 @@ class AdminUsers(APIView):
 
             data.append(info)
 
-        return data
+        return data, total_count
 
     def get(self, request):
         """List all users in DB or LDAPImport
@@ -643,19 +647,14 @@ class AdminUsers(APIView):
                           ccnet_api.count_inactive_emailusers('DB')
             if order_by:
 
-                if total_count > 500 and \
-                        not getattr(settings, 'ALWAYS_SORT_USERS_BY_QUOTA_USAGE', False):
-                    error_msg = _("There are more than 500 users, and sort is not offered.")
-                    return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
-
                 try:
-                    data = self.get_info_of_users_order_by_quota_usage(source,
-                                                                       direction,
-                                                                       page,
-                                                                       per_page,
-                                                                       is_active,
-                                                                       role,
-                                                                       )
+                    data, total_count = self.get_info_of_users_order_by_quota_usage(request,
+                                                                                    source,
+                                                                                    direction,
+                                                                                    page,
+                                                                                    per_page,
+                                                                                    is_active,
+                                                                                    role)
                 except Exception as e:
                     logger.error(e)
                     error_msg = 'Internal Server Error'
@@ -680,16 +679,12 @@ class AdminUsers(APIView):
 
             if order_by:
 
-                if total_count > 500 and \
-                        not getattr(settings, 'ALWAYS_SORT_USERS_BY_QUOTA_USAGE', False):
-                    error_msg = _("There are more than 500 users, and sort is not offered.")
-                    return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
-
                 try:
-                    data = self.get_info_of_users_order_by_quota_usage(source,
-                                                                       direction,
-                                                                       page,
-                                                                       per_page)
+                    data, total_count = self.get_info_of_users_order_by_quota_usage(request,
+                                                                                    source,
+                                                                                    direction,
+                                                                                    page,
+                                                                                    per_page)
                 except Exception as e:
                     logger.error(e)
                     error_msg = 'Internal Server Error'
@@ -0,0 +1,73 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+
+from seahub.api2.authentication import TokenAuthentication
+from seahub.api2.throttling import UserRateThrottle
+from seahub.api2.utils import api_error
+from seahub.utils.user_report import start_user_export_task, \
+    get_user_export_status, is_valid_user_export_task_id
+
+logger = logging.getLogger(__name__)
+
+
+class SysUsersExportExcel(APIView):
+    authentication_classes = (TokenAuthentication, SessionAuthentication)
+    permission_classes = (IsAdminUser,)
+    throttle_classes = (UserRateThrottle,)
+
+    def post(self, request):
+        """ Start exporting all users to excel in background.
+
+        Permission checking:
+        1. only admin can perform this action.
+        """
+        if not request.user.admin_permissions.can_manage_user():
+            return api_error(status.HTTP_403_FORBIDDEN, 'Permission denied.')
+
+        try:
+            task_id = start_user_export_task()
+        except Exception as e:
+            logger.error(e)
+            error_msg = 'Internal Server Error'
+            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
+
+        if not task_id:
+            error_msg = 'Another export is running, please try again later.'
+            return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
+        return Response({'task_id': task_id})
+
+    def get(self, request):
+        """ Get progress of an export.
+
+        Permission checking:
+        1. only admin can perform this action.
+        """
+        if not request.user.admin_permissions.can_manage_user():
+            return api_error(status.HTTP_403_FORBIDDEN, 'Permission denied.')
+
+        task_id = request.GET.get('task_id', '')
+        if not is_valid_user_export_task_id(task_id):
+            error_msg = 'task_id invalid.'
+            return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
+        task_status = get_user_export_status(task_id)
+        if not task_status:
+            error_msg = 'Task %s not found.' % task_id
+            return api_error(status.HTTP_404_NOT_FOUND, error_msg)
+
+        if task_status['failed']:
+            error_msg = 'Internal Server Error'
+            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
+
+        return Response({
+            'is_finished': task_status['is_finished'],
+            'done': task_status['done'],
+            'total': task_status['total'],
+        })
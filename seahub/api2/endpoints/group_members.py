@@ -28,7 +28,8 @@ from seahub.base.accounts import User
 from seahub.group.signals import add_user_to_group
 from seahub.group.views import group_invite
 from seahub.group.utils import is_group_member, is_group_admin, \
-    is_group_owner, is_group_admin_or_owner, get_group_member_info
+    is_group_owner, is_group_admin_or_owner, get_group_member_info, \
+    get_group_member_info_list
 from seahub.profile.models import Profile
 from seahub.settings import MULTI_TENANCY
 
@@ -70,15 +71,12 @@ class GroupMembers(APIView):
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        group_members = []
         is_admin = request.GET.get('is_admin', 'false')
-        for m in members:
+        if is_admin == 'true':
             # only return group admins
-            if is_admin == 'true' and not m.is_staff:
-                continue
+            members = [m for m in members if m.is_staff]
 
-            member_info = get_group_member_info(request, group_id, m.user_name)
-            group_members.append(member_info)
+        group_members = get_group_member_info_list(request, group_id, members)
 
         return Response(group_members)
 
@@ -151,13 +149,8 @@ class GroupSearchMember(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
-        group_members = []
         members = ccnet_api.search_group_members(group_id, q)
-        for member in members:
-
-            member_info = get_group_member_info(request, group_id, member.user_name)
-
-            group_members.append(member_info)
+        group_members = get_group_member_info_list(request, group_id, members)
 
         return Response(group_members)
 
@@ -26,7 +26,7 @@ from seahub.base.templatetags.seahub_tags import email2nickname, \
 from seahub.base.accounts import User
 from seahub.organizations.models import OrgAdminSettings, DISABLE_ORG_ENCRYPTED_LIBRARY
 from seahub.organizations.views import org_user_exists
-from seahub.signals import repo_created
+from seahub.signals import repo_created, repo_renamed
 from seahub.group.utils import is_group_admin, is_group_member
 from seahub.utils import is_valid_dirent_name, is_org_context, \
         is_pro_version, normalize_dir_path, is_valid_username, \
@@ -41,7 +41,8 @@ from seahub.share.utils import share_dir_to_user, share_dir_to_group, update_use
         check_user_share_out_permission, update_group_dir_permission, \
         check_group_share_out_permission, check_user_share_in_permission, \
         normalize_custom_permission_name
-from seahub.share.models import FileShare, UploadLinkShare
+from seahub.share.models import FileShare, UploadLinkShare, \
+    clear_share_link_token_cache_by
 
 from seahub.constants import PERMISSION_READ, PERMISSION_READ_WRITE, \
         PERMISSION_PREVIEW, PERMISSION_PREVIEW_EDIT
@@ -225,6 +226,8 @@ class GroupOwnedLibrary(APIView):
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
+        repo_renamed.send(sender=None, repo_id=repo_id)
+
         repo_info = get_group_owned_repo_info(request, repo_id)
         return Response(repo_info)
 
@@ -1513,6 +1516,7 @@ class GroupOwnedLibraryTransferView(APIView):
         try:
             UploadLinkShare.objects.filter(username=repo_owner, repo_id=repo_id).update(username=new_owner)
             FileShare.objects.filter(username=repo_owner, repo_id=repo_id).update(username=new_owner)
+            clear_share_link_token_cache_by(username=new_owner, repo_id=repo_id)
         except Exception as e:
             logger.error(e)
             error_msg = 'Internal Server Error'
@@ -25,6 +25,7 @@ from seahub.utils.repo import is_repo_admin
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 from seahub.wiki.models import Wiki
 from seahub.share.models import FileShare
+from seahub.share.view_counter import get_view_cnt
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +67,7 @@ def get_share_link_info(fileshare):
     data['link'] = gen_shared_link(token, fileshare.s_type)
     data['ctime'] = ctime
     data['expire_date'] = expire_date
-    data['view_cnt'] = fileshare.view_cnt
+    data['view_cnt'] = get_view_cnt(fileshare)
 
     return data
 
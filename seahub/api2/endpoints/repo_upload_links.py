@@ -19,6 +19,7 @@ from seahub.avatar.templatetags.avatar_tags import api_avatar_url
 from seahub.base.templatetags.seahub_tags import email2nickname, \
         email2contact_email
 from seahub.share.models import UploadLinkShare
+from seahub.share.view_counter import get_view_cnt
 from seahub.utils import gen_shared_upload_link
 from seahub.utils.repo import is_repo_admin
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
@@ -61,7 +62,7 @@ def get_upload_link_info(upload_link):
     data['link'] = gen_shared_upload_link(token)
     data['ctime'] = ctime
     data['expire_date'] = expire_date
-    data['view_cnt'] = upload_link.view_cnt
+    data['view_cnt'] = get_view_cnt(upload_link)
 
     return data
 
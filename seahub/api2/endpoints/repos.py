@@ -32,6 +32,7 @@ from seahub.utils.timeutils import timestamp_to_isoformat_timestr
 from seahub.utils.repo import get_repo_owner, is_repo_admin, \
         repo_has_been_shared_out, normalize_repo_status_code
 from seahub.avatar.templatetags.avatar_tags import api_avatar_url
+from seahub.profile.utils import UserInfoResolver
 
 from seahub.settings import ENABLE_STORAGE_CLASSES
 
@@ -72,9 +73,8 @@ class ReposView(APIView):
 
         email = request.user.username
 
-        # Use dict to reduce memcache fetch cost in large for-loop.
-        contact_email_dict = {}
-        nickname_dict = {}
+        # Resolve all users in bulk to reduce memcache fetch cost.
+        user_info = UserInfoResolver.for_request(request)
 
         org_id = None
         if is_org_context(request):
@@ -100,11 +100,7 @@ class ReposView(APIView):
 
             # Reduce memcache fetch ops.
             modifiers_set = {x.last_modifier for x in owned_repos}
-            for e in modifiers_set:
-                if e not in contact_email_dict:
-                    contact_email_dict[e] = email2contact_email(e)
-                if e not in nickname_dict:
-                    nickname_dict[e] = email2nickname(e)
+            user_info.resolve(modifiers_set | {email}, with_avatar=True)
 
             owned_repo_ids = [item.repo_id for item in owned_repos]
             try:
@@ -124,7 +120,6 @@ class ReposView(APIView):
 
                 if is_wiki_repo(r):
                     continue
-                url, _, _ = api_avatar_url(email)
 
                 enable_onlyoffice, _ = get_office_feature_by_repo(r)
 
@@ -133,13 +128,13 @@ class ReposView(APIView):
                     "repo_id": r.id,
                     "repo_name": r.name,
                     "owner_email": email,
-                    "owner_name": email2nickname(email),
-                    "owner_contact_email": email2contact_email(email),
-                    "owner_avatar": url,
+                    "owner_name": user_info.get_nickname(email),
+                    "owner_contact_email": user_info.get_contact_email(email),
+                    "owner_avatar": user_info.get_avatar_url(email),
                     "last_modified": timestamp_to_isoformat_timestr(r.last_modify),
                     "modifier_email": r.last_modifier,
-                    "modifier_name": nickname_dict.get(r.last_modifier, ''),
-                    "modifier_contact_email": contact_email_dict.get(r.last_modifier, ''),
+                    "modifier_name": user_info.get_nickname(r.last_modifier),
+                    "modifier_contact_email": user_info.get_contact_email(r.last_modifier),
                     "size": r.size,
                     "encrypted": r.encrypted,
                     "permission": 'rw',  # Always have read-write permission to owned repo
@@ -169,11 +164,8 @@ class ReposView(APIView):
             # Reduce memcache fetch ops.
             owners_set = {x.user for x in shared_repos}
             modifiers_set = {x.last_modifier for x in shared_repos}
-            for e in owners_set | modifiers_set:
-                if e not in contact_email_dict:
-                    contact_email_dict[e] = email2contact_email(e)
-                if e not in nickname_dict:
-                    nickname_dict[e] = email2nickname(e)
+            user_info.resolve(modifiers_set)
+            user_info.resolve(owners_set, with_avatar=True)
 
             shared_repo_ids = [item.repo_id for item in shared_repos]
             try:
@@ -199,9 +191,9 @@ class ReposView(APIView):
                     group_id = get_group_id_by_repo_owner(owner_email)
                     group_name = group_id_to_name(group_id)
 
-                owner_name = group_name if is_group_owned_repo else nickname_dict.get(owner_email, '')
-                owner_contact_email = '' if is_group_owned_repo else contact_email_dict.get(owner_email, '')
-                url, _, _ = api_avatar_url(owner_email)
+                owner_name = group_name if is_group_owned_repo else user_info.get_nickname(owner_email)
+                owner_contact_email = '' if is_group_owned_repo else user_info.get_contact_email(owner_email)
+                url = user_info.get_avatar_url(owner_email)
 
                 enable_onlyoffice, _ = get_office_feature_by_repo(r)
 
@@ -211,8 +203,8 @@ class ReposView(APIView):
                     "repo_name": r.repo_name,
                     "last_modified": timestamp_to_isoformat_timestr(r.last_modify),
                     "modifier_email": r.last_modifier,
-                    "modifier_name": nickname_dict.get(r.last_modifier, ''),
-                    "modifier_contact_email": contact_email_dict.get(r.last_modifier, ''),
+                    "modifier_name": user_info.get_nickname(r.last_modifier),
+                    "modifier_contact_email": user_info.get_contact_email(r.last_modifier),
                     "owner_email": owner_email,
                     "owner_name": owner_name,
                     "owner_contact_email": owner_contact_email,
@@ -244,13 +236,8 @@ class ReposView(APIView):
             group_repos.sort(key=lambda x: x.last_modify, reverse=True)
 
             # Reduce memcache fetch ops.
-            share_from_set = {x.user for x in group_repos}
             modifiers_set = {x.last_modifier for x in group_repos}
-            for e in modifiers_set | share_from_set:
-                if e not in contact_email_dict:
-                    contact_email_dict[e] = email2contact_email(e)
-                if e not in nickname_dict:
-                    nickname_dict[e] = email2nickname(e)
+            user_info.resolve(modifiers_set)
 
             group_repo_ids = [item.repo_id for item in group_repos]
             try:
@@ -275,8 +262,8 @@ class ReposView(APIView):
                     "repo_name": r.repo_name,
                     "last_modified": timestamp_to_isoformat_timestr(r.last_modify),
                     "modifier_email": r.last_modifier,
-                    "modifier_name": nickname_dict.get(r.last_modifier, ''),
-                    "modifier_contact_email": contact_email_dict.get(r.last_modifier, ''),
+                    "modifier_name": user_info.get_nickname(r.last_modifier),
+                    "modifier_contact_email": user_info.get_contact_email(r.last_modifier),
                     "size": r.size,
                     "encrypted": r.encrypted,
                     "permission": r.permission,
@@ -303,13 +290,9 @@ class ReposView(APIView):
 
             # Reduce memcache fetch ops.
             owner_set = set(all_repo_owner)
-            share_from_set = {x.user for x in public_repos}
             modifiers_set = {x.last_modifier for x in public_repos}
-            for e in modifiers_set | share_from_set | owner_set:
-                if e not in contact_email_dict:
-                    contact_email_dict[e] = email2contact_email(e)
-                if e not in nickname_dict:
-                    nickname_dict[e] = email2nickname(e)
+            user_info.resolve(modifiers_set)
+            user_info.resolve(owner_set, with_avatar=True)
 
             for r in public_repos:
 
@@ -317,7 +300,6 @@ class ReposView(APIView):
                     continue
 
                 repo_owner = repo_id_owner_dict[r.repo_id]
-                url, _, _ = api_avatar_url(repo_owner)
                 enable_onlyoffice, _ = get_office_feature_by_repo(r)
                 repo_info = {
                     "type": "public",
@@ -325,12 +307,12 @@ class ReposView(APIView):
                     "repo_name": r.repo_name,
                     "last_modified": timestamp_to_isoformat_timestr(r.last_modify),
                     "modifier_email": r.last_modifier,
-                    "modifier_name": nickname_dict.get(r.last_modifier, ''),
-                    "modifier_contact_email": contact_email_dict.get(r.last_modifier, ''),
+                    "modifier_name": user_info.get_nickname(r.last_modifier),
+                    "modifier_contact_email": user_info.get_contact_email(r.last_modifier),
                     "owner_email": repo_owner,
-                    "owner_name": nickname_dict.get(repo_owner, ''),
-                    "owner_contact_email": contact_email_dict.get(repo_owner, ''),
-                    "owner_avatar": url,
+                    "owner_name": user_info.get_nickname(repo_owner),
+                    "owner_contact_email": user_info.get_contact_email(repo_owner),
+                    "owner_avatar": user_info.get_avatar_url(repo_owner),
                     "size": r.size,
                     "encrypted": r.encrypted,
                     "permission": r.permission,
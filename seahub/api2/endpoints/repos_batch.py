@@ -1,7 +1,7 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 import os
-import posixpath
 import json
+import time
 import logging
 
 from pysearpc import SearpcError
@@ -32,12 +32,14 @@ from seahub.utils import is_org_context, send_perm_audit_msg, \
         normalize_dir_path, get_folder_permission_recursively, \
         normalize_file_path, check_filename_with_rename, get_file_type_and_ext
 from seahub.utils.repo import get_repo_owner, get_available_repo_perms, \
-        parse_repo_perm, get_locked_files_by_dir, get_sub_folder_permission_by_dir
+        parse_repo_perm, BatchPrecheck
+from seahub.utils.repo_cache import get_repo_meta
+from seahub.utils.db_api import SeafileDB
 
 from seahub.views import check_folder_permission
 from seahub.settings import MAX_PATH
 from seahub.utils.file_types import SEADOC
-from seahub.seadoc.utils import copy_sdoc_images, move_sdoc_images
+from seahub.seadoc.utils import copy_sdoc_images_in_batch, move_sdoc_images_in_batch
 
 logger = logging.getLogger(__name__)
 
@@ -62,15 +64,6 @@ class ReposBatchView(APIView):
 
         return ret
 
-    def has_shared_to_user(self, request, repo_id, username):
-        users = self.get_repo_shared_to_users(request, repo_id)
-
-        has_shared = False
-        if username in users:
-            has_shared = True
-
-        return has_shared
-
     def get_repo_shared_to_groups(self, request, repo_id):
         username = request.user.username
         if is_org_context(request):
@@ -88,14 +81,45 @@ class ReposBatchView(APIView):
 
         return ret
 
-    def has_shared_to_group(self, request, repo_id, group_id):
-        group_ids = self.get_repo_shared_to_groups(request, repo_id)
+    def get_repo_owners(self, request, repo_ids):
+        """ Return a dict of repo id to owner of the existing repos in
+        `repo_ids`, read from seafile db by one query.
+        """
+        try:
+            repo_owners = SeafileDB().get_repo_owners(repo_ids)
+        except Exception as e:
+            # e.g. seafile db not reachable by seahub, ask seafile one by one
+            logger.warning(e)
+            return {repo_id: get_repo_owner(request, repo_id)
+                    for repo_id in repo_ids if get_repo_meta(repo_id).repo}
+
+        ret = {}
+        for repo_id, (owner, org_owner) in repo_owners.items():
+            if is_org_context(request):
+                ret[repo_id] = org_owner
+            else:
+                ret[repo_id] = owner or org_owner
 
-        has_shared = False
-        if group_id in group_ids:
-            has_shared = True
+        return ret
 
-        return has_shared
+    def get_repos_shared_to(self, request, repo_ids, share_type):
+        """ Return a dict of repo id to the set of users or group ids the
+        repo is shared to by current user, read from seafile db by one query.
+        """
+        username = request.user.username
+        org_id = request.user.org.org_id if is_org_context(request) else ''
+        try:
+            return SeafileDB().get_repos_shared_to(repo_ids, username,
+                                                   share_type, org_id)
+        except Exception as e:
+            logger.warning(e)
+
+        if share_type == 'user':
+            return {repo_id: set(self.get_repo_shared_to_users(request, repo_id))
+                    for repo_id in repo_ids}
+        else:
+            return {repo_id: set(self.get_repo_shared_to_groups(request, repo_id))
+                    for repo_id in repo_ids}
 
     def post(self, request):
 
@@ -119,17 +143,22 @@ class ReposBatchView(APIView):
         repo_id_list = request.data.getlist('repo_id')
         valid_repo_id_list = []
 
+        # seconds spent in each phase, logged at the end
+        timings = {}
+        phase_start = time.monotonic()
+
         # filter out invalid repo id
+        repo_owners = self.get_repo_owners(request, list(set(repo_id_list)))
         for repo_id in repo_id_list:
 
-            if not seafile_api.get_repo(repo_id):
+            if repo_id not in repo_owners:
                 result['failed'].append({
                     'repo_id': repo_id,
                     'error_msg': 'Library %s not found.' % repo_id
                 })
                 continue
 
-            repo_owner = get_repo_owner(request, repo_id)
+            repo_owner = repo_owners[repo_id]
             if repo_owner != username and not is_repo_admin(username, repo_id):
                 result['failed'].append({
                     'repo_id': repo_id,
@@ -191,8 +220,14 @@ class ReposBatchView(APIView):
                                 % (to_username, org_of_to_user[0].org_name)
                         return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
+                timings['validate'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+                shared_to = self.get_repos_shared_to(request, valid_repo_id_list, 'user')
+                timings['read_shares'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+
                 for repo_id in valid_repo_id_list:
-                    if self.has_shared_to_user(request, repo_id, to_username):
+                    if to_username in shared_to.get(repo_id, ()):
                         result['failed'].append({
                             'repo_id': repo_id,
                             'error_msg': 'This item has been shared to %s.' % to_username
@@ -215,7 +250,7 @@ class ReposBatchView(APIView):
                                                    permission)
 
                         # send a signal when sharing repo successful
-                        repo = seafile_api.get_repo(repo_id)
+                        repo = get_repo_meta(repo_id).repo
                         share_repo_to_user_successful.send(sender=None,
                                                            from_user=username,
                                                            to_user=to_username,
@@ -260,8 +295,14 @@ class ReposBatchView(APIView):
                     error_msg = 'User %s is not member of group %s.' % (username, group_name)
                     return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
+                timings['validate'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+                shared_to = self.get_repos_shared_to(request, valid_repo_id_list, 'group')
+                timings['read_shares'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+
                 for repo_id in valid_repo_id_list:
-                    if self.has_shared_to_group(request, repo_id, to_group_id):
+                    if to_group_id in shared_to.get(repo_id, ()):
                         result['failed'].append({
                             'repo_id': repo_id,
                             'error_msg': 'This item has been shared to %s.' % group_name
@@ -279,7 +320,7 @@ class ReposBatchView(APIView):
                                     repo_id, to_group_id, username, permission)
 
                         # send a signal when sharing repo successful
-                        repo = seafile_api.get_repo(repo_id)
+                        repo = get_repo_meta(repo_id).repo
                         share_repo_to_group_successful.send(sender=None,
                                                             from_user=username,
                                                             group_id=to_group_id,
@@ -322,16 +363,22 @@ class ReposBatchView(APIView):
                     error_msg = 'username invalid.'
                     return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
+                timings['validate'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+                shared_to = self.get_repos_shared_to(request, valid_repo_id_list, 'user')
+                timings['read_shares'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+
                 for repo_id in valid_repo_id_list:
 
-                    if not self.has_shared_to_user(request, repo_id, to_username):
+                    if to_username not in shared_to.get(repo_id, ()):
                         result['failed'].append({
                             'repo_id': repo_id,
                             'error_msg': 'This item has not been shared to %s.' % to_username
                             })
                         continue
 
-                    repo_owner = get_repo_owner(request, repo_id)
+                    repo_owner = repo_owners[repo_id]
                     try:
                         # get share permission before unshare operation
                         permission = check_user_share_out_permission(repo_id,
@@ -382,8 +429,14 @@ class ReposBatchView(APIView):
                 group = ccnet_api.get_group(to_group_id)
                 group_name = group.group_name if group else ''
 
+                timings['validate'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+                shared_to = self.get_repos_shared_to(request, valid_repo_id_list, 'group')
+                timings['read_shares'] = time.monotonic() - phase_start
+                phase_start = time.monotonic()
+
                 for repo_id in valid_repo_id_list:
-                    if not self.has_shared_to_group(request, repo_id, to_group_id):
+                    if to_group_id not in shared_to.get(repo_id, ()):
                         result['failed'].append({
                             'repo_id': repo_id,
                             'error_msg': 'This item has not been shared to %s.' % group_name
@@ -425,6 +478,10 @@ class ReposBatchView(APIView):
                             'error_msg': 'Internal Server Error'
                         })
 
+        timings['apply'] = time.monotonic() - phase_start
+        logger.debug('Batch %s of %d libraries: %s.', operation, len(repo_id_list),
+                     ', '.join('%s %.3fs' % (k, v) for k, v in timings.items()))
+
         return Response(result)
 
 
@@ -1127,7 +1184,7 @@ class ReposAsyncBatchCopyItemView(APIView):
             return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
         # resource check
-        if not seafile_api.get_repo(src_repo_id):
+        if not get_repo_meta(src_repo_id).repo:
             error_msg = 'Library %s not found.' % src_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1193,11 +1250,10 @@ class ReposAsyncBatchCopyItemView(APIView):
                 filetype, fileext = get_file_type_and_ext(src_dirent)
                 if filetype == SEADOC:
                     sdoc_dirents_map[src_dirent] = dst_dirent
-            for src_dirent, dst_dirent in sdoc_dirents_map.items():
-                src_path = posixpath.join(src_parent_dir, src_dirent)
-                dst_path = posixpath.join(dst_parent_dir, dst_dirent)
-                copy_sdoc_images(
-                    src_repo_id, src_path, dst_repo_id, dst_path, username, is_async=True)
+            if sdoc_dirents_map:
+                copy_sdoc_images_in_batch(
+                    src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir,
+                    sdoc_dirents_map, username, is_async=True)
         except Exception as e:
             logger.error(e)
 
@@ -1254,7 +1310,7 @@ class ReposAsyncBatchMoveItemView(APIView):
             return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
         # resource check
-        if not seafile_api.get_repo(src_repo_id):
+        if not get_repo_meta(src_repo_id).repo:
             error_msg = 'Library %s not found.' % src_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1288,25 +1344,18 @@ class ReposAsyncBatchMoveItemView(APIView):
             result = {'lib_need_decrypt': True}
             return Response(result, status=status.HTTP_403_FORBIDDEN)
 
-        # check locked files
+        # check locked files and sub folder permission
         username = request.user.username
-        locked_files = get_locked_files_by_dir(request, src_repo_id, src_parent_dir)
-        for dirent in src_dirents:
-            # file is locked and lock owner is not current user
-            if dirent in list(locked_files.keys()) and \
-                    locked_files[dirent] != username:
-                error_msg = _('File %s is locked.') % dirent
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
-
-        # check sub folder permission
-        folder_permission_dict = get_sub_folder_permission_by_dir(request,
-                                                                  src_repo_id,
-                                                                  src_parent_dir)
-        for dirent in src_dirents:
-            if dirent in list(folder_permission_dict.keys()) and \
-                    parse_repo_perm(folder_permission_dict[dirent]).can_edit_on_web is False:
-                error_msg = _("Can't move folder %s, please check its permission.") % dirent
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
+        failures = BatchPrecheck(request, src_repo_id).check(
+            src_parent_dir, src_dirents,
+            can_change_folder=lambda perm: parse_repo_perm(perm).can_edit_on_web is not False)
+        if failures:
+            failure = failures[0]
+            if failure['error'] == BatchPrecheck.LOCKED:
+                error_msg = _('File %s is locked.') % failure['name']
+            else:
+                error_msg = _("Can't move folder %s, please check its permission.") % failure['name']
+            return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
         dirents_map = {}
         dst_dirents = []
@@ -1339,11 +1388,10 @@ class ReposAsyncBatchMoveItemView(APIView):
                 filetype, fileext = get_file_type_and_ext(src_dirent)
                 if filetype == SEADOC:
                     sdoc_dirents_map[src_dirent] = dst_dirent
-            for src_dirent, dst_dirent in sdoc_dirents_map.items():
-                src_path = posixpath.join(src_parent_dir, src_dirent)
-                dst_path = posixpath.join(dst_parent_dir, dst_dirent)
-                move_sdoc_images(
-                    src_repo_id, src_path, dst_repo_id, dst_path, username, is_async=True)
+            if sdoc_dirents_map:
+                move_sdoc_images_in_batch(
+                    src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir,
+                    sdoc_dirents_map, username, is_async=True)
         except Exception as e:
             logger.error(e)
 
@@ -1400,7 +1448,7 @@ class ReposSyncBatchCopyItemView(APIView):
             return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
         # resource check
-        if not seafile_api.get_repo(src_repo_id):
+        if not get_repo_meta(src_repo_id).repo:
             error_msg = 'Library %s not found.' % src_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1408,7 +1456,7 @@ class ReposSyncBatchCopyItemView(APIView):
             error_msg = 'Folder %s not found.' % src_parent_dir
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
-        if not seafile_api.get_repo(dst_repo_id):
+        if not get_repo_meta(dst_repo_id).repo:
             error_msg = 'Library %s not found.' % dst_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1459,11 +1507,10 @@ class ReposSyncBatchCopyItemView(APIView):
                 filetype, fileext = get_file_type_and_ext(src_dirent)
                 if filetype == SEADOC:
                     sdoc_dirents_map[src_dirent] = dst_dirent
-            for src_dirent, dst_dirent in sdoc_dirents_map.items():
-                src_path = posixpath.join(src_parent_dir, src_dirent)
-                dst_path = posixpath.join(dst_parent_dir, dst_dirent)
-                copy_sdoc_images(
-                    src_repo_id, src_path, dst_repo_id, dst_path, username, is_async=False)
+            if sdoc_dirents_map:
+                copy_sdoc_images_in_batch(
+                    src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir,
+                    sdoc_dirents_map, username, is_async=False)
         except Exception as e:
             logger.error(e)
 
@@ -1520,7 +1567,7 @@ class ReposSyncBatchMoveItemView(APIView):
             return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
         # resource check
-        if not seafile_api.get_repo(src_repo_id):
+        if not get_repo_meta(src_repo_id).repo:
             error_msg = 'Library %s not found.' % src_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1528,7 +1575,7 @@ class ReposSyncBatchMoveItemView(APIView):
             error_msg = 'Folder %s not found.' % src_parent_dir
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
-        if not seafile_api.get_repo(dst_repo_id):
+        if not get_repo_meta(dst_repo_id).repo:
             error_msg = 'Library %s not found.' % dst_repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
@@ -1547,25 +1594,18 @@ class ReposSyncBatchMoveItemView(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
-        # check locked files
+        # check locked files and sub folder permission
         username = request.user.username
-        locked_files = get_locked_files_by_dir(request, src_repo_id, src_parent_dir)
-        for dirent in src_dirents:
-            # file is locked and lock owner is not current user
-            if dirent in list(locked_files.keys()) and \
-                    locked_files[dirent] != username:
-                error_msg = _('File %s is locked.') % dirent
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
-
-        # check sub folder permission
-        folder_permission_dict = get_sub_folder_permission_by_dir(request,
-                                                                  src_repo_id,
-                                                                  src_parent_dir)
-        for dirent in src_dirents:
-            if dirent in list(folder_permission_dict.keys()) and \
-                    parse_repo_perm(folder_permission_dict[dirent]).can_edit_on_web is False:
-                error_msg = _("Can't move folder %s, please check its permission.") % dirent
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
+        failures = BatchPrecheck(request, src_repo_id).check(
+            src_parent_dir, src_dirents,
+            can_change_folder=lambda perm: parse_repo_perm(perm).can_edit_on_web is not False)
+        if failures:
+            failure = failures[0]
+            if failure['error'] == BatchPrecheck.LOCKED:
+                error_msg = _('File %s is locked.') % failure['name']
+            else:
+                error_msg = _("Can't move folder %s, please check its permission.") % failure['name']
+            return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
         # move file
         result = {}
@@ -1639,23 +1679,18 @@ class ReposBatchDeleteItemView(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
-        # check locked files
+        # check locked files and sub folder permission
         username = request.user.username
-        locked_files = get_locked_files_by_dir(request, repo_id, parent_dir)
-        for dirent in dirents:
-            # file is locked and lock owner is not current user
-            if dirent in list(locked_files.keys()) and \
-                    locked_files[dirent] != username:
-                error_msg = _('File %s is locked.') % dirent
+        failures = BatchPrecheck(request, repo_id).check(
+            parent_dir, dirents,
+            can_change_folder=lambda perm: perm in ('rw', 'cloud-edit'))
+        if failures:
+            failure = failures[0]
+            if failure['error'] == BatchPrecheck.LOCKED:
+                error_msg = _('File %s is locked.') % failure['name']
                 return api_error(status.HTTP_423_LOCKED, error_msg)
-
-        # check sub folder permission
-        folder_permission_dict = get_sub_folder_permission_by_dir(request, repo_id, parent_dir)
-        for dirent in dirents:
-            if dirent in list(folder_permission_dict.keys()) and \
-                    folder_permission_dict[dirent] not in ('rw', 'cloud-edit'):
-                error_msg = _("Can't delete folder %s, please check its permission.") % dirent
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
+            error_msg = _("Can't delete folder %s, please check its permission.") % failure['name']
+            return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
         # delete file
         result = {}
@@ -1711,25 +1746,13 @@ class RepoFoldersItemBatchDelete(APIView):
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
         username = request.user.username
-        parent_dir_dirents_map = {}
-        
-        for file_path in file_names:
-            parent_dir = os.path.dirname(file_path)
-            basename = os.path.basename(file_path)
-            if not parent_dir_dirents_map.get(parent_dir, []):
-                parent_dir_dirents_map[parent_dir] = [basename,]
-            else:
-                parent_dir_dirents_map[parent_dir].append(basename)
-                
-        for parent_dir, dirents  in parent_dir_dirents_map.items():
-            locked_files = get_locked_files_by_dir(request, repo_id, parent_dir)
-            for dirent in dirents:
-                # file is locked and lock owner is not current user
-                if dirent in list(locked_files.keys()) and \
-                    locked_files[dirent] != request.user.username:
-                    error_msg = _('File %s is locked.') % dirent
-                    return api_error(status.HTTP_423_LOCKED, error_msg)
-                
+
+        # check locked files, each parent folder is listed once
+        failures = BatchPrecheck(request, repo_id).check_paths(file_names)
+        if failures:
+            error_msg = _('File %s is locked.') % failures[0]['name']
+            return api_error(status.HTTP_423_LOCKED, error_msg)
+
         try:
             seafile_api.batch_del_files(repo_id, json.dumps(file_names), username)
         except Exception as e:
@@ -3,7 +3,6 @@ import os
 import sys
 import logging
 
-from django.db.models import Q
 from django.conf import settings as django_settings
 
 from rest_framework.authentication import SessionAuthentication
@@ -20,6 +19,7 @@ from seahub.api2.utils import api_error
 
 from seahub.utils import is_valid_email, is_org_context
 from seahub.utils.ccnet_db import CcnetDB
+from seahub.utils.user_search_index import search_users
 from seahub.base.accounts import User
 from seahub.base.templatetags.seahub_tags import email2nickname, \
         email2contact_email
@@ -74,31 +74,17 @@ class SearchUser(APIView):
             if CLOUD_MODE:
                 if is_org_context(request):
 
-                    # get all org users
-                    url_prefix = request.user.org.url_prefix
+                    # search user from org users
+                    org_id = request.user.org.org_id
                     try:
-                        all_org_users = ccnet_api.get_org_users_by_url_prefix(url_prefix, -1, -1)
+                        email_list += search_users(
+                            q, 20, org_id,
+                            listed_only=django_settings.ENABLE_ADDRESSBOOK_OPT_IN)
                     except Exception as e:
                         logger.error(e)
                         error_msg = 'Internal Server Error'
                         return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-                    limited_emails = []
-                    for org_user in all_org_users:
-
-                        if not org_user.is_active:
-                            continue
-
-                        # prepare limited emails for search from profile
-                        limited_emails.append(org_user.email)
-
-                        # search user from org users
-                        if q in org_user.email:
-                            email_list.append(org_user.email)
-
-                    # search from profile, limit search range in all org users
-                    email_list += search_user_from_profile_with_limits(q, limited_emails)
-
                 elif ENABLE_GLOBAL_ADDRESSBOOK:
                     # search from ccnet
                     email_list += search_user_from_ccnet(q)
@@ -137,10 +123,11 @@ class SearchUser(APIView):
 
         if django_settings.ENABLE_ADDRESSBOOK_OPT_IN:
             # get users who has setted to show in address book
-            listed_users = Profile.objects.filter(list_in_address_book=True).values('user')
+            listed_users = Profile.objects.filter(
+                user__in=email_result, list_in_address_book=True).values('user')
             listed_user_list = [u['user'] for u in listed_users]
 
-            email_result = list(set(email_result) & set(listed_user_list))
+            email_result = [e for e in email_result if e in listed_user_list]
 
         # check if include myself in user result
         try:
@@ -205,50 +192,13 @@ def search_user_from_ccnet(q, offset=0, limit=10):
     return email_list
 
 
-def search_user_from_profile(q, offset=0, limit=10, max_attempts=10):
-    """Return a list of email addresses, with a length of at least 10.
-
-    If not enough results are found, continue searching up to max_attempts times.
-    """
-    email_list = []
-    attempts = 0
-
-    ccnet_db = CcnetDB()
-
-    while len(email_list) < 10 and attempts < max_attempts:
-
-        # Search by nickname, contact email, or login ID
-        users = Profile.objects.filter(
-            Q(nickname__icontains=q) |
-            Q(contact_email__icontains=q) |
-            Q(login_id__icontains=q)
-        ).values('user')[offset:offset + limit]
-
-        new_emails = ccnet_db.get_active_users_by_user_list([user['user'] for user in users])
-        email_list.extend([email for email in new_emails if email not in email_list])
-        offset += limit
-        attempts += 1
-
-    return email_list[:10]
-
-
-def search_user_from_profile_with_limits(q, limited_emails):
+def search_user_from_profile(q, limit=10):
     """ Return 10 items at most.
-    """
-    # search within limited_emails
-    users = Profile.objects.filter(
-        Q(user__in=limited_emails) & (
-            Q(nickname__icontains=q) |
-            Q(contact_email__icontains=q) |
-            Q(login_id__icontains=q)
-        )
-    ).values('user')[:10]
 
-    email_list = []
-    for user in users:
-        email_list.append(user['user'])
-
-    return email_list
+    Search active users whose email, nickname, contact email, login id or
+    pinyin of nickname starts with `q`, or has a word starting with `q`.
+    """
+    return search_users(q, limit)
 
 
 def search_user_when_global_address_book_disabled(request, q):
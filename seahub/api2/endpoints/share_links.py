@@ -33,7 +33,9 @@ from seahub.base.templatetags.seahub_tags import email2nickname
 from seahub.constants import PERMISSION_READ_WRITE, PERMISSION_READ, \
         PERMISSION_PREVIEW_EDIT, PERMISSION_PREVIEW
 from seahub.share.models import FileShare, UploadLinkShare, check_share_link_access, check_share_link_access_by_scope
+from seahub.share.view_counter import get_view_cnt, get_view_cnts
 from seahub.share.decorators import check_share_link_count
+from seahub.share.link_batch import ShareLinkBatch
 from seahub.share.utils import VALID_SHARE_LINK_SCOPE, SCOPE_SPECIFIC_USERS, SCOPE_SPECIFIC_EMAILS
 from seahub.utils import gen_shared_link, is_org_context, normalize_file_path, \
     normalize_dir_path, is_pro_version, get_file_type_and_ext, \
@@ -41,7 +43,8 @@ from seahub.utils import gen_shared_link, is_org_context, normalize_file_path, \
     get_password_strength_level, is_valid_password, is_valid_email, string2list, gen_file_get_url_by_sharelink
 from seahub.utils.file_op import if_locked_by_online_office
 from seahub.utils.file_types import IMAGE, VIDEO, XMIND, PDF
-from seahub.utils.file_tags import get_tagged_files, get_files_tags_in_dir
+from seahub.utils.file_tags import get_tagged_files, get_files_tags_in_dir, \
+    get_repo_tagged_files
 from seahub.utils.timeutils import datetime_to_isoformat_timestr, \
         timestamp_to_isoformat_timestr
 from seahub.utils.repo import parse_repo_perm
@@ -60,16 +63,18 @@ from seahub.repo_tags.models import RepoTags
 logger = logging.getLogger(__name__)
 
 
-def get_share_link_info(fileshare):
+def get_share_link_info(fileshare, link_batch=None):
+    """ Return info of a share link, repo and dirent of it are got from
+    `link_batch` if given, a `ShareLinkBatch` holding the link.
+    """
     data = {}
     token = fileshare.token
 
+    if link_batch is None:
+        link_batch = ShareLinkBatch([fileshare])
+
     repo_id = fileshare.repo_id
-    try:
-        repo = seafile_api.get_repo(repo_id)
-    except Exception as e:
-        logger.error(e)
-        repo = None
+    repo = link_batch.get_repo(repo_id)
 
     path = fileshare.path
     if path:
@@ -77,15 +82,7 @@ def get_share_link_info(fileshare):
     else:
         obj_name = ''
 
-    if repo:
-        if fileshare.s_type == 'd':
-            folder_path = normalize_dir_path(fileshare.path)
-            obj_id = seafile_api.get_dir_id_by_path(repo_id, folder_path)
-        else:
-            file_path = normalize_file_path(fileshare.path)
-            obj_id = seafile_api.get_file_id_by_path(repo_id, file_path)
-    else:
-        obj_id = ''
+    obj_id = link_batch.get_obj_id(fileshare) if repo else ''
 
     if fileshare.expire_date:
         expire_date = datetime_to_isoformat_timestr(fileshare.expire_date)
@@ -110,7 +107,7 @@ def get_share_link_info(fileshare):
     data['link'] = gen_shared_link(token, fileshare.s_type)
     data['download_link'] = gen_file_get_url_by_sharelink(token)
     data['show_download_link'] = fileshare.show_download_link
-    data['view_cnt'] = fileshare.view_cnt
+    data['view_cnt'] = get_view_cnt(fileshare)
     data['ctime'] = ctime
     data['expire_date'] = expire_date
     data['is_expired'] = fileshare.is_expired()
@@ -119,12 +116,7 @@ def get_share_link_info(fileshare):
     data['user_scope'] = fileshare.user_scope
     data['can_edit'] = False
     if repo and path != '/' and not data['is_dir']:
-        try:
-            dirent = seafile_api.get_dirent_by_path(repo_id, path)
-        except Exception as e:
-            logger.error(e)
-            dirent = None
-
+        dirent = link_batch.get_dirent(fileshare)
         if dirent:
             try:
                 can_edit, error_msg = can_edit_file(obj_name, dirent.size, repo)
@@ -234,18 +226,14 @@ class ShareLinks(APIView):
                                           .filter(repo_id=repo_id) \
                                           .filter(path=path)[offset:offset + per_page]
 
-        repo_object_dict = {}
+        link_batch = ShareLinkBatch(fileshares)
         repo_folder_permission_dict = {}
 
-        for fileshare in fileshares:
+        for fileshare in link_batch.links:
 
             repo_id = fileshare.repo_id
             path = fileshare.path
 
-            if repo_id not in repo_object_dict:
-                repo = seafile_api.get_repo(repo_id)
-                repo_object_dict[repo_id] = repo
-
             tmp_key = f"{repo_id}_{path}"
             if tmp_key not in repo_folder_permission_dict:
                 try:
@@ -256,8 +244,10 @@ class ShareLinks(APIView):
                 except Exception:
                     repo_folder_permission_dict[tmp_key] = ''
 
+        view_cnt_dict = get_view_cnts(link_batch.links)
+
         links_info = []
-        for fs in fileshares:
+        for fs in link_batch.links:
 
             link_info = {}
 
@@ -269,7 +259,7 @@ class ShareLinks(APIView):
             link_info['username'] = username
             link_info['repo_id'] = repo_id
 
-            repo_object = repo_object_dict.get(repo_id, '')
+            repo_object = link_batch.get_repo(repo_id)
             if repo_object:
                 repo_name = repo_object.repo_name
             else:
@@ -288,7 +278,7 @@ class ShareLinks(APIView):
             link_info['link'] = gen_shared_link(token, s_type)
             link_info['download_link'] = gen_file_get_url_by_sharelink(token)
             link_info['show_download_link'] = fs.show_download_link
-            link_info['view_cnt'] = fs.view_cnt
+            link_info['view_cnt'] = view_cnt_dict[fs.pk]
             link_info['ctime'] = datetime_to_isoformat_timestr(fs.ctime) if fs.ctime else ''
             link_info['expire_date'] = datetime_to_isoformat_timestr(fs.expire_date) if fs.expire_date else ''
             link_info['is_expired'] = fs.is_expired()
@@ -312,6 +302,7 @@ class ShareLinks(APIView):
 
             result = dir_list + file_list
 
+        logger.debug('share links of %s listed: %s', username, link_batch.stats)
         return Response(result)
 
     @check_share_link_count
@@ -1423,15 +1414,14 @@ class ShareLinkRepoTags(APIView):
         # get all tags in repo
         repo_tags = RepoTags.objects.filter(repo_id=repo_id)
 
-        # get tagged files by tag id
+        # get tagged files by tag id, of all tags at once
         tag_id_file_list_dict = defaultdict(list)
-        for repo_tag in repo_tags:
-            tagged_files = get_tagged_files(repo, repo_tag.pk)['tagged_files']
+        for repo_tag_id, tagged_files in get_repo_tagged_files(repo).items():
             tagged_files = [
                 item for item in tagged_files
                 if item.get('parent_path') and item.get('parent_path').startswith(share_link.path.rstrip('/'))
             ]
-            tag_id_file_list_dict[repo_tag.pk] = tagged_files
+            tag_id_file_list_dict[repo_tag_id] = tagged_files
 
         # generate response
         result = {
@@ -1504,28 +1494,44 @@ class ShareLinksCleanInvalid(APIView):
         """
 
         username = request.user.username
-        share_links = FileShare.objects.filter(username=username)
+        start = time.monotonic()
 
-        for share_link in share_links.iterator(chunk_size=1000):
+        share_links = FileShare.objects.filter(username=username) \
+            .only('pk', 'repo_id', 'path', 's_type', 'expire_date')
 
+        invalid_ids = []
+        unexpired_links = []
+        for share_link in share_links.iterator(chunk_size=1000):
             if share_link.is_expired():
-                share_link.delete()
-                continue
-
-            repo_id = share_link.repo_id
-            if not seafile_api.get_repo(repo_id):
-                share_link.delete()
-                continue
-
-            if share_link.s_type == 'd':
-                folder_path = normalize_dir_path(share_link.path)
-                obj_id = seafile_api.get_dir_id_by_path(repo_id, folder_path)
+                invalid_ids.append(share_link.pk)
             else:
-                file_path = normalize_file_path(share_link.path)
-                obj_id = seafile_api.get_file_id_by_path(repo_id, file_path)
-
-            if not obj_id:
-                share_link.delete()
-                continue
+                unexpired_links.append(share_link)
+
+        # links whose repo or path cannot be got are kept
+        link_batch = ShareLinkBatch(unexpired_links)
+        unknown_count = 0
+        for link in link_batch.links:
+            is_valid = link_batch.is_valid(link)
+            if is_valid is None:
+                unknown_count += 1
+            elif not is_valid:
+                invalid_ids.append(link.pk)
+
+        delete_start = time.monotonic()
+        # in chunks, to keep under the limit of query parameters of database
+        for i in range(0, len(invalid_ids), 1000):
+            FileShare.objects.filter(pk__in=invalid_ids[i:i + 1000]).delete()
+
+        stats = dict(link_batch.stats)
+        stats['deleted'] = len(invalid_ids)
+        stats['delete_time'] = time.monotonic() - delete_start
+        stats['total_time'] = time.monotonic() - start
+        logger.debug('invalid share links of %s cleaned: %s', username, stats)
+
+        if unknown_count:
+            logger.error('%d share links of %s not checked, seafile lookups failed'
+                         % (unknown_count, username))
+            error_msg = 'Internal Server Error'
+            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
         return Response({'success': True})
@@ -13,10 +13,9 @@ from seaserv import seafile_api, ccnet_api
 from seahub.api2.utils import api_error
 from seahub.api2.authentication import TokenAuthentication
 from seahub.api2.throttling import UserRateThrottle
-from seahub.profile.models import Profile
+from seahub.profile.utils import UserInfoResolver
 from seahub.utils import is_org_context, is_valid_username, send_perm_audit_msg
 from seahub.utils.repo import get_available_repo_perms
-from seahub.base.templatetags.seahub_tags import email2nickname, email2contact_email
 from seahub.share.models import ExtraSharePermission, ExtraGroupsSharePermission, \
         CustomSharePermissions
 from seahub.share.utils import update_user_dir_permission, update_group_dir_permission,\
@@ -76,6 +75,10 @@ class SharedRepos(APIView):
         usernames = []
         gids = []
 
+        user_info = UserInfoResolver.for_request(request)
+        user_info.resolve({repo.last_modifier for repo in shared_repos} |
+                          {repo.user for repo in shared_repos if repo.share_type == 'personal'})
+
         for repo in shared_repos:
             if repo.is_virtual:
                 continue
@@ -88,13 +91,13 @@ class SharedRepos(APIView):
             result['share_permission'] = repo.permission
             result['share_permission_name'] = custom_permission_dict.get(repo.permission, '')
             result['modifier_email'] = repo.last_modifier
-            result['modifier_name'] = email2nickname(repo.last_modifier)
-            result['modifier_contact_email'] = email2contact_email(repo.last_modifier)
+            result['modifier_name'] = user_info.get_nickname(repo.last_modifier)
+            result['modifier_contact_email'] = user_info.get_contact_email(repo.last_modifier)
 
             if repo.share_type == 'personal':
-                result['user_name'] = email2nickname(repo.user)
+                result['user_name'] = user_info.get_nickname(repo.user)
                 result['user_email'] = repo.user
-                result['contact_email'] = Profile.objects.get_contact_email_by_user(repo.user)
+                result['contact_email'] = user_info.get_contact_email(repo.user)
                 usernames.append((repo.repo_id, repo.user))
 
             if repo.share_type == 'group':
@@ -12,6 +12,7 @@ from seaserv import seafile_api
 from seahub.api2.authentication import TokenAuthentication
 from seahub.api2.throttling import UserRateThrottle
 from seahub.share.models import UploadLinkShare
+from seahub.share.view_counter import get_view_cnts
 from seahub.utils import gen_shared_upload_link
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 
@@ -26,6 +27,8 @@ class SharedUploadLinksView(APIView):
         username = request.user.username
 
         uploadlinks = UploadLinkShare.objects.filter(username=username)
+        view_cnt_dict = get_view_cnts(uploadlinks)
+
         p_uploadlinks = []
         for link in uploadlinks:
             r = seafile_api.get_repo(link.repo_id)
@@ -56,7 +59,7 @@ class SharedUploadLinksView(APIView):
                 "path": link.path,
                 "token": link.token,
                 "ctime": datetime_to_isoformat_timestr(link.ctime),
-                "view_cnt": link.view_cnt,
+                "view_cnt": view_cnt_dict[link.pk],
                 "expire_date": expire_date,
             })
 
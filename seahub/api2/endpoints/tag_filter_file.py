@@ -27,6 +27,9 @@ class TaggedFilesView(APIView):
 
     def get(self, request, repo_id, repo_tag_id):
         """list tagged files by repo tag
+
+        ``page`` and ``per_page`` are optional, all files are listed if no
+        ``page``.
         """
         # resource check
         repo = seafile_api.get_repo(repo_id)
@@ -44,7 +47,20 @@ class TaggedFilesView(APIView):
             error_msg = 'Permission denied.'
             return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
+        # paginated if page is given
+        start, limit = 0, -1
+        if 'page' in request.GET:
+            try:
+                page = int(request.GET.get('page', '1'))
+                per_page = int(request.GET.get('per_page', '100'))
+            except ValueError:
+                page = 1
+                per_page = 100
+
+            start = (max(page, 1) - 1) * per_page
+            limit = max(per_page, 0)
+
         # get tagged files dict
-        tagged_files = get_tagged_files(repo, repo_tag_id)
+        tagged_files = get_tagged_files(repo, repo_tag_id, start, limit)
 
         return Response(tagged_files, status=status.HTTP_200_OK)
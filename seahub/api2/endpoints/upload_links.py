@@ -25,6 +25,7 @@ from seahub.api2.throttling import AnonRateThrottle, UserRateThrottle
 from seahub.api2.permissions import CanGenerateUploadLink
 
 from seahub.share.models import UploadLinkShare, check_share_link_common
+from seahub.share.view_counter import get_view_cnt
 from seahub.utils import gen_shared_upload_link, gen_file_upload_url, \
         is_pro_version, get_password_strength_level, is_valid_password
 
@@ -75,7 +76,7 @@ def get_upload_link_info(uls):
     data['path'] = path
     data['obj_name'] = obj_name
     data['obj_id'] = obj_id or ""
-    data['view_cnt'] = uls.view_cnt
+    data['view_cnt'] = get_view_cnt(uls)
     data['ctime'] = ctime
     data['link'] = gen_shared_upload_link(token)
     data['token'] = token
@@ -21,6 +21,7 @@ from seahub.api2.throttling import UserRateThrottle
 from seahub.api2.utils import api_error
 from seahub.wiki.models import Wiki, DuplicateWikiNameError
 from seahub.wiki.utils import is_valid_wiki_name, slugfy_wiki_name
+from seahub.signals import repo_renamed
 from seahub.utils import is_org_context, get_user_repos, gen_inner_file_get_url, gen_file_upload_url
 from seahub.utils.repo import is_group_repo_staff, is_repo_owner
 from seahub.views import check_folder_permission
@@ -227,6 +228,7 @@ class WikiView(APIView):
             return api_error(status.HTTP_400_BAD_REQUEST, msg)
 
         if edit_repo(wiki.repo_id, wiki_name, '', username):
+            repo_renamed.send(sender=None, repo_id=wiki.repo_id)
             wiki.slug = wiki_slug
             wiki.name = wiki_name
             wiki.save()
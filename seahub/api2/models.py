@@ -7,14 +7,31 @@ from hashlib import sha1
 import operator
 from functools import cmp_to_key
 
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 
 from seahub.base.fields import LowerCaseCharField
+from seahub.role_permissions.models import AdminRole
 
 DESKTOP_PLATFORMS = ('windows', 'linux', 'mac')
 MOBILE_PLATFORMS = ('ios', 'android')
 
+TOKEN_AUTH_CACHE_PREFIX = 'TOKEN_AUTH_'
+
+
+def get_token_auth_cache_key(key):
+    """Cache key of a resolved api token, the raw token is not kept in
+    cache keys.
+    """
+    return TOKEN_AUTH_CACHE_PREFIX + sha1(key.encode('utf-8')).hexdigest()
+
+
+def clear_token_auth_cache(key):
+    cache.delete(get_token_auth_cache_key(key))
+
 
 class TokenManager(models.Manager):
 
@@ -217,3 +234,29 @@ class TokenV2(models.Model):
                     last_accessed=self.last_accessed,
                     last_login_ip=self.last_login_ip,
                     wiped_at=self.wiped_at)
+
+
+# handle signals
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+@receiver(post_save, sender=TokenV2)
+@receiver(post_delete, sender=TokenV2)
+def token_changed_cb(sender, instance, **kwargs):
+    # token deleted (logout, unlink device, user deleted or inactivated)
+    # or updated (remote wipe)
+    clear_token_auth_cache(instance.key)
+
+
+def clear_user_token_auth_cache(username):
+    """Clear the cached user of all api tokens of ``username``, when its
+    role, admin role, staff or active status is changed.
+    """
+    keys = list(Token.objects.filter(user=username).values_list('key', flat=True)) + \
+        list(TokenV2.objects.filter(user=username).values_list('key', flat=True))
+    cache.delete_many([get_token_auth_cache_key(key) for key in keys])
+
+
+@receiver(post_save, sender=AdminRole)
+@receiver(post_delete, sender=AdminRole)
+def admin_role_changed_cb(sender, instance, **kwargs):
+    clear_user_token_auth_cache(instance.email)
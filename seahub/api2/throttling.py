@@ -50,13 +50,26 @@ class BaseThrottle(object):
         return None
 
 
+# Throttle engines, selected per scope by prefixing the rate with the
+# engine name, e.g. 'window:3000/minute'.
+#
+# history: keep the timestamps of all requests in the period, exact but
+#          storage and cost grow with the rate.
+# window:  sliding window approximated by the counters of the current and
+#          the previous period, constant storage and cost.
+THROTTLE_ENGINE_HISTORY = 'history'
+THROTTLE_ENGINE_WINDOW = 'window'
+THROTTLE_ENGINES = (THROTTLE_ENGINE_HISTORY, THROTTLE_ENGINE_WINDOW)
+
+
 class SimpleRateThrottle(BaseThrottle):
     """
     A simple cache implementation, that only requires `.get_cache_key()`
     to be overridden.
 
     The rate (requests / seconds) is set by a `throttle` attribute on the View
-    class.  The attribute is a string of the form 'number_of_requests/period'.
+    class.  The attribute is a string of the form 'number_of_requests/period',
+    optionally prefixed by the throttle engine: 'engine:number_of_requests/period'.
 
     Period should be one of: ('s', 'sec', 'm', 'min', 'h', 'hour', 'd', 'day')
 
@@ -72,6 +85,7 @@ class SimpleRateThrottle(BaseThrottle):
     def __init__(self):
         if not getattr(self, 'rate', None):
             self.rate = self.get_rate()
+        self.engine = self.parse_engine(self.rate)
         self.num_requests, self.duration = self.parse_rate(self.rate)
 
     def get_cache_key(self, request, view):
@@ -98,6 +112,19 @@ class SimpleRateThrottle(BaseThrottle):
             msg = "No default throttle rate set for '%s' scope" % self.scope
             raise ImproperlyConfigured(msg)
 
+    def parse_engine(self, rate):
+        """
+        Return the throttle engine of the request rate string.
+        """
+        if rate is None or ':' not in rate:
+            return THROTTLE_ENGINE_HISTORY
+
+        engine = rate.split(':', 1)[0].strip()
+        if engine not in THROTTLE_ENGINES:
+            msg = "Invalid throttle engine '%s' for '%s' scope" % (engine, self.scope)
+            raise ImproperlyConfigured(msg)
+        return engine
+
     def parse_rate(self, rate):
         """
         Given the request rate string, return a two tuple of:
@@ -105,6 +132,7 @@ class SimpleRateThrottle(BaseThrottle):
         """
         if rate is None:
             return (None, None)
+        rate = rate.split(':', 1)[-1]
         num, period = rate.split('/')
         num_requests = int(num)
         duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
@@ -127,6 +155,9 @@ class SimpleRateThrottle(BaseThrottle):
         if self.key is None:
             return True
 
+        if self.engine == THROTTLE_ENGINE_WINDOW:
+            return self.allow_request_by_window()
+
         self.history = self.cache.get(self.key, [])
         self.now = self.timer()
 
@@ -138,6 +169,43 @@ class SimpleRateThrottle(BaseThrottle):
             return self.throttle_failure()
         return self.throttle_success()
 
+    def allow_request_by_window(self):
+        """
+        Sliding window throttle with two counters.
+
+        The number of requests in the last `duration` seconds is estimated as
+        the count of the current fixed window, plus the count of the previous
+        window weighted by its overlap with the sliding window. Each counter
+        is a single integer updated with an atomic `incr`.
+        """
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = '%s_%d' % (self.key, window)
+        previous_key = '%s_%d' % (self.key, window - 1)
+
+        counts = self.cache.get_many([current_key, previous_key])
+        self.current_count = counts.get(current_key, 0)
+        self.previous_count = counts.get(previous_key, 0)
+        self.window_elapsed = self.now - window * self.duration
+
+        if self.get_window_count() >= self.num_requests:
+            return self.throttle_failure()
+
+        # keep the counter for two windows, it's still needed as the
+        # previous window of the next one
+        if not self.cache.add(current_key, 1, self.duration * 2):
+            try:
+                self.cache.incr(current_key)
+            except ValueError:
+                # expired between `add` and `incr`
+                self.cache.set(current_key, 1, self.duration * 2)
+
+        return True
+
+    def get_window_count(self):
+        weight = 1 - self.window_elapsed / float(self.duration)
+        return self.previous_count * weight + self.current_count
+
     def throttle_success(self):
         """
         Inserts the current request's timestamp along with the key
@@ -157,6 +225,9 @@ class SimpleRateThrottle(BaseThrottle):
         """
         Returns the recommended next request time in seconds.
         """
+        if self.engine == THROTTLE_ENGINE_WINDOW:
+            return self.wait_by_window()
+
         if self.history:
             remaining_duration = self.duration - (self.now - self.history[-1])
         else:
@@ -168,6 +239,23 @@ class SimpleRateThrottle(BaseThrottle):
 
         return remaining_duration / float(available_requests)
 
+    def wait_by_window(self):
+        """
+        Returns the time in seconds until the weight of the previous window
+        has decreased enough to allow one more request.
+        """
+        remaining_duration = self.duration - self.window_elapsed
+        excess = self.get_window_count() - self.num_requests + 1
+        if excess <= 0:
+            return None
+
+        if self.current_count + 1 > self.num_requests or not self.previous_count:
+            # only the next window can allow more requests
+            return remaining_duration
+
+        return min(remaining_duration,
+                   excess * self.duration / float(self.previous_count))
+
 
 class AnonRateThrottle(SimpleRateThrottle):
     """
@@ -250,6 +338,7 @@ class ScopedRateThrottle(SimpleRateThrottle):
         # Determine the allowed request rate as we normally would during
         # the `__init__` call.
         self.rate = self.get_rate()
+        self.engine = self.parse_engine(self.rate)
         self.num_requests, self.duration = self.parse_rate(self.rate)
 
         # We can now proceed as normal.
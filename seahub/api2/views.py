@@ -24,7 +24,6 @@ from django.conf import settings as dj_settings
 from django.contrib.auth.hashers import check_password
 from django.contrib.sites.shortcuts import get_current_site
 from django.db import IntegrityError
-from django.db.models import F
 from django.http import HttpResponse
 from django.template.defaultfilters import filesizeformat
 from django.utils import timezone
@@ -58,12 +57,15 @@ from seahub.group.views import remove_group_common, \
     rename_group_with_new_name, is_group_staff
 from seahub.group.utils import BadGroupNameError, ConflictGroupNameError, \
     validate_group_name, is_group_member, group_id_to_name, is_group_admin
-from seahub.thumbnail.utils import generate_thumbnail
+from seahub.thumbnail.jobs import create_thumbnail
 from seahub.notifications.models import UserNotification
 from seahub.options.models import UserOptions
 from seahub.profile.models import Profile, DetailedProfile
-from seahub.signals import (repo_created, repo_deleted, repo_transfer)
-from seahub.share.models import FileShare, OrgFileShare, UploadLinkShare
+from seahub.signals import (repo_created, repo_deleted, repo_transfer,
+                             repo_renamed)
+from seahub.share.models import FileShare, OrgFileShare, UploadLinkShare, \
+    clear_share_link_token_cache_by
+from seahub.share.view_counter import incr_view_cnt, get_view_cnts
 from seahub.utils import gen_file_get_url, gen_token, gen_file_upload_url, \
     check_filename_with_rename, is_valid_username, EVENTS_ENABLED, \
     EMPTY_SHA1, is_pro_version, \
@@ -80,12 +82,14 @@ from seahub.utils.file_types import IMAGE, SEADOC
 from seahub.utils.file_revisions import get_file_revisions_after_renamed
 from seahub.utils.devices import do_unlink_device
 from seahub.utils.repo import get_repo_owner, get_library_storages, \
-        get_locked_files_by_dir, get_related_users_by_repo, \
+        BatchPrecheck, get_related_users_by_repo, \
         is_valid_repo_id_format, can_set_folder_perm_by_user, \
         add_encrypted_repo_secret_key_to_database, get_available_repo_perms, \
         parse_repo_perm
-from seahub.utils.star import star_file, unstar_file, get_dir_starred_files
-from seahub.utils.file_tags import get_files_tags_in_dir
+from seahub.utils.star import star_file, unstar_file
+from seahub.utils.dirent_enrichment import enrich_dirents, \
+    StarredEnricher, FileTagsEnricher
+from seahub.profile.utils import UserInfoResolver
 from seahub.utils.file_types import DOCUMENT, MARKDOWN
 from seahub.utils.file_size import get_file_size_unit
 from seahub.utils.file_op import check_file_lock
@@ -1567,6 +1571,7 @@ class Repo(APIView):
                 return api_error(status.HTTP_403_FORBIDDEN, error_msg)
 
             if edit_repo(repo_id, repo_name, repo_desc, username):
+                repo_renamed.send(sender=None, repo_id=repo_id)
                 return Response("success")
             else:
                 return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1901,6 +1906,7 @@ class RepoOwner(APIView):
         try:
             UploadLinkShare.objects.filter(username=username, repo_id=repo_id).update(username=new_owner)
             FileShare.objects.filter(username=username, repo_id=repo_id).update(username=new_owner)
+            clear_share_link_token_cache_by(username=new_owner, repo_id=repo_id)
         except Exception as e:
             logger.error(e)
             error_msg = 'Internal Server Error'
@@ -2211,6 +2217,23 @@ class UpdateBlksLinkView(APIView):
         return Response(url)
 
 def get_dir_file_recursively(username, repo_id, path, all_dirs):
+    all_dirs = _list_dir_recursively(username, repo_id, path, all_dirs)
+
+    # Resolve users of all files with one bulk lookup.
+    file_list = [item for item in all_dirs if item['type'] == 'file']
+    user_info = UserInfoResolver()
+    user_info.resolve({x['modifier_email'] for x in file_list} |
+                      {x['lock_owner'] for x in file_list if x.get('lock_owner')})
+
+    for e in file_list:
+        e['modifier_contact_email'] = user_info.get_contact_email(e['modifier_email'])
+        e['modifier_name'] = user_info.get_nickname(e['modifier_email'])
+        if e.get('lock_owner'):
+            e['lock_owner_name'] = user_info.get_nickname(e['lock_owner'])
+
+    return all_dirs
+
+def _list_dir_recursively(username, repo_id, path, all_dirs):
     is_pro = is_pro_version()
     path_id = seafile_api.get_dir_id_by_path(repo_id, path)
     dirs = seafile_api.list_dir_with_perm(repo_id, path,
@@ -2232,8 +2255,6 @@ def get_dir_file_recursively(username, repo_id, path, all_dirs):
             if is_pro:
                 entry["is_locked"] = dirent.is_locked
                 entry["lock_owner"] = dirent.lock_owner
-                if dirent.lock_owner:
-                    entry["lock_owner_name"] = email2nickname(dirent.lock_owner)
                 entry["lock_time"] = dirent.lock_time
                 if username == dirent.lock_owner:
                     entry["locked_by_me"] = True
@@ -2248,25 +2269,9 @@ def get_dir_file_recursively(username, repo_id, path, all_dirs):
 
         all_dirs.append(entry)
 
-        # Use dict to reduce memcache fetch cost in large for-loop.
-        file_list =  [item for item in all_dirs if item['type'] == 'file']
-        contact_email_dict = {}
-        nickname_dict = {}
-        modifiers_set = {x['modifier_email'] for x in file_list}
-        for e in modifiers_set:
-            if e not in contact_email_dict:
-                contact_email_dict[e] = email2contact_email(e)
-            if e not in nickname_dict:
-                nickname_dict[e] = email2nickname(e)
-
-        for e in file_list:
-            e['modifier_contact_email'] = contact_email_dict.get(e['modifier_email'], '')
-            e['modifier_name'] = nickname_dict.get(e['modifier_email'], '')
-
-
         if stat.S_ISDIR(dirent.mode):
             sub_path = posixpath.join(path, dirent.obj_name)
-            get_dir_file_recursively(username, repo_id, sub_path, all_dirs)
+            _list_dir_recursively(username, repo_id, sub_path, all_dirs)
 
     return all_dirs
 
@@ -2287,7 +2292,8 @@ def get_dir_entrys_by_id(request, repo, path, dir_id, request_type=None):
         return api_error(HTTP_520_OPERATION_FAILED,
                          "Failed to list dir.")
 
-    dir_list, file_list = [], []
+    is_pro = is_pro_version()
+    dir_list, file_entries = [], []
     for dirent in dirs:
 
         if dirent.permission == PERMISSION_INVISIBLE:
@@ -2304,11 +2310,9 @@ def get_dir_entrys_by_id(request, repo, path, dir_id, request_type=None):
                                               dirent.obj_id)
             else:
                 entry["size"] = dirent.size
-            if is_pro_version():
+            if is_pro:
                 entry["is_locked"] = dirent.is_locked
                 entry["lock_owner"] = dirent.lock_owner
-                if dirent.lock_owner:
-                    entry["lock_owner_name"] = email2nickname(dirent.lock_owner)
                 entry["lock_time"] = dirent.lock_time
                 if username == dirent.lock_owner:
                     entry["locked_by_me"] = True
@@ -2323,34 +2327,23 @@ def get_dir_entrys_by_id(request, repo, path, dir_id, request_type=None):
         if dtype == 'dir':
             dir_list.append(entry)
         else:
-            file_list.append(entry)
-
-    # Use dict to reduce memcache fetch cost in large for-loop.
-    contact_email_dict = {}
-    nickname_dict = {}
-    modifiers_set = {x['modifier_email'] for x in file_list}
-    for e in modifiers_set:
-        if e not in contact_email_dict:
-            contact_email_dict[e] = email2contact_email(e)
-        if e not in nickname_dict:
-            nickname_dict[e] = email2nickname(e)
-
-    starred_files = get_dir_starred_files(username, repo.id, path)
-    files_tags_in_dir = get_files_tags_in_dir(repo.id, path)
-
-    for e in file_list:
-        e['modifier_contact_email'] = contact_email_dict.get(e['modifier_email'], '')
-        e['modifier_name'] = nickname_dict.get(e['modifier_email'], '')
-
-        file_tags = files_tags_in_dir.get(e['name'])
-        if file_tags:
-            e['file_tags'] = []
-            for file_tag in file_tags:
-                e['file_tags'].append(file_tag)
-        file_path = posixpath.join(path, e['name'])
-        e['starred'] = False
-        if normalize_file_path(file_path) in starred_files:
-            e['starred'] = True
+            file_entries.append((entry, dirent, posixpath.join(path, dirent.obj_name)))
+
+    # Resolve users, stars and tags of all files with one bulk lookup each.
+    user_info = UserInfoResolver.for_request(request)
+    user_info.resolve([dirent.modifier for _, dirent, _ in file_entries] +
+                      [dirent.lock_owner for _, dirent, _ in file_entries if is_pro])
+    for entry, dirent, _ in file_entries:
+        entry['modifier_name'] = user_info.get_nickname(dirent.modifier)
+        entry['modifier_contact_email'] = user_info.get_contact_email(dirent.modifier)
+        # only locked files have lock owner name
+        if is_pro and dirent.lock_owner:
+            entry['lock_owner_name'] = user_info.get_nickname(dirent.lock_owner)
+
+    file_list = enrich_dirents([
+        StarredEnricher(username, repo.id, path),
+        FileTagsEnricher(repo.id, path),
+    ], file_entries)
 
     dir_list.sort(key=lambda x: x['name'].lower())
     file_list.sort(key=lambda x: x['name'].lower())
@@ -2501,15 +2494,11 @@ class OpDeleteView(APIView):
             return api_error(status.HTTP_403_FORBIDDEN,
                              'You do not have permission to delete this file.')
 
-        allowed_file_names = []
-        locked_files = get_locked_files_by_dir(request, repo_id, parent_dir)
-        for file_name in file_names.split(':'):
-            if file_name not in list(locked_files.keys()):
-                # file is not locked
-                allowed_file_names.append(file_name)
-            elif locked_files[file_name] == username:
-                # file is locked by current user
-                allowed_file_names.append(file_name)
+        # skip files locked by others
+        file_names = file_names.split(':')
+        locked = set(f['name'] for f in
+                     BatchPrecheck(request, repo_id).check(parent_dir, file_names))
+        allowed_file_names = [f for f in file_names if f not in locked]
 
         try:
             seafile_api.del_file(repo_id, parent_dir,
@@ -2574,15 +2563,11 @@ class OpMoveView(APIView):
             return api_error(status.HTTP_403_FORBIDDEN,
                     'You do not have permission to move file to destination folder.')
 
-        allowed_obj_names = []
-        locked_files = get_locked_files_by_dir(request, repo_id, parent_dir)
-        for file_name in obj_names.split(':'):
-            if file_name not in list(locked_files.keys()):
-                # file is not locked
-                allowed_obj_names.append(file_name)
-            elif locked_files[file_name] == username:
-                # file is locked by current user
-                allowed_obj_names.append(file_name)
+        # skip files locked by others
+        obj_names = obj_names.split(':')
+        locked = set(f['name'] for f in
+                     BatchPrecheck(request, repo_id).check(parent_dir, obj_names))
+        allowed_obj_names = [f for f in obj_names if f not in locked]
 
         # check if all file/dir existes
         obj_names = allowed_obj_names
@@ -4160,9 +4145,8 @@ class SharedFileView(APIView):
         if not file_id:
             return api_error(status.HTTP_404_NOT_FOUND, "File not found")
 
-        # Increase file shared link view_cnt, this operation should be atomic
-        fileshare.view_cnt = F('view_cnt') + 1
-        fileshare.save()
+        # Increase file shared link view_cnt
+        incr_view_cnt(fileshare)
 
         op = request.GET.get('op', 'download')
         return get_repo_file(request, repo_id, file_id, file_name, op)
@@ -5216,7 +5200,7 @@ class ThumbnailView(APIView):
             check_folder_permission(request, repo_id, path) is None:
             return api_error(status.HTTP_403_FORBIDDEN, 'Permission denied.')
 
-        success, status_code = generate_thumbnail(request, repo_id, size, path)
+        success, status_code = create_thumbnail(repo_id, size, path, obj_id)
         if success:
             thumbnail_dir = os.path.join(THUMBNAIL_ROOT, str(size))
             thumbnail_file = os.path.join(thumbnail_dir, obj_id)
@@ -5372,6 +5356,7 @@ class RepoDownloadSharedLinks(APIView):
 
         shared_links = []
         fileshares = FileShare.objects.filter(repo_id=repo_id)
+        view_cnt_dict = get_view_cnts(fileshares)
         for fs in fileshares:
             size = None
             shared_link = {}
@@ -5396,7 +5381,7 @@ class RepoDownloadSharedLinks(APIView):
             shared_link['token'] = fs.token
             shared_link['path'] = path
             shared_link['name'] = os.path.basename(path.rstrip('/')) if path != '/' else '/'
-            shared_link['view_count'] = fs.view_cnt
+            shared_link['view_count'] = view_cnt_dict[fs.pk]
             shared_link['share_type'] = fs.s_type
             shared_link['size'] = size if size else ''
             shared_links.append(shared_link)
@@ -5465,6 +5450,7 @@ class RepoUploadSharedLinks(APIView):
 
         shared_links = []
         fileshares = UploadLinkShare.objects.filter(repo_id=repo_id)
+        view_cnt_dict = get_view_cnts(fileshares)
         for fs in fileshares:
             shared_link = {}
             path = fs.path
@@ -5480,7 +5466,7 @@ class RepoUploadSharedLinks(APIView):
             shared_link['token'] = fs.token
             shared_link['path'] = path
             shared_link['name'] = os.path.basename(path.rstrip('/')) if path != '/' else '/'
-            shared_link['view_count'] = fs.view_cnt
+            shared_link['view_count'] = view_cnt_dict[fs.pk]
             shared_links.append(shared_link)
 
         return Response(shared_links)
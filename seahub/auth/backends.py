@@ -10,6 +10,7 @@ from django.conf import settings
 from seaserv import ccnet_api, seafile_api
 
 from seahub.base.accounts import User, AuthBackend
+from seahub.api2.models import clear_user_token_auth_cache
 from seahub.profile.models import Profile
 from seahub.utils.file_size import get_quota_from_string
 from seahub.role_permissions.utils import get_enabled_role_permissions_by_role
@@ -257,6 +258,7 @@ class SeafileRemoteUserBackend(AuthBackend):
 
                 # update user role
                 ccnet_api.update_role_emailuser(user_info['email'], role)
+                clear_user_token_auth_cache(user_info['email'])
 
                 # update user role quota
                 role_quota = get_enabled_role_permissions_by_role(role)['role_quota']
@@ -278,6 +280,7 @@ class SeafileRemoteUserBackend(AuthBackend):
 
             # update user role
             ccnet_api.update_role_emailuser(user_info['email'], role)
+            clear_user_token_auth_cache(user_info['email'])
 
             # update user role quota
             role_quota = get_enabled_role_permissions_by_role(role)['role_quota']
@@ -5,14 +5,16 @@ import hashlib
 from urllib.parse import urlparse
 
 from django import template
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils.html import format_html
 
 from seahub.base.accounts import User
 
-from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
-from seahub.avatar.util import get_primary_avatar, get_default_avatar_url, \
-    cache_result, get_default_avatar_non_registered_url
+from seahub.avatar.settings import AVATAR_DEFAULT_SIZE, AVATAR_CACHE_TIMEOUT
+from seahub.avatar.util import get_primary_avatar, get_primary_avatars, \
+    get_default_avatar_url, cache_result, cached_funcs, get_cache_key, \
+    get_default_avatar_non_registered_url
 from seahub.utils import get_service_url
 from seahub.settings import SITE_ROOT, AVATAR_FILE_STORAGE
 
@@ -39,8 +41,10 @@ def avatar_url(user, size=AVATAR_DEFAULT_SIZE):
     else:
         return url
 
-@cache_result
-def api_avatar_url(user, size=AVATAR_DEFAULT_SIZE):
+def gen_api_avatar_url(avatar, size=AVATAR_DEFAULT_SIZE):
+    """Return url, whether it is the default avatar and upload time of
+    ``avatar``, the default avatar if it is ``None``.
+    """
 
     service_url = get_service_url()
     service_url = service_url.rstrip('/')
@@ -50,8 +54,6 @@ def api_avatar_url(user, size=AVATAR_DEFAULT_SIZE):
     parse_result = urlparse(service_url)
     service_url_without_sub_path = '%s://%s' % (parse_result[0], parse_result[1])
 
-    avatar = get_primary_avatar(user, size=size)
-
     if not avatar:
         # /media/avatars/default.png
         return service_url_without_sub_path + get_default_avatar_url(), True, None
@@ -65,6 +67,24 @@ def api_avatar_url(user, size=AVATAR_DEFAULT_SIZE):
     else:
         return service_url + url, False, date_uploaded
 
+@cache_result
+def api_avatar_url(user, size=AVATAR_DEFAULT_SIZE):
+    avatar = get_primary_avatar(user, size=size)
+    return gen_api_avatar_url(avatar, size)
+
+def api_avatar_urls(emails, size=AVATAR_DEFAULT_SIZE):
+    """Return a dict of email to ``api_avatar_url`` of ``emails``, whose
+    avatars are got with one query. Results are cached as ``api_avatar_url``
+    caches them.
+    """
+    avatars = get_primary_avatars(emails, size)
+    results = {e: gen_api_avatar_url(avatars.get(e), size) for e in emails}
+
+    cached_funcs.add('api_avatar_url')
+    cache.set_many({get_cache_key(e, size, 'api_avatar_url'): result
+                    for e, result in results.items()}, AVATAR_CACHE_TIMEOUT)
+    return results
+
 @cache_result
 @register.simple_tag
 def avatar(user, size=AVATAR_DEFAULT_SIZE):
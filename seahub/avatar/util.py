@@ -112,6 +112,20 @@ def get_primary_avatar(user, size=AVATAR_DEFAULT_SIZE):
             avatar.create_thumbnail(size)
     return avatar
 
+def get_primary_avatars(emails, size=AVATAR_DEFAULT_SIZE):
+    """Return a dict of email to primary avatar of ``emails``, got with one
+    query. Emails without avatar are not in the dict.
+    """
+    from seahub.avatar.models import Avatar
+    avatars = {}
+    for avatar in Avatar.objects.filter(emailuser__in=list(emails), primary=1):
+        avatars.setdefault(avatar.emailuser, avatar)
+
+    for avatar in avatars.values():
+        if not avatar.thumbnail_exists(size):
+            avatar.create_thumbnail(size)
+    return avatars
+
 def get_avatar_file_storage():
     """Get avatar file storage, defaults to file system storage.
     """
@@ -22,6 +22,7 @@ from ldap import filter
 
 from seahub.auth import login
 from seahub.auth.utils import get_virtual_id_by_email
+from seahub.api2.models import clear_user_token_auth_cache
 from seahub.constants import DEFAULT_USER, DEFAULT_ORG, DEFAULT_ADMIN
 from seahub.profile.models import Profile, DetailedProfile
 from seahub.role_permissions.models import AdminRole
@@ -117,6 +118,7 @@ class UserManager(object):
         If user has a role, update it; or create a role for user.
         """
         ccnet_api.update_role_emailuser(email, role, is_manual_set=is_manual_set)
+        clear_user_token_auth_cache(email)
         return self.get(email=email)
 
     def create_oauth_user(self, email=None, password=None, is_staff=False, is_active=False):
@@ -562,6 +564,7 @@ class User(object):
                                                               self.password,
                                                               int(self.is_staff),
                                                               int(self.is_active))
+            clear_user_token_auth_cache(self.username)
 
             if self.password_changed:
                 emailuser = ccnet_threaded_rpc.get_emailuser(self.username)
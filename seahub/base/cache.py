@@ -0,0 +1,254 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+A two level cache backend.
+
+A small process-local LRU cache (L1) is put in front of a cache shared by
+all seahub workers (L2, e.g. memcached or Redis). Hot keys like nicknames,
+contact emails and avatar urls are then served from process memory, and
+misses cost one network round trip instead of an open/read/unpickle of a
+file as with ``FileBasedCache``.
+
+Values in L1 may be stale for at most their L1 timeout when another worker
+changes or deletes them, so keep L1 timeouts short. Keys that need an
+up-to-date value on every read (e.g. throttle history) should not be kept
+in L1, set their L1 timeout to 0.
+
+Example configuration in seahub_settings.py::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'seahub.base.cache.TieredCache',
+            'OPTIONS': {
+                'L2': {
+                    'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+                    'LOCATION': '127.0.0.1:11211',
+                },
+                'L1_MAX_ENTRIES': 10000,
+                'L1_TIMEOUT': 10,
+                # per key prefix timeout in L1, 0 means never kept in L1
+                'L1_PREFIX_TIMEOUTS': {'throttle_': 0},
+                # per key prefix timeout in L2, override the one given by caller
+                'PREFIX_TIMEOUTS': {'NICKNAME_': 24 * 60 * 60},
+            },
+        },
+    }
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+# Keys with these prefixes are always read from L2.
+DEFAULT_L1_PREFIX_TIMEOUTS = {
+    'throttle_': 0,
+    'share_link_view_cnt_': 0,
+}
+
+
+class LocalLRUCache(object):
+    """A thread safe, size bounded LRU dict with per entry expire time.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a ``(hit, value)`` tuple.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+
+            expire_at, pickled = entry
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                return False, None
+
+            self._data.move_to_end(key)
+
+        return True, pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        if timeout <= 0:
+            self.delete(key)
+            return
+
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, pickled)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache(BaseCache):
+    """Process-local LRU cache (L1) in front of a shared cache (L2).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+
+        l2_conf = dict(options.get('L2', {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }))
+        l2_conf.setdefault('KEY_PREFIX', self.key_prefix)
+        l2_conf.setdefault('VERSION', self.version)
+        if 'KEY_FUNCTION' in params:
+            l2_conf.setdefault('KEY_FUNCTION', params['KEY_FUNCTION'])
+        backend_cls = import_string(l2_conf['BACKEND'])
+        self.l2 = backend_cls(l2_conf.get('LOCATION', location), l2_conf)
+
+        self.l1 = LocalLRUCache(int(options.get('L1_MAX_ENTRIES', 10000)))
+        self.l1_timeout = int(options.get('L1_TIMEOUT', 10))
+
+        l1_prefix_timeouts = dict(DEFAULT_L1_PREFIX_TIMEOUTS)
+        l1_prefix_timeouts.update(options.get('L1_PREFIX_TIMEOUTS', {}))
+        # longest prefix first, so that the most specific one wins
+        self.l1_prefix_timeouts = sorted(l1_prefix_timeouts.items(),
+                                         key=lambda x: len(x[0]), reverse=True)
+        self.prefix_timeouts = sorted(options.get('PREFIX_TIMEOUTS', {}).items(),
+                                      key=lambda x: len(x[0]), reverse=True)
+
+    @staticmethod
+    def _match_prefix(prefix_timeouts, key):
+        for prefix, timeout in prefix_timeouts:
+            if key.startswith(prefix):
+                return prefix, timeout
+        return None, None
+
+    def _timeout(self, key, timeout):
+        """Timeout in L2, the per prefix one overrides the given one.
+        """
+        prefix, prefix_timeout = self._match_prefix(self.prefix_timeouts, key)
+        return timeout if prefix is None else prefix_timeout
+
+    def _l1_timeout(self, key, timeout):
+        """Timeout in L1, never longer than the one in L2.
+        """
+        prefix, l1_timeout = self._match_prefix(self.l1_prefix_timeouts, key)
+        if prefix is None:
+            l1_timeout = self.l1_timeout
+
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is not None:
+            l1_timeout = min(l1_timeout, timeout - time.time())
+        return l1_timeout
+
+    def _l1_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(key, timeout)
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1.set(self._l1_key(key, version), value,
+                        self._l1_timeout(key, timeout))
+        return added
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        hit, value = self.l1.get(l1_key)
+        if hit:
+            return value
+
+        value = self.l2.get(key, self._missing_key, version=version)
+        if value is self._missing_key:
+            return default
+
+        self.l1.set(l1_key, value, self._l1_timeout(key, DEFAULT_TIMEOUT))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(key, timeout)
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(self._l1_key(key, version), value,
+                    self._l1_timeout(key, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(key, timeout)
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        result = {}
+        l2_keys = []
+        for key in keys:
+            hit, value = self.l1.get(self._l1_key(key, version))
+            if hit:
+                result[key] = value
+            else:
+                l2_keys.append(key)
+
+        if l2_keys:
+            l2_result = self.l2.get_many(l2_keys, version=version)
+            for key, value in l2_result.items():
+                self.l1.set(self._l1_key(key, version), value,
+                            self._l1_timeout(key, DEFAULT_TIMEOUT))
+            result.update(l2_result)
+
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        # group keys by their timeout, usually there is only one group
+        groups = {}
+        for key, value in data.items():
+            groups.setdefault(self._timeout(key, timeout), {})[key] = value
+
+        failed_keys = []
+        for group_timeout, group in groups.items():
+            failed_keys += self.l2.set_many(group, group_timeout, version=version)
+            for key, value in group.items():
+                self.l1.set(self._l1_key(key, version), value,
+                            self._l1_timeout(key, group_timeout))
+
+        for key in failed_keys:
+            self.l1.delete(self._l1_key(key, version))
+        return failed_keys
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.l1.delete(self._l1_key(key, version))
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        hit, _ = self.l1.get(self._l1_key(key, version))
+        return hit or self.l2.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # counters are always kept in L2 only, so that workers share them
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.l1.delete(self._l1_key(key, version))
+        return self.l2.decr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
@@ -57,42 +57,42 @@ class Command(BaseCommand):
 
         head = [_("User"), _("Type"), _("IP"), _("Device"), _("Date"),
                 _("Library Name"), _("Library ID"), _("Library Owner"), _("File Path"),]
-        data_list = []
-
-        repo_obj_dict = {}
-        repo_owner_dict = {}
-
-        events.sort(key=lambda x: x.timestamp, reverse=True)
-        for ev in events:
-            event_type, ev.show_device = generate_file_audit_event_type(ev)
-
-            repo_id = ev.repo_id
-            if repo_id not in repo_obj_dict:
-                repo = seafile_api.get_repo(repo_id)
-                repo_obj_dict[repo_id] = repo
-            else:
-                repo = repo_obj_dict[repo_id]
-
-            if repo:
-                repo_name = repo.name
-                if repo_id not in repo_owner_dict:
-                    repo_owner = seafile_api.get_repo_owner(repo_id) or \
-                            seafile_api.get_org_repo_owner(repo_id)
-                    repo_owner_dict[repo_id] = repo_owner
+
+        def gen_rows():
+            repo_obj_dict = {}
+            repo_owner_dict = {}
+
+            events.sort(key=lambda x: x.timestamp, reverse=True)
+            for ev in events:
+                event_type, ev.show_device = generate_file_audit_event_type(ev)
+
+                repo_id = ev.repo_id
+                if repo_id not in repo_obj_dict:
+                    repo = seafile_api.get_repo(repo_id)
+                    repo_obj_dict[repo_id] = repo
+                else:
+                    repo = repo_obj_dict[repo_id]
+
+                if repo:
+                    repo_name = repo.name
+                    if repo_id not in repo_owner_dict:
+                        repo_owner = seafile_api.get_repo_owner(repo_id) or \
+                                seafile_api.get_org_repo_owner(repo_id)
+                        repo_owner_dict[repo_id] = repo_owner
+                    else:
+                        repo_owner = repo_owner_dict[repo_id]
                 else:
-                    repo_owner = repo_owner_dict[repo_id]
-            else:
-                repo_name = _('Deleted')
-                repo_owner = '--'
+                    repo_name = _('Deleted')
+                    repo_owner = '--'
 
-            username = ev.user if ev.user else _('Anonymous User')
-            date = utc_to_local(ev.timestamp).strftime('%Y-%m-%d %H:%M:%S') if \
-                ev.timestamp else ''
+                username = ev.user if ev.user else _('Anonymous User')
+                date = utc_to_local(ev.timestamp).strftime('%Y-%m-%d %H:%M:%S') if \
+                    ev.timestamp else ''
 
-            row = [username, event_type, ev.ip, ev.show_device,
-                   date, repo_name, ev.repo_id, repo_owner, ev.file_path]
-            data_list.append(row)
+                row = [username, event_type, ev.ip, ev.show_device,
+                       date, repo_name, ev.repo_id, repo_owner, ev.file_path]
+                yield row
 
         excel_name = 'file-access-logs.xlsx'
-        wb = write_xls('file-access-logs', head, data_list)
+        wb = write_xls('file-access-logs', head, gen_rows())
         wb.save(posixpath.join(path, excel_name)) if path else wb.save(excel_name)
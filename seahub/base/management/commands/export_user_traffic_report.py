@@ -41,25 +41,25 @@ class Command(BaseCommand):
         month_obj = datetime.datetime.strptime(month, "%Y%m")
         res_data = get_all_users_traffic_by_month(month_obj, -1, -1)
 
-        data_list = []
         head = [_("Time"), _("User"), _("Web Download") + ('(MB)'), \
                 _("Sync Download") + ('(MB)'), _("Link Download") + ('(MB)'), \
                 _("Web Upload") + ('(MB)'), _("Sync Upload") + ('(MB)'), \
                 _("Link Upload") + ('(MB)')]
 
-        for data in res_data:
-            web_download = byte_to_mb(data['web_file_download'])
-            sync_download = byte_to_mb(data['sync_file_download'])
-            link_download = byte_to_mb(data['link_file_download'])
-            web_upload = byte_to_mb(data['web_file_upload'])
-            sync_upload = byte_to_mb(data['sync_file_upload'])
-            link_upload = byte_to_mb(data['link_file_upload'])
+        def gen_rows():
+            for data in res_data:
+                web_download = byte_to_mb(data['web_file_download'])
+                sync_download = byte_to_mb(data['sync_file_download'])
+                link_download = byte_to_mb(data['link_file_download'])
+                web_upload = byte_to_mb(data['web_file_upload'])
+                sync_upload = byte_to_mb(data['sync_file_upload'])
+                link_upload = byte_to_mb(data['link_file_upload'])
 
-            row = [month, data['user'], web_download, sync_download, \
-                    link_download, web_upload, sync_upload, link_upload]
+                row = [month, data['user'], web_download, sync_download, \
+                        link_download, web_upload, sync_upload, link_upload]
 
-            data_list.append(row)
+                yield row
 
         excel_name = "User-Traffic-%s" % month
-        wb = write_xls(excel_name, head, data_list)
+        wb = write_xls(excel_name, head, gen_rows())
         wb.save(posixpath.join(path, '%s.xlsx' % excel_name)) if path else wb.save('%s.xlsx' % excel_name)
@@ -0,0 +1,16 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+
+from django.core.management.base import BaseCommand
+
+from seahub.utils.user_quota_usage import refresh_user_quota_usage
+
+
+class Command(BaseCommand):
+
+    help = "Refresh space usage of users, used to sort the admin user list. " \
+           "Can be run by cron to keep the list up to date."
+
+    def handle(self, *args, **options):
+        created, updated, deleted = refresh_user_quota_usage()
+        self.stdout.write('Space usage refreshed, %d created, %d updated, '
+                          '%d deleted.' % (created, updated, deleted))
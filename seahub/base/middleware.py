@@ -1,5 +1,6 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 import re
+import logging
 
 from rest_framework import status
 from django.urls import reverse
@@ -16,6 +17,7 @@ from seahub.organizations.models import OrgSettings
 from seahub.notifications.models import Notification
 from seahub.notifications.utils import refresh_cache
 from seahub.api2.utils import api_error
+from seahub.utils.repo_cache import start_request_cache, end_request_cache
 
 from seahub.settings import SITE_ROOT, SUPPORT_EMAIL
 try:
@@ -27,6 +29,8 @@ try:
 except ImportError:
     MULTI_TENANCY = False
 
+logger = logging.getLogger(__name__)
+
 
 class BaseMiddleware(MiddlewareMixin):
     """
@@ -63,6 +67,25 @@ class BaseMiddleware(MiddlewareMixin):
         return response
 
 
+class RepoCacheMiddleware(MiddlewareMixin):
+    """Keep repo metadata got by ``seahub.utils.repo_cache`` for the time of
+    a request.
+    """
+
+    def process_request(self, request):
+        request._repo_cache_token = start_request_cache()
+        return None
+
+    def process_response(self, request, response):
+        token = getattr(request, '_repo_cache_token', None)
+        if token is not None:
+            rpc_calls, rpc_saved = end_request_cache(token)
+            if rpc_calls or rpc_saved:
+                logger.debug('%s: %d repo rpcs, %d saved by repo cache.',
+                             request.path, rpc_calls, rpc_saved)
+        return response
+
+
 class InfobarMiddleware(MiddlewareMixin):
     """Query info bar close status, and store into request."""
 
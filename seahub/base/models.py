@@ -1,7 +1,7 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 import os
 import logging
-from django.db import models
+from django.db import models, connection
 from django.db.models import Q
 from django.utils import timezone
 
@@ -13,6 +13,7 @@ from seahub.organizations.signals import org_last_activity
 from seahub.utils import within_time_range, gen_token, \
         normalize_file_path, normalize_dir_path
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
+from seahub.utils.ccnet_db import CcnetUsers, get_ccnet_db_name
 from seahub.tags.models import FileUUIDMap
 from .fields import LowerCaseCharField
 
@@ -475,3 +476,114 @@ class RepoTransfer(models.Model):
 
     class Meta:
         db_table = 'RepoTransfer'
+
+
+class UserQuotaUsageManager(models.Manager):
+
+    def update_usages(self, usages, batch_size=1000):
+        """Make the table hold ``usages``, a dict of email to space usage of
+        all users. Only rows that changed are written.
+
+        Return number of rows created, updated and deleted.
+        """
+        to_update = []
+        to_delete = []
+        existing = set()
+        for pk, email, quota_usage in self.values_list('id', 'email', 'quota_usage').iterator():
+            existing.add(email)
+            if email not in usages:
+                to_delete.append(pk)
+            elif usages[email] != quota_usage:
+                to_update.append(self.model(id=pk, email=email, quota_usage=usages[email]))
+
+        to_create = [self.model(email=email, quota_usage=quota_usage)
+                     for email, quota_usage in usages.items() if email not in existing]
+
+        if to_update:
+            self.bulk_update(to_update, ['quota_usage'], batch_size=batch_size)
+        if to_create:
+            self.bulk_create(to_create, batch_size=batch_size)
+        for i in range(0, len(to_delete), batch_size):
+            self.filter(id__in=to_delete[i:i + batch_size]).delete()
+
+        return len(to_create), len(to_update), len(to_delete)
+
+    def list_users(self, direction, start, limit, is_active=None, role=None,
+                   emails=None):
+        """List users sorted by space usage, with the filters of
+        ``CcnetDB.list_eligible_users``. Only ``emails`` are listed if given.
+        Users not refreshed yet, e.g. created since the last refresh, are
+        listed with a usage of -1.
+
+        Return a list of ``CcnetUsers`` with ``quota_usage`` set, and the
+        number of users matched.
+        """
+        ccnet_db_name = get_ccnet_db_name()
+        table = self.model._meta.db_table
+
+        clauses = []
+        params = []
+        if is_active in ('0', '1'):
+            clauses.append('AND t2.is_active = %s')
+            params.append(int(is_active))
+        if role:
+            if role == 'default':
+                clauses.append('AND (t3.role IS NULL OR t3.role = %s)')
+            else:
+                clauses.append('AND t3.role = %s')
+            params.append(role)
+        if emails is not None:
+            if not emails:
+                return [], 0
+            clauses.append('AND t2.email IN (%s)' % ','.join(['%s'] * len(emails)))
+            params.extend(emails)
+
+        from_clause = f"""
+        FROM
+            `{ccnet_db_name}`.`EmailUser` t2
+        LEFT JOIN
+            `{table}` t1
+        ON
+            t2.email = t1.email
+        LEFT JOIN
+            `{ccnet_db_name}`.`UserRole` t3
+        ON
+            t2.email = t3.email
+        WHERE
+            t2.email NOT LIKE '%%@seafile_group' {' '.join(clauses)}
+        """
+        order = 'DESC' if direction == 'desc' else 'ASC'
+        sql = f"""
+        SELECT t2.id, t2.email, t2.is_staff, t2.is_active, t2.ctime, t3.role,
+            COALESCE(t1.quota_usage, -1) AS sort_usage
+        {from_clause}
+        ORDER BY sort_usage {order}, t2.id {order}
+        LIMIT %s OFFSET %s
+        """
+
+        users = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(1) {from_clause}', params)
+            total_count = int(cursor.fetchone()[0])
+
+            cursor.execute(sql, params + [limit, start])
+            for user_id, email, is_staff, is_active, ctime, role, quota_usage \
+                    in cursor.fetchall():
+                user = CcnetUsers(user_id=user_id, email=email, is_staff=is_staff,
+                                  is_active=is_active, ctime=ctime, role=role)
+                user.quota_usage = quota_usage
+                users.append(user)
+
+        return users, total_count
+
+
+class UserQuotaUsage(models.Model):
+    """Space usage of users, sorted for the admin user list. Refreshed from
+    seafile by ``seahub.utils.user_quota_usage``.
+    """
+    email = models.CharField(max_length=255, unique=True)
+    quota_usage = models.BigIntegerField(db_index=True)
+    objects = UserQuotaUsageManager()
+
+    class Meta:
+        db_table = 'user_quota_usage'
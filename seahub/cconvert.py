@@ -64,7 +64,7 @@ class CConvert:
 		"Convert single Unicode to PinYin from index"
 		if strIn==' ':return self.spliter
 		if set(strIn).issubset("'\"`~!@#$%^&*()=+[]{}\\|;:,.<>/?"):return self.spliter # or return ""
-		if set(strIn).issubset("－—！#＃%％&＆（）*，、。：；？？　@＠＼{｛｜}｝~～‘’“”《》【】+＋=＝×￥·…　".decode("utf-8")):return ""
+		if set(strIn).issubset("－—！#＃%％&＆（）*，、。：；？？　@＠＼{｛｜}｝~～‘’“”《》【】+＋=＝×￥·…　"):return ""
 		pos=re.search("^"+strIn+"([0-9a-zA-Z]+)", self.data, re.M)
 		if pos==None:
 			return strIn
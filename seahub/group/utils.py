@@ -8,7 +8,9 @@ import seaserv
 from seaserv import ccnet_api
 
 from seahub.utils import is_org_context, normalize_cache_key
+from seahub.utils.ccnet_db import CcnetDB
 from seahub.profile.models import Profile
+from seahub.profile.utils import UserInfoResolver
 from seahub.base.templatetags.seahub_tags import email2nickname
 from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
 from seahub.avatar.templatetags.avatar_tags import api_avatar_url, \
@@ -118,9 +120,63 @@ def get_group_member_info(request, group_id, email):
 
     return member_info
 
-def get_group_members_info(group_id, emails):
+def get_group_member_info_list(request, group_id, members):
+    """Same as ``get_group_member_info``, but resolve info of all
+    ``members`` (returned by ``ccnet_api.get_group_members``) in bulk.
+    """
+    emails = [m.user_name for m in members]
+    user_info = UserInfoResolver.for_request(request)
+    user_info.resolve(emails, with_avatar=True)
+
+    login_id_map = {p.user: p.login_id for p in
+                    Profile.objects.filter(user__in=emails)}
+    group = ccnet_api.get_group(int(group_id))
+
+    member_info_list = []
+    for m in members:
+        email = m.user_name
+        is_admin = bool(m.is_staff)
+        role = 'Member'
+        if email == group.creator_name:
+            role = 'Owner'
+        elif is_admin:
+            role = 'Admin'
+
+        member_info = {
+            'group_id': group_id,
+            "name": user_info.get_nickname(email),
+            'email': email,
+            "contact_email": user_info.get_contact_email(email),
+            "login_id": login_id_map.get(email) or '',
+            "avatar_url": user_info.get_avatar_url(email),
+            "is_admin": is_admin,
+            "role": role,
+        }
+        member_info_list.append(member_info)
+
+    return member_info_list
+
+def get_group_members_info(group_id, emails, user_info=None, admin_emails=None):
+    """Return info of group members ``emails``. ``admin_emails`` are the
+    admins among them, got with one query if not given.
+    """
+    if admin_emails is None:
+        try:
+            admin_emails = CcnetDB().get_group_ids_admins_map([int(group_id)]).get(int(group_id), [])
+        except Exception as e:
+            logger.error(e)
+            admin_emails = [email for email in emails
+                            if ccnet_api.check_group_staff(int(group_id), email)]
+    admin_emails = set(admin_emails)
+
     member_profiles = Profile.objects.filter(user__in=emails)
     username_profile_map = {p.user : p for p in member_profiles}
+
+    if user_info is None:
+        user_info = UserInfoResolver()
+    user_info.resolve(emails, with_avatar=True)
+
+    group = ccnet_api.get_group(int(group_id))
     members_info_list = []
     for email in emails:
         p = username_profile_map.get(email) or None
@@ -131,11 +187,10 @@ def get_group_members_info(group_id, emails):
             login_id = ''
             contact_email = ''
 
-        avatar_url, _, _ = api_avatar_url(email)
+        avatar_url = user_info.get_avatar_url(email)
 
         role = 'Member'
-        group = ccnet_api.get_group(int(group_id))
-        is_admin = bool(ccnet_api.check_group_staff(int(group_id), email))
+        is_admin = email in admin_emails
         if email == group.creator_name:
             role = 'Owner'
         elif is_admin:
@@ -143,7 +198,7 @@ def get_group_members_info(group_id, emails):
 
         member_info = {
             'group_id': group_id,
-            "name": email2nickname(email),
+            "name": user_info.get_nickname(email),
             'email': email,
             "contact_email": contact_email,
             "login_id": login_id,
@@ -14,13 +14,19 @@ from seahub.notifications.models import Notification
 from seahub.tags.models import FileUUIDMap
 from seahub.notifications.settings import NOTIFICATION_CACHE_TIMEOUT
 from seahub.avatar.templatetags.avatar_tags import api_avatar_url
-from seahub.base.templatetags.seahub_tags import email2nickname, email2contact_email
+from seahub.base.templatetags.seahub_tags import email2nickname
+from seahub.profile.utils import UserInfoResolver
 from seahub.share.models import CustomSharePermissions
 from seahub.utils import get_service_url
 
 logger = logging.getLogger(__name__)
 
 
+# keys of notice detail whose value is a user email
+NOTICE_USER_KEYS = ('share_from', 'group_staff', 'author', 'repo_owner',
+                    'from_user', 'op_user')
+
+
 def refresh_cache():
     """
     Function to be called when change primary notification.
@@ -31,6 +37,21 @@ def refresh_cache():
 
 def update_notice_detail(request, notices):
     repo_dict = {}
+
+    # Resolve all users mentioned in notices in bulk.
+    emails = set()
+    for notice in notices:
+        try:
+            d = json.loads(notice.detail)
+        except Exception:
+            continue
+        if isinstance(d, dict):
+            emails.update(d.get(key) for key in NOTICE_USER_KEYS
+                          if isinstance(d.get(key), str))
+
+    user_info = UserInfoResolver.for_request(request)
+    user_info.resolve(emails, with_avatar=True)
+
     for notice in notices:
         if notice.is_repo_share_msg():
             try:
@@ -54,12 +75,12 @@ def update_notice_detail(request, notices):
                 else:
                     d.pop('org_id', None)
                     share_from_user_email = d.pop('share_from')
-                    url, is_default, date_uploaded = api_avatar_url(share_from_user_email)
+                    url = user_info.get_avatar_url(share_from_user_email)
                     d['repo_name'] = repo.name
                     d['repo_id'] = repo.id
-                    d['share_from_user_name'] = email2nickname(share_from_user_email)
+                    d['share_from_user_name'] = user_info.get_nickname(share_from_user_email)
                     d['share_from_user_email'] = share_from_user_email
-                    d['share_from_user_contact_email'] = email2contact_email(share_from_user_email)
+                    d['share_from_user_contact_email'] = user_info.get_contact_email(share_from_user_email)
                     d['share_from_user_avatar_url'] = url
                     notice.detail = d
 
@@ -97,13 +118,13 @@ def update_notice_detail(request, notices):
                 else:
                     d.pop('org_id', None)
                     share_from_user_email = d.pop('share_from')
-                    url, is_default, date_uploaded = api_avatar_url(share_from_user_email)
+                    url = user_info.get_avatar_url(share_from_user_email)
 
                     d['repo_name'] = repo.name
                     d['repo_id'] = repo.id
-                    d['share_from_user_name'] = email2nickname(share_from_user_email)
+                    d['share_from_user_name'] = user_info.get_nickname(share_from_user_email)
                     d['share_from_user_email'] = share_from_user_email
-                    d['share_from_user_contact_email'] = email2contact_email(share_from_user_email)
+                    d['share_from_user_contact_email'] = user_info.get_contact_email(share_from_user_email)
                     d['share_from_user_avatar_url'] = url
                     d['permission'] = permission
                     notice.detail = d
@@ -133,13 +154,13 @@ def update_notice_detail(request, notices):
                 else:
                     d.pop('org_id', None)
                     share_from_user_email = d.pop('share_from')
-                    url, is_default, date_uploaded = api_avatar_url(share_from_user_email)
+                    url = user_info.get_avatar_url(share_from_user_email)
 
                     d['repo_name'] = repo.name
                     d['repo_id'] = repo.id
-                    d['share_from_user_name'] = email2nickname(share_from_user_email)
+                    d['share_from_user_name'] = user_info.get_nickname(share_from_user_email)
                     d['share_from_user_email'] = share_from_user_email
-                    d['share_from_user_contact_email'] = email2contact_email(share_from_user_email)
+                    d['share_from_user_contact_email'] = user_info.get_contact_email(share_from_user_email)
                     d['share_from_user_avatar_url'] = url
                     notice.detail = d
 
@@ -170,10 +191,10 @@ def update_notice_detail(request, notices):
                 else:
                     d.pop('org_id', None)
                     share_from_user_email = d.pop('share_from')
-                    url, is_default, date_uploaded = api_avatar_url(share_from_user_email)
-                    d['share_from_user_name'] = email2nickname(share_from_user_email)
+                    url = user_info.get_avatar_url(share_from_user_email)
+                    d['share_from_user_name'] = user_info.get_nickname(share_from_user_email)
                     d['share_from_user_email'] = share_from_user_email
-                    d['share_from_user_contact_email'] = email2contact_email(share_from_user_email)
+                    d['share_from_user_contact_email'] = user_info.get_contact_email(share_from_user_email)
                     d['share_from_user_avatar_url'] = url
                     d['repo_name'] = repo.name
                     d['repo_id'] = repo.id
@@ -192,10 +213,10 @@ def update_notice_detail(request, notices):
                     notice.detail = None
                 else:
                     group_staff_email = d.pop('group_staff')
-                    url, is_default, date_uploaded = api_avatar_url(group_staff_email)
-                    d['group_staff_name'] = email2nickname(group_staff_email)
+                    url = user_info.get_avatar_url(group_staff_email)
+                    d['group_staff_name'] = user_info.get_nickname(group_staff_email)
                     d['group_staff_email'] = group_staff_email
-                    d['group_staff_contact_email'] = email2contact_email(group_staff_email)
+                    d['group_staff_contact_email'] = user_info.get_contact_email(group_staff_email)
                     d['group_staff_avatar_url'] = url
                     d['group_name'] = group.group_name
 
@@ -207,10 +228,10 @@ def update_notice_detail(request, notices):
             try:
                 d = json.loads(notice.detail)
                 author_email = d.pop('author')
-                url, is_default, date_uploaded = api_avatar_url(author_email)
-                d['author_name'] = email2nickname(author_email)
+                url = user_info.get_avatar_url(author_email)
+                d['author_name'] = user_info.get_nickname(author_email)
                 d['author_email'] = author_email
-                d['author_context_email'] = email2contact_email(author_email)
+                d['author_context_email'] = user_info.get_contact_email(author_email)
                 d['author_avatar_url'] = url
 
                 notice.detail = d
@@ -227,10 +248,10 @@ def update_notice_detail(request, notices):
                 else:
                     d.pop('org_id', None)
                     repo_owner_email = d.pop('repo_owner')
-                    d['transfer_from_user_name'] = email2nickname(repo_owner_email)
+                    d['transfer_from_user_name'] = user_info.get_nickname(repo_owner_email)
                     d['transfer_from_user_email'] = repo_owner_email
-                    d['transfer_from_user_contact_email'] = email2contact_email(repo_owner_email)
-                    url, is_default, date_uploaded = api_avatar_url(repo_owner_email)
+                    d['transfer_from_user_contact_email'] = user_info.get_contact_email(repo_owner_email)
+                    url = user_info.get_avatar_url(repo_owner_email)
                     d['transfer_from_user_avatar_url'] = url
                     notice.detail = d
 
@@ -242,10 +263,10 @@ def update_notice_detail(request, notices):
                 d = json.loads(notice.detail)
                 d.pop('to_user', None)
                 request_user_email = d.pop('from_user')
-                url, is_default, date_uploaded = api_avatar_url(request_user_email)
-                d['request_user_name'] = email2nickname(request_user_email)
+                url = user_info.get_avatar_url(request_user_email)
+                d['request_user_name'] = user_info.get_nickname(request_user_email)
                 d['request_user_email'] = request_user_email
-                d['request_user_contact_email'] = email2contact_email(request_user_email)
+                d['request_user_contact_email'] = user_info.get_contact_email(request_user_email)
                 d['request_user_avatat_url'] = url
                 notice.detail = d
             except Exception as e:
@@ -277,7 +298,7 @@ def update_notice_detail(request, notices):
                     d['folder_path'] = d.pop('uploaded_to')
                     d['folder_name'] = name
                     d['file_path'] = file_path
-                    url, is_default, date_uploaded = api_avatar_url('')
+                    url = user_info.get_avatar_url('')
                     d['uploaded_user_avatar_url'] = url
                     notice.detail = d
                 else:
@@ -312,7 +333,7 @@ def update_notice_detail(request, notices):
                     d['parent_dir_path'] = d.pop('uploaded_to')
                     d['parent_dir_name'] = name
                     d['folder_path'] = folder_path
-                    url, is_default, date_uploaded = api_avatar_url('')
+                    url = user_info.get_avatar_url('')
                     d['uploaded_user_avatar_url'] = url
                     notice.detail = d
                 else:
@@ -339,11 +360,11 @@ def update_notice_detail(request, notices):
                 else:
                     author_email = d.pop('author')
                     file_name = os.path.basename(file_path)
-                    url, is_default, date_uploaded = api_avatar_url(author_email)
+                    url = user_info.get_avatar_url(author_email)
                     d['author_avatar_url'] = url
-                    d['author_name'] = email2nickname(author_email)
+                    d['author_name'] = user_info.get_nickname(author_email)
                     d['author_email'] = author_email
-                    d['author_contact_email'] = email2contact_email(author_email)
+                    d['author_contact_email'] = user_info.get_contact_email(author_email)
                     d['file_name'] = file_name
                     notice.detail = d
             except Exception as e:
@@ -361,11 +382,11 @@ def update_notice_detail(request, notices):
                     repo_dict[repo_id] = repo
 
                 op_user_email = d.pop('op_user')
-                url, is_default, date_uploaded = api_avatar_url(op_user_email)
+                url = user_info.get_avatar_url(op_user_email)
                 d['op_user_avatar_url'] = url
                 d['op_user_email'] = op_user_email
-                d['op_user_name'] = email2nickname(op_user_email)
-                d['op_user_contact_email'] = email2contact_email(op_user_email)
+                d['op_user_name'] = user_info.get_nickname(op_user_email)
+                d['op_user_contact_email'] = user_info.get_contact_email(op_user_email)
                 notice.detail = d
             except Exception as e:
                 logger.error(e)
@@ -9,6 +9,7 @@ from django.utils.translation import gettext as _
 from seaserv import seafile_api, ccnet_api
 
 from seahub.api2.utils import get_api_token
+from seahub.api2.models import clear_user_token_auth_cache
 from seahub import auth
 from seahub.profile.models import Profile
 from seahub.utils import is_valid_email, render_error, get_service_url
@@ -256,6 +257,7 @@ def oauth_callback(request):
 
             # update user role
             ccnet_api.update_role_emailuser(email, role)
+            clear_user_token_auth_cache(email)
 
             # update user role quota
             role_quota = get_enabled_role_permissions_by_role(role)['role_quota']
@@ -16,6 +16,7 @@ from seahub.api2.utils import api_error
 from seahub.base.templatetags.seahub_tags import email2nickname, email2contact_email
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 from seahub.share.models import FileShare, OrgFileShare
+from seahub.share.view_counter import get_view_cnts
 
 from seahub.organizations.api.permissions import IsOrgAdmin
 
@@ -51,6 +52,8 @@ class OrgAdminLinks(APIView):
         else:
             page_next = False
 
+        view_cnt_dict = get_view_cnts(publinks)
+
         link_list = []
 
         for l in publinks:
@@ -60,7 +63,7 @@ class OrgAdminLinks(APIView):
             link['owner_email'] = l.username
             link['owner_contact_email'] = email2contact_email(l.username)
             link['created_time'] = datetime_to_isoformat_timestr(l.ctime)
-            link['view_count'] = l.view_cnt
+            link['view_count'] = view_cnt_dict[l.pk]
             link['token'] = l.token
 
             if l.is_file_share_link():
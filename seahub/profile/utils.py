@@ -1,11 +1,21 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import logging
+
 from django.core.cache import cache
 
 from .models import Profile
 from .settings import NICKNAME_CACHE_PREFIX, NICKNAME_CACHE_TIMEOUT, \
-        CONTACT_CACHE_TIMEOUT, CONTACT_CACHE_PREFIX
+        CONTACT_CACHE_TIMEOUT, CONTACT_CACHE_PREFIX, EMAIL_ID_CACHE_PREFIX, \
+        EMAIL_ID_CACHE_TIMEOUT
+from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
+from seahub.avatar.templatetags.avatar_tags import api_avatar_url, api_avatar_urls
+from seahub.avatar.util import get_cache_key
+from seahub.base.accounts import User
 from seahub.shortcuts import get_first_object_or_none
 from seahub.utils import normalize_cache_key
+from seahub.utils.ccnet_db import CcnetDB
+
+logger = logging.getLogger(__name__)
 
 def refresh_cache(username):
     """
@@ -40,3 +50,168 @@ def convert_contact_emails(in_list):
             ret.append(e)
 
     return ret
+
+class UserInfoResolver(object):
+    """Resolve nickname, contact email, id and avatar url of many users at
+    once.
+
+    All cached values are fetched with one ``cache.get_many``; profiles, ids
+    and avatars of the misses with one query each, and the results are
+    written back with ``cache.set_many``. Resolved users are memorized, so an email is
+    never looked up twice by the same resolver.
+
+    Use ``UserInfoResolver.for_request(request)`` to share one resolver
+    within a request::
+
+        user_info = UserInfoResolver.for_request(request)
+        user_info.resolve(emails, with_avatar=True)
+        user_info.get_nickname(email)
+    """
+
+    def __init__(self, avatar_size=AVATAR_DEFAULT_SIZE):
+        self.avatar_size = avatar_size
+        self._nicknames = {}
+        self._contact_emails = {}
+        self._ids = {}
+        self._avatar_urls = {}
+
+    @classmethod
+    def for_request(cls, request):
+        if request is None:
+            return cls()
+
+        resolver = getattr(request, '_user_info_resolver', None)
+        if resolver is None:
+            resolver = cls()
+            request._user_info_resolver = resolver
+        return resolver
+
+    def resolve(self, emails, with_id=False, with_avatar=False):
+        """Resolve info of ``emails``, return a dict of email to user info.
+        """
+        emails = {e for e in emails if e}
+
+        name_todo = {e for e in emails
+                     if e not in self._nicknames or e not in self._contact_emails}
+        id_todo = {e for e in emails if e not in self._ids} if with_id else set()
+        avatar_todo = {e for e in emails if e not in self._avatar_urls} \
+            if with_avatar else set()
+
+        if name_todo or id_todo or avatar_todo:
+            self._resolve(name_todo, id_todo, avatar_todo)
+
+        return {e: self.get_user_info(e) for e in emails}
+
+    def _resolve(self, name_todo, id_todo, avatar_todo):
+        keys = {}
+        for e in name_todo:
+            keys[normalize_cache_key(e, NICKNAME_CACHE_PREFIX)] = (self._nicknames, e)
+            keys[normalize_cache_key(e, CONTACT_CACHE_PREFIX)] = (self._contact_emails, e)
+        for e in id_todo:
+            keys[normalize_cache_key(e, EMAIL_ID_CACHE_PREFIX)] = (self._ids, e)
+        for e in avatar_todo:
+            keys[get_cache_key(e, self.avatar_size, 'api_avatar_url')] = (self._avatar_urls, e)
+
+        cached = cache.get_many(list(keys))
+        for key, value in cached.items():
+            result, e = keys[key]
+            if result is self._ids:
+                if value is not None:
+                    result[e] = value
+            elif result is self._avatar_urls:
+                if value:
+                    result[e] = value[0]
+            elif value and value.strip():
+                result[e] = value.strip() if result is self._nicknames else value
+
+        to_cache = {}
+
+        name_misses = {e for e in name_todo
+                       if e not in self._nicknames or e not in self._contact_emails}
+        if name_misses:
+            profiles = {p.user: p for p in Profile.objects.filter(user__in=name_misses)}
+            for e in name_misses:
+                p = profiles.get(e)
+                if e not in self._contact_emails:
+                    contact_email = p.contact_email if p and p.contact_email else e
+                    self._contact_emails[e] = contact_email
+                    to_cache.setdefault(CONTACT_CACHE_TIMEOUT, {})[
+                        normalize_cache_key(e, CONTACT_CACHE_PREFIX)] = contact_email
+
+                if e not in self._nicknames:
+                    if p and p.nickname and p.nickname.strip():
+                        nickname = p.nickname.strip()
+                    else:
+                        nickname = self._contact_emails[e].split('@')[0]
+                    self._nicknames[e] = nickname
+                    to_cache.setdefault(NICKNAME_CACHE_TIMEOUT, {})[
+                        normalize_cache_key(e, NICKNAME_CACHE_PREFIX)] = nickname
+
+        id_misses = {e for e in id_todo if e not in self._ids}
+        if id_misses:
+            try:
+                user_ids = CcnetDB().get_user_ids(id_misses)
+            except Exception as e:
+                logger.error(e)
+                user_ids = {}
+
+            for e in id_misses:
+                user_id = user_ids.get(e)
+                if user_id is None:
+                    # e.g. ldap users, which are not in the EmailUser table
+                    try:
+                        user_id = User.objects.get(email=e).id
+                    except User.DoesNotExist:
+                        user_id = -1
+                self._ids[e] = user_id
+                to_cache.setdefault(EMAIL_ID_CACHE_TIMEOUT, {})[
+                    normalize_cache_key(e, EMAIL_ID_CACHE_PREFIX)] = user_id
+
+        avatar_misses = {e for e in avatar_todo if e not in self._avatar_urls}
+        if avatar_misses:
+            # ``api_avatar_urls`` caches its own result
+            for e, result in api_avatar_urls(avatar_misses, self.avatar_size).items():
+                self._avatar_urls[e] = result[0]
+
+        for timeout, values in to_cache.items():
+            cache.set_many(values, timeout)
+
+    def get_nickname(self, email):
+        if not email:
+            return ''
+        if email not in self._nicknames:
+            self.resolve([email])
+        return self._nicknames[email]
+
+    def get_contact_email(self, email):
+        if not email:
+            return ''
+        if email not in self._contact_emails:
+            self.resolve([email])
+        return self._contact_emails[email]
+
+    def get_id(self, email):
+        if not email:
+            return -1
+        if email not in self._ids:
+            self.resolve([email], with_id=True)
+        return self._ids[email]
+
+    def get_avatar_url(self, email):
+        if email not in self._avatar_urls:
+            if not email:
+                return api_avatar_url(email, self.avatar_size)[0]
+            self.resolve([email], with_avatar=True)
+        return self._avatar_urls[email]
+
+    def get_user_info(self, email):
+        info = {
+            'email': email,
+            'name': self.get_nickname(email),
+            'contact_email': self.get_contact_email(email),
+        }
+        if email in self._ids:
+            info['id'] = self._ids[email]
+        if email in self._avatar_urls:
+            info['avatar_url'] = self._avatar_urls[email]
+        return info
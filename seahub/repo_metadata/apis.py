@@ -17,8 +17,9 @@ from seahub.repo_metadata.utils import add_init_metadata_task, gen_unique_id, in
     get_unmodifiable_columns, can_read_metadata, init_faces, \
     extract_file_details, get_table_by_name, remove_faces_table, FACES_SAVE_PATH, \
     init_tags, init_tag_self_link_columns, remove_tags_table, add_init_face_recognition_task, init_ocr, \
-    remove_ocr_column, get_update_record, update_people_cover_photo
-from seahub.repo_metadata.metadata_server_api import MetadataServerAPI, list_metadata_view_records
+    remove_ocr_column, get_update_record, update_people_cover_photo, update_records, RECORD_FAILED
+from seahub.repo_metadata.metadata_server_api import MetadataServerAPI, list_metadata_view_records, \
+    list_metadata_view_records_by_cursor, decode_cursor
 from seahub.utils.repo import is_repo_admin
 from seaserv import seafile_api
 from seahub.repo_metadata.constants import FACE_RECOGNITION_VIEW_ID
@@ -302,12 +303,15 @@ class MetadataRecords(APIView):
                 per_page: optional, if use page, default is 25
                 is_dir: optional, True or False
                 order_by: list with string, like ['`parent_dir` ASC']
+                cursor: optional, page by cursor instead of start, empty for
+                        the first page, then the `next_cursor` of last page
         """
 
         # args check
         view_id = request.GET.get('view_id', '')
         start = request.GET.get('start', 0)
         limit = request.GET.get('limit', 1000)
+        cursor = request.GET.get('cursor', None)
 
         try:
             start = int(start)
@@ -328,6 +332,13 @@ class MetadataRecords(APIView):
             error_msg = 'view_id is invalid.'
             return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
+        cursor_data = None
+        if cursor is not None:
+            cursor_data = decode_cursor(cursor)
+            if cursor_data is None:
+                error_msg = 'cursor invalid.'
+                return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
+
         # metadata enable check
         metadata = RepoMetadata.objects.filter(repo_id=repo_id).first()
         if not metadata or not metadata.enabled:
@@ -361,7 +372,11 @@ class MetadataRecords(APIView):
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
         try:
-            results = list_metadata_view_records(repo_id, request.user.username, view, tags_enabled, start, limit)
+            if cursor_data is not None:
+                results = list_metadata_view_records_by_cursor(repo_id, request.user.username, view,
+                                                               tags_enabled, cursor_data, limit)
+            else:
+                results = list_metadata_view_records(repo_id, request.user.username, view, tags_enabled, start, limit)
         except Exception as err:
             logger.error(err)
             error_msg = 'Internal Server Error'
@@ -390,22 +405,7 @@ class MetadataRecords(APIView):
             error_msg = 'Library %s not found.' % repo_id
             return api_error(status.HTTP_404_NOT_FOUND, error_msg)
 
-        metadata_server_api = MetadataServerAPI(repo_id, request.user.username)
-
-        from seafevents.repo_metadata.constants import METADATA_TABLE
-        try:
-            columns_data = metadata_server_api.list_columns(METADATA_TABLE.id)
-            columns = columns_data.get('columns', [])
-        except Exception as e:
-            logger.exception(e)
-            error_msg = 'Internal Server Error'
-            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
-
-        unmodifiable_column_names = [column.get('name') for column in get_unmodifiable_columns()]
-
         record_id_to_record = {}
-        sql = f'SELECT `_id` FROM `{METADATA_TABLE.name}` WHERE '
-        parameters = []
         for record_data in records_data:
             record = record_data.get('record', {})
             if not record:
@@ -415,45 +415,30 @@ class MetadataRecords(APIView):
                 error_msg = 'record_id invalid.'
                 return api_error(status.HTTP_400_BAD_REQUEST, error_msg)
 
-            sql += f' `{METADATA_TABLE.columns.id.name}` = ? OR '
-            parameters.append(record_id)
             record_id_to_record[record_id] = record
 
-        sql = sql.rstrip('OR ')
-        sql += ';'
+        if not record_id_to_record:
+            return Response({'success': True, 'records': []})
 
-        if not parameters:
-            return Response({'success': True})
+        metadata_server_api = MetadataServerAPI(repo_id, request.user.username)
 
+        from seafevents.repo_metadata.constants import METADATA_TABLE
         try:
-            query_result = metadata_server_api.query_rows(sql, parameters)
+            columns = metadata_server_api.get_table_schema(METADATA_TABLE.id)['columns']
+            record_status = update_records(metadata_server_api, record_id_to_record, columns)
         except Exception as e:
             logger.exception(e)
             error_msg = 'Internal Server Error'
             return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        results = query_result.get('results')
-        if not results:
-            # file or folder has been deleted
-            return Response({'success': True})
-
-        rows = []
-        for record in results:
-            to_updated_record = record_id_to_record.get(record_id)
-            update = get_update_record(to_updated_record, columns, unmodifiable_column_names)
-            if update:
-                record_id = record.get('_id')
-                update[METADATA_TABLE.columns.id.name] = record_id
-                rows.append(update)
-        if rows:
-            try:
-                metadata_server_api.update_rows(METADATA_TABLE.id, rows)
-            except Exception as e:
-                logger.exception(e)
-                error_msg = 'Internal Server Error'
-                return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
+        statuses = set(record_status.values())
+        if statuses == {RECORD_FAILED}:
+            error_msg = 'Internal Server Error'
+            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
 
-        return Response({'success': True})
+        records = [{'record_id': record_id, 'status': record_status[record_id]}
+                   for record_id in record_id_to_record]
+        return Response({'success': RECORD_FAILED not in statuses, 'records': records})
 
 
 class MetadataRecord(APIView):
@@ -551,8 +536,7 @@ class MetadataRecord(APIView):
 
         from seafevents.repo_metadata.constants import METADATA_TABLE
         try:
-            columns_data = metadata_server_api.list_columns(METADATA_TABLE.id)
-            columns = columns_data.get('columns', [])
+            columns = metadata_server_api.get_table_schema(METADATA_TABLE.id)['columns']
         except Exception as e:
             logger.exception(e)
             error_msg = 'Internal Server Error'
@@ -1445,7 +1429,7 @@ class PeoplePhotos(APIView):
         from seafevents.repo_metadata.utils import gen_sorts_sql
         from seafevents.repo_metadata.constants import PrivatePropertyKeys
         try:
-            columns = metadata_server_api.list_columns(METADATA_TABLE.id).get('columns')
+            columns = metadata_server_api.get_table_schema(METADATA_TABLE.id)['columns']
             order_sql = gen_sorts_sql(METADATA_TABLE, columns, view.get('sorts'))
         except Exception as e:
             logger.exception(e)
@@ -1,53 +1,288 @@
-import requests, jwt, time
-from seahub.settings import METADATA_SERVER_URL, METADATA_SERVER_SECRET_KEY
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import jwt
+import requests
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from seahub.settings import METADATA_SERVER_URL, METADATA_SERVER_SECRET_KEY, \
+    METADATA_SERVER_POOL_SIZE, METADATA_SERVER_RETRIES, \
+    METADATA_COLUMNS_CACHE_TIMEOUT
+from seahub.utils import normalize_cache_key
+
+JWT_EXPIRATION = 3600
+# a cached jwt is renewed when it expires in less than this number of seconds
+JWT_RENEW_MARGIN = 300
+JWT_CACHE_MAX_ENTRIES = 10000
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_executor = None
+
+_jwt_cache = {}
+_jwt_cache_lock = threading.Lock()
+
+METADATA_SCHEMA_VERSION_CACHE_PREFIX = 'METADATA_SCHEMA_VERSION_'
+METADATA_COLUMNS_CACHE_PREFIX = 'METADATA_COLUMNS_'
+
+
+def get_session():
+    """Return the process wide session to metadata server.
+
+    Connections are kept alive and reused by all requests of the process.
+    Connection errors are retried for all methods, read errors only for
+    idempotent ones. A new session is created in a forked worker.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            retry = Retry(total=METADATA_SERVER_RETRIES,
+                          connect=METADATA_SERVER_RETRIES,
+                          read=METADATA_SERVER_RETRIES,
+                          status=0,
+                          backoff_factor=0.1,
+                          allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=METADATA_SERVER_POOL_SIZE,
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_pid = pid
+
+    return _session
+
+
+def get_executor():
+    """Return the process wide executor used to send requests to metadata
+    server concurrently.
+    """
+    global _executor
+    if _executor is None:
+        with _session_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=METADATA_SERVER_POOL_SIZE,
+                                               thread_name_prefix='metadata-server')
+    return _executor
+
+
+def gen_jwt_token(base_id, user):
+    """Return a jwt of ``(base_id, user)``, reused until it is about to
+    expire.
+    """
+    now = int(time.time())
+    cache_key = (base_id, user)
+    cached = _jwt_cache.get(cache_key)
+    if cached and cached[1] - now > JWT_RENEW_MARGIN:
+        return cached[0]
+
+    exp = now + JWT_EXPIRATION
+    payload = {
+        'exp': exp,
+        'base_id': base_id,
+        'user': user
+    }
+    token = jwt.encode(payload, METADATA_SERVER_SECRET_KEY, algorithm='HS256')
+
+    with _jwt_cache_lock:
+        if len(_jwt_cache) >= JWT_CACHE_MAX_ENTRIES:
+            _jwt_cache.clear()
+        _jwt_cache[cache_key] = (token, exp)
+
+    return token
+
+
+def encode_cursor(data):
+    """Return an opaque continuation token of ``data``.
+    """
+    return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return data of ``cursor``, ``{}`` for the first page or ``None`` if
+    invalid.
+    """
+    if not cursor:
+        return {}
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+    if 'key' in data and (not isinstance(data['key'], list) or len(data['key']) != 3):
+        return None
+    if 'offset' in data and (not isinstance(data['offset'], int) or data['offset'] < 0):
+        return None
+    return data
+
+
+def gen_records_order_sql():
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    return f' ORDER BY `{METADATA_TABLE.columns.parent_dir.name}` ASC, ' \
+        f'`{METADATA_TABLE.columns.is_dir.name}` DESC, ' \
+        f'`{METADATA_TABLE.columns.file_name.name}` ASC'
+
+
+def gen_records_after_key_sql(key):
+    """Return the condition and parameters of records sorted after
+    ``key``, a ``[parent_dir, is_dir, file_name]`` list, in the order of
+    ``gen_records_order_sql``. A file name is unique in a folder, so no tie
+    breaker is needed.
+    """
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    parent_dir_column = f'`{METADATA_TABLE.columns.parent_dir.name}`'
+    is_dir_column = f'`{METADATA_TABLE.columns.is_dir.name}`'
+    file_name_column = f'`{METADATA_TABLE.columns.file_name.name}`'
+
+    parent_dir, is_dir, file_name = key
+    if is_dir:
+        # folders are listed before files
+        sql = f'({parent_dir_column} > ? OR ({parent_dir_column} = ? AND ' \
+            f'({is_dir_column} = ? OR ({is_dir_column} = ? AND {file_name_column} > ?))))'
+        parameters = [parent_dir, parent_dir, False, True, file_name]
+    else:
+        sql = f'({parent_dir_column} > ? OR ({parent_dir_column} = ? AND ' \
+            f'{is_dir_column} = ? AND {file_name_column} > ?))'
+        parameters = [parent_dir, parent_dir, False, file_name]
+    return sql, parameters
+
 
+def get_next_cursor(results, limit, cursor_data):
+    """Return the token of the page after ``results``, or ``None`` if it
+    is the last page.
+    """
+    if not results or len(results) < limit:
+        return None
 
-def list_metadata_records(repo_id, user, parent_dir=None, name=None, is_dir=None, start=0, limit=1000, order_by=None):
+    if 'offset' in cursor_data:
+        return encode_cursor({'offset': cursor_data['offset'] + len(results)})
+
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    last = results[-1]
+    return encode_cursor({'key': [
+        last.get(METADATA_TABLE.columns.parent_dir.name),
+        bool(last.get(METADATA_TABLE.columns.is_dir.name)),
+        last.get(METADATA_TABLE.columns.file_name.name),
+    ]})
+
+
+def list_metadata_records(repo_id, user, parent_dir=None, name=None, is_dir=None, start=0, limit=1000, order_by=None,
+                          cursor_data=None):
+    """List records, by ``start`` and ``limit``, or after the record given
+    in ``cursor_data`` (see ``decode_cursor``) if it is not ``None``, in
+    which case the result has a ``next_cursor`` and ``order_by`` is ignored.
+    """
     from seafevents.repo_metadata.constants import METADATA_TABLE
     sql = f'SELECT * FROM `{METADATA_TABLE.name}`'
 
+    conditions = []
     parameters = []
 
     if parent_dir:
-        sql += f' WHERE `{METADATA_TABLE.columns.parent_dir.name}` LIKE ?'
+        conditions.append(f'`{METADATA_TABLE.columns.parent_dir.name}` LIKE ?')
         parameters.append(parent_dir)
-        if name:
-            sql += f' AND `{METADATA_TABLE.columns.file_name.name}` LIKE ?'
-            parameters.append(name)
-
-        if is_dir:
-            sql += f' AND `{METADATA_TABLE.columns.is_dir.name}` LIKE ?'
-            parameters.append(str(is_dir))
-    elif name:
-        sql += f' WHERE `{METADATA_TABLE.columns.file_name.name}` LIKE ?'
+
+    if name:
+        conditions.append(f'`{METADATA_TABLE.columns.file_name.name}` LIKE ?')
         parameters.append(name)
 
-        if is_dir:
-            sql += f' AND `{METADATA_TABLE.columns.is_dir.name}` LIKE ?'
-            parameters.append(str(is_dir))
-    elif is_dir:
-        sql += f' WHERE `{METADATA_TABLE.columns.is_dir.name}` LIKE ?'
+    if is_dir:
+        conditions.append(f'`{METADATA_TABLE.columns.is_dir.name}` LIKE ?')
         parameters.append(str(is_dir))
 
-    sql += f' ORDER BY {order_by}' if order_by else \
-        f' ORDER BY \
-            `{METADATA_TABLE.columns.parent_dir.name}` ASC, \
-            `{METADATA_TABLE.columns.is_dir.name}` DESC, \
-            `{METADATA_TABLE.columns.file_name.name}` ASC'
+    if cursor_data is not None and 'key' in cursor_data:
+        after_key_sql, after_key_parameters = gen_records_after_key_sql(cursor_data['key'])
+        conditions.append(after_key_sql)
+        parameters.extend(after_key_parameters)
+
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+
+    if order_by and cursor_data is None:
+        sql += f' ORDER BY {order_by}'
+    else:
+        sql += gen_records_order_sql()
 
+    if cursor_data is not None:
+        start = cursor_data.get('offset', 0)
     sql += f' LIMIT {start}, {limit};'
 
     metadata_server_api = MetadataServerAPI(repo_id, user)
     response_results = metadata_server_api.query_rows(sql, parameters)
 
+    if cursor_data is not None:
+        response_results['next_cursor'] = get_next_cursor(
+            response_results.get('results'), limit, cursor_data)
+
     return response_results
 
 
-def list_metadata_view_records(repo_id, user, view, tags_enabled, start=0, limit=1000):
+# clauses of the sql generated for a view, in their order
+VIEW_SQL_CLAUSE_RE = re.compile(r'\s+(WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT)\s+', re.IGNORECASE)
+
+
+def split_view_sql(sql):
+    """Split ``sql`` generated for a view into a dict of its clauses, keyed
+    by 'SELECT', 'WHERE', 'GROUP BY', 'ORDER BY' and 'LIMIT'. Keywords in
+    quoted strings and names, e.g. in filter terms, are skipped.
+    """
+    clauses = {}
+    clause, begin = 'SELECT', 0
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            if char == '\\':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in '\'"`':
+            quote = char
+        else:
+            match = VIEW_SQL_CLAUSE_RE.match(sql, i)
+            if match:
+                clauses[clause] = sql[begin:i]
+                clause = ' '.join(match.group(1).upper().split())
+                begin = match.end()
+                i = begin
+                continue
+        i += 1
+    clauses[clause] = sql[begin:].rstrip().rstrip(';')
+    return clauses
+
+
+def gen_view_records_sql(metadata_server_api, user, view, tags_enabled, start, limit, cursor_key=None):
+    """Return the sql and parameters of the records of ``view``, by
+    ``start`` and ``limit``.
+
+    If ``cursor_key`` is not ``None``, the view must have no sorts and
+    groupbys: its records are sorted by ``gen_records_order_sql`` and, unless
+    ``cursor_key`` is empty, selected after that key (see
+    ``gen_records_after_key_sql``), ``start`` is ignored.
+    """
     from seafevents.repo_metadata.constants import METADATA_TABLE, TAGS_TABLE, PrivatePropertyKeys
     from seafevents.repo_metadata.utils import gen_view_data_sql
-    metadata_server_api = MetadataServerAPI(repo_id, user)
-    columns = metadata_server_api.list_columns(METADATA_TABLE.id).get('columns')
+    # columns are listed while querying tags, if they are not cached
+    schema_future = metadata_server_api.submit('get_table_schema', METADATA_TABLE.id)
 
     basic_filters = view.get('basic_filters', [])
     tags_data = {'metadata': [], 'results': []}
@@ -59,25 +294,82 @@ def list_metadata_view_records(repo_id, user, view, tags_enabled, start=0, limit
                 tags_ids_str = ', '.join([f'"{tag_id}"' for tag_id in filter_term])
                 sql = f'SELECT `{TAGS_TABLE.columns.id.name}`, `{TAGS_TABLE.columns.name.name}` FROM `{TAGS_TABLE.name}` WHERE `{TAGS_TABLE.columns.id.name}` IN ({tags_ids_str})'
                 tags_data = metadata_server_api.query_rows(sql)
-    sql = gen_view_data_sql(METADATA_TABLE, columns, view, start, limit, {'tags_data': tags_data, 'username': user})
-
-    # Remove face-vectors from the query SQL because they are too large
-    query_fields_str = ''
-    for column in columns:
-        column_name = column.get('name')
-        if column_name == METADATA_TABLE.columns.face_vectors.name:
-            continue
-        elif column_name == METADATA_TABLE.columns.ocr.name:
-            continue
-        column_name_str = '`%s`, ' % column_name
-        query_fields_str += column_name_str
-    query_fields_str = query_fields_str.strip(', ')
-    sql = sql.replace('*', query_fields_str)
-
-    response_results = metadata_server_api.query_rows(sql, [])
+
+    schema = schema_future.result()
+    if cursor_key is not None:
+        start = 0
+    sql = gen_view_data_sql(METADATA_TABLE, schema['columns'], view, start, limit,
+                            {'tags_data': tags_data, 'username': user})
+
+    # Remove face-vectors from the query SQL because they are too large,
+    # only the first '*' is the select list, filter terms may contain '*'
+    sql = sql.replace('*', schema['projection'], 1)
+    if cursor_key is None:
+        return sql, []
+
+    clauses = split_view_sql(sql)
+    conditions = []
+    parameters = []
+    if cursor_key:
+        after_key_sql, parameters = gen_records_after_key_sql(cursor_key)
+        conditions.append(after_key_sql)
+    if clauses.get('WHERE'):
+        conditions.append(f'({clauses["WHERE"]})')
+
+    sql = clauses['SELECT']
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += gen_records_order_sql() + f' LIMIT 0, {limit};'
+    return sql, parameters
+
+
+def list_metadata_view_records(repo_id, user, view, tags_enabled, start=0, limit=1000):
+    metadata_server_api = MetadataServerAPI(repo_id, user)
+    sql, parameters = gen_view_records_sql(metadata_server_api, user, view, tags_enabled, start, limit)
+    response_results = metadata_server_api.query_rows(sql, parameters)
+    return response_results
+
+
+def list_metadata_view_records_by_cursor(repo_id, user, view, tags_enabled, cursor_data, limit=1000):
+    """List records of a view after the record given in ``cursor_data``
+    (see ``decode_cursor``), the result has a ``next_cursor``.
+
+    Records of a view without sorts and groupbys are sorted by
+    ``gen_records_order_sql`` and selected after the sort key of the last
+    record, so that every page costs the same. Other views are paged by
+    offset, the offset is kept in the cursor.
+    """
+    metadata_server_api = MetadataServerAPI(repo_id, user)
+
+    if view.get('sorts') or view.get('groupbys'):
+        if 'key' in cursor_data:
+            cursor_data = {}
+        start = cursor_data.get('offset', 0)
+        sql, parameters = gen_view_records_sql(metadata_server_api, user, view, tags_enabled, start, limit)
+        response_results = metadata_server_api.query_rows(sql, parameters)
+        response_results['next_cursor'] = get_next_cursor(
+            response_results.get('results'), limit, dict(cursor_data, offset=start))
+        return response_results
+
+    sql, parameters = gen_view_records_sql(metadata_server_api, user, view, tags_enabled, 0, limit,
+                                           cursor_key=cursor_data.get('key', []))
+    response_results = metadata_server_api.query_rows(sql, parameters)
+    response_results['next_cursor'] = get_next_cursor(
+        response_results.get('results'), limit, {})
     return response_results
 
 
+def gen_query_projection(columns):
+    """Return the select list of ``columns`` without the face vectors and
+    ocr columns, which are too large to be returned in a list of records.
+    """
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    excluded_names = (METADATA_TABLE.columns.face_vectors.name,
+                      METADATA_TABLE.columns.ocr.name)
+    return ', '.join('`%s`' % column.get('name') for column in columns
+                     if column.get('name') not in excluded_names)
+
+
 def parse_response(response):
     if response.status_code >= 300 or response.status_code < 200:
         raise ConnectionError(response.status_code, response.text)
@@ -96,22 +388,79 @@ class MetadataServerAPI:
         self.timeout = timeout
 
     def gen_headers(self):
-        payload = {
-            'exp': int(time.time()) + 3600,
-            'base_id': self.base_id,
-            'user': self.user
-        }
-        token = jwt.encode(payload, METADATA_SERVER_SECRET_KEY, algorithm='HS256')
+        token = gen_jwt_token(self.base_id, self.user)
         return {"Authorization": "Bearer %s" % token}
 
+    @property
+    def session(self):
+        return get_session()
+
+    def _schema_version_cache_key(self):
+        return normalize_cache_key(self.base_id, METADATA_SCHEMA_VERSION_CACHE_PREFIX)
+
+    def get_schema_version(self):
+        key = self._schema_version_cache_key()
+        version = cache.get(key)
+        if version is None:
+            # start from a time based version, so that entries cached with
+            # an evicted version are not used again
+            cache.add(key, int(time.time() * 1000), None)
+            version = cache.get(key, 0)
+        return version
+
+    def bump_schema_version(self):
+        """Invalidate cached columns of all tables of this base, called
+        after a table or column is added, updated or deleted.
+        """
+        key = self._schema_version_cache_key()
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+    def get_table_schema(self, table_id):
+        """Return ``{'columns': [...], 'projection': '`a`, `b`'}`` of a
+        table, cached until the schema of the base is changed.
+        """
+        key = normalize_cache_key('%s_%s_%s' % (self.base_id, table_id,
+                                                self.get_schema_version()),
+                                  METADATA_COLUMNS_CACHE_PREFIX)
+        schema = cache.get(key)
+        if schema is not None:
+            return schema
+
+        columns = self.list_columns(table_id).get('columns') or []
+        schema = {
+            'columns': columns,
+            'projection': gen_query_projection(columns),
+        }
+        # columns of a base being initialized are added later by seafevents
+        if columns:
+            cache.set(key, schema, METADATA_COLUMNS_CACHE_TIMEOUT)
+        return schema
+
+    def submit(self, method, *args, **kwargs):
+        """Call ``method`` of this api in background, return a future.
+
+        Used to send independent requests at the same time, e.g.::
+
+            columns_future = metadata_server_api.submit('list_columns', table_id)
+            query_result = metadata_server_api.query_rows(sql)
+            columns = columns_future.result()
+        """
+        return get_executor().submit(getattr(self, method), *args, **kwargs)
+
     def create_base(self):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}'
-        response = requests.post(url, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.post(url, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def delete_base(self):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}'
-        response = requests.delete(url, headers=self.headers, timeout=self.timeout)
+        response = self.session.delete(url, headers=self.headers, timeout=self.timeout)
+        self.bump_schema_version()
         if response.status_code == 404:
             return {'success': True}
         return parse_response(response)
@@ -122,7 +471,7 @@ class MetadataServerAPI:
             'table_id': table_id,
             'rows': rows
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def update_rows(self, table_id, rows):
@@ -131,7 +480,7 @@ class MetadataServerAPI:
             'table_id': table_id,
             'rows': rows
         }
-        response = requests.put(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.put(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def delete_rows(self, table_id, row_ids):
@@ -140,7 +489,7 @@ class MetadataServerAPI:
             'table_id': table_id,
             'row_ids': row_ids
         }
-        response = requests.delete(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.delete(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def query_rows(self, sql, params=[]):
@@ -151,7 +500,7 @@ class MetadataServerAPI:
         if params:
             post_data['params'] = params
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/query'
-        response = requests.post(url, json=post_data, headers=self.headers, timeout=self.timeout)
+        response = self.session.post(url, json=post_data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     # column
@@ -160,7 +509,7 @@ class MetadataServerAPI:
         data = {
             'table_id': table_id
         }
-        response = requests.get(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.get(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def add_column(self, table_id, column):
@@ -169,8 +518,10 @@ class MetadataServerAPI:
             'table_id': table_id,
             'column': column
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def add_columns(self, table_id, columns):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/columns'
@@ -178,8 +529,10 @@ class MetadataServerAPI:
             'table_id': table_id,
             'columns': columns
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def add_link_columns(self, link_id, table_id, other_table_id, table_column, other_table_column):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/link-columns'
@@ -190,8 +543,10 @@ class MetadataServerAPI:
             'table_column': table_column,
             'other_table_column': other_table_column,
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def delete_column(self, table_id, column_key, permanently=False):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/columns'
@@ -200,8 +555,10 @@ class MetadataServerAPI:
             'column_key': column_key,
             'permanently': permanently
         }
-        response = requests.delete(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.delete(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def update_column(self, table_id, column):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/columns'
@@ -209,20 +566,24 @@ class MetadataServerAPI:
             'table_id': table_id,
             'column': column
         }
-        response = requests.put(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.put(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def create_table(self, table_name):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/tables'
         data = {
             'name': table_name,
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     def get_metadata(self):
         url = f'{METADATA_SERVER_URL}/api/v1/base/{self.base_id}/metadata'
-        response = requests.get(url, headers=self.headers, timeout=self.timeout)
+        response = self.session.get(url, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def delete_table(self, table_id, permanently=False):
@@ -230,8 +591,10 @@ class MetadataServerAPI:
         data = {
             'permanently': permanently
         }
-        response = requests.delete(url, json=data, headers=self.headers, timeout=self.timeout)
-        return parse_response(response)
+        response = self.session.delete(url, json=data, headers=self.headers, timeout=self.timeout)
+        result = parse_response(response)
+        self.bump_schema_version()
+        return result
 
     # link
     def insert_link(self, link_id, table_id, row_id_map, is_linked_back=False):
@@ -242,7 +605,7 @@ class MetadataServerAPI:
             'is_linked_back': is_linked_back,
             'row_id_map': row_id_map,
         }
-        response = requests.post(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.post(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def update_link(self, link_id, table_id, row_id_map, is_linked_back=False):
@@ -253,7 +616,7 @@ class MetadataServerAPI:
             'is_linked_back': is_linked_back,
             'row_id_map': row_id_map
         }
-        response = requests.put(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.put(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
 
     def delete_link(self, link_id, table_id, row_id_map, is_linked_back=False):
@@ -264,5 +627,31 @@ class MetadataServerAPI:
             'is_linked_back': is_linked_back,
             'row_id_map': row_id_map
         }
-        response = requests.delete(url, json=data, headers=self.headers, timeout=self.timeout)
+        response = self.session.delete(url, json=data, headers=self.headers, timeout=self.timeout)
         return parse_response(response)
+
+
+class AsyncMetadataServerAPI:
+    """asyncio variant of ``MetadataServerAPI``, every method returns a
+    coroutine. Requests are sent by the process wide executor and session,
+    so that no async http library is needed::
+
+        api = AsyncMetadataServerAPI(base_id, user)
+        columns, rows = await asyncio.gather(api.list_columns(table_id),
+                                             api.query_rows(sql))
+    """
+
+    def __init__(self, base_id, user, timeout=30):
+        self.api = MetadataServerAPI(base_id, user, timeout)
+
+    def __getattr__(self, name):
+        method = getattr(self.api, name)
+        if not callable(method):
+            return method
+
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_executor(),
+                                              partial(method, *args, **kwargs))
+
+        return wrapper
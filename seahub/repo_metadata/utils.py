@@ -3,6 +3,7 @@ import time
 import requests
 import json
 import random
+import logging
 from urllib.parse import urljoin
 from datetime import datetime
 
@@ -12,8 +13,18 @@ from seahub.utils.timeutils import datetime_to_isoformat_timestr
 
 from seaserv import seafile_api
 
+logger = logging.getLogger(__name__)
+
 FACES_SAVE_PATH = '_Internal/Faces'
 
+# max number of records looked up or updated by one request to metadata server
+RECORDS_CHUNK_SIZE = 500
+
+RECORD_UPDATED = 'updated'
+RECORD_UNCHANGED = 'unchanged'
+RECORD_NOT_FOUND = 'not_found'
+RECORD_FAILED = 'failed'
+
 
 def add_init_metadata_task(params):
     payload = {'exp': int(time.time()) + 300, }
@@ -336,3 +347,71 @@ def get_update_record(update={}, columns=[], unmodifiable_column_names=[]):
                 pass
 
     return update_record
+
+
+def chunks(items, size=None):
+    size = size or RECORDS_CHUNK_SIZE
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def query_existing_record_ids(metadata_server_api, record_ids):
+    """Return the set of ``record_ids`` still in the metadata table, looked
+    up by chunks of ``IN (...)`` queries.
+    """
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    id_column_name = METADATA_TABLE.columns.id.name
+
+    existing_ids = set()
+    for chunk in chunks(list(record_ids)):
+        placeholders = ', '.join(['?'] * len(chunk))
+        sql = f'SELECT `{id_column_name}` FROM `{METADATA_TABLE.name}` ' \
+            f'WHERE `{id_column_name}` IN ({placeholders});'
+        query_result = metadata_server_api.query_rows(sql, chunk)
+        existing_ids.update(row.get(id_column_name) for row in
+                            query_result.get('results') or [])
+
+    return existing_ids
+
+
+def update_records(metadata_server_api, record_id_to_update, columns):
+    """Update records of the metadata table in bulk.
+
+    ``record_id_to_update`` maps a record id to the submitted values.
+    Returns a dict of record id to its status: ``updated``, ``unchanged``
+    (no modifiable value), ``not_found`` (file or folder deleted) or
+    ``failed``. Raises if the records can't be looked up.
+    """
+    from seafevents.repo_metadata.constants import METADATA_TABLE
+    id_column_name = METADATA_TABLE.columns.id.name
+
+    existing_ids = query_existing_record_ids(metadata_server_api, record_id_to_update.keys())
+    unmodifiable_column_names = [column.get('name') for column in get_unmodifiable_columns()]
+
+    record_status = {}
+    rows = []
+    for record_id, update in record_id_to_update.items():
+        if record_id not in existing_ids:
+            record_status[record_id] = RECORD_NOT_FOUND
+            continue
+
+        row = get_update_record(update, columns, unmodifiable_column_names)
+        if not row:
+            record_status[record_id] = RECORD_UNCHANGED
+            continue
+
+        row[id_column_name] = record_id
+        rows.append(row)
+
+    for chunk in chunks(rows):
+        try:
+            metadata_server_api.update_rows(METADATA_TABLE.id, chunk)
+            status = RECORD_UPDATED
+        except Exception as e:
+            logger.exception(e)
+            status = RECORD_FAILED
+
+        for row in chunk:
+            record_status[row[id_column_name]] = status
+
+    return record_status
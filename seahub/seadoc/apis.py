@@ -20,7 +20,8 @@ from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
 from django.utils.translation import gettext as _
-from django.http import HttpResponseRedirect, HttpResponse, FileResponse, HttpResponseNotModified
+from django.http import HttpResponseRedirect, FileResponse, HttpResponseNotModified, \
+    StreamingHttpResponse
 from django.core.files.base import ContentFile
 from django.utils import timezone
 from django.db import transaction
@@ -40,9 +41,11 @@ from seahub.api2.utils import api_error, user_to_dict, to_python_boolean, get_us
 from seahub.api2.throttling import UserRateThrottle
 from seahub.seadoc.utils import is_valid_seadoc_access_token, get_seadoc_upload_link, \
     get_seadoc_download_link, get_seadoc_file_uuid, gen_seadoc_access_token, \
-    gen_seadoc_image_parent_path, get_seadoc_asset_upload_link, get_seadoc_asset_download_link, \
+    gen_seadoc_image_parent_path, get_seadoc_asset_upload_link, \
     can_access_seadoc_asset, is_seadoc_revision, ZSDOC, export_sdoc
 from seahub.seadoc.settings import SDOC_REVISIONS_DIR, SDOC_IMAGES_DIR
+from seahub.seadoc.asset_cache import open_cached_asset, can_cache_asset, \
+    fetch_asset, stream_asset
 from seahub.utils.file_types import SEADOC, IMAGE, VIDEO
 from seahub.utils.file_op import if_locked_by_online_office
 from seahub.utils import get_file_type_and_ext, normalize_file_path, \
@@ -54,6 +57,7 @@ from seahub.utils import get_file_type_and_ext, normalize_file_path, \
 from seahub.tags.models import FileUUIDMap
 from seahub.utils.error_msg import file_type_error_msg
 from seahub.utils.repo import parse_repo_perm, get_related_users_by_repo
+from seahub.utils.repo_cache import get_repo_meta
 from seahub.seadoc.models import SeadocHistoryName, SeadocRevision, SeadocCommentReply, SeadocNotification
 from seahub.avatar.templatetags.avatar_tags import api_avatar_url
 from seahub.base.templatetags.seahub_tags import email2nickname, \
@@ -403,22 +407,95 @@ class SeadocUploadImage(APIView):
         return Response({'relative_path': relative_path})
 
 
-def latest_entry(request, file_uuid, filename):
+def get_seadoc_asset(request, file_uuid, filename):
+    """Resolve uuid map, permission and dirent of an image or video of a
+    sdoc file, once per request.
+
+    Returns ``(asset, error_response)``.
+    """
+    resolved = getattr(request, '_seadoc_asset', None)
+    if resolved and resolved[0] == (file_uuid, filename):
+        return resolved[1]
+
+    result = _resolve_seadoc_asset(request, file_uuid, filename)
+    request._seadoc_asset = ((file_uuid, filename), result)
+    return result
+
+
+def _resolve_seadoc_asset(request, file_uuid, filename):
     uuid_map = FileUUIDMap.objects.get_fileuuidmap_by_uuid(file_uuid)
-    if uuid_map:
-        try:
-            repo_id = uuid_map.repo_id
-            username = request.user.username
-            parent_path = gen_seadoc_image_parent_path(file_uuid, repo_id, username)
-            filepath = os.path.join(parent_path, filename)
-            file_obj = seafile_api.get_dirent_by_path(repo_id, filepath)
-            dt = datetime.fromtimestamp(file_obj.mtime)
-            return dt
-        except Exception as e:
-            logger.error(e)
-            return None
-    else:
+    if not uuid_map:
+        error_msg = 'seadoc uuid %s not found.' % file_uuid
+        return None, api_error(status.HTTP_404_NOT_FOUND, error_msg)
+
+    repo_id = uuid_map.repo_id
+    # permission check
+    if not Wiki2Publish.objects.filter(repo_id=repo_id).exists():
+        file_path = posixpath.join(uuid_map.parent_path, uuid_map.filename)
+        if not can_access_seadoc_asset(request, repo_id, file_path, file_uuid):
+            error_msg = 'Permission denied.'
+            return None, api_error(status.HTTP_403_FORBIDDEN, error_msg)
+
+    asset_path = posixpath.join(SDOC_IMAGES_DIR, file_uuid, filename)
+    try:
+        dirent = seafile_api.get_dirent_by_path(repo_id, asset_path)
+    except Exception as e:
+        logger.error(e)
+        error_msg = 'Internal Server Error'
+        return None, api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
+
+    if not dirent:
+        error_msg = 'file %s not found.' % filename
+        return None, api_error(status.HTTP_404_NOT_FOUND, error_msg)
+
+    asset = {
+        'repo_id': repo_id,
+        'obj_id': dirent.obj_id,
+        'mtime': dirent.mtime,
+        'size': dirent.size,
+    }
+    return asset, None
+
+
+def latest_entry(request, file_uuid, filename):
+    asset, error_resp = get_seadoc_asset(request, file_uuid, filename)
+    if not asset:
+        return None
+    return datetime.fromtimestamp(asset['mtime'])
+
+
+def asset_etag(request, file_uuid, filename):
+    # assets are stored by content, object id is a strong etag
+    asset, error_resp = get_seadoc_asset(request, file_uuid, filename)
+    if not asset:
         return None
+    return asset['obj_id']
+
+
+def seadoc_asset_response(request, asset, filename, content_type):
+    """Serve an asset from the local cache, or stream it from fileserver if
+    it is too big to be cached.
+    """
+    username = request.user.username
+    asset_file = open_cached_asset(asset['obj_id'])
+    try:
+        if not asset_file and can_cache_asset(asset['size']):
+            asset_file = fetch_asset(asset['repo_id'], asset['obj_id'], filename, username)
+
+        if asset_file:
+            response = FileResponse(asset_file, content_type=content_type)
+        else:
+            chunks = stream_asset(asset['repo_id'], asset['obj_id'], filename, username)
+            response = StreamingHttpResponse(chunks, content_type=content_type)
+            if asset['size'] >= 0:
+                response['Content-Length'] = asset['size']
+    except Exception as e:
+        logger.error(e)
+        error_msg = 'Internal Server Error'
+        return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
+
+    response['Cache-Control'] = 'private, max-age=%s' % (3600 * 24 * 7)
+    return response
 
 
 class SeadocDownloadImage(APIView):
@@ -427,39 +504,14 @@ class SeadocDownloadImage(APIView):
     permission_classes = ()
     throttle_classes = (UserRateThrottle, )
 
-    @method_decorator(condition(last_modified_func=latest_entry))
+    @method_decorator(condition(etag_func=asset_etag, last_modified_func=latest_entry))
     def get(self, request, file_uuid, filename):
-        uuid_map = FileUUIDMap.objects.get_fileuuidmap_by_uuid(file_uuid)
-        if not uuid_map:
-            error_msg = 'seadoc uuid %s not found.' % file_uuid
-            return api_error(status.HTTP_404_NOT_FOUND, error_msg)
+        asset, error_resp = get_seadoc_asset(request, file_uuid, filename)
+        if error_resp:
+            return error_resp
 
-        repo_id = uuid_map.repo_id
-        username = request.user.username
-        wiki_publish = Wiki2Publish.objects.filter(repo_id=repo_id).first()
-        # permission check
-        if not wiki_publish:
-            file_path = posixpath.join(uuid_map.parent_path, uuid_map.filename)
-            if not can_access_seadoc_asset(request, repo_id, file_path, file_uuid):
-                error_msg = 'Permission denied.'
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
-
-        # main
-        parent_path = gen_seadoc_image_parent_path(file_uuid, repo_id, username)
-        download_link = get_seadoc_asset_download_link(repo_id, parent_path, filename, username)
-        if not download_link:
-            error_msg = 'file %s not found.' % filename
-            return api_error(status.HTTP_404_NOT_FOUND, error_msg)
-        resp = requests.get(download_link)
-        if not resp.ok:
-            logger.error(resp.text)
-            error_msg = 'Internal Server Error'
-            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
         filetype, fileext = get_file_type_and_ext(filename)
-        response = HttpResponse(
-            content=resp.content, content_type='image/' + fileext)
-        response['Cache-Control'] = 'private, max-age=%s' % (3600 * 24 * 7)
-        return response
+        return seadoc_asset_response(request, asset, filename, 'image/' + fileext)
 
 
 class SeadocUploadVideo(APIView):
@@ -527,39 +579,14 @@ class SeadocDownloadVideo(APIView):
     permission_classes = ()
     throttle_classes = (UserRateThrottle, )
 
-    @method_decorator(condition(last_modified_func=latest_entry))
+    @method_decorator(condition(etag_func=asset_etag, last_modified_func=latest_entry))
     def get(self, request, file_uuid, filename):
-        uuid_map = FileUUIDMap.objects.get_fileuuidmap_by_uuid(file_uuid)
-        if not uuid_map:
-            error_msg = 'seadoc uuid %s not found.' % file_uuid
-            return api_error(status.HTTP_404_NOT_FOUND, error_msg)
-
-        repo_id = uuid_map.repo_id
-        username = request.user.username
-        wiki_publish = Wiki2Publish.objects.filter(repo_id=repo_id).first()
-        # permission check
-        if not wiki_publish:
-            file_path = posixpath.join(uuid_map.parent_path, uuid_map.filename)
-            if not can_access_seadoc_asset(request, repo_id, file_path, file_uuid):
-                error_msg = 'Permission denied.'
-                return api_error(status.HTTP_403_FORBIDDEN, error_msg)
+        asset, error_resp = get_seadoc_asset(request, file_uuid, filename)
+        if error_resp:
+            return error_resp
 
-        # main
-        parent_path = gen_seadoc_image_parent_path(file_uuid, repo_id, username)
-        download_link = get_seadoc_asset_download_link(repo_id, parent_path, filename, username)
-        if not download_link:
-            error_msg = 'file %s not found.' % filename
-            return api_error(status.HTTP_404_NOT_FOUND, error_msg)
-        resp = requests.get(download_link)
-        if not resp.ok:
-            logger.error(resp.text)
-            error_msg = 'Internal Server Error'
-            return api_error(status.HTTP_500_INTERNAL_SERVER_ERROR, error_msg)
         filetype, fileext = get_file_type_and_ext(filename)
-        response = HttpResponse(
-            content=resp.content, content_type='video/' + fileext)
-        response['Cache-Control'] = 'private, max-age=%s' % (3600 * 24 * 7)
-        return response
+        return seadoc_asset_response(request, asset, filename, 'video/' + fileext)
 
 
 class SeadocAsyncCopyImages(APIView):
@@ -2458,7 +2485,7 @@ class SeadocFilesInfoView(APIView):
                 info['file_ext'] = fileext
                 info['file_type'] = filetype
                 if filetype == SEADOC and not dirent_file_uuid:
-                    repo = seafile_api.get_repo(repo_id)
+                    repo = get_repo_meta(repo_id).repo
                     dirent_file_uuid = get_seadoc_file_uuid(repo, path)
                     info['file_uuid'] = dirent_file_uuid
             files_info[file_url] = info
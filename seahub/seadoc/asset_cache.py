@@ -0,0 +1,172 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Local cache of images and videos of sdoc files.
+
+Assets are stored by file object id, so a cached file never goes stale and
+needs no invalidation: a changed image has a new object id. The directory is
+kept under ``SEADOC_ASSET_CACHE_SIZE`` by removing the least recently used
+files, using mtime as last access time.
+"""
+import os
+import uuid
+import time
+import logging
+
+import requests
+from django.core.cache import cache
+
+from seaserv import seafile_api
+
+from seahub.settings import SEADOC_ASSET_CACHE_ROOT, SEADOC_ASSET_CACHE_SIZE
+from seahub.utils import gen_inner_file_get_url
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# an asset bigger than this part of the cache is streamed but not cached
+MAX_ASSET_SIZE_RATIO = 0.1
+# evict down to this part of the cache, so that it doesn't run on every write
+EVICT_TARGET_RATIO = 0.9
+# seconds between two evictions
+EVICT_INTERVAL = 60
+EVICT_CACHE_KEY = 'SEADOC_ASSET_CACHE_EVICT'
+# tmp files older than this are left by dead processes
+TMP_FILE_TIMEOUT = 60 * 60
+
+
+def _get_cache_size():
+    return SEADOC_ASSET_CACHE_SIZE * 1024 * 1024
+
+
+def get_asset_cache_path(obj_id):
+    return os.path.join(SEADOC_ASSET_CACHE_ROOT, obj_id[:2], obj_id)
+
+
+def can_cache_asset(size):
+    return 0 < size <= _get_cache_size() * MAX_ASSET_SIZE_RATIO
+
+
+def open_cached_asset(obj_id):
+    """Return the cached file of ``obj_id`` opened for reading, ``None`` if
+    not cached.
+
+    The file is opened rather than returned by path, so that it can still be
+    read if evicted meanwhile.
+    """
+    if SEADOC_ASSET_CACHE_SIZE <= 0:
+        return None
+
+    path = get_asset_cache_path(obj_id)
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return None
+
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return f
+
+
+def get_asset_download_url(repo_id, obj_id, filename, username):
+    token = seafile_api.get_fileserver_access_token(
+        repo_id, obj_id, 'view', username, use_onetime=False)
+    if not token:
+        return None
+    return gen_inner_file_get_url(token, filename)
+
+
+def stream_asset(repo_id, obj_id, filename, username):
+    """Return an iterator over the content of an asset read from fileserver.
+    """
+    download_url = get_asset_download_url(repo_id, obj_id, filename, username)
+    if not download_url:
+        raise Exception('Failed to get download url of %s.' % obj_id)
+
+    resp = requests.get(download_url, stream=True)
+    if not resp.ok:
+        resp.close()
+        raise Exception(resp.text)
+
+    def chunks():
+        try:
+            yield from resp.iter_content(CHUNK_SIZE)
+        finally:
+            resp.close()
+
+    return chunks()
+
+
+def fetch_asset(repo_id, obj_id, filename, username):
+    """Download an asset into the cache, return it opened for reading.
+    """
+    path = get_asset_cache_path(obj_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in stream_asset(repo_id, obj_id, filename, username):
+                f.write(chunk)
+        # opened before it is moved into the cache, so that it can still be
+        # read if evicted right away
+        f = open(tmp_path, 'rb')
+        try:
+            os.replace(tmp_path, path)
+        except Exception:
+            f.close()
+            raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+    if cache.add(EVICT_CACHE_KEY, 1, EVICT_INTERVAL):
+        try:
+            evict_assets()
+        except Exception as e:
+            logger.error(e)
+
+    return f
+
+
+def evict_assets():
+    """Remove the least recently used assets until the cache fits in
+    ``EVICT_TARGET_RATIO`` of its size.
+    """
+    now = time.time()
+    entries = []
+    total_size = 0
+    for root, dirs, files in os.walk(SEADOC_ASSET_CACHE_ROOT):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if name.endswith('.tmp'):
+                if now - st.st_mtime > TMP_FILE_TIMEOUT:
+                    _remove(path)
+                continue
+
+            entries.append((st.st_mtime, st.st_size, path))
+            total_size += st.st_size
+
+    if total_size <= _get_cache_size():
+        return
+
+    target_size = _get_cache_size() * EVICT_TARGET_RATIO
+    entries.sort()
+    for mtime, size, path in entries:
+        if total_size <= target_size:
+            break
+        _remove(path)
+        total_size -= size
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -328,6 +328,91 @@ def move_sdoc_images(src_repo_id, src_path, dst_repo_id, dst_path, username, is_
     return
 
 
+def get_sdoc_images_uuids(src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir, sdoc_dirents_map):
+    """Return (src_file_uuids, dst_file_uuids) of the sdoc files of
+    `sdoc_dirents_map` (src name to dst name) which have images.
+    """
+    dir_id = seafile_api.get_dir_id_by_path(src_repo_id, SDOC_IMAGES_DIR)
+    if not dir_id:
+        return [], []
+    image_dirs = set(d.obj_name for d in seafile_api.list_dir_by_dir_id(src_repo_id, dir_id))
+
+    src_uuid_maps = FileUUIDMap.objects.bulk_get_or_create(
+        src_repo_id, [(src_parent_dir, name, False) for name in sdoc_dirents_map])
+    dirents_map = {}
+    for src_dirent, dst_dirent in sdoc_dirents_map.items():
+        src_file_uuid = str(src_uuid_maps[posixpath.join(src_parent_dir, src_dirent)].uuid)
+        if src_file_uuid in image_dirs:
+            dirents_map[src_file_uuid] = dst_dirent
+    if not dirents_map:
+        return [], []
+
+    dst_uuid_maps = FileUUIDMap.objects.bulk_get_or_create(
+        dst_repo_id, [(dst_parent_dir, name, False) for name in dirents_map.values()])
+    src_file_uuids = list(dirents_map.keys())
+    dst_file_uuids = [str(dst_uuid_maps[posixpath.join(dst_parent_dir, name)].uuid)
+                      for name in dirents_map.values()]
+    return src_file_uuids, dst_file_uuids
+
+
+def copy_sdoc_images_in_batch(src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir,
+                              sdoc_dirents_map, username, is_async=True):
+    src_file_uuids, dst_file_uuids = get_sdoc_images_uuids(
+        src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir, sdoc_dirents_map)
+    if not src_file_uuids:
+        return
+
+    dir_id = seafile_api.get_dir_id_by_path(dst_repo_id, SDOC_IMAGES_DIR)
+    if not dir_id:
+        seafile_api.mkdir_with_parents(dst_repo_id, '/', SDOC_IMAGES_DIR.strip('/'), username)
+
+    if is_async:
+        need_progress=1
+        synchronous=0
+    else:
+        need_progress=0
+        synchronous=1
+    # copy all sdoc image dirs by one task
+    seafile_api.copy_file(
+        src_repo_id, SDOC_IMAGES_DIR,
+        json.dumps(src_file_uuids),
+        dst_repo_id, SDOC_IMAGES_DIR,
+        json.dumps(dst_file_uuids),
+        username=username,
+        need_progress=need_progress, synchronous=synchronous,
+    )
+    return
+
+
+def move_sdoc_images_in_batch(src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir,
+                              sdoc_dirents_map, username, is_async=True):
+    src_file_uuids, dst_file_uuids = get_sdoc_images_uuids(
+        src_repo_id, src_parent_dir, dst_repo_id, dst_parent_dir, sdoc_dirents_map)
+    if not src_file_uuids:
+        return
+
+    dir_id = seafile_api.get_dir_id_by_path(dst_repo_id, SDOC_IMAGES_DIR)
+    if not dir_id:
+        seafile_api.mkdir_with_parents(dst_repo_id, '/', SDOC_IMAGES_DIR.strip('/'), username)
+
+    if is_async:
+        need_progress=1
+        synchronous=0
+    else:
+        need_progress=0
+        synchronous=1
+    # move all sdoc image dirs by one task
+    seafile_api.move_file(
+        src_repo_id, SDOC_IMAGES_DIR,
+        json.dumps(src_file_uuids),
+        dst_repo_id, SDOC_IMAGES_DIR,
+        json.dumps(dst_file_uuids),
+        replace=False, username=username,
+        need_progress=need_progress, synchronous=synchronous,
+    )
+    return
+
+
 def export_sdoc_clear_tmp_files_and_dirs(tmp_file_path, tmp_zip_path):
     # delete tmp files/dirs
     if os.path.exists(tmp_file_path):
@@ -135,6 +135,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'seahub.auth.middleware.AuthenticationMiddleware',
     'seahub.base.middleware.BaseMiddleware',
+    'seahub.base.middleware.RepoCacheMiddleware',
     'seahub.base.middleware.InfobarMiddleware',
     'seahub.password_session.middleware.CheckPasswordHash',
     'seahub.base.middleware.ForcePasswdChangeMiddleware',
@@ -510,6 +511,10 @@ SUPPORT_EMAIL = ''
 FILE_PREVIEW_MAX_SIZE = 30 * 1024 * 1024
 FILE_ENCODING_LIST = ['auto', 'utf-8', 'gbk', 'ISO-8859-1', 'ISO-8859-5']
 FILE_ENCODING_TRY_LIST = ['utf-8', 'gbk']
+# changes of a text file revision are not computed above this number of
+# lines, and only counted above this number of changed lines
+TEXT_DIFF_MAX_LINES = 200000
+TEXT_DIFF_MAX_CHANGED_LINES = 10000
 HIGHLIGHT_KEYWORD = False # If True, highlight the keywords in the file when the visit is via clicking a link in 'search result' page.
 # extensions of previewed files
 TEXT_PREVIEW_EXT = """ac, am, bat, c, cc, cmake, cpp, cs, css, diff, el, h, html, htm, java, js, json, less, make, org, php, pl, properties, py, rb, scala, script, sh, sql, txt, text, tex, vi, vim, xhtml, xml, log, csv, groovy, rst, patch, go, yml"""
@@ -536,6 +541,9 @@ CACHE_DIR = "/tmp"
 install_topdir = os.path.expanduser(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 central_conf_dir = os.environ.get('SEAFILE_CENTRAL_CONF_DIR', '')
 
+# For multi-worker deployments, ``seahub.base.cache.TieredCache`` puts a
+# process-local LRU cache in front of memcached or Redis, see its docstring
+# for a configuration example.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
@@ -551,6 +559,9 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Prefix a rate with 'window:' (e.g. 'window:3000/minute') to use the
+    # constant-cost sliding window counter instead of the request history,
+    # see seahub/api2/throttling.py.
     'DEFAULT_THROTTLE_RATES': {
         'ping': '3000/minute',
         'anon': '60/minute',
@@ -562,6 +573,33 @@ REST_FRAMEWORK = {
 }
 REST_FRAMEWORK_THROTTING_WHITELIST = []
 
+# Seconds to cache the user and org of an api token, 0 to disable.
+TOKEN_AUTH_CACHE_TIMEOUT = 60
+
+# Seconds a process keeps repo objects got by seahub.utils.repo_cache, 0 to
+# keep them for the current request only. Owners and status are always kept
+# for the current request only.
+REPO_META_CACHE_TIMEOUT = 10
+# Seconds after which a process rebuilds its user search index, see
+# seahub.utils.user_search_index, 0 to rebuild it on every search.
+USER_SEARCH_INDEX_TIMEOUT = 300
+# Seconds after which space usage of users, sorted for the admin user list,
+# is refreshed, see seahub.utils.user_quota_usage. 0 to refresh it on every
+# request.
+USER_QUOTA_USAGE_REFRESH_INTERVAL = 600
+# Seconds between writes of buffered view counts of share links to
+# database, see seahub.share.view_counter. 0 to write each visit at once.
+# Visits are only buffered with memcached or Redis as cache (also as L2 of
+# TieredCache), whose counters are atomic; with another cache each visit is
+# written at once.
+SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL = 30
+# Seconds to cache the share link or upload link of a token, and unknown
+# tokens, see seahub.share.models.get_share_link_by_token. 0 to disable.
+SHARE_LINK_TOKEN_CACHE_TIMEOUT = 60
+# Save a device's last accessed time, ip and client version at most once
+# in this number of seconds.
+TOKEN_V2_UPDATE_INTERVAL = 60
+
 # file and path
 GET_FILE_HISTORY_TIMEOUT = 10 * 60 # seconds
 MAX_UPLOAD_FILE_NAME_LEN    = 255
@@ -895,6 +933,16 @@ THUMBNAIL_VIDEO_FRAME_TIME = 5  # use the frame at 5 second as thumbnail
 # pdf thumbnails
 ENABLE_PDF_THUMBNAIL = True
 
+# number of processes creating thumbnails per seahub worker, 0 to create
+# them in the seahub worker. Every seahub worker has its own processes, e.g.
+# 4 gunicorn workers with 2 processes each create up to 8 thumbnails at once
+THUMBNAIL_JOB_WORKERS = 2
+# seconds to wait for a thumbnail to be created
+THUMBNAIL_JOB_TIMEOUT = 60
+# max number of thumbnails of the other files in a folder created in
+# advance when one is requested, 0 to disable
+THUMBNAIL_PREFETCH_LIMIT = 50
+
 # template for create new office file
 OFFICE_TEMPLATE_ROOT = os.path.join(MEDIA_ROOT, 'office-template')
 
@@ -954,6 +1002,22 @@ SEADOC_PRIVATE_KEY = ''
 SEADOC_SERVER_URL = 'http://127.0.0.1:7070'
 FILE_CONVERTER_SERVER_URL = 'http://127.0.0.1:8888'
 
+# Absolute filesystem path to the directory that will hold images and videos
+# of sdoc files fetched from fileserver.
+if os.path.exists(SEAHUB_DATA_ROOT):
+    SEADOC_ASSET_CACHE_ROOT = os.path.join(SEAHUB_DATA_ROOT, 'sdoc-assets')
+else:
+    SEADOC_ASSET_CACHE_ROOT = os.path.join(PROJECT_ROOT, 'seahub/seadoc/assets')
+# size(MB) limit of the directory, 0 to disable caching
+SEADOC_ASSET_CACHE_SIZE = 1024
+
+# Absolute filesystem path to the directory that will hold users exported to
+# excel in background, it must be shared by all seahub servers.
+if os.path.exists(SEAHUB_DATA_ROOT):
+    USER_EXPORT_ROOT = os.path.join(SEAHUB_DATA_ROOT, 'user-export')
+else:
+    USER_EXPORT_ROOT = os.path.join(CACHE_DIR, 'seahub_user_export')
+
 
 ##########################
 # Settings for tldraw    #
@@ -1015,6 +1079,12 @@ if os.environ.get('SEAFILE_DOCS', None):
 ENABLE_METADATA_MANAGEMENT = False
 METADATA_SERVER_URL = ''
 METADATA_SERVER_SECRET_KEY = ''
+# max number of kept alive connections to metadata server per process
+METADATA_SERVER_POOL_SIZE = 10
+METADATA_SERVER_RETRIES = 2
+# seconds to cache the columns of a metadata table, the cache is also
+# cleared when a column or table is added, updated or deleted
+METADATA_COLUMNS_CACHE_TIMEOUT = 5 * 60
 
 #############################
 # multi office suite support
@@ -8,7 +8,7 @@ from django.utils.translation import gettext as _
 from rest_framework import status
 
 from seahub.api2.utils import api_error
-from seahub.share.models import FileShare, UploadLinkShare
+from seahub.share.models import FileShare, get_share_link_by_token
 from seahub.share.utils import SCOPE_SPECIFIC_EMAILS, SCOPE_ALL_USERS, SCOPE_SPECIFIC_USERS
 from seahub.utils import render_error
 from seahub.utils import normalize_cache_key, is_pro_version, redirect_to_login
@@ -64,19 +64,7 @@ def share_link_audit(func):
 
         assert token is not None    # Checked by URLconf
 
-        is_for_upload = False
-        try:
-            fileshare = FileShare.objects.get(token=token)
-        except FileShare.DoesNotExist:
-            fileshare = None
-
-        if not fileshare:
-            try:
-                fileshare = UploadLinkShare.objects.get(token=token)
-                is_for_upload = True
-            except UploadLinkShare.DoesNotExist:
-                fileshare = None
-
+        fileshare, is_for_upload = get_share_link_by_token(token)
         if not fileshare:
             return render_error(request, _('Link does not exist.'))
 
@@ -0,0 +1,226 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Repos and dirents of a batch of share links.
+
+``ShareLinkBatch(links)`` gets the repo of the links once per repo, and the
+dirents of the link paths once per parent folder: a folder holding several
+of the paths is listed by one ``list_dir_by_path``, instead of one
+``get_dir_id_by_path``/``get_file_id_by_path`` and ``get_dirent_by_path``
+per link. A folder holding one of the paths gets it by
+``get_dirent_by_path``.
+
+A lookup that fails is not taken as "not found". When a folder cannot be
+listed, or a dirent cannot be got, the id of the file or folder of each of
+its links is got as before, by ``get_file_id_by_path`` or
+``get_dir_id_by_path``. If that fails too, or the repo cannot be got, the
+link is unknown: ``get_obj_id`` and ``is_valid`` return None for it.
+
+``stats`` holds the numbers of links, repos, rpcs for dirents and failed
+lookups, and the seconds spent in getting repos and dirents.
+"""
+import os
+import stat
+import time
+import logging
+
+from seaserv import seafile_api
+
+from seahub.utils import normalize_dir_path, normalize_file_path
+from seahub.utils.repo_cache import get_repo_meta
+
+logger = logging.getLogger(__name__)
+
+# a folder holding at least this number of link paths is listed
+LIST_DIR_MIN_PATHS = 2
+
+# lookup failed, e.g. seafile rpc error
+_UNKNOWN = object()
+
+
+def _get_link_path(link):
+    """Path of a share link, without the trailing slash of folders.
+    """
+    if link.s_type == 'd':
+        path = normalize_dir_path(link.path)
+        return '/' if path == '/' else path.rstrip('/')
+    return normalize_file_path(link.path)
+
+
+class ShareLinkBatch(object):
+    """Repos and dirents of ``links``, got when first asked for.
+    """
+
+    def __init__(self, links):
+        self.links = list(links)
+        self._repos = None
+        self._dirents = None
+        self._obj_ids = {}
+        self.stats = {
+            'links': len(self.links),
+            'repos': 0,
+            'dirent_calls': 0,
+            'failed_lookups': 0,
+            'repos_time': 0,
+            'dirents_time': 0,
+        }
+
+    def _resolve_repos(self):
+        start = time.monotonic()
+        self._repos = {}
+        for repo_id in set(link.repo_id for link in self.links):
+            try:
+                self._repos[repo_id] = get_repo_meta(repo_id).repo
+            except Exception as e:
+                logger.error(e)
+                self._repos[repo_id] = _UNKNOWN
+                self.stats['failed_lookups'] += 1
+
+        self.stats['repos'] = len(self._repos)
+        self.stats['repos_time'] = time.monotonic() - start
+
+    def _get_dirent_by_path(self, repo_id, path):
+        self.stats['dirent_calls'] += 1
+        try:
+            return seafile_api.get_dirent_by_path(repo_id, path)
+        except Exception as e:
+            # path does not exist or rpc error, checked by id of the link
+            logger.debug(e)
+            return _UNKNOWN
+
+    def _resolve_dirents(self):
+        start = time.monotonic()
+        self._dirents = {}
+
+        # names of link paths in each folder, and repos with a link to '/'
+        folders = {}
+        root_repo_ids = set()
+        for link in self.links:
+            if not self.get_repo(link.repo_id):
+                continue
+
+            path = _get_link_path(link)
+            if path == '/':
+                root_repo_ids.add(link.repo_id)
+                continue
+
+            parent_dir, name = os.path.split(path)
+            folders.setdefault((link.repo_id, parent_dir), set()).add(name)
+
+        for (repo_id, parent_dir), names in folders.items():
+            dirents = None
+            if len(names) >= LIST_DIR_MIN_PATHS:
+                self.stats['dirent_calls'] += 1
+                try:
+                    dirents = seafile_api.list_dir_by_path(repo_id, parent_dir) or []
+                    dirents = {d.obj_name: d for d in dirents}
+                except Exception as e:
+                    # folder does not exist or rpc error, get each dirent
+                    logger.debug(e)
+                    dirents = None
+
+            for name in names:
+                path = os.path.join(parent_dir, name)
+                if dirents is not None:
+                    self._dirents[(repo_id, path)] = dirents.get(name)
+                else:
+                    self._dirents[(repo_id, path)] = \
+                        self._get_dirent_by_path(repo_id, path)
+
+        # root folder of a repo has no dirent, keep its id instead
+        for repo_id in root_repo_ids:
+            self.stats['dirent_calls'] += 1
+            try:
+                self._dirents[(repo_id, '/')] = \
+                    seafile_api.get_dir_id_by_path(repo_id, '/')
+            except Exception as e:
+                logger.error(e)
+                self._dirents[(repo_id, '/')] = _UNKNOWN
+                self.stats['failed_lookups'] += 1
+
+        self.stats['dirents_time'] = time.monotonic() - start
+
+    def _get_obj_id_by_path(self, link, path):
+        """Id of the file or folder of ``link`` by a rpc of its own, as
+        when it is not in a batch.
+        """
+        key = (link.repo_id, path, link.s_type)
+        if key not in self._obj_ids:
+            self.stats['dirent_calls'] += 1
+            try:
+                if link.s_type == 'd':
+                    obj_id = seafile_api.get_dir_id_by_path(link.repo_id, path)
+                else:
+                    obj_id = seafile_api.get_file_id_by_path(link.repo_id, path)
+            except Exception as e:
+                logger.error(e)
+                obj_id = None
+                self.stats['failed_lookups'] += 1
+            else:
+                obj_id = obj_id or ''
+            self._obj_ids[key] = obj_id
+        return self._obj_ids[key]
+
+    def get_repo(self, repo_id):
+        """Return repo of ``repo_id``, None if it does not exist or cannot
+        be got.
+        """
+        if self._repos is None:
+            self._resolve_repos()
+        repo = self._repos.get(repo_id)
+        return None if repo is _UNKNOWN else repo
+
+    def get_dirent(self, link):
+        """Return dirent of the file or folder shared by ``link``, None if
+        it does not exist, cannot be got or is shared by a link to the root
+        folder.
+        """
+        if self._dirents is None:
+            self._resolve_dirents()
+
+        path = _get_link_path(link)
+        if path == '/':
+            return None
+
+        dirent = self._dirents.get((link.repo_id, path))
+        if not dirent or dirent is _UNKNOWN or \
+                stat.S_ISDIR(dirent.mode) != (link.s_type == 'd'):
+            return None
+        return dirent
+
+    def get_obj_id(self, link):
+        """Return id of the file or folder shared by ``link``, '' if it does
+        not exist, None if it cannot be got.
+        """
+        if self._repos is None:
+            self._resolve_repos()
+        repo = self._repos.get(link.repo_id)
+        if repo is _UNKNOWN:
+            return None
+        if not repo:
+            return ''
+
+        if self._dirents is None:
+            self._resolve_dirents()
+
+        path = _get_link_path(link)
+        dirent = self._dirents.get((link.repo_id, path))
+        if path == '/':
+            return None if dirent is _UNKNOWN else (dirent or '')
+
+        if dirent is _UNKNOWN:
+            return self._get_obj_id_by_path(link, path)
+
+        dirent = self.get_dirent(link)
+        return dirent.obj_id if dirent else ''
+
+    def is_valid(self, link):
+        """A link is invalid when it is expired, or its repo, file or folder
+        does not exist. Return None if that cannot be known, e.g. on a
+        seafile rpc error.
+        """
+        if link.is_expired():
+            return False
+
+        obj_id = self.get_obj_id(link)
+        if obj_id is None:
+            return None
+        return bool(obj_id)
@@ -4,11 +4,14 @@ import json
 import logging
 import operator
 import datetime
-from functools import reduce
+from hashlib import sha1
+from functools import reduce, lru_cache
 from constance import config
 
+from django.core.cache import cache
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -21,6 +24,7 @@ from seahub.utils.hasher import AESPasswordHasher
 from seahub.utils import normalize_file_path, normalize_dir_path, gen_token, \
     get_service_url, is_valid_org_id
 from seahub.constants import PERMISSION_READ, PERMISSION_ADMIN
+from seahub.settings import SHARE_LINK_TOKEN_CACHE_TIMEOUT
 
 
 # Get an instance of a logger
@@ -33,6 +37,65 @@ def make_password(password):
     return aes.encode(password)
 
 
+@lru_cache(maxsize=1024)
+def _decode_password(password_enc):
+    aes = AESPasswordHasher()
+    return aes.decode(password_enc)
+
+
+SHARE_LINK_TOKEN_CACHE_PREFIX = 'SHARE_LINK_TOKEN_'
+
+
+def get_share_link_token_cache_key(token):
+    """Cache key of a resolved share link token, the raw token is not kept
+    in cache keys.
+    """
+    return SHARE_LINK_TOKEN_CACHE_PREFIX + sha1(token.encode('utf-8')).hexdigest()
+
+
+def clear_share_link_token_cache(tokens):
+    cache.delete_many([get_share_link_token_cache_key(t) for t in tokens])
+
+
+def clear_share_link_token_cache_by(**filters):
+    """Clear cached share links and upload links matching ``filters``, used
+    after a ``QuerySet.update()``, which sends no ``post_save``.
+    """
+    tokens = list(FileShare.objects.filter(**filters).values_list('token', flat=True))
+    tokens += list(UploadLinkShare.objects.filter(**filters).values_list('token', flat=True))
+    clear_share_link_token_cache(tokens)
+
+
+def get_share_link_by_token(token):
+    """Return ``(link, is_upload_link)`` of ``token``, ``link`` is a
+    ``FileShare``, an ``UploadLinkShare`` or None if there is no such link.
+
+    The result, including that of an unknown token, is cached for
+    ``SHARE_LINK_TOKEN_CACHE_TIMEOUT`` seconds, and cleared when the link is
+    saved or deleted (links of a deleted repo are deleted). Expire date is
+    not checked here, callers check it on each request.
+    """
+    cache_key = get_share_link_token_cache_key(token)
+    if SHARE_LINK_TOKEN_CACHE_TIMEOUT > 0:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    link, is_upload_link = None, False
+    try:
+        link = FileShare.objects.get(token=token)
+    except FileShare.DoesNotExist:
+        try:
+            link = UploadLinkShare.objects.get(token=token)
+            is_upload_link = True
+        except UploadLinkShare.DoesNotExist:
+            pass
+
+    if SHARE_LINK_TOKEN_CACHE_TIMEOUT > 0:
+        cache.set(cache_key, (link, is_upload_link), SHARE_LINK_TOKEN_CACHE_TIMEOUT)
+    return link, is_upload_link
+
+
 class AnonymousShare(models.Model):
     """
     Model used for sharing repo to unregistered email.
@@ -169,9 +232,8 @@ class FileShareManager(models.Manager):
     def _get_valid_file_share_by_token(self, token):
         """Return share link that exists and not expire, otherwise none.
         """
-        try:
-            fs = self.get(token=token)
-        except self.model.DoesNotExist:
+        fs, is_upload_link = get_share_link_by_token(token)
+        if fs is None or is_upload_link:
             return None
 
         if fs.expire_date is None:
@@ -458,8 +520,7 @@ class FileShare(models.Model):
 
         if self.password:
             try:
-                aes = AESPasswordHasher()
-                return aes.decode(self.password)
+                return _decode_password(self.password)
             except Exception:
                 logger.error('Error occurred when get share link password')
                 return ''
@@ -520,9 +581,8 @@ class UploadLinkShareManager(models.Manager):
     def get_valid_upload_link_by_token(self, token):
         """Return upload link that exists and not expire, otherwise none.
         """
-        try:
-            fs = self.get(token=token)
-        except self.model.DoesNotExist:
+        fs, is_upload_link = get_share_link_by_token(token)
+        if fs is None or not is_upload_link:
             return None
 
         if fs.expire_date is None:
@@ -564,8 +624,7 @@ class UploadLinkShare(models.Model):
 
         if self.password:
             try:
-                aes = AESPasswordHasher()
-                return aes.decode(self.password)
+                return _decode_password(self.password)
             except Exception:
                 logger.error('Error occurred when get share link password')
                 return ''
@@ -699,6 +758,15 @@ class CustomSharePermissions(models.Model):
 
 # signal handlers
 
+@receiver(post_save, sender=FileShare)
+@receiver(post_delete, sender=FileShare)
+@receiver(post_save, sender=UploadLinkShare)
+@receiver(post_delete, sender=UploadLinkShare)
+def share_link_changed_cb(sender, instance, **kwargs):
+    # link created, updated or deleted (also when its repo is deleted)
+    clear_share_link_token_cache([instance.token])
+
+
 @receiver(repo_deleted)
 def remove_share_info(sender, **kwargs):
     repo_id = kwargs['repo_id']
@@ -0,0 +1,191 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Buffered view counts of share links and upload links.
+
+A visit of a link does not update its row. Each process adds the visit to
+an in memory buffer, and to a counter of pending visits of the link in
+cache. A thread of the process writes the buffer to database every
+``SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL`` seconds, with one UPDATE per model
+and number of visits, then takes the written visits off the counters.
+
+``get_view_cnt`` and ``get_view_cnts`` return the count in database plus
+the pending visits of all processes. Visits buffered by a process that is
+killed are lost. Its visits stay in the pending counters until they expire,
+``PENDING_TIMEOUT_INTERVALS`` flush intervals after the last visit of the
+link; a counter evicted or expired too early only makes the reading lower,
+never lower than the count in database.
+
+Counting needs a cache whose ``incr`` and ``decr`` are atomic and shared by
+all processes (memcached or Redis, also as L2 of ``TieredCache``). With
+another cache, e.g. the default file based one, each visit updates the row
+at once.
+"""
+import os
+import time
+import atexit
+import logging
+import threading
+
+from django.core.cache import cache, caches
+from django.db import connection
+from django.db.models import F
+
+from seahub.base.cache import TieredCache
+from seahub.settings import SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# keys with this prefix are never kept in the L1 of TieredCache
+SHARE_LINK_VIEW_CNT_CACHE_PREFIX = 'share_link_view_cnt_'
+
+# a pending counter expires this number of flush intervals after the last
+# visit of its link, e.g. when the process that buffered them was killed
+PENDING_TIMEOUT_INTERVALS = 4
+
+# modules of cache backends whose counters are atomic
+ATOMIC_CACHE_BACKEND_MODULES = (
+    'django.core.cache.backends.memcached',
+    'django.core.cache.backends.redis',
+    'django_redis.',
+)
+
+_lock = threading.Lock()
+_buffer = {}
+_flusher = None
+_flusher_pid = None
+
+
+def _cache_key(model, pk):
+    return '%s%s_%s' % (SHARE_LINK_VIEW_CNT_CACHE_PREFIX,
+                        model._meta.model_name, pk)
+
+
+def has_atomic_counters(backend=None):
+    """Whether ``incr`` and ``decr`` of the default cache are atomic and
+    shared by all processes.
+    """
+    backend = backend or caches['default']
+    if isinstance(backend, TieredCache):
+        # counters are kept in L2 only
+        backend = backend.l2
+    return type(backend).__module__.startswith(ATOMIC_CACHE_BACKEND_MODULES)
+
+
+def is_buffered():
+    return SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL > 0 and has_atomic_counters()
+
+
+def _incr_pending(key, delta):
+    timeout = SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL * PENDING_TIMEOUT_INTERVALS
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, timeout):
+            return
+        cache.incr(key, delta)
+    cache.touch(key, timeout)
+
+
+def _decr_pending(key, delta):
+    try:
+        cache.decr(key, delta)
+    except ValueError:
+        # evicted, nothing to take off
+        pass
+
+
+def flush_view_cnts():
+    """Write the visits buffered by this process to database.
+    """
+    global _buffer
+    with _lock:
+        buffered, _buffer = _buffer, {}
+    if not buffered:
+        return
+
+    groups = {}
+    for (model, pk), delta in buffered.items():
+        groups.setdefault((model, delta), []).append(pk)
+
+    for (model, delta), pks in groups.items():
+        try:
+            model.objects.filter(pk__in=pks).update(view_cnt=F('view_cnt') + delta)
+        except Exception as e:
+            logger.error(e)
+            # keep them for the next flush
+            with _lock:
+                for pk in pks:
+                    _buffer[(model, pk)] = _buffer.get((model, pk), 0) + delta
+            continue
+
+        for pk in pks:
+            _decr_pending(_cache_key(model, pk), delta)
+
+
+def _run_flusher():
+    while True:
+        time.sleep(SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL)
+        try:
+            flush_view_cnts()
+        except Exception as e:
+            logger.error(e)
+        finally:
+            connection.close()
+
+
+def _ensure_flusher():
+    global _flusher, _flusher_pid
+    if _flusher is not None and _flusher_pid == os.getpid():
+        return
+
+    with _lock:
+        if _flusher is None or _flusher_pid != os.getpid():
+            # buffer of the parent process is not ours to write
+            _buffer.clear()
+            _flusher = threading.Thread(target=_run_flusher, daemon=True)
+            _flusher.start()
+            _flusher_pid = os.getpid()
+
+
+def incr_view_cnt(link):
+    """Count a visit of ``link``, a ``FileShare`` or ``UploadLinkShare``.
+    """
+    if not is_buffered():
+        type(link).objects.filter(pk=link.pk).update(view_cnt=F('view_cnt') + 1)
+        return
+
+    _ensure_flusher()
+    key = (type(link), link.pk)
+    with _lock:
+        _buffer[key] = _buffer.get(key, 0) + 1
+    try:
+        _incr_pending(_cache_key(*key), 1)
+    except Exception as e:
+        logger.warning(e)
+
+
+def get_view_cnts(links):
+    """Return a dict of pk to view count of ``links``, which are all
+    ``FileShare`` or all ``UploadLinkShare``.
+    """
+    links = list(links)
+    if not is_buffered():
+        return {link.pk: link.view_cnt for link in links}
+
+    keys = {_cache_key(type(link), link.pk): link for link in links}
+    try:
+        pending = cache.get_many(list(keys)) if keys else {}
+    except Exception as e:
+        logger.warning(e)
+        pending = {}
+
+    # a counter may be below zero after it expired while its visits were
+    # still buffered
+    return {link.pk: link.view_cnt + max(0, int(pending.get(key) or 0))
+            for key, link in keys.items()}
+
+
+def get_view_cnt(link):
+    return get_view_cnts([link])[link.pk]
+
+
+atexit.register(flush_view_cnts)
@@ -23,7 +23,7 @@ from seahub.utils import string2list, check_filename_with_rename, \
     is_valid_username, is_valid_email, is_org_context, \
     gen_token, normalize_cache_key, gen_shared_link
 from seahub.utils.mail import send_html_email_with_dj_template
-from seahub.utils.ms_excel import write_xls
+from seahub.utils.ms_excel import export_response
 from seahub.utils.timeutils import datetime_to_isoformat_timestr
 from seahub.settings import SITE_ROOT, SHARE_LINK_AUDIT_CODE_TIMEOUT
 
@@ -202,40 +202,35 @@ def export_shared_link(request):
                             status=400,
                             content_type='application/json; charset=utf-8')
 
-    data_list = []
     username = request.user.username
-    share_links = FileShare.objects.filter(token__in=token_list)
+    share_links = FileShare.objects.filter(token__in=token_list, username=username)
 
-    for link in share_links:
+    def gen_rows():
+        for link in share_links.iterator():
+            link_info = get_share_link_info(link)
+            row = [link_info.get('link'), link_info.get('username'),
+                   link_info.get('password') or '--',
+                   link_info.get('permission'),
+                   link_info.get('expire_date')]
 
-        if link.username != username:
-            continue
-
-        link_info = get_share_link_info(link)
-        row = [link_info.get('link'), link_info.get('username'),
-               link_info.get('password') or '--',
-               link_info.get('permission'),
-               link_info.get('expire_date')]
-
-        data_list.append(row)
+            yield row
 
     excel_name = 'Share Links'
     head = [_("Share Link"), _("Creator"),
             _('Password'), _("Permission"), _("Expiration")]
 
     try:
-        wb = write_xls(excel_name, head, data_list)
+        response = export_response(request, excel_name, head, gen_rows(), excel_name)
     except Exception as e:
         logger.error(e)
+        response = None
+
+    if not response:
         data = json.dumps({'error': _('Internal Server Error')})
         return HttpResponse(data,
                             status=500,
                             content_type='application/json; charset=utf-8')
 
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = 'attachment; filename="%s.xlsx"' % excel_name
-    wb.save(response)
-
     return response
 
 
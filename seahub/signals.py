@@ -5,6 +5,7 @@ from django.dispatch import Signal
 repo_created = Signal()
 repo_deleted = Signal()
 repo_transfer = Signal()
+repo_renamed = Signal()
 clean_up_repo_trash = Signal()
 repo_restored = Signal()
 upload_file_successful = Signal()
@@ -7,10 +7,9 @@ import posixpath
 
 from django.db import models
 
-from seaserv import seafile_api
-
 from seahub.base.fields import LowerCaseCharField
 from seahub.utils import normalize_file_path, normalize_dir_path
+from seahub.utils.repo_cache import get_repo_meta
 
 
 ########## Manager
@@ -44,6 +43,61 @@ class FileUUIDMapManager(models.Manager):
             uuid.save(using=self._db)
         return uuid
 
+    def bulk_get_or_create(self, repo_id, dirents, batch_size=1000):
+        """ get or create filemaps of many dirents at once
+            args:
+            - `repo_id`:
+            - `dirents`: list of (parent_path, filename, is_dir)
+            - `batch_size`: number of dirents looked up or inserted by a query
+            return:
+                dict of path to filemap, path is parent_path and filename
+                joined as given
+        """
+        # map each parent path to its origin, once
+        origins = {}
+        keys = {}
+        for parent_path, filename, is_dir in dirents:
+            if parent_path not in origins:
+                origin_repo_id, origin_path = \
+                    self.model.get_origin_repo_id_and_parent_path(repo_id, parent_path)
+                origin_path = self.model.normalize_path(origin_path)
+                origins[parent_path] = (
+                    origin_repo_id, origin_path,
+                    self.model.md5_repo_id_parent_path(origin_repo_id, origin_path))
+            path = posixpath.join(parent_path, filename)
+            keys[path] = (origins[parent_path][2], filename, bool(is_dir))
+
+        wanted = set(keys.values())
+        wanted_list = list(wanted)
+        found = {}
+        for i in range(0, len(wanted_list), batch_size):
+            batch = wanted_list[i:i + batch_size]
+            uuid_maps = super(FileUUIDMapManager, self).filter(
+                repo_id_parent_path_md5__in={md5 for md5, _, _ in batch},
+                filename__in={filename for _, filename, _ in batch})
+            for uuid_map in uuid_maps:
+                key = (uuid_map.repo_id_parent_path_md5, uuid_map.filename,
+                       uuid_map.is_dir)
+                if key in wanted:
+                    found.setdefault(key, uuid_map)
+
+        # bulk_create skips save(), so md5 and normalized path are set here
+        md5_to_origin = {md5: (r, p) for r, p, md5 in origins.values()}
+        new_uuid_maps = []
+        for md5, filename, is_dir in wanted_list:
+            if (md5, filename, is_dir) in found:
+                continue
+            origin_repo_id, origin_path = md5_to_origin[md5]
+            uuid_map = self.model(repo_id=origin_repo_id, parent_path=origin_path,
+                                  repo_id_parent_path_md5=md5,
+                                  filename=filename, is_dir=is_dir)
+            found[(md5, filename, is_dir)] = uuid_map
+            new_uuid_maps.append(uuid_map)
+        if new_uuid_maps:
+            self.bulk_create(new_uuid_maps, batch_size=batch_size)
+
+        return {path: found[key] for path, key in keys.items()}
+
     def create_fileuuidmap_by_uuid(self, file_uuid, repo_id, parent_path, filename, is_dir):
         repo_id, parent_path = self.model.get_origin_repo_id_and_parent_path(repo_id, parent_path)
         file_map = self.model(uuid=file_uuid, repo_id=repo_id, parent_path=parent_path, filename=filename, is_dir=is_dir)
@@ -221,10 +275,10 @@ class FileUUIDMap(models.Model):
 
     @classmethod
     def get_origin_repo_id_and_parent_path(cls, repo_id, parent_path):
-        repo = seafile_api.get_repo(repo_id)
-        if repo.is_virtual:
-            repo_id = repo.origin_repo_id
-            parent_path = posixpath.join(repo.origin_path, parent_path.strip('/'))
+        origin_repo_id, origin_path = get_repo_meta(repo_id).origin
+        if origin_path is not None:
+            repo_id = origin_repo_id
+            parent_path = posixpath.join(origin_path, parent_path.strip('/'))
         return repo_id, parent_path
 
     def save(self, *args, **kwargs):
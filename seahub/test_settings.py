@@ -17,6 +17,15 @@ REST_FRAMEWORK = {
     },
 }
 
+# tests change repos by seafile_api directly, keep repo metadata for the
+# current request only
+REPO_META_CACHE_TIMEOUT = 0
+# tests create users and profiles directly, do not keep the user search index
+USER_SEARCH_INDEX_TIMEOUT = 0
+USER_QUOTA_USAGE_REFRESH_INTERVAL = 0
+SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL = 0
+SHARE_LINK_TOKEN_CACHE_TIMEOUT = 0
+
 # Use static file storage instead of cached, since the cached need to run collect
 # command first.
 # admin roles for test
@@ -0,0 +1,251 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Thumbnail jobs.
+
+Thumbnails are created by a bounded pool of worker processes instead of
+inside the web worker, so that opening a folder of photos can't pin every
+web worker on PIL. Each web worker has its own pool, so the site runs up to
+``THUMBNAIL_JOB_WORKERS`` times the number of web workers of them.
+
+Requests for the same ``(file_id, size)`` share one job: in a process by
+sharing the future of the job, across processes by a lock in cache, held by
+the process which submitted the job. The other processes poll until the
+thumbnail appears instead of submitting it again.
+
+When a thumbnail is requested, thumbnails of the other files in its
+folder are prefetched while the pool has idle workers, a folder is listed
+at most once in ``PREFETCH_INTERVAL`` seconds.
+"""
+import os
+import stat
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.cache import cache
+
+from seaserv import seafile_api
+
+from seahub.settings import THUMBNAIL_ROOT, THUMBNAIL_JOB_WORKERS, \
+    THUMBNAIL_JOB_TIMEOUT, THUMBNAIL_PREFETCH_LIMIT, ENABLE_VIDEO_THUMBNAIL
+from seahub.thumbnail.utils import generate_thumbnail
+from seahub.utils import get_file_type_and_ext, normalize_cache_key
+from seahub.utils.file_types import IMAGE, VIDEO, XMIND, PDF
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.2
+JOB_CACHE_PREFIX = 'THUMBNAIL_JOB_'
+
+# a folder is listed for prefetching at most once in this number of seconds
+PREFETCH_INTERVAL = 10
+# prefetch while there are less than this number of jobs per worker
+PREFETCH_QUEUE_FACTOR = 2
+PREFETCH_CACHE_PREFIX = 'THUMBNAIL_PREFETCH_'
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_pool():
+    """Return the pool of this process, ``None`` if thumbnails are created
+    in the web worker (``THUMBNAIL_JOB_WORKERS = 0``).
+    """
+    global _pool, _pool_pid
+    if THUMBNAIL_JOB_WORKERS <= 0:
+        return None
+
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # workers are spawned, not forked, so that they don't share
+            # the rpc connections of the web worker
+            _pool = ProcessPoolExecutor(max_workers=THUMBNAIL_JOB_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+            _pool_pid = pid
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _get_job_cache_key(file_id, size):
+    return normalize_cache_key('%s_%s' % (file_id, size), JOB_CACHE_PREFIX)
+
+
+def _wait_for_other_process(thumbnail_file, cache_key, timeout):
+    """Another process is creating the thumbnail, wait until it is done.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if os.path.exists(thumbnail_file):
+            return (True, 200)
+
+        if cache.get(cache_key) is None:
+            # done, but no thumbnail created
+            return (os.path.exists(thumbnail_file), 500)
+
+        time.sleep(LOCK_POLL_INTERVAL)
+
+    return (False, 500)
+
+
+def run_thumbnail_job(repo_id, size, path, file_id):
+    """Create a thumbnail, runs in a worker of the pool.
+    """
+    thumbnail_file = os.path.join(THUMBNAIL_ROOT, str(size), file_id)
+    if os.path.exists(thumbnail_file):
+        return (True, 200)
+
+    try:
+        return generate_thumbnail(None, repo_id, size, path)
+    except Exception as e:
+        logger.error(e)
+        return (False, 500)
+
+
+def submit_thumbnail_job(repo_id, size, path, file_id):
+    """Return the future of the job creating thumbnail of ``file_id``,
+    shared by all requests of this process, ``None`` if another process
+    is creating it.
+    """
+    key = (file_id, size)
+    cache_key = _get_job_cache_key(file_id, size)
+    with _jobs_lock:
+        future = _jobs.get(key)
+        if future is not None:
+            return future
+
+        # released when the job is done, or expires if this process dies
+        if not cache.add(cache_key, os.getpid(), THUMBNAIL_JOB_TIMEOUT):
+            return None
+
+        try:
+            future = get_pool().submit(run_thumbnail_job, repo_id, size, path, file_id)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        _jobs[key] = future
+
+    def done(f):
+        with _jobs_lock:
+            if _jobs.get(key) is f:
+                del _jobs[key]
+        cache.delete(cache_key)
+
+    future.add_done_callback(done)
+    return future
+
+
+def create_thumbnail(repo_id, size, path, file_id=None, timeout=None):
+    """Create thumbnail of a file and wait for it, return a
+    ``(success, status_code)`` tuple as ``generate_thumbnail`` does.
+
+    The same permission checks as ``generate_thumbnail`` are needed before.
+    """
+    try:
+        size = int(size)
+    except ValueError as e:
+        logger.error(e)
+        return (False, 400)
+
+    if get_pool() is None:
+        return generate_thumbnail(None, repo_id, size, path)
+
+    if not file_id:
+        file_id = seafile_api.get_file_id_by_path(repo_id, path)
+        if not file_id:
+            return (False, 400)
+
+    thumbnail_file = os.path.join(THUMBNAIL_ROOT, str(size), file_id)
+    if os.path.exists(thumbnail_file):
+        return (True, 200)
+
+    timeout = timeout or THUMBNAIL_JOB_TIMEOUT
+    try:
+        future = submit_thumbnail_job(repo_id, size, path, file_id)
+        if future is None:
+            return _wait_for_other_process(thumbnail_file,
+                                           _get_job_cache_key(file_id, size),
+                                           timeout)
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        logger.warning('Timeout when creating thumbnail of %s in %s.' % (path, repo_id))
+        return (False, 500)
+    except BrokenProcessPool as e:
+        logger.error(e)
+        _reset_pool()
+        return (False, 500)
+
+
+def _count_jobs():
+    with _jobs_lock:
+        return len(_jobs)
+
+
+def _support_thumbnail(file_name):
+    file_type, _ = get_file_type_and_ext(file_name)
+    return file_type in (IMAGE, XMIND, PDF) or \
+        (file_type == VIDEO and ENABLE_VIDEO_THUMBNAIL)
+
+
+def prefetch_dir_thumbnails(repo_id, size, parent_dir):
+    """Create thumbnails of files in ``parent_dir`` in background, as long
+    as the pool has idle workers.
+    """
+    if get_pool() is None or THUMBNAIL_PREFETCH_LIMIT <= 0:
+        return
+
+    try:
+        size = int(size)
+    except ValueError:
+        return
+
+    cache_key = normalize_cache_key('%s_%s' % (repo_id, parent_dir),
+                                    PREFETCH_CACHE_PREFIX)
+    if not cache.add(cache_key, 1, PREFETCH_INTERVAL):
+        return
+
+    try:
+        dirents = seafile_api.list_dir_by_path(repo_id, parent_dir)
+    except Exception as e:
+        logger.error(e)
+        return
+
+    thumbnail_dir = os.path.join(THUMBNAIL_ROOT, str(size))
+    prefetched = 0
+    for dirent in dirents or []:
+        # keep the queue short, requested thumbnails wait behind it
+        if prefetched >= THUMBNAIL_PREFETCH_LIMIT or \
+           _count_jobs() >= THUMBNAIL_JOB_WORKERS * PREFETCH_QUEUE_FACTOR:
+            break
+
+        if stat.S_ISDIR(dirent.mode) or not _support_thumbnail(dirent.obj_name):
+            continue
+
+        if os.path.exists(os.path.join(thumbnail_dir, dirent.obj_id)):
+            continue
+
+        path = os.path.join(parent_dir, dirent.obj_name)
+        try:
+            future = submit_thumbnail_job(repo_id, size, path, dirent.obj_id)
+        except BrokenProcessPool as e:
+            logger.error(e)
+            _reset_pool()
+            return
+        if future is not None:
+            prefetched += 1
@@ -294,7 +294,15 @@ def _create_thumbnail_common(fp, thumbnail_file, size):
     if image.mode in ['RGBA', 'P']:
         save_type = 'png'
     icc_profile = image.info.get('icc_profile')
-    image.save(thumbnail_file, save_type, icc_profile=icc_profile)
+    # write to a temporary file first, so that a thumbnail file is always
+    # complete when it exists
+    tmp_file = '%s.%d.tmp' % (thumbnail_file, os.getpid())
+    try:
+        image.save(tmp_file, save_type, icc_profile=icc_profile)
+        os.replace(tmp_file, thumbnail_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.unlink(tmp_file)
     return (True, 200)
 
 def extract_xmind_image(repo_id, path, size=XMIND_IMAGE_SIZE):
@@ -18,8 +18,8 @@ from seahub.views import check_folder_permission
 from seahub.settings import THUMBNAIL_DEFAULT_SIZE, THUMBNAIL_EXTENSION, \
     THUMBNAIL_ROOT
 import seahub.settings as settings
-from seahub.thumbnail.utils import generate_thumbnail, \
-    get_thumbnail_src, get_share_link_thumbnail_src
+from seahub.thumbnail.utils import get_thumbnail_src, get_share_link_thumbnail_src
+from seahub.thumbnail.jobs import create_thumbnail, prefetch_dir_thumbnails
 from seahub.share.models import FileShare, check_share_link_common
 
 # Get an instance of a logger
@@ -56,7 +56,8 @@ def thumbnail_create(request, repo_id):
                             content_type=content_type)
 
     size = request.GET.get('size', THUMBNAIL_DEFAULT_SIZE)
-    success, status_code = generate_thumbnail(request, repo_id, size, path)
+    success, status_code = create_thumbnail(repo_id, size, path)
+    prefetch_dir_thumbnails(repo_id, size, os.path.dirname(path))
     if success:
         src = get_thumbnail_src(repo_id, size, path)
         result['encoded_thumbnail_src'] = quote(src)
@@ -113,7 +114,7 @@ def thumbnail_get(request, repo_id, size, path):
     success = True
     thumbnail_file = os.path.join(THUMBNAIL_ROOT, str(size), obj_id)
     if not os.path.exists(thumbnail_file):
-        success, status_code = generate_thumbnail(request, repo_id, size, path)
+        success, status_code = create_thumbnail(repo_id, size, path, obj_id)
 
     if success:
         try:
@@ -182,7 +183,9 @@ def share_link_thumbnail_create(request, token):
     real_path = get_real_path_by_fs_and_req_path(fileshare, req_path)
 
     size = request.GET.get('size', THUMBNAIL_DEFAULT_SIZE)
-    success, status_code = generate_thumbnail(request, repo_id, size, real_path)
+    success, status_code = create_thumbnail(repo_id, size, real_path)
+    if fileshare.s_type == 'd':
+        prefetch_dir_thumbnails(repo_id, size, os.path.dirname(real_path))
     if success:
         src = get_share_link_thumbnail_src(token, size, req_path)
         result['encoded_thumbnail_src'] = quote(src)
@@ -257,7 +260,7 @@ def share_link_thumbnail_get(request, token, size, path):
     success = True
     thumbnail_file = os.path.join(THUMBNAIL_ROOT, str(size), obj_id)
     if not os.path.exists(thumbnail_file):
-        success, status_code = generate_thumbnail(request, repo_id, size, image_path)
+        success, status_code = create_thumbnail(repo_id, size, image_path, obj_id)
 
     if success:
         try:
@@ -1565,3 +1565,6 @@ def transfer_repo(repo_id, new_owner, is_share, org_id=None):
                 seafile_api.transfer_repo_to_group(repo_id, group_id, PERMISSION_READ_WRITE)
             else:
                 seafile_api.set_repo_owner(repo_id, new_owner)
+
+    from seahub.utils.repo_cache import invalidate_repo_meta
+    invalidate_repo_meta(repo_id)
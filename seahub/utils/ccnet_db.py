@@ -207,6 +207,96 @@ class CcnetDB:
 
         return active_users
 
+    def get_users_org_id_map(self, emails):
+        if not emails:
+            return {}
+        placeholders = ','.join(['%s'] * len(emails))
+        sql = f"""
+        SELECT `email`, `org_id`
+        FROM `{self.db_name}`.`OrgUser`
+        WHERE
+            email IN ({placeholders})
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, list(emails))
+            return {email: org_id for email, org_id in cursor.fetchall()}
+
+    def get_user_ids(self, emails):
+        """Return a dict of email to id of those of ``emails`` that are in
+        the ``EmailUser`` table.
+        """
+        if not emails:
+            return {}
+        placeholders = ','.join(['%s'] * len(emails))
+        sql = f"""
+        SELECT `email`, `id`
+        FROM `{self.db_name}`.`EmailUser`
+        WHERE
+            email IN ({placeholders})
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, list(emails))
+            return {email: user_id for email, user_id in cursor.fetchall()}
+
+    def get_active_emails(self, emails, org_id=None):
+        """Return those of ``emails`` that are active users, and members of
+        ``org_id`` if given, in the given order.
+        """
+        if not emails:
+            return []
+        placeholders = ','.join(['%s'] * len(emails))
+        if org_id is None:
+            sql = f"""
+            SELECT t1.email
+            FROM `{self.db_name}`.`EmailUser` t1
+            WHERE
+                t1.is_active = 1 AND t1.email IN ({placeholders})
+            """
+            params = list(emails)
+        else:
+            sql = f"""
+            SELECT t1.email
+            FROM `{self.db_name}`.`EmailUser` t1
+            JOIN `{self.db_name}`.`OrgUser` t2
+            ON t1.email = t2.email
+            WHERE
+                t1.is_active = 1 AND t2.org_id = %s AND t1.email IN ({placeholders})
+            """
+            params = [org_id] + list(emails)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            active_emails = {email for email, in cursor.fetchall()}
+        return [e for e in emails if e in active_emails]
+
+    def get_active_users_org_id(self):
+        """Return a dict of email to org id of all active users, org id is
+        None for users not in an org.
+        """
+        sql = f"""
+        SELECT t1.email, t2.org_id
+        FROM `{self.db_name}`.`EmailUser` t1
+        LEFT JOIN `{self.db_name}`.`OrgUser` t2
+        ON t1.email = t2.email
+        WHERE
+            t1.is_active = 1 AND t1.email NOT LIKE '%%@seafile_group'
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return {email: org_id for email, org_id in cursor.fetchall()}
+
+    def list_user_emails(self):
+        """Return emails of all users, active or not.
+        """
+        sql = f"""
+        SELECT `email`
+        FROM `{self.db_name}`.`EmailUser`
+        WHERE
+            email NOT LIKE '%%@seafile_group'
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return [email for email, in cursor.fetchall()]
+
     def get_org_user_count(self, org_id):
         sql = f"""
         SELECT COUNT(1) FROM `{self.db_name}`.`OrgUser` WHERE org_id={org_id}
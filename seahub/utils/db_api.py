@@ -138,6 +138,102 @@ class SeafileDB:
 
         return share_info_list
 
+    def get_repo_owners(self, repo_ids):
+
+        # get owner and org owner of existing repos, by one query
+
+        if not repo_ids:
+            return {}
+
+        placeholders = ','.join(['%s'] * len(repo_ids))
+        sql = f"""
+        SELECT
+            r.repo_id, o.owner_id, g.user
+        FROM
+            `{self.db_name}`.`Repo` r
+        LEFT JOIN `{self.db_name}`.`RepoOwner` o ON r.repo_id = o.repo_id
+        LEFT JOIN `{self.db_name}`.`OrgRepo` g ON r.repo_id = g.repo_id
+        WHERE
+            r.repo_id IN ({placeholders});
+        """
+
+        repo_owners = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, list(repo_ids))
+            for item in cursor.fetchall():
+                repo_owners[item[0]] = (item[1], item[2])
+
+        return repo_owners
+
+    def get_users_quota_map(self, emails):
+
+        # get quotas set for users and org users, by one query,
+        # users without a quota set use their role quota or default quota
+
+        if not emails:
+            return {}
+
+        placeholders = ','.join(['%s'] * len(emails))
+        sql = f"""
+        SELECT
+            NULL, user, quota
+        FROM
+            `{self.db_name}`.`UserQuota`
+        WHERE
+            user IN ({placeholders}) AND quota > 0
+        UNION ALL
+        SELECT
+            org_id, user, quota
+        FROM
+            `{self.db_name}`.`OrgUserQuota`
+        WHERE
+            user IN ({placeholders}) AND quota > 0;
+        """
+
+        quota_map = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, list(emails) * 2)
+            for item in cursor.fetchall():
+                quota_map[(item[0], item[1])] = item[2]
+
+        return quota_map
+
+    def get_repos_shared_to(self, repo_ids, from_user, share_type, org_id=''):
+
+        # get users or group ids repos are shared to by `from_user`, by one query
+
+        if not repo_ids:
+            return {}
+
+        placeholders = ','.join(['%s'] * len(repo_ids))
+        if share_type == 'user':
+            table = 'OrgSharedRepo' if org_id else 'SharedRepo'
+            share_to, share_from = 'to_email', 'from_email'
+        else:
+            table = 'OrgGroupRepo' if org_id else 'RepoGroup'
+            share_to, share_from = 'group_id', 'owner' if org_id else 'user_name'
+
+        sql = f"""
+        SELECT
+            s.repo_id, s.{share_to}
+        FROM
+            `{self.db_name}`.`{table}` s
+        WHERE
+            s.{share_from} = %s AND s.repo_id IN ({placeholders})
+        """
+        params = [from_user] + list(repo_ids)
+        if org_id:
+            sql += " AND s.org_id = %s"
+            params.append(org_id)
+
+        shared_to = {}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for item in cursor.fetchall():
+                shared_to.setdefault(item[0], set()).add(item[1])
+
+        return shared_to
+
     def get_folder_user_share_list(self, repo_id, org_id=''):
 
         # get folders shared to user
@@ -0,0 +1,188 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Batched enrichment of directory listings.
+
+Listing a folder used to run extra queries per dirent for starred items,
+file tags and thumbnails. Each enricher below first collects the keys it
+needs from all dirents, then resolves them with a single bulk operation and
+finally merges the result into the dirent info dicts. Users of the dirents
+are resolved by ``UserInfoResolver``.
+
+Usage::
+
+    enrichers = [StarredEnricher(username, repo_id, path),
+                 FileTagsEnricher(repo_id, path)]
+    enrich_dirents(enrichers, [(info, dirent, path), ...])
+"""
+import os
+import logging
+from urllib.parse import quote
+
+from seahub.base.models import UserStarredFiles
+from seahub.settings import ENABLE_VIDEO_THUMBNAIL, THUMBNAIL_ROOT
+from seahub.thumbnail.utils import get_thumbnail_src
+from seahub.utils import normalize_file_path, FILEEXT_TYPE_MAP
+from seahub.utils.file_tags import get_files_tags_in_dir
+from seahub.utils.file_types import IMAGE, VIDEO, XMIND, PDF
+
+logger = logging.getLogger(__name__)
+
+# Above this number of starred candidates, a prefix query is cheaper than
+# an ``IN (...)`` list.
+STARRED_IN_QUERY_LIMIT = 1000
+
+# Below this number of thumbnail candidates, stat each file instead of
+# scanning the whole thumbnail directory.
+THUMBNAIL_SCANDIR_THRESHOLD = 200
+
+
+class DirentEnricher(object):
+    """Base class of a dirent enricher.
+
+    ``collect`` is called for every dirent, ``resolve`` once, then
+    ``enrich`` for every dirent again.
+    """
+
+    def collect(self, dirent, path):
+        pass
+
+    def resolve(self):
+        pass
+
+    def enrich(self, info, dirent, path):
+        pass
+
+
+class StarredEnricher(DirentEnricher):
+    """Add ``starred`` flag of the dirents in ``parent_dir``.
+    """
+
+    def __init__(self, username, repo_id, parent_dir, org_id=-1):
+        self.username = username
+        self.repo_id = repo_id
+        self.parent_dir = parent_dir
+        self.org_id = org_id
+        self.paths = set()
+        self.starred_paths = set()
+
+    def collect(self, dirent, path):
+        self.paths.add(normalize_file_path(path))
+
+    def resolve(self):
+        if not self.paths:
+            return
+
+        starred_items = UserStarredFiles.objects.filter(email=self.username,
+                repo_id=self.repo_id, org_id=self.org_id)
+        if len(self.paths) <= STARRED_IN_QUERY_LIMIT:
+            # starred dir is saved with a trailing slash
+            path_list = list(self.paths) + [p + '/' for p in self.paths]
+            starred_items = starred_items.filter(path__in=path_list)
+        else:
+            starred_items = starred_items.filter(path__startswith=self.parent_dir)
+
+        try:
+            self.starred_paths = {normalize_file_path(p) for p in
+                                  starred_items.values_list('path', flat=True)}
+        except Exception as e:
+            logger.error(e)
+            self.starred_paths = set()
+
+    def enrich(self, info, dirent, path):
+        info['starred'] = normalize_file_path(path) in self.starred_paths
+
+
+class FileTagsEnricher(DirentEnricher):
+    """Add ``file_tags`` of the files in ``parent_dir``.
+    """
+
+    def __init__(self, repo_id, parent_dir):
+        self.repo_id = repo_id
+        self.parent_dir = parent_dir
+        self.has_files = False
+        self.files_tags_in_dir = {}
+
+    def collect(self, dirent, path):
+        self.has_files = True
+
+    def resolve(self):
+        if not self.has_files:
+            return
+
+        try:
+            self.files_tags_in_dir = get_files_tags_in_dir(self.repo_id, self.parent_dir)
+        except Exception as e:
+            logger.error(e)
+            self.files_tags_in_dir = {}
+
+    def enrich(self, info, dirent, path):
+        file_tags = self.files_tags_in_dir.get(dirent.obj_name, [])
+        if file_tags:
+            info['file_tags'] = list(file_tags)
+
+
+class ThumbnailEnricher(DirentEnricher):
+    """Add ``encoded_thumbnail_src`` of the files whose thumbnail has already
+    been created, so that web browser can get it directly instead of asking
+    to create it.
+    """
+
+    def __init__(self, repo_id, thumbnail_size, file_types=(IMAGE, XMIND, PDF)):
+        self.repo_id = repo_id
+        self.thumbnail_size = thumbnail_size
+        self.file_types = file_types
+        self.candidates = set()
+        self.existing = set()
+
+    def support_thumbnail(self, file_name):
+        file_ext = os.path.splitext(file_name)[1][1:].lower()
+        file_type = FILEEXT_TYPE_MAP.get(file_ext)
+        return file_type in self.file_types or \
+            (file_type == VIDEO and ENABLE_VIDEO_THUMBNAIL)
+
+    def collect(self, dirent, path):
+        if self.support_thumbnail(dirent.obj_name):
+            self.candidates.add(dirent.obj_id)
+
+    def resolve(self):
+        if not self.candidates:
+            return
+
+        thumbnail_dir = os.path.join(THUMBNAIL_ROOT, str(self.thumbnail_size))
+        if len(self.candidates) < THUMBNAIL_SCANDIR_THRESHOLD:
+            self.existing = {obj_id for obj_id in self.candidates if
+                             os.path.exists(os.path.join(thumbnail_dir, obj_id))}
+            return
+
+        existing = set()
+        try:
+            with os.scandir(thumbnail_dir) as it:
+                for entry in it:
+                    if entry.name in self.candidates:
+                        existing.add(entry.name)
+                        if len(existing) == len(self.candidates):
+                            break
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(e)
+
+        self.existing = existing
+
+    def enrich(self, info, dirent, path):
+        if dirent.obj_id in self.existing:
+            src = get_thumbnail_src(self.repo_id, self.thumbnail_size, path)
+            info['encoded_thumbnail_src'] = quote(src)
+
+
+def enrich_dirents(enrichers, entries):
+    """Run ``enrichers`` over ``entries``, a list of ``(info, dirent, path)``.
+    """
+    entries = list(entries)
+    for enricher in enrichers:
+        for info, dirent, path in entries:
+            enricher.collect(dirent, path)
+        enricher.resolve()
+        for info, dirent, path in entries:
+            enricher.enrich(info, dirent, path)
+
+    return [info for info, _, _ in entries]
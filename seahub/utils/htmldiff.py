@@ -1528,7 +1528,7 @@ def _mdiff(fromlines, tolines, context=None, linejunk=None,
                 num_blanks_to_yield -= 1
                 yield ('', '\n'), None, True
             if s.startswith('X'):
-                raise StopIteration
+                return
             else:
                 yield from_line, to_line, True
 
@@ -1550,7 +1550,10 @@ def _mdiff(fromlines, tolines, context=None, linejunk=None,
         while True:
             # Collecting lines of text until we have a from/to pair
             while (len(fromlines)==0 or len(tolines)==0):
-                from_line, to_line, found_diff =next(line_iterator)
+                try:
+                    from_line, to_line, found_diff = next(line_iterator)
+                except StopIteration:
+                    return
                 if from_line is not None:
                     fromlines.append((from_line, found_diff))
                 if to_line is not None:
@@ -1560,51 +1563,66 @@ def _mdiff(fromlines, tolines, context=None, linejunk=None,
             to_line, to_diff = tolines.pop(0)
             yield (from_line, to_line, fromDiff or to_diff)
 
+    return context_diffs(_line_pair_iterator(), context)
+
+
+def context_diffs(line_pair_iterator, context=None):
+    r"""Returns generator yielding the from/to line pairs of
+    ``line_pair_iterator`` needed to show ``context`` lines around changes,
+    with a ``(None, None, None)`` separator between groups of changes.
+
+    ``line_pair_iterator`` yields ``(from_line, to_line, found_diff)`` as
+    the inner iterator of _mdiff does.  With ``context`` None, all pairs
+    are yielded.
+    """
+    line_pair_iterator = iter(line_pair_iterator)
     # Handle case where user does not want context differencing, just yield
     # them up without doing anything else with them.
-    line_pair_iterator = _line_pair_iterator()
     if context is None:
-        while True:
-            yield next(line_pair_iterator)
+        yield from line_pair_iterator
     # Handle case where user wants context differencing.  We must do some
     # storage of lines until we know for sure that they are to be yielded.
     else:
-        context += 1
-        lines_to_write = 0
-        while True:
-            # Store lines up until we find a difference, note use of a
-            # circular queue because we only need to keep around what
-            # we need for context.
-            index, contextLines = 0, [None]*(context)
-            found_diff = False
-            while(found_diff is False):
-                from_line, to_line, found_diff = next(line_pair_iterator)
-                i = index % context
-                contextLines[i] = (from_line, to_line, found_diff)
-                index += 1
-            # Yield lines that we have collected so far, but first yield
-            # the user's separator.
-            if index > context:
-                yield None, None, None
-                lines_to_write = context
-            else:
-                lines_to_write = index
-                index = 0
-            while(lines_to_write):
-                i = index % context
-                index += 1
-                yield contextLines[i]
-                lines_to_write -= 1
-            # Now yield the context lines after the change
-            lines_to_write = context-1
-            while(lines_to_write):
-                from_line, to_line, found_diff = next(line_pair_iterator)
-                # If another change within the context, extend the context
-                if found_diff:
-                    lines_to_write = context-1
+        # next() raises StopIteration when the pairs are exhausted
+        try:
+            context += 1
+            lines_to_write = 0
+            while True:
+                # Store lines up until we find a difference, note use of a
+                # circular queue because we only need to keep around what
+                # we need for context.
+                index, contextLines = 0, [None]*(context)
+                found_diff = False
+                while(found_diff is False):
+                    from_line, to_line, found_diff = next(line_pair_iterator)
+                    i = index % context
+                    contextLines[i] = (from_line, to_line, found_diff)
+                    index += 1
+                # Yield lines that we have collected so far, but first yield
+                # the user's separator.
+                if index > context:
+                    yield None, None, None
+                    lines_to_write = context
                 else:
+                    lines_to_write = index
+                    index = 0
+                while(lines_to_write):
+                    i = index % context
+                    index += 1
+                    yield contextLines[i]
                     lines_to_write -= 1
-                yield from_line, to_line, found_diff
+                # Now yield the context lines after the change
+                lines_to_write = context-1
+                while(lines_to_write):
+                    from_line, to_line, found_diff = next(line_pair_iterator)
+                    # If another change within the context, extend the context
+                    if found_diff:
+                        lines_to_write = context-1
+                    else:
+                        lines_to_write -= 1
+                    yield from_line, to_line, found_diff
+        except StopIteration:
+            return
 
 
 _file_template = """
@@ -1950,6 +1968,12 @@ class HtmlDiff(object):
 
         return fromlist, tolist, flaglist, next_href, next_id
 
+    def _mdiff(self, fromlines, tolines, context=None):
+        """Returns the mdiff iterator of side by side from/to lines, can be
+        overridden to use another differencing algorithm"""
+        return _mdiff(fromlines, tolines, context, linejunk=self._linejunk,
+                      charjunk=self._charjunk)
+
     def make_table(self,fromlines,tolines,context=False, numlines=5):
         """Returns HTML table of side by side comparison with change highlights
 
@@ -1980,8 +2004,7 @@ class HtmlDiff(object):
             context_lines = numlines
         else:
             context_lines = None
-        diffs = _mdiff(fromlines, tolines, context_lines, linejunk=self._linejunk,
-                      charjunk=self._charjunk)
+        diffs = self._mdiff(fromlines, tolines, context_lines)
 
         # set up iterator to wrap lines that exceed desired width
         if self._wrapcolumn:
@@ -0,0 +1,284 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Line diff of text files, used to show the changes of a file revision.
+
+Lines are interned to integers, so that comparing two lines is comparing
+two ints whatever their length. The common head and tail are skipped, then
+the middle is diffed by the linear space variant of Myers' algorithm,
+which runs in ``O((N + M) * D)`` where ``D`` is the number of changed lines,
+instead of the quadratic ``SequenceMatcher`` of difflib.
+
+When the search for a sub range reaches ``MAX_COST`` edits, the sub range
+is split at the furthest point reached, as GNU diff does: the diff may not
+be the shortest but the time stays bounded.
+"""
+from seahub.utils.htmldiff import HtmlDiff, context_diffs
+
+MAX_COST = 256
+
+
+def intern_lines(fromlines, tolines):
+    """Return the lines of both sides as lists of ints, equal lines having
+    the same int.
+    """
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in fromlines]
+    b = [ids.setdefault(line, len(ids)) for line in tolines]
+    return a, b
+
+
+def _middle_snake(a, alo, ahi, b, blo, bhi, max_cost):
+    """Return ``(x, y, u, v)``, the middle snake of the shortest edit path
+    from ``a[alo:ahi]`` to ``b[blo:bhi]``, ``a[x:u]`` being equal to
+    ``b[y:v]``.
+
+    If no path is found in ``max_cost`` steps, return a split point
+    ``(x, y, x, y)`` on the furthest reaching forward path.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = min((n + m + 1) // 2, max_cost)
+    offset = max_d + 1
+    vf = [0] * (2 * offset + 1)
+    vb = [0] * (2 * offset + 1)
+
+    for d in range(max_d + 1):
+        # forward paths
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and vf[offset + k - 1] < vf[offset + k + 1]):
+                x = vf[offset + k + 1]
+            else:
+                x = vf[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            vf[offset + k] = x
+
+            c = delta - k
+            if odd and -d < c < d and x + vb[offset + c] >= n:
+                return (alo + x0, blo + y0, alo + x, blo + y)
+
+        # backward paths, ``x`` counting from the ends
+        for c in range(-d, d + 1, 2):
+            if c == -d or (c != d and vb[offset + c - 1] < vb[offset + c + 1]):
+                x = vb[offset + c + 1]
+            else:
+                x = vb[offset + c - 1] + 1
+            y = x - c
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - 1 - x] == b[bhi - 1 - y]:
+                x += 1
+                y += 1
+            vb[offset + c] = x
+
+            k = delta - c
+            if not odd and -d <= k <= d and vf[offset + k] + x >= n:
+                return (ahi - x, bhi - y, ahi - x0, bhi - y0)
+
+    # too expensive, split on the furthest forward path
+    best_k, best = 0, -1
+    for k in range(-max_d, max_d + 1, 2):
+        x = vf[offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and x + y > best:
+            best_k, best = k, x + y
+    x = vf[offset + best_k]
+    return (alo + x, blo + x - best_k, alo + x, blo + x - best_k)
+
+
+def get_matching_blocks(a, b, max_cost=MAX_COST):
+    """Return ``(i, j, size)`` triples of equal lines of ``a`` and ``b``,
+    ordered and ended by ``(len(a), len(b), 0)`` as
+    ``SequenceMatcher.get_matching_blocks`` does.
+
+    Lines only in one side can't match, they are left out of the search,
+    so that a rewritten file costs no search at all.
+    """
+    a_lines, b_lines = set(a), set(b)
+    a_index = [i for i, line in enumerate(a) if line in b_lines]
+    b_index = [j for j, line in enumerate(b) if line in a_lines]
+
+    blocks = []
+    for i, j, size in _get_matching_blocks([a[i] for i in a_index],
+                                           [b[j] for j in b_index], max_cost):
+        # map back to a and b, splitting where left out lines were
+        start = 0
+        for k in range(1, size + 1):
+            if k == size or \
+                    a_index[i + k] != a_index[i + k - 1] + 1 or \
+                    b_index[j + k] != b_index[j + k - 1] + 1:
+                blocks.append((a_index[i + start], b_index[j + start], k - start))
+                start = k
+
+    blocks.append((len(a), len(b), 0))
+    return blocks
+
+
+def _get_matching_blocks(a, b, max_cost):
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+
+        # common head and tail
+        head = alo
+        while head < ahi and head - alo < bhi - blo and \
+                a[head] == b[blo + head - alo]:
+            head += 1
+        if head > alo:
+            blocks.append((alo, blo, head - alo))
+            blo += head - alo
+            alo = head
+
+        tail = 0
+        while tail < ahi - alo and tail < bhi - blo and \
+                a[ahi - 1 - tail] == b[bhi - 1 - tail]:
+            tail += 1
+        if tail:
+            blocks.append((ahi - tail, bhi - tail, tail))
+            ahi -= tail
+            bhi -= tail
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        x, y, u, v = _middle_snake(a, alo, ahi, b, blo, bhi, max_cost)
+        if u > x:
+            blocks.append((x, y, u - x))
+        if (x, y) != (alo, blo) or (u, v) != (ahi, bhi):
+            stack.append((u, ahi, v, bhi))
+            stack.append((alo, x, blo, y))
+
+    blocks.sort()
+    return blocks
+
+
+def get_opcodes(a, b, max_cost=MAX_COST):
+    """Return ``(tag, i1, i2, j1, j2)`` tuples describing how to turn ``a``
+    into ``b``, as ``SequenceMatcher.get_opcodes`` does.
+    """
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in get_matching_blocks(a, b, max_cost):
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        if size:
+            if opcodes and opcodes[-1][0] == 'equal':
+                tag, i1, i2, j1, j2 = opcodes.pop()
+                opcodes.append(('equal', i1, ai + size, j1, bj + size))
+            else:
+                opcodes.append(('equal', ai, ai + size, bj, bj + size))
+        i, j = ai + size, bj + size
+    return opcodes
+
+
+def _mark_line(text, key):
+    # same marks as _mdiff, which won't be noticed by an xml/html escaper
+    return '\0' + key + (text or ' ') + '\1'
+
+
+def _mark_changed_lines(fromtext, totext):
+    """Mark the changed middle of two lines, their common head and tail
+    being left unmarked.
+    """
+    size = min(len(fromtext), len(totext))
+    head = 0
+    while head < size and fromtext[head] == totext[head]:
+        head += 1
+    tail = 0
+    while tail < size - head and fromtext[-1 - tail] == totext[-1 - tail]:
+        tail += 1
+
+    if head == 0 and tail == 0:
+        return _mark_line(fromtext, '-'), _mark_line(totext, '+')
+
+    from_middle = fromtext[head:len(fromtext) - tail]
+    to_middle = totext[head:len(totext) - tail]
+    if from_middle and to_middle:
+        from_key = to_key = '^'
+    else:
+        from_key, to_key = '-', '+'
+
+    if from_middle:
+        fromtext = fromtext[:head] + _mark_line(from_middle, from_key) + \
+            fromtext[head + len(from_middle):]
+    if to_middle:
+        totext = totext[:head] + _mark_line(to_middle, to_key) + \
+            totext[head + len(to_middle):]
+    return fromtext, totext
+
+
+def gen_line_pairs(fromlines, tolines, opcodes):
+    """Yield ``((from_num, from_text), (to_num, to_text), found_diff)``
+    pairs with change marks, as the inner iterator of ``_mdiff`` does.
+    """
+    blank = ('', '\n')
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                yield (i + 1, fromlines[i]), (j + 1, tolines[j]), False
+            continue
+
+        for offset in range(max(i2 - i1, j2 - j1)):
+            i, j = i1 + offset, j1 + offset
+            if i < i2 and j < j2:
+                fromtext, totext = _mark_changed_lines(fromlines[i], tolines[j])
+                yield (i + 1, fromtext), (j + 1, totext), True
+            elif i < i2:
+                yield (i + 1, _mark_line(fromlines[i], '-')), blank, True
+            else:
+                yield blank, (j + 1, _mark_line(tolines[j], '+')), True
+
+
+class LineHtmlDiff(HtmlDiff):
+    """``HtmlDiff`` using the line diff of this module, or ``opcodes`` if
+    already computed.
+    """
+
+    def __init__(self, opcodes=None, max_cost=MAX_COST, **kwargs):
+        super(LineHtmlDiff, self).__init__(**kwargs)
+        self._opcodes = opcodes
+        self._max_cost = max_cost
+
+    def _mdiff(self, fromlines, tolines, context=None):
+        opcodes = self._opcodes
+        if opcodes is None:
+            opcodes = get_opcodes(*intern_lines(fromlines, tolines),
+                                  max_cost=self._max_cost)
+        return context_diffs(gen_line_pairs(fromlines, tolines, opcodes),
+                             context)
+
+
+def count_changes(opcodes):
+    """Return the number of removed and added lines of ``opcodes``.
+    """
+    removed = added = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'equal':
+            removed += i2 - i1
+            added += j2 - j1
+    return removed, added
+
+
+def make_diff_table(fromlines, tolines, max_changed_lines=None, numlines=5):
+    """Return ``(table, removed, added)``, the rows of the side by side
+    table of changes with ``numlines`` lines of context, and the number of
+    removed and added lines.
+
+    ``table`` is ``None`` if more than ``max_changed_lines`` lines are
+    changed, such a table being too large to be of any use.
+    """
+    opcodes = get_opcodes(*intern_lines(fromlines, tolines))
+    removed, added = count_changes(opcodes)
+    if max_changed_lines is not None and removed + added > max_changed_lines:
+        return None, removed, added
+
+    table = LineHtmlDiff(opcodes).make_table(fromlines, tolines, True, numlines)
+    return table, removed, added
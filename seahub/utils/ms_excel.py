@@ -1,34 +1,111 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
+import csv
 import logging
+import tempfile
+from itertools import chain, islice
+
 import openpyxl
+from django.http import FileResponse, StreamingHttpResponse
 
 logger = logging.getLogger(__name__)
 
+XLS_CONTENT_TYPE = 'application/ms-excel'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+
+# keep the xlsx file in memory up to this size before moving it to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
 def write_xls(sheet_name, head, data_list):
     """write listed data into excel
+
+    ``data_list`` can be any iterable of rows, e.g. a generator. Rows are
+    written to a write-only worksheet one by one, which keeps memory flat
+    whatever the number of rows. The returned workbook can only be saved
+    once. Return ``None`` if failed to create the workbook or to get the
+    rows.
     """
 
     try:
-        wb = openpyxl.Workbook()
-        ws = wb.active
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_name)
     except Exception as e:
         logger.error(e)
         return None
 
-    ws.title = sheet_name
-
-    row_num = 0
-
     # write table head
-    for col_num in range(len(head)):
-        c = ws.cell(row = row_num + 1, column = col_num + 1)
-        c.value = head[col_num]
+    ws.append(head)
 
     # write table data
-    for row in data_list:
-        row_num += 1
-        for col_num in range(len(row)):
-            c = ws.cell(row = row_num + 1, column = col_num + 1)
-            c.value = row[col_num]
+    try:
+        for row in data_list:
+            ws.append(row)
+    except Exception as e:
+        logger.error(e)
+        # close the temp file of the rows written so far
+        ws.close()
+        return None
 
     return wb
+
+
+def xls_response(wb, filename):
+    """Return a response streaming the saved ``wb`` as attachment.
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    wb.save(f)
+    f.seek(0)
+    return FileResponse(f, as_attachment=True, filename=filename,
+                        content_type=XLS_CONTENT_TYPE)
+
+
+class _Echo(object):
+    def write(self, value):
+        return value
+
+
+def write_csv(head, data_list):
+    """Return a generator of csv lines of ``head`` and ``data_list``.
+    """
+    writer = csv.writer(_Echo())
+    # BOM, so that excel detects utf-8
+    yield '\ufeff'
+    yield writer.writerow(head)
+    for row in data_list:
+        yield writer.writerow(row)
+
+
+def csv_response(head, data_list, filename):
+    """Return a response streaming ``data_list`` as csv while the rows are
+    produced.
+
+    The first row is got before the response is returned, return ``None``
+    if that fails.
+    """
+    try:
+        rows = iter(data_list)
+        first_rows = list(islice(rows, 1))
+    except Exception as e:
+        logger.error(e)
+        return None
+
+    response = StreamingHttpResponse(write_csv(head, chain(first_rows, rows)),
+                                     content_type=CSV_CONTENT_TYPE)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def export_response(request, sheet_name, head, data_list, filename):
+    """Export ``data_list`` as xlsx, or as csv if ``format=csv`` is in
+    query string.
+
+    ``filename`` is without extension. Return ``None`` if failed to create
+    the workbook or to get the rows.
+    """
+    if request.GET.get('format', '') == 'csv':
+        return csv_response(head, data_list, filename + '.csv')
+
+    wb = write_xls(sheet_name, head, data_list)
+    if not wb:
+        return None
+    return xls_response(wb, filename + '.xlsx')
@@ -0,0 +1,163 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Decoded content of textual files, for previews and diffs.
+
+The content is read from fileserver by chunks and decoded while read, with
+the encoding detected on the first ``ENCODING_SAMPLE_SIZE`` bytes instead of
+the whole file. Reading stops past ``FILE_PREVIEW_MAX_SIZE``.
+
+Decoded contents are cached by file object id and encoding: an object id is
+the hash of the content, so a cached content never goes stale and needs no
+invalidation, and a popular file is read and decoded once for all seahub
+workers sharing the cache.
+"""
+import codecs
+import logging
+import urllib.request
+import urllib.error
+
+import chardet
+from django.core.cache import cache
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import gettext as _
+
+from seaserv import seafile_api
+
+from seahub.settings import FILE_ENCODING_TRY_LIST, FILE_PREVIEW_MAX_SIZE
+from seahub.utils import gen_inner_file_get_url, normalize_cache_key
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+PREVIEW_CONTENT_CACHE_PREFIX = 'PREVIEW_CONTENT_'
+PREVIEW_CONTENT_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# larger files are not cached, memcached refuses items larger than 1MB
+PREVIEW_CONTENT_CACHE_MAX_SIZE = 512 * 1024
+
+
+def detect_encoding(sample, is_whole=False):
+    """Return the encoding of ``sample``, the beginning of a file unless
+    ``is_whole``, ``None`` if unknown.
+    """
+    for enc in FILE_ENCODING_TRY_LIST:
+        try:
+            # an incremental decoder accepts a sample cut inside a character
+            codecs.getincrementaldecoder(enc)().decode(sample, is_whole)
+            return enc
+        except UnicodeDecodeError:
+            continue
+
+    return chardet.detect(sample)['encoding']
+
+
+def _decode(content, file_enc):
+    """Decode the whole ``content`` as before streaming, return
+    ``(err, content, encoding)``.
+    """
+    encoding = detect_encoding(content, is_whole=True) \
+        if file_enc == 'auto' else file_enc
+    if not encoding:
+        return _('Unknown file encoding'), '', ''
+
+    try:
+        return '', content.decode(encoding), encoding
+    except (UnicodeDecodeError, LookupError):
+        if file_enc != 'auto':
+            return _('The encoding you chose is not proper.'), '', encoding
+        return _('Unknown file encoding'), '', ''
+
+
+def read_file_content(raw_path, file_enc='auto', max_size=FILE_PREVIEW_MAX_SIZE):
+    """Read a textual file from fileserver, return ``(err, content,
+    encoding, size)``.
+    """
+    try:
+        file_response = urllib.request.urlopen(raw_path)
+    except urllib.error.HTTPError as e:
+        logger.error(e)
+        return _('HTTPError: failed to open file online'), '', None, 0
+    except urllib.error.URLError as e:
+        logger.error(e)
+        return _('URLError: failed to open file online'), '', None, 0
+
+    encoding = None if file_enc == 'auto' else file_enc
+    decoder = None
+    failed = False
+    chunks = []
+    parts = []
+    size = 0
+    with file_response:
+        while True:
+            chunk = file_response.read(READ_CHUNK_SIZE)
+            size += len(chunk)
+            if size > max_size:
+                err = _('File size surpasses %s, can not be opened online.') % \
+                    filesizeformat(max_size)
+                return err, '', None, size
+
+            # raw content is kept in case the sample was misleading
+            chunks.append(chunk)
+            if failed:
+                if not chunk:
+                    break
+                continue
+
+            if decoder is None:
+                if chunk and size < ENCODING_SAMPLE_SIZE:
+                    continue
+                sample = b''.join(chunks)
+                encoding = encoding or detect_encoding(sample, is_whole=not chunk)
+                try:
+                    decoder = codecs.getincrementaldecoder(encoding)()
+                except (LookupError, TypeError):
+                    failed = True
+                    continue
+                chunk = sample
+
+            try:
+                parts.append(decoder.decode(chunk, not chunk))
+            except UnicodeDecodeError:
+                failed = True
+                continue
+
+            if not chunk:
+                break
+
+    if failed:
+        err, content, encoding = _decode(b''.join(chunks), file_enc)
+        return err, content, encoding, size
+
+    return '', ''.join(parts), encoding, size
+
+
+def get_preview_content(obj_id, file_enc='auto', raw_path=None,
+                        repo_id=None, file_name=None, username=''):
+    """Return ``(err, content, encoding)`` of a textual file, from cache if
+    there.
+
+    The file is read from ``raw_path``, or from a fileserver url of
+    ``repo_id`` and ``file_name`` if not given. Permission must be checked
+    before.
+    """
+    cache_key = None
+    if obj_id:
+        cache_key = normalize_cache_key('%s_%s' % (obj_id, file_enc),
+                                        PREVIEW_CONTENT_CACHE_PREFIX)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            content, encoding = cached
+            return '', content, encoding
+
+    if not raw_path:
+        token = seafile_api.get_fileserver_access_token(
+            repo_id, obj_id, 'view', username, use_onetime=False)
+        if not token:
+            return _('Unable to view file'), '', None
+        raw_path = gen_inner_file_get_url(token, file_name)
+
+    err, content, encoding, size = read_file_content(raw_path, file_enc)
+    if cache_key and not err and size <= PREVIEW_CONTENT_CACHE_MAX_SIZE:
+        cache.set(cache_key, (content, encoding), PREVIEW_CONTENT_CACHE_TIMEOUT)
+
+    return err, content, encoding
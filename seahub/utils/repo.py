@@ -1,5 +1,6 @@
 # Copyright (c) 2012-2016 Seafile Ltd.
 # -*- coding: utf-8 -*-
+import os
 import stat
 import logging
 from collections import namedtuple
@@ -13,6 +14,7 @@ from seahub.constants import (
     REPO_STATUS_NORMAL, REPO_STATUS_READ_ONLY, CUSTOM_PERMISSION_PREFIX
 )
 from seahub.utils import EMPTY_SHA1, is_org_context, is_pro_version
+from seahub.utils.repo_cache import get_repo_meta
 from seahub.api2.utils import to_python_boolean
 from seahub.base.models import RepoSecretKey
 from seahub.base.templatetags.seahub_tags import email2nickname
@@ -123,14 +125,15 @@ def get_sub_repo_abbrev_origin_path(repo_name, origin_path):
         return repo_name + origin_path
 
 def get_repo_owner(request, repo_id):
+    repo_meta = get_repo_meta(repo_id)
     if is_org_context(request):
-        repo_owner = seafile_api.get_org_repo_owner(repo_id)
+        repo_owner = repo_meta.org_owner
     else:
         # for admin panel
         # administrator may get org repo's owner
-        repo_owner = seafile_api.get_repo_owner(repo_id)
+        repo_owner = repo_meta.owner
         if not repo_owner:
-            repo_owner = seafile_api.get_org_repo_owner(repo_id)
+            repo_owner = repo_meta.org_owner
 
     return repo_owner
 
@@ -263,6 +266,96 @@ def get_sub_folder_permission_by_dir(request, repo_id, parent_dir):
 
     return folder_permission_dict
 
+class BatchPrecheck(object):
+    """ Check locked files and sub folder permissions of the dirents of a
+    batch copy/move/delete.
+
+    Each parent folder is listed once, and its locked files and sub folder
+    permissions are kept in dicts, whatever the number of dirents checked.
+
+    `check` returns a list of failures, one per failed dirent:
+
+        {
+            'parent_dir': '/a',
+            'name': 'b.md',
+            'error': 'locked',  # or 'folder_permission_denied'
+        }
+    """
+
+    LOCKED = 'locked'
+    FOLDER_PERMISSION_DENIED = 'folder_permission_denied'
+
+    def __init__(self, request, repo_id):
+        self.username = request.user.username
+        self.repo_id = repo_id
+        self._dirs = {}
+
+    def _get_dir_info(self, parent_dir):
+        if parent_dir not in self._dirs:
+            dir_id = seafile_api.get_dir_id_by_path(self.repo_id, parent_dir)
+            dirents = seafile_api.list_dir_with_perm(self.repo_id,
+                    parent_dir, dir_id, self.username, -1, -1)
+
+            locked_files = {}
+            folder_permission_dict = {}
+            for dirent in dirents or []:
+                if dirent.is_locked:
+                    locked_files[dirent.obj_name] = dirent.lock_owner
+                if stat.S_ISDIR(dirent.mode):
+                    folder_permission_dict[dirent.obj_name] = dirent.permission
+
+            self._dirs[parent_dir] = (locked_files, folder_permission_dict)
+
+        return self._dirs[parent_dir]
+
+    def get_locked_files(self, parent_dir):
+        return self._get_dir_info(parent_dir)[0]
+
+    def get_sub_folder_permissions(self, parent_dir):
+        return self._get_dir_info(parent_dir)[1]
+
+    def check(self, parent_dir, dirents, check_lock=True, can_change_folder=None):
+        """ Return failures of `dirents` in `parent_dir`, locked ones first.
+
+        `can_change_folder` takes the permission of a sub folder and tells
+        whether the operation is allowed on it, folders are not checked if
+        not given.
+        """
+        locked_files, folder_permission_dict = self._get_dir_info(parent_dir)
+
+        failures = []
+        if check_lock:
+            for dirent in dirents:
+                # file is locked and lock owner is not current user
+                if dirent in locked_files and \
+                        locked_files[dirent] != self.username:
+                    failures.append({'parent_dir': parent_dir, 'name': dirent,
+                                     'error': self.LOCKED})
+
+        if can_change_folder is not None:
+            for dirent in dirents:
+                permission = folder_permission_dict.get(dirent)
+                if permission is not None and not can_change_folder(permission):
+                    failures.append({'parent_dir': parent_dir, 'name': dirent,
+                                     'error': self.FOLDER_PERMISSION_DENIED})
+
+        return failures
+
+    def check_paths(self, paths, check_lock=True, can_change_folder=None):
+        """ Like `check`, for paths which may be in different folders.
+        """
+        parent_dir_dirents_map = {}
+        for path in paths:
+            parent_dir = os.path.dirname(path)
+            parent_dir_dirents_map.setdefault(parent_dir, []).append(
+                os.path.basename(path))
+
+        failures = []
+        for parent_dir, dirents in parent_dir_dirents_map.items():
+            failures.extend(self.check(parent_dir, dirents, check_lock,
+                                       can_change_folder))
+        return failures
+
 def get_shared_groups_by_repo(repo_id, org_id=None):
     if not org_id or org_id < 0:
         group_ids = seafile_api.get_shared_group_ids_by_repo(
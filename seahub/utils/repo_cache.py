@@ -0,0 +1,176 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Cache of repo metadata: repo object, owner, virtual origin and status.
+
+A request often gets the same repo, its owner and its status several times,
+e.g. once in the view and once more in every ``check_folder_permission``.
+``get_repo_meta(repo_id)`` returns a ``RepoMeta`` whose items are fetched
+from seafile when first used and then kept for the current request, set up
+by ``RepoCacheMiddleware``.
+
+Owner and status decide permissions, so they are never kept longer than a
+request. The repo object is also kept for ``REPO_META_CACHE_TIMEOUT``
+seconds in the process, so that the next requests served by this process
+get it too. Process level entries are dropped when a repo is deleted,
+transferred, renamed or restored in this process, other processes see the
+change after at most ``REPO_META_CACHE_TIMEOUT`` seconds.
+
+The numbers of rpcs made and saved in a request are logged at debug level.
+"""
+import threading
+import time
+import contextvars
+from collections import OrderedDict
+
+from django.dispatch import receiver
+
+from seaserv import seafile_api
+
+from seahub.settings import REPO_META_CACHE_TIMEOUT
+from seahub.signals import repo_deleted, repo_transfer, repo_renamed, \
+    repo_restored
+
+REPO_META_CACHE_MAX_ENTRIES = 10000
+
+_MISSING = object()
+
+# RepoMeta of repos used in the current request, and rpc counters
+_request_cache = contextvars.ContextVar('repo_meta_request_cache', default=None)
+
+# repo objects shared by the requests of this process
+_process_cache = OrderedDict()
+_process_cache_lock = threading.Lock()
+
+
+class RepoMeta(object):
+    """Metadata of a repo, each item is fetched once, when first used.
+    """
+
+    def __init__(self, repo_id):
+        self.repo_id = repo_id
+        self._values = {}
+
+    def _get(self, name, func, *args):
+        value = self._values.get(name, _MISSING)
+        stats = _request_cache.get()
+        if value is not _MISSING:
+            if stats is not None:
+                stats['rpc_saved'] += 1
+            return value
+
+        value = func(*args)
+        if stats is not None:
+            stats['rpc_calls'] += 1
+        self._values[name] = value
+        return value
+
+    @property
+    def repo(self):
+        if 'repo' not in self._values and REPO_META_CACHE_TIMEOUT > 0:
+            repo = _get_from_process_cache(self.repo_id)
+            if repo is not None:
+                self._values['repo'] = repo
+
+        fetched = 'repo' not in self._values
+        repo = self._get('repo', seafile_api.get_repo, self.repo_id)
+        # a missing repo is not kept, it may be created by another process
+        if fetched and repo and REPO_META_CACHE_TIMEOUT > 0:
+            _set_to_process_cache(self.repo_id, repo)
+        return repo
+
+    @property
+    def owner(self):
+        return self._get('owner', seafile_api.get_repo_owner, self.repo_id)
+
+    @property
+    def org_owner(self):
+        return self._get('org_owner', seafile_api.get_org_repo_owner, self.repo_id)
+
+    @property
+    def status(self):
+        return self._get('status', seafile_api.get_repo_status, self.repo_id)
+
+    @property
+    def origin(self):
+        """Return ``(origin_repo_id, origin_path)`` of a virtual repo,
+        ``(repo_id, None)`` otherwise.
+        """
+        repo = self.repo
+        if repo and repo.is_virtual:
+            return repo.origin_repo_id, repo.origin_path
+        return self.repo_id, None
+
+
+def _get_from_process_cache(repo_id):
+    with _process_cache_lock:
+        entry = _process_cache.get(repo_id)
+        if entry is None:
+            return None
+
+        expire_at, repo = entry
+        if expire_at <= time.monotonic():
+            del _process_cache[repo_id]
+            return None
+
+        _process_cache.move_to_end(repo_id)
+        return repo
+
+
+def _set_to_process_cache(repo_id, repo):
+    with _process_cache_lock:
+        _process_cache[repo_id] = (time.monotonic() + REPO_META_CACHE_TIMEOUT, repo)
+        _process_cache.move_to_end(repo_id)
+        while len(_process_cache) > REPO_META_CACHE_MAX_ENTRIES:
+            _process_cache.popitem(last=False)
+
+
+def get_repo_meta(repo_id):
+    """Return the ``RepoMeta`` of ``repo_id`` for the current request, its
+    repo object is shared for a short time by the other requests of this
+    process.
+    """
+    stats = _request_cache.get()
+    if stats is not None:
+        meta = stats['repos'].get(repo_id)
+        if meta is not None:
+            return meta
+
+    meta = RepoMeta(repo_id)
+    if stats is not None:
+        stats['repos'][repo_id] = meta
+    return meta
+
+
+def invalidate_repo_meta(repo_id):
+    """Drop the cached metadata of ``repo_id``, of this process and of the
+    current request.
+    """
+    with _process_cache_lock:
+        _process_cache.pop(repo_id, None)
+
+    stats = _request_cache.get()
+    if stats is not None:
+        stats['repos'].pop(repo_id, None)
+
+
+def start_request_cache():
+    return _request_cache.set({'repos': {}, 'rpc_calls': 0, 'rpc_saved': 0})
+
+
+def end_request_cache(token):
+    """Reset the request cache, return its ``(rpc_calls, rpc_saved)``.
+    """
+    stats = _request_cache.get()
+    _request_cache.reset(token)
+    if stats is None:
+        return 0, 0
+    return stats['rpc_calls'], stats['rpc_saved']
+
+
+@receiver(repo_deleted)
+@receiver(repo_transfer)
+@receiver(repo_renamed)
+@receiver(repo_restored)
+def repo_changed_cb(sender, **kwargs):
+    repo_id = kwargs.get('repo_id')
+    if repo_id:
+        invalidate_repo_meta(repo_id)
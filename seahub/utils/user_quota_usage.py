@@ -0,0 +1,86 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""Space usage of users, kept sorted in the ``user_quota_usage`` table so
+that the admin user list can be sorted by space used one page at a time.
+
+Seafile lists the usage of all users at once only, so the table is
+refreshed as a whole, writing the rows that changed: by the
+``refresh_user_quota_usage`` command, or when the list is requested and the
+last refresh is older than ``USER_QUOTA_USAGE_REFRESH_INTERVAL`` seconds. In
+that case the current table is listed while it is refreshed in the
+background. Status and role of users are read from ccnet when listing, so
+they are always up to date.
+"""
+import time
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import connection
+
+from seaserv import seafile_api
+
+from seahub.base.models import UserQuotaUsage
+from seahub.settings import USER_QUOTA_USAGE_REFRESH_INTERVAL
+from seahub.utils.ccnet_db import CcnetDB
+
+logger = logging.getLogger(__name__)
+
+USER_QUOTA_USAGE_REFRESHED_AT_KEY = 'USER_QUOTA_USAGE_REFRESHED_AT'
+USER_QUOTA_USAGE_LOCK_KEY = 'USER_QUOTA_USAGE_REFRESHING'
+USER_QUOTA_USAGE_LOCK_TIMEOUT = 10 * 60
+
+
+def refresh_user_quota_usage():
+    """Refresh space usage of all users, usage is -1 for users who never
+    used any space. Return number of rows created, updated and deleted.
+    """
+    start = time.monotonic()
+    usage_map = {}
+    for user in seafile_api.list_user_quota_usage():
+        usage_map.setdefault(user.user, user.usage)
+
+    usages = {email: usage_map.get(email, -1)
+              for email in CcnetDB().list_user_emails()}
+    result = UserQuotaUsage.objects.update_usages(usages)
+    cache.set(USER_QUOTA_USAGE_REFRESHED_AT_KEY, time.time(), None)
+
+    logger.debug('Space usage of %d users refreshed in %.2fs, '
+                 '%d created, %d updated, %d deleted.',
+                 len(usages), time.monotonic() - start, *result)
+    return result
+
+
+def _refresh_in_background():
+    try:
+        refresh_user_quota_usage()
+    except Exception as e:
+        logger.error(e)
+    finally:
+        cache.delete(USER_QUOTA_USAGE_LOCK_KEY)
+        connection.close()
+
+
+def _refresh_if_stale():
+    refreshed_at = cache.get(USER_QUOTA_USAGE_REFRESHED_AT_KEY)
+    if refreshed_at is not None and USER_QUOTA_USAGE_REFRESH_INTERVAL > 0 and \
+            time.time() - refreshed_at < USER_QUOTA_USAGE_REFRESH_INTERVAL:
+        return
+
+    if USER_QUOTA_USAGE_REFRESH_INTERVAL <= 0 or \
+            not UserQuotaUsage.objects.exists():
+        refresh_user_quota_usage()
+        return
+
+    # only one process refreshes the table
+    if cache.add(USER_QUOTA_USAGE_LOCK_KEY, 1, USER_QUOTA_USAGE_LOCK_TIMEOUT):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+
+
+def list_users_order_by_quota_usage(direction, start, limit, is_active=None,
+                                    role=None, emails=None):
+    """List users sorted by space usage, see
+    ``UserQuotaUsageManager.list_users``.
+    """
+    _refresh_if_stale()
+    return UserQuotaUsage.objects.list_users(direction, start, limit,
+                                             is_active, role, emails)
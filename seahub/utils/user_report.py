@@ -0,0 +1,344 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""User report, shared by the user exports of system admin and the
+``export_users`` and ``export_user_storage_report`` commands.
+
+Users are enriched by chunks: profiles and last logins are fetched with one
+query per chunk and joined through dicts, space usage is listed once for all
+users (once per organization for org users), quotas set for users are read
+with one query per chunk.
+
+An export can be run in background by the ``export_users`` command, which is
+spawned as a separate process. Its progress is kept in cache and its file is
+saved in ``USER_EXPORT_ROOT``, so that any seahub worker can report and
+download it. Only one export runs at a time on the site.
+"""
+import os
+import re
+import sys
+import time
+import uuid
+import logging
+import subprocess
+
+from django.core.cache import cache
+from django.utils import translation
+from django.utils.translation import gettext as _
+
+from seaserv import seafile_api, ccnet_api
+
+from seahub.base.models import UserLastLogin
+from seahub.base.templatetags.seahub_tags import tsstr_sec
+from seahub.constants import GUEST_USER, DEFAULT_USER
+from seahub.profile.models import Profile
+from seahub.settings import USER_EXPORT_ROOT, PROJECT_ROOT
+from seahub.utils.ccnet_db import CcnetDB
+from seahub.utils.db_api import SeafileDB
+from seahub.utils.file_size import get_file_size_unit, byte_to_mb
+from seahub.utils.ms_excel import write_xls
+
+logger = logging.getLogger(__name__)
+
+REPORT_CHUNK_SIZE = 500
+
+USER_EXPORT_CACHE_PREFIX = 'USER_EXPORT_TASK_'
+USER_EXPORT_RUNNING_CACHE_KEY = 'USER_EXPORT_RUNNING_TASK'
+USER_EXPORT_TIMEOUT = 24 * 60 * 60
+# a running export updates its status after each chunk of users, it is
+# reported as failed when not updated for this long
+USER_EXPORT_STALL_TIMEOUT = 10 * 60
+USER_EXPORT_FILENAME = 'users.xlsx'
+
+_export_processes = []
+
+
+def get_all_users():
+    return ccnet_api.get_emailusers('DB', -1, -1) + \
+        ccnet_api.get_emailusers('LDAPImport', -1, -1)
+
+
+class _UsageMap(object):
+    """Space usage of users, listed once for users not in organization and
+    once per organization.
+    """
+
+    def __init__(self):
+        self._user_usage = None
+        self._org_usage = {}
+
+    def _list(self, users_with_usage):
+        usage = {}
+        for user in users_with_usage:
+            usage.setdefault(user.user, user.usage)
+        return usage
+
+    def get(self, email, org_id=None):
+        if org_id:
+            if org_id not in self._org_usage:
+                self._org_usage[org_id] = self._list(
+                    seafile_api.list_org_user_quota_usage(org_id))
+            return self._org_usage[org_id].get(email, 0)
+
+        if self._user_usage is None:
+            self._user_usage = self._list(seafile_api.list_user_quota_usage())
+        return self._user_usage.get(email, 0)
+
+
+def _get_users_org_id_map(emails):
+    try:
+        return CcnetDB().get_users_org_id_map(emails)
+    except Exception as e:
+        logger.warning('Failed to list orgs of users from database: %s' % e)
+
+    org_id_map = {}
+    for email in emails:
+        orgs = ccnet_api.get_orgs_by_user(email)
+        if orgs:
+            org_id_map[email] = orgs[0].org_id
+    return org_id_map
+
+
+def _get_quota(email, org_id):
+    try:
+        if org_id:
+            return seafile_api.get_org_user_quota(org_id, email)
+        return seafile_api.get_user_quota(email)
+    except Exception as e:
+        logger.error(e)
+        return -1
+
+
+class _QuotaMap(object):
+    """Space quota of users.
+
+    Quotas set for users are read from database by one query per chunk. Users
+    without a quota set get their role quota or the default quota (the org
+    quota for org users) from seafile, which is fetched once per role and
+    organization. Without access to database, quota is fetched per user.
+    """
+
+    def __init__(self):
+        self._user_quota = None
+        self._fallback_quota = {}
+
+    def load(self, emails):
+        try:
+            self._user_quota = SeafileDB().get_users_quota_map(emails)
+        except Exception as e:
+            logger.warning('Failed to list quotas of users from database: %s' % e)
+            self._user_quota = None
+
+    def get(self, user, org_id=None):
+        if self._user_quota is None:
+            return _get_quota(user.email, org_id)
+
+        quota = self._user_quota.get((org_id, user.email))
+        if quota:
+            return quota
+
+        key = (org_id, user.role)
+        if key not in self._fallback_quota:
+            self._fallback_quota[key] = _get_quota(user.email, org_id)
+        return self._fallback_quota[key]
+
+
+def iter_user_report(users, progress_callback=None):
+    """Populate ``users`` with name, contact email, login id, last login,
+    org id, space usage and space quota, yield them one by one.
+
+    ``progress_callback(done, total)`` is called after each chunk.
+    """
+    usage_map = _UsageMap()
+    quota_map = _QuotaMap()
+    total = len(users)
+
+    for start in range(0, total, REPORT_CHUNK_SIZE):
+        chunk = users[start:start + REPORT_CHUNK_SIZE]
+        emails = [user.email for user in chunk]
+
+        profiles = {p.user: p for p in Profile.objects.filter(user__in=emails)}
+        last_logins = {l.username: l.last_login for l in
+                       UserLastLogin.objects.filter(username__in=emails)}
+        org_id_map = _get_users_org_id_map(emails)
+        quota_map.load(emails)
+
+        for user in chunk:
+            email = user.email
+            profile = profiles.get(email)
+            user.name = profile.nickname if profile and profile.nickname else ''
+            user.contact_email = profile.contact_email if profile and profile.contact_email else ''
+            user.login_id = profile.login_id if profile and profile.login_id else ''
+            user.last_login = last_logins.get(email)
+            user.org_id = org_id_map.get(email)
+
+            user.space_quota = quota_map.get(user, user.org_id)
+            try:
+                user.space_usage = usage_map.get(email, user.org_id)
+            except Exception as e:
+                logger.error(e)
+                user.space_usage = -1
+
+            yield user
+
+        if progress_callback:
+            progress_callback(min(start + REPORT_CHUNK_SIZE, total), total)
+
+
+def get_user_export_head(is_pro, with_login_id=True):
+    head = [_("Email"), _("Name"), _("Contact Email")]
+    if with_login_id:
+        head.append(_("Login ID"))
+    head.append(_("Status"))
+    if is_pro:
+        head.append(_("Role"))
+    head += [_("Space Usage") + "(MB)", _("Space Quota") + "(MB)",
+             _("Create At"), _("Last Login"), _("Admin"), _("LDAP(imported)")]
+    return head
+
+
+def _space_to_mb(space):
+    if space <= 0:
+        return ''
+
+    try:
+        return round(float(space) / get_file_size_unit('MB'), 2)
+    except Exception as e:
+        logger.error(e)
+        return '--'
+
+
+def _get_role_name(user):
+    if not user.role or user.role == DEFAULT_USER:
+        return _('Default')
+    if user.role == GUEST_USER:
+        return _('Guest')
+    return user.role
+
+
+def gen_user_export_rows(report, is_pro, with_login_id=True):
+    for user in report:
+        row = [user.email, user.name, user.contact_email]
+        if with_login_id:
+            row.append(user.login_id)
+        row.append(_('Active') if user.is_active else _('Inactive'))
+        if is_pro:
+            row.append(_get_role_name(user))
+        row += [
+            _space_to_mb(user.space_usage),
+            _space_to_mb(user.space_quota),
+            tsstr_sec(user.ctime) if user.ctime else '',
+            user.last_login.strftime("%Y-%m-%d %H:%M:%S") if user.last_login else '',
+            _('Yes') if user.is_staff else '',
+            _('Yes') if user.source == 'LDAPImport' else '',
+        ]
+        yield row
+
+
+def get_user_storage_head():
+    return [_("Email"), _("Name"), _("Contact Email"),
+            _("Space Usage") + "(MB)", _("Space Quota") + "(MB)"]
+
+
+def gen_user_storage_rows(report):
+    for user in report:
+        # same fallbacks as email2nickname and email2contact_email
+        contact_email = user.contact_email or user.email
+        name = user.name.strip() or contact_email.split('@')[0]
+        yield [user.email, name, contact_email,
+               byte_to_mb(user.space_usage), byte_to_mb(user.space_quota)]
+
+
+# background export
+
+def is_valid_user_export_task_id(task_id):
+    return bool(re.match(r'^[0-9a-f]{32}$', task_id or ''))
+
+
+def get_user_export_file(task_id):
+    return os.path.join(USER_EXPORT_ROOT, task_id, USER_EXPORT_FILENAME)
+
+
+def get_user_export_status(task_id):
+    status = cache.get(USER_EXPORT_CACHE_PREFIX + task_id)
+    if status and not status['is_finished'] and \
+            time.time() - status['updated_at'] > USER_EXPORT_STALL_TIMEOUT:
+        # the export process died without recording its result
+        status.update(is_finished=True, failed=True)
+    return status
+
+
+def _set_user_export_status(task_id, **status):
+    status['updated_at'] = time.time()
+    cache.set(USER_EXPORT_CACHE_PREFIX + task_id, status, USER_EXPORT_TIMEOUT)
+    if status['is_finished']:
+        cache.delete(USER_EXPORT_RUNNING_CACHE_KEY)
+    else:
+        cache.set(USER_EXPORT_RUNNING_CACHE_KEY, task_id,
+                  USER_EXPORT_STALL_TIMEOUT)
+
+
+def run_user_export_task(task_id, is_pro):
+    """Export all users to excel, called by the ``export_users`` command.
+    """
+    def progress_callback(done, total):
+        _set_user_export_status(task_id, is_finished=False, failed=False,
+                                done=done, total=total)
+
+    try:
+        users = get_all_users()
+        progress_callback(0, len(users))
+
+        report = iter_user_report(users, progress_callback)
+        wb = write_xls('users', get_user_export_head(is_pro),
+                       gen_user_export_rows(report, is_pro))
+        if not wb:
+            raise ValueError('Failed to write users to excel.')
+
+        export_file = get_user_export_file(task_id)
+        os.makedirs(os.path.dirname(export_file), exist_ok=True)
+        wb.save(export_file)
+    except Exception as e:
+        logger.exception(e)
+        _set_user_export_status(task_id, is_finished=True, failed=True,
+                                done=0, total=0)
+        return False
+
+    _set_user_export_status(task_id, is_finished=True, failed=False,
+                            done=len(users), total=len(users))
+    return True
+
+
+def _reap_export_processes():
+    for process in _export_processes[:]:
+        if process.poll() is not None:
+            _export_processes.remove(process)
+
+
+def start_user_export_task():
+    """Spawn the ``export_users`` command to export all users to excel in
+    background, return the task id, or None if an export is running.
+    """
+    _reap_export_processes()
+
+    task_id = uuid.uuid4().hex
+    if not cache.add(USER_EXPORT_RUNNING_CACHE_KEY, task_id,
+                     USER_EXPORT_STALL_TIMEOUT):
+        return None
+
+    _set_user_export_status(task_id, is_finished=False, failed=False,
+                            done=0, total=0)
+
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'manage.py'),
+               'export_users', '--task-id', task_id,
+               '--language', translation.get_language()]
+    try:
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL,
+                                   close_fds=True, start_new_session=True)
+    except Exception:
+        _set_user_export_status(task_id, is_finished=True, failed=True,
+                                done=0, total=0)
+        raise
+
+    _export_processes.append(process)
+    return task_id
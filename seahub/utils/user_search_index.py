@@ -0,0 +1,314 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""In memory index of users, for the search user endpoint.
+
+Users are indexed by email, nickname, contact email, login id and the
+pinyin of nickname. A query is matched against the beginning of these
+fields and of their words, case insensitively: "carl", "smi" and
+"carl sm" all find "Carl Smith". Chinese words are also matched from
+any of their characters.
+
+Each process keeps an index of all active users, and an index per org.
+They are built from the ccnet and profile tables when first used, and
+rebuilt in a background thread every ``USER_SEARCH_INDEX_TIMEOUT``
+seconds. When a profile is saved or a user is registered or deleted, the
+indexes of the current process are updated at once. Other processes see
+the change at their next rebuild.
+
+The index may be stale, e.g. a user deactivated or moved out of an org is
+still found until the next rebuild. ``search_users`` checks the found users
+in ccnet before returning them.
+"""
+import re
+import time
+import logging
+import threading
+from bisect import bisect_left, insort
+
+from django.db import connection
+from django.dispatch import receiver
+from django.db.models.signals import post_save
+from registration.signals import user_registered, user_deleted
+
+from seahub.base.templatetags.seahub_tags import char2pinyin
+from seahub.profile.models import Profile
+from seahub.settings import USER_SEARCH_INDEX_TIMEOUT
+from seahub.utils.ccnet_db import CcnetDB
+
+logger = logging.getLogger(__name__)
+
+_WORD_SPLIT_RE = re.compile(r'[\W_]+')
+
+# pinyin of each character met, char2pinyin is slow
+_pinyin_memo = {}
+
+
+def get_pinyin(text):
+    pieces = []
+    for c in text:
+        piece = _pinyin_memo.get(c)
+        if piece is None:
+            try:
+                piece = char2pinyin(c)
+            except Exception as e:
+                logger.warning(e)
+                piece = c
+            _pinyin_memo[c] = piece
+        pieces.append(piece)
+    return ''.join(pieces).lower()
+
+
+def get_search_tokens(email, nickname='', contact_email='', login_id=''):
+    """Return the set of strings a user is found by prefix of.
+    """
+    fields = [email, nickname, contact_email, login_id]
+    if nickname and not nickname.isascii():
+        fields.append(get_pinyin(nickname))
+
+    tokens = set()
+    for field in fields:
+        if not field:
+            continue
+        field = field.lower()
+        tokens.add(field)
+        for word in _WORD_SPLIT_RE.split(field):
+            if not word:
+                continue
+            tokens.add(word)
+            if not word.isascii():
+                # chinese names are not split into words, search from any
+                # character of them
+                tokens.update(word[i:] for i in range(1, len(word)))
+    return tokens
+
+
+class UserSearchIndex(object):
+    """Users found by prefix of their tokens, kept in a sorted list.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = []
+        # token -> emails, in insertion order
+        self._postings = {}
+        self._user_tokens = {}
+        self._listed = set()
+
+    def __len__(self):
+        return len(self._user_tokens)
+
+    def __contains__(self, email):
+        return email in self._user_tokens
+
+    @classmethod
+    def build(cls, users):
+        """Build an index of ``users``, an iterable of ``(email, tokens,
+        list_in_address_book)``.
+        """
+        index = cls()
+        postings = index._postings
+        for email, tokens, listed in users:
+            index._user_tokens[email] = tokens
+            if listed:
+                index._listed.add(email)
+            for token in tokens:
+                postings.setdefault(token, {})[email] = None
+        index._tokens = sorted(postings)
+        return index
+
+    def _remove(self, email):
+        for token in self._user_tokens.pop(email, ()):
+            emails = self._postings[token]
+            emails.pop(email, None)
+            if not emails:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+        self._listed.discard(email)
+
+    def update(self, email, tokens, listed):
+        with self._lock:
+            self._remove(email)
+            self._user_tokens[email] = tokens
+            if listed:
+                self._listed.add(email)
+            for token in tokens:
+                if token not in self._postings:
+                    self._postings[token] = {}
+                    insort(self._tokens, token)
+                self._postings[token][email] = None
+
+    def remove(self, email):
+        with self._lock:
+            self._remove(email)
+
+    def search(self, q, limit=10, listed_only=False):
+        """Return at most ``limit`` emails of users with a token starting
+        with ``q``, users with a token equal to ``q`` first.
+        """
+        q = q.strip().lower()
+        if not q:
+            return []
+
+        result = {}
+        with self._lock:
+            tokens = self._tokens
+            i = bisect_left(tokens, q)
+            while i < len(tokens) and tokens[i].startswith(q):
+                for email in self._postings[tokens[i]]:
+                    if email in result:
+                        continue
+                    if listed_only and email not in self._listed:
+                        continue
+                    result[email] = None
+                    if len(result) >= limit:
+                        return list(result)
+                i += 1
+
+        return list(result)
+
+
+class _Indexes(object):
+
+    def __init__(self, global_index, org_indexes, user_org_ids):
+        self.global_index = global_index
+        self.org_indexes = org_indexes
+        self.user_org_ids = user_org_ids
+        self.built_at = time.monotonic()
+
+    def get(self, org_id=None):
+        if org_id is None:
+            return self.global_index
+        return self.org_indexes.get(org_id) or UserSearchIndex()
+
+    def update(self, email, tokens, listed, org_id=None):
+        self.global_index.update(email, tokens, listed)
+        org_id = self.user_org_ids.get(email, org_id)
+        if org_id is not None:
+            self.user_org_ids[email] = org_id
+            self.org_indexes.setdefault(org_id, UserSearchIndex()).update(
+                email, tokens, listed)
+
+    def remove(self, email):
+        self.global_index.remove(email)
+        org_id = self.user_org_ids.pop(email, None)
+        if org_id in self.org_indexes:
+            self.org_indexes[org_id].remove(email)
+
+
+_indexes = None
+_build_lock = threading.Lock()
+_rebuilding = False
+
+
+def _build_indexes():
+    start = time.monotonic()
+    user_org_ids = CcnetDB().get_active_users_org_id()
+
+    profile_fields = {}
+    for p in Profile.objects.values_list('user', 'nickname', 'contact_email',
+                                         'login_id', 'list_in_address_book').iterator():
+        profile_fields[p[0]] = p[1:]
+
+    users = []
+    org_users = {}
+    for email, org_id in user_org_ids.items():
+        nickname, contact_email, login_id, listed = \
+            profile_fields.get(email, ('', '', '', False))
+        user = (email,
+                get_search_tokens(email, nickname, contact_email, login_id),
+                listed)
+        users.append(user)
+        if org_id is not None:
+            org_users.setdefault(org_id, []).append(user)
+
+    indexes = _Indexes(
+        UserSearchIndex.build(users),
+        {org_id: UserSearchIndex.build(u) for org_id, u in org_users.items()},
+        {email: org_id for email, org_id in user_org_ids.items()
+         if org_id is not None})
+    logger.debug('User search index of %d users built in %.2fs.',
+                 len(users), time.monotonic() - start)
+    return indexes
+
+
+def _rebuild_in_background():
+    global _indexes, _rebuilding
+    try:
+        _indexes = _build_indexes()
+    except Exception as e:
+        logger.error(e)
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def get_user_search_index(org_id=None):
+    """Return the index of all users, or of users of ``org_id``.
+    """
+    global _indexes, _rebuilding
+
+    indexes = _indexes
+    if indexes is None or USER_SEARCH_INDEX_TIMEOUT <= 0:
+        with _build_lock:
+            if _indexes is None or _indexes is indexes:
+                _indexes = _build_indexes()
+            indexes = _indexes
+    elif time.monotonic() - indexes.built_at > USER_SEARCH_INDEX_TIMEOUT:
+        with _build_lock:
+            if not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=_rebuild_in_background,
+                                 daemon=True).start()
+
+    return indexes.get(org_id)
+
+
+def search_users(q, limit=10, org_id=None, listed_only=False):
+    """Search the index of all users, or of users of ``org_id``. Return
+    emails of found users who are active, and members of ``org_id`` if
+    given, at the time of the search.
+    """
+    emails = get_user_search_index(org_id).search(q, limit, listed_only)
+    return CcnetDB().get_active_emails(emails, org_id)
+
+
+@receiver(post_save, sender=Profile, dispatch_uid="update_user_search_index")
+def profile_saved_cb(sender, instance, **kwargs):
+    indexes = _indexes
+    if indexes is None:
+        return
+
+    email = instance.user
+    org_id = None
+    if email not in indexes.global_index:
+        try:
+            org_id = CcnetDB().get_users_org_id_map([email]).get(email)
+        except Exception as e:
+            # not added to the org index until the next rebuild
+            logger.error(e)
+    tokens = get_search_tokens(email, instance.nickname,
+                               instance.contact_email, instance.login_id)
+    indexes.update(email, tokens, instance.list_in_address_book, org_id)
+
+
+@receiver(user_registered)
+def user_registered_cb(sender, **kwargs):
+    indexes = _indexes
+    if indexes is None:
+        return
+
+    email = kwargs['user'].username
+    if email in indexes.global_index:
+        return
+    org_id = None
+    try:
+        org_id = CcnetDB().get_users_org_id_map([email]).get(email)
+    except Exception as e:
+        logger.error(e)
+    indexes.update(email, get_search_tokens(email), False, org_id)
+
+
+@receiver(user_deleted)
+def user_deleted_cb(sender, **kwargs):
+    indexes = _indexes
+    if indexes is not None:
+        indexes.remove(kwargs['username'])
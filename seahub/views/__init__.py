@@ -49,6 +49,7 @@ from seahub.utils import render_permission_error, render_error, \
     normalize_file_path, normalize_dir_path
 from seahub.utils.star import get_dir_starred_files
 from seahub.utils.repo import get_library_storages, parse_repo_perm, is_repo_admin
+from seahub.utils.repo_cache import get_repo_meta
 from seahub.utils.file_op import check_file_lock
 from seahub.utils.timeutils import utc_to_local
 from seahub.utils.auth import get_login_bg_image_path
@@ -126,7 +127,7 @@ def check_folder_permission(request, repo_id, path):
     - `repo_id`:
     - `path`:
     """
-    repo_status = seafile_api.get_repo_status(repo_id)
+    repo_status = get_repo_meta(repo_id).status
     if repo_status == 1:
         return PERMISSION_READ
 
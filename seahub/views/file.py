@@ -10,20 +10,17 @@ import json
 import time
 import uuid
 import stat
-import urllib.request
-import urllib.error
 import urllib.parse
-import chardet
 import logging
 import posixpath
 import re
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 
 from django.core.cache import cache
 from django.contrib.sites.shortcuts import get_current_site
 from django.contrib import messages
 from django.urls import reverse
-from django.db.models import F
 from django.http import Http404, HttpResponseRedirect, HttpResponseBadRequest, HttpResponseForbidden
 from django.shortcuts import render
 from urllib.parse import quote
@@ -49,16 +46,19 @@ from seahub.base.accounts import ANONYMOUS_EMAIL, User
 from seahub.base.templatetags.seahub_tags import file_icon_filter
 from seahub.share.models import FileShare, check_share_link_common
 from seahub.share.decorators import share_link_audit, share_link_login_required
+from seahub.share.view_counter import incr_view_cnt
 from seahub.wiki.utils import get_wiki_dirent
 from seahub.wiki.models import Wiki, WikiDoesNotExist, WikiPageMissing
 from seahub.utils import render_error, is_org_context, \
     get_file_type_and_ext, gen_file_get_url, \
     render_permission_error, is_pro_version, is_textual_file, \
-    EMPTY_SHA1, HtmlDiff, gen_inner_file_get_url, \
+    EMPTY_SHA1, gen_inner_file_get_url, \
     get_conf_text_ext, HAS_OFFICE_CONVERTER, PREVIEW_FILEEXT, \
     normalize_file_path, get_service_url, OFFICE_PREVIEW_MAX_SIZE, \
     normalize_cache_key, gen_file_get_url_by_sharelink, gen_file_get_url_new
 from seahub.utils.ip import get_remote_ip
+from seahub.utils.line_diff import make_diff_table
+from seahub.utils.preview_content import get_preview_content
 from seahub.utils.file_types import (IMAGE, PDF, SVG,
                                      DOCUMENT, SPREADSHEET, AUDIO,
                                      MARKDOWN, TEXT, VIDEO, XMIND, SEADOC, TLDRAW)
@@ -72,6 +72,7 @@ from seahub.utils.user_permissions import get_user_role
 from seahub.views import check_folder_permission, \
         get_unencry_rw_repos_by_user
 from seahub.utils.repo import is_repo_owner, parse_repo_perm, is_repo_admin
+from seahub.utils.repo_cache import get_repo_meta
 from seahub.group.utils import is_group_member
 from seahub.thumbnail.utils import extract_xmind_image, get_thumbnail_src, \
         XMIND_IMAGE_SIZE, get_share_link_thumbnail_src, get_thumbnail_image_path
@@ -86,12 +87,12 @@ if HAS_OFFICE_CONVERTER:
 
 import seahub.settings as settings
 from seahub.settings import FILE_ENCODING_LIST, FILE_PREVIEW_MAX_SIZE, \
-    FILE_ENCODING_TRY_LIST, MEDIA_URL, ENABLE_WATERMARK, \
+    MEDIA_URL, ENABLE_WATERMARK, \
     SHARE_LINK_EXPIRE_DAYS_MIN, SHARE_LINK_EXPIRE_DAYS_MAX, SHARE_LINK_PASSWORD_MIN_LENGTH, \
     SHARE_LINK_FORCE_USE_PASSWORD, SHARE_LINK_PASSWORD_STRENGTH_LEVEL, \
     SHARE_LINK_EXPIRE_DAYS_DEFAULT, ENABLE_SHARE_LINK_REPORT_ABUSE, SEADOC_SERVER_URL, \
     ENABLE_METADATA_MANAGEMENT, BAIDU_MAP_KEY, GOOGLE_MAP_KEY, GOOGLE_MAP_ID, ENABLE_MULTIPLE_OFFICE_SUITE, \
-    OFFICE_SUITE_LIST
+    OFFICE_SUITE_LIST, TEXT_DIFF_MAX_LINES, TEXT_DIFF_MAX_CHANGED_LINES
 
 
 # wopi
@@ -224,65 +225,12 @@ def gen_path_link(path, repo_name):
 
     return zipped
 
-def get_file_content(file_type, raw_path, file_enc):
+def get_file_content(file_type, raw_path, file_enc, obj_id=None):
     """Get textual file content, including txt/markdown/seaf.
     """
-    return repo_file_get(raw_path, file_enc) if is_textual_file(
+    return get_preview_content(obj_id, file_enc, raw_path) if is_textual_file(
         file_type=file_type) else ('', '', '')
 
-def repo_file_get(raw_path, file_enc):
-    """
-    Get file content and encoding.
-    """
-    err = ''
-    file_content = ''
-    encoding = None
-    if file_enc != 'auto':
-        encoding = file_enc
-
-    try:
-        file_response = urllib.request.urlopen(raw_path)
-        content = file_response.read()
-    except urllib.error.HTTPError as e:
-        logger.error(e)
-        err = _('HTTPError: failed to open file online')
-        return err, '', None
-    except urllib.error.URLError as e:
-        logger.error(e)
-        err = _('URLError: failed to open file online')
-        return err, '', None
-    else:
-        if encoding:
-            try:
-                u_content = content.decode(encoding)
-            except UnicodeDecodeError:
-                err = _('The encoding you chose is not proper.')
-                return err, '', encoding
-        else:
-            for enc in FILE_ENCODING_TRY_LIST:
-                try:
-                    u_content = content.decode(enc)
-                    encoding = enc
-                    break
-                except UnicodeDecodeError:
-                    if enc != FILE_ENCODING_TRY_LIST[-1]:
-                        continue
-                    else:
-                        encoding = chardet.detect(content)['encoding']
-                        if encoding:
-                            try:
-                                u_content = content.decode(encoding)
-                            except UnicodeDecodeError:
-                                err = _('Unknown file encoding')
-                                return err, '', ''
-                        else:
-                            err = _('Unknown file encoding')
-                            return err, '', ''
-
-        file_content = u_content
-
-    return err, file_content, encoding
-
 
 def get_file_view_path_and_perm(request, repo_id, obj_id, path,
                                 use_onetime=settings.FILESERVER_TOKEN_ONCE_ONLY):
@@ -309,13 +257,13 @@ def get_file_view_path_and_perm(request, repo_id, obj_id, path,
         inner_url = gen_inner_file_get_url(token, filename)
         return (outer_url, inner_url, user_perm)
 
-def handle_textual_file(request, filetype, raw_path, ret_dict):
+def handle_textual_file(request, filetype, raw_path, ret_dict, obj_id=None):
     # encoding option a user chose
     file_enc = request.GET.get('file_enc', 'auto')
     if not file_enc in FILE_ENCODING_LIST:
         file_enc = 'auto'
     err, file_content, encoding = get_file_content(filetype,
-                                                   raw_path, file_enc)
+                                                   raw_path, file_enc, obj_id)
     file_encoding_list = FILE_ENCODING_LIST
     if encoding and encoding not in FILE_ENCODING_LIST:
         file_encoding_list.append(encoding)
@@ -779,7 +727,7 @@ def view_lib_file(request, repo_id, path):
         if file_enc not in FILE_ENCODING_LIST:
             file_enc = 'auto'
 
-        error_msg, file_content, encoding = get_file_content(filetype, inner_path, file_enc)
+        error_msg, file_content, encoding = get_file_content(filetype, inner_path, file_enc, file_id)
         if error_msg:
             return_dict['err'] = error_msg
             return render(request, template, return_dict)
@@ -1094,7 +1042,7 @@ def view_history_file_common(request, repo_id, ret_dict):
 
             """Choose different approach when dealing with different type of file."""
             if is_textual_file(file_type=filetype):
-                handle_textual_file(request, filetype, inner_path, ret_dict)
+                handle_textual_file(request, filetype, inner_path, ret_dict, obj_id)
             elif filetype == DOCUMENT:
                 handle_document(raw_path, obj_id, fileext, ret_dict)
             elif filetype == SPREADSHEET:
@@ -1205,7 +1153,7 @@ def _download_file_from_share_link(request, fileshare, use_tmp_token=False):
     """
     next_page = request.headers.get('referer', settings.SITE_ROOT)
 
-    repo = get_repo(fileshare.repo_id)
+    repo = get_repo_meta(fileshare.repo_id).repo
     if not repo:
         raise Http404
 
@@ -1263,7 +1211,7 @@ def view_shared_file(request, fileshare):
 
     # recourse check
     repo_id = fileshare.repo_id
-    repo = get_repo(repo_id)
+    repo = get_repo_meta(repo_id).repo
     if not repo:
         raise Http404
 
@@ -1279,9 +1227,8 @@ def view_shared_file(request, fileshare):
     if not seafile_api.check_permission_by_path(repo_id, '/', shared_by):
         return render_error(request, _('Permission denied'))
 
-    # Increase file shared link view_cnt, this operation should be atomic
-    fileshare.view_cnt = F('view_cnt') + 1
-    fileshare.save()
+    # Increase file shared link view_cnt
+    incr_view_cnt(fileshare)
 
     if not request.user.is_authenticated:
         username = ANONYMOUS_EMAIL
@@ -1425,7 +1372,7 @@ def view_shared_file(request, fileshare):
         """Choose different approach when dealing with different type of file."""
         inner_path = gen_inner_file_get_url(access_token, filename)
         if is_textual_file(file_type=filetype):
-            handle_textual_file(request, filetype, inner_path, ret_dict)
+            handle_textual_file(request, filetype, inner_path, ret_dict, obj_id)
         elif filetype == DOCUMENT:
             handle_document(raw_path, obj_id, fileext, ret_dict)
         elif filetype == SPREADSHEET:
@@ -1526,7 +1473,7 @@ def view_file_via_shared_dir(request, fileshare):
 
     # recourse check
     repo_id = fileshare.repo_id
-    repo = get_repo(repo_id)
+    repo = get_repo_meta(repo_id).repo
     if not repo:
         raise Http404
 
@@ -1666,7 +1613,7 @@ def view_file_via_shared_dir(request, fileshare):
 
         """Choose different approach when dealing with different type of file."""
         if is_textual_file(file_type=filetype):
-            handle_textual_file(request, filetype, inner_path, ret_dict)
+            handle_textual_file(request, filetype, inner_path, ret_dict, obj_id)
         elif filetype == DOCUMENT:
             handle_document(raw_path, obj_id, fileext, ret_dict)
         elif filetype == SPREADSHEET:
@@ -1871,36 +1818,60 @@ def download_file(request, repo_id, obj_id):
     return HttpResponseRedirect(redirect_url)
 
 ########## text diff
-def get_file_content_by_commit_and_path(request, repo_id, commit_id, path, file_enc):
-    try:
-        obj_id = seafserv_threaded_rpc.get_file_id_by_commit_and_path( \
-                                        repo_id, commit_id, path)
-    except:
-        return None, 'bad path'
-
+TEXT_DIFF_CACHE_PREFIX = 'TEXT_DIFF_'
+TEXT_DIFF_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# larger diff tables are not cached
+TEXT_DIFF_CACHE_MAX_SIZE = 1024 * 1024
+
+def read_file_revision(repo_id, obj_id, path, file_enc, username):
+    """Return ``(content, err)`` of a revision of file, permission must be
+    checked before.
+    """
     if not obj_id or obj_id == EMPTY_SHA1:
         return '', None
-    else:
-        if parse_repo_perm(check_folder_permission(
-                request, repo_id, '/')).can_preview is True:
-            # Get a token to visit file
-            token = seafile_api.get_fileserver_access_token(repo_id,
-                    obj_id, 'view', request.user.username)
 
-            if not token:
-                return None, 'FileServer access token invalid'
+    err, file_content, encoding = get_preview_content(obj_id, file_enc,
+            repo_id=repo_id, file_name=os.path.basename(path), username=username)
+    return file_content, err
 
-        else:
-            return None, 'permission denied'
+def get_text_diff(repo_id, path, prev_obj_id, current_obj_id, file_enc, username):
+    """Return ``(diff, err)``, ``diff`` being a dict of the diff table rows
+    and the numbers of lines.
 
-        filename = os.path.basename(path)
-        inner_path = gen_inner_file_get_url(token, filename)
+    Both revisions are read at the same time. ``table`` is ``None`` if the
+    file is too large to show its changes.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        prev = executor.submit(read_file_revision, repo_id, prev_obj_id,
+                               path, file_enc, username)
+        current = executor.submit(read_file_revision, repo_id, current_obj_id,
+                                  path, file_enc, username)
+        prev_content, prev_err = prev.result()
+        current_content, current_err = current.result()
+
+    if current_err or prev_err:
+        return None, current_err or prev_err
+
+    prev_lines = prev_content.splitlines()
+    current_lines = current_content.splitlines()
+    diff = {
+        'is_new_file': prev_content == '' and current_content == '',
+        'table': '',
+        'prev_lines': len(prev_lines),
+        'current_lines': len(current_lines),
+        'removed': None,
+        'added': None,
+    }
+    if diff['is_new_file']:
+        return diff, None
 
-        try:
-            err, file_content, encoding = repo_file_get(inner_path, file_enc)
-        except Exception as e:
-            return None, 'error when read file from fileserver: %s' % e
-        return file_content, err
+    if max(len(prev_lines), len(current_lines)) > TEXT_DIFF_MAX_LINES:
+        diff['table'] = None
+        return diff, None
+
+    diff['table'], diff['removed'], diff['added'] = make_diff_table(
+        prev_lines, current_lines, TEXT_DIFF_MAX_CHANGED_LINES)
+    return diff, None
 
 @login_required
 def text_diff(request, repo_id):
@@ -1924,26 +1895,31 @@ def text_diff(request, repo_id):
 
     prev_commit = seafserv_threaded_rpc.get_commit(repo.id, repo.version, current_commit.parent_id)
     if not prev_commit:
-        return render_error('bad commit id')
-
-    current_content, err = get_file_content_by_commit_and_path(request, \
-                                    repo_id, current_commit.id, path, file_enc)
-    if err:
-        return render_error(request, err)
-
-    prev_content, err = get_file_content_by_commit_and_path(request, \
-                                    repo_id, prev_commit.id, path, file_enc)
-    if err:
-        return render_error(request, err)
-
-    is_new_file = False
-    diff_result_table = ''
-    if prev_content == '' and current_content == '':
-        is_new_file = True
-    else:
-        diff = HtmlDiff()
-        diff_result_table = diff.make_table(prev_content.splitlines(),
-                                        current_content.splitlines(), True)
+        return render_error(request, 'bad commit id')
+
+    try:
+        current_obj_id = seafserv_threaded_rpc.get_file_id_by_commit_and_path(
+            repo_id, current_commit.id, path)
+        prev_obj_id = seafserv_threaded_rpc.get_file_id_by_commit_and_path(
+            repo_id, prev_commit.id, path)
+    except Exception:
+        return render_error(request, 'bad path')
+
+    if parse_repo_perm(check_folder_permission(
+            request, repo_id, '/')).can_preview is not True:
+        return render_error(request, 'permission denied')
+
+    # file objects never change, nor does the diff between two of them
+    cache_key = normalize_cache_key('%s_%s_%s' % (prev_obj_id, current_obj_id, file_enc),
+                                    TEXT_DIFF_CACHE_PREFIX)
+    diff = cache.get(cache_key)
+    if diff is None:
+        diff, err = get_text_diff(repo_id, path, prev_obj_id, current_obj_id,
+                                  file_enc, request.user.username)
+        if err:
+            return render_error(request, err)
+        if len(diff['table'] or '') <= TEXT_DIFF_CACHE_MAX_SIZE:
+            cache.set(cache_key, diff, TEXT_DIFF_CACHE_TIMEOUT)
 
     zipped = gen_path_link(path, repo.name)
 
@@ -1956,8 +1932,12 @@ def text_diff(request, repo_id):
         'zipped': zipped,
         'current_commit': current_commit,
         'prev_commit': prev_commit,
-        'diff_result_table': diff_result_table,
-        'is_new_file': is_new_file,
+        'diff_result_table': diff['table'],
+        'is_new_file': diff['is_new_file'],
+        'prev_lines': diff['prev_lines'],
+        'current_lines': diff['current_lines'],
+        'removed_lines': diff['removed'],
+        'added_lines': diff['added'],
         'referer': referer,
     })
 
@@ -2083,7 +2063,8 @@ def view_media_file_via_share_link(request):
         return render_error(request, 'File does not exist')
 
     # read file from cache, if hit
-    err_msg, file_content = get_file_content_from_cache(file_id, repo_id, shared_file_name)
+    err_msg, file_content, encoding = get_preview_content(file_id,
+            repo_id=repo_id, file_name=shared_file_name)
 
     if err_msg:
         return render_error(request, err_msg)
@@ -2157,29 +2138,6 @@ def view_media_file_via_public_wiki(request):
     return HttpResponseRedirect(dl_or_raw_url)
 
 
-def get_file_content_from_cache(file_id, repo_id, file_name):
-    err_msg = ''
-    file_content = ''
-
-    cache_key = normalize_cache_key(file_id)
-    # read file from cache, if hit
-    file_content = cache.get(cache_key)
-    if not file_content:
-        # otherwise, read file from database and update cache
-        access_token = seafile_api.get_fileserver_access_token(repo_id,
-                file_id, 'view', '', use_onetime=False)
-
-        if not access_token:
-            err_msg = _('Unable to view file')
-            return err_msg, file_content
-
-        file_raw_path = gen_inner_file_get_url(access_token, file_name)
-
-        err_msg, file_content, encode = repo_file_get(file_raw_path, 'auto')
-        cache.set(cache_key, file_content, 24 * 60 * 60)
-
-    return err_msg, file_content
-
 @login_required
 @repo_passwd_set_required
 def view_sdoc_revision(request, repo_id, revision_id):
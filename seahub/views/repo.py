@@ -5,7 +5,6 @@ import posixpath
 import logging
 
 from django.urls import reverse
-from django.db.models import F
 from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import render
 from django.utils.translation import gettext as _
@@ -17,9 +16,10 @@ from seaserv import seafile_api
 from seahub.auth.decorators import login_required
 from seahub.options.models import UserOptions, CryptoOptionNotSetError
 from seahub.share.decorators import share_link_audit, share_link_login_required
-from seahub.share.models import FileShare, UploadLinkShare, \
+from seahub.share.models import UploadLinkShare, \
     check_share_link_common
 from seahub.share.utils import check_share_link_user_access
+from seahub.share.view_counter import incr_view_cnt
 from seahub.views import gen_path_link, get_repo_dirents, \
     check_folder_permission
 
@@ -27,6 +27,7 @@ from seahub.utils import gen_dir_share_link, \
     gen_shared_upload_link, render_error, \
     get_file_type_and_ext, get_service_url, normalize_dir_path, redirect_to_login
 from seahub.utils.repo import is_repo_owner, get_repo_owner
+from seahub.utils.repo_cache import get_repo_meta
 from seahub.settings import ENABLE_UPLOAD_FOLDER, \
     ENABLE_RESUMABLE_FILEUPLOAD, ENABLE_VIDEO_THUMBNAIL, \
     THUMBNAIL_ROOT, THUMBNAIL_DEFAULT_SIZE, THUMBNAIL_SIZE_FOR_GRID, \
@@ -278,7 +279,7 @@ def view_shared_dir(request, fileshare):
 
     real_path = normalize_dir_path(real_path)
 
-    repo = get_repo(repo_id)
+    repo = get_repo_meta(repo_id).repo
     if not repo:
         raise Http404
 
@@ -298,9 +299,7 @@ def view_shared_dir(request, fileshare):
 
     if req_path == '/':  # When user view the root of shared dir..
         # increase shared link view_cnt,
-        fileshare = FileShare.objects.get(token=token)
-        fileshare.view_cnt = F('view_cnt') + 1
-        fileshare.save()
+        incr_view_cnt(fileshare)
 
     permissions = fileshare.get_permissions()
 
@@ -364,7 +363,7 @@ def view_shared_upload_link(request, uploadlink):
 
     username = uploadlink.username
     repo_id = uploadlink.repo_id
-    repo = get_repo(repo_id)
+    repo = get_repo_meta(repo_id).repo
     if not repo:
         raise Http404
 
@@ -375,16 +374,11 @@ def view_shared_upload_link(request, uploadlink):
     else:
         dir_name = os.path.basename(path[:-1])
 
-    repo = get_repo(repo_id)
-    if not repo:
-        raise Http404
-
     if repo.encrypted or \
             seafile_api.check_permission_by_path(repo_id, path, username) != 'rw':
         return render_error(request, _('Permission denied'))
 
-    uploadlink.view_cnt = F('view_cnt') + 1
-    uploadlink.save()
+    incr_view_cnt(uploadlink)
 
     no_quota = True if seaserv.check_quota(repo_id) < 0 else False
 
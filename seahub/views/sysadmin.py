@@ -2,6 +2,8 @@
 # encoding: utf-8
 
 from types import FunctionType
+import os
+import shutil
 import logging
 import json
 import datetime
@@ -11,7 +13,8 @@ from constance import config
 from django.conf import settings as dj_settings
 from django.urls import reverse
 from django.contrib import messages
-from django.http import HttpResponse, Http404, HttpResponseRedirect, HttpResponseNotAllowed
+from django.http import HttpResponse, Http404, HttpResponseRedirect, HttpResponseNotAllowed, \
+    FileResponse
 from django.shortcuts import render
 from django.utils.translation import gettext as _
 
@@ -20,14 +23,13 @@ from seaserv import ccnet_threaded_rpc, seafserv_threaded_rpc, \
 from pysearpc import SearpcError
 
 from seahub.base.accounts import User
-from seahub.base.models import UserLastLogin
 from seahub.base.decorators import sys_staff_required, require_POST
 from seahub.base.sudo_mode import update_sudo_mode_ts
 from seahub.base.templatetags.seahub_tags import tsstr_sec, email2nickname, \
     email2contact_email
 from seahub.auth import authenticate
 from seahub.auth.decorators import login_required, login_required_ajax
-from seahub.constants import GUEST_USER, DEFAULT_USER, HASH_URLS
+from seahub.constants import DEFAULT_USER, HASH_URLS
 from seahub.institutions.models import Institution
 from seahub.role_permissions.utils import get_available_roles, \
         get_available_admin_roles
@@ -37,7 +39,10 @@ from seahub.utils.ip import get_remote_ip
 from seahub.utils.file_size import get_file_size_unit
 from seahub.utils.ldap import get_ldap_info
 from seahub.utils.licenseparse import parse_license
-from seahub.utils.ms_excel import write_xls
+from seahub.utils.ms_excel import write_xls, export_response
+from seahub.utils.user_report import get_all_users, iter_user_report, \
+    get_user_export_head, gen_user_export_rows, get_user_export_status, \
+    get_user_export_file, is_valid_user_export_task_id, USER_EXPORT_FILENAME
 from seahub.utils.repo import get_related_users_by_repo, get_repo_owner
 from seahub.utils.auth import get_login_bg_image_path
 from seahub.views import get_system_default_repo_id
@@ -149,132 +154,58 @@ def _populate_user_quota_usage(user):
 @sys_staff_required
 def sys_useradmin_export_excel(request):
     """ Export all users from database to excel
+
+    With ``task_id``, return the file exported in background instead.
     """
 
     next_page = request.headers.get('referer', None)
     if not next_page:
         next_page = SITE_ROOT
 
+    task_id = request.GET.get('task_id', '')
+    if task_id:
+        return _get_user_export_file_response(request, task_id, next_page)
+
     try:
-        users = ccnet_api.get_emailusers('DB', -1, -1) + \
-                ccnet_api.get_emailusers('LDAPImport', -1, -1)
+        users = get_all_users()
     except Exception as e:
         logger.error(e)
         messages.error(request, _('Failed to export Excel'))
         return HttpResponseRedirect(next_page)
 
-    if is_pro_version():
-        is_pro = True
-    else:
-        is_pro = False
-
-    if is_pro:
-        head = [_("Email"), _("Name"), _("Contact Email"), _("Login ID"), _("Status"), _("Role"),
-                _("Space Usage") + "(MB)", _("Space Quota") + "(MB)",
-                _("Create At"), _("Last Login"), _("Admin"), _("LDAP(imported)")]
-    else:
-        head = [_("Email"), _("Name"), _("Contact Email"), _("Login ID"), _("Status"),
-                _("Space Usage") + "(MB)", _("Space Quota") + "(MB)",
-                _("Create At"), _("Last Login"), _("Admin"), _("LDAP(imported)")]
-
-    # only operate 100 users for every `for` loop
-    looped = 0
-    limit = 100
-    data_list = []
-
-    while looped < len(users):
-
-        current_users = users[looped:looped+limit]
-
-        last_logins = UserLastLogin.objects.filter(username__in=[x.email \
-                for x in current_users])
-        user_profiles = Profile.objects.filter(user__in=[x.email \
-                for x in current_users])
-
-        for user in current_users:
-            # populate name and contact email
-            user.contact_email = ''
-            user.name = ''
-            user.login_id = ''
-            for profile in user_profiles:
-                if profile.user == user.email:
-                    user.contact_email = profile.contact_email
-                    user.name = profile.nickname
-                    user.login_id = profile.login_id
+    is_pro = is_pro_version()
+    head = get_user_export_head(is_pro)
+    rows = gen_user_export_rows(iter_user_report(users), is_pro)
 
-            # populate space usage and quota
-            MB = get_file_size_unit('MB')
-
-            _populate_user_quota_usage(user)
-            if user.space_usage > 0:
-                try:
-                    space_usage_MB = round(float(user.space_usage) / MB, 2)
-                except Exception as e:
-                    logger.error(e)
-                    space_usage_MB = '--'
-            else:
-                space_usage_MB = ''
-
-            if user.space_quota > 0:
-                try:
-                    space_quota_MB = round(float(user.space_quota) / MB, 2)
-                except Exception as e:
-                    logger.error(e)
-                    space_quota_MB = '--'
-            else:
-                space_quota_MB = ''
-
-            # populate user last login time
-            user.last_login = None
-            for last_login in last_logins:
-                if last_login.username == user.email:
-                    user.last_login = last_login.last_login
-
-            if user.is_active:
-                status = _('Active')
-            else:
-                status = _('Inactive')
-
-            create_at = tsstr_sec(user.ctime) if user.ctime else ''
-            last_login = user.last_login.strftime("%Y-%m-%d %H:%M:%S") if \
-                user.last_login else ''
-
-            is_admin = _('Yes') if user.is_staff else ''
-            ldap_import = _('Yes') if user.source == 'LDAPImport' else ''
-
-            if is_pro:
-                if user.role:
-                    if user.role == GUEST_USER:
-                        role = _('Guest')
-                    elif user.role == DEFAULT_USER:
-                        role = _('Default')
-                    else:
-                        role = user.role
-                else:
-                    role = _('Default')
-
-                row = [user.email, user.name, user.contact_email, user.login_id, status, role,
-                       space_usage_MB, space_quota_MB, create_at,
-                       last_login, is_admin, ldap_import]
-            else:
-                row = [user.email, user.name, user.contact_email, user.login_id, status,
-                       space_usage_MB, space_quota_MB, create_at,
-                       last_login, is_admin, ldap_import]
+    response = export_response(request, 'users', head, rows, 'users')
+    if not response:
+        messages.error(request, _('Failed to export Excel'))
+        return HttpResponseRedirect(next_page)
 
-            data_list.append(row)
+    return response
 
-        # update `looped` value when `for` loop finished
-        looped += limit
+def _get_user_export_file_response(request, task_id, next_page):
+    task_status = get_user_export_status(task_id) if \
+        is_valid_user_export_task_id(task_id) else None
+    if not task_status or not task_status['is_finished'] or task_status['failed']:
+        messages.error(request, _('Failed to export Excel'))
+        return HttpResponseRedirect(next_page)
 
-    wb = write_xls('users', head, data_list)
-    if not wb:
+    export_file = get_user_export_file(task_id)
+    try:
+        f = open(export_file, 'rb')
+    except FileNotFoundError:
         messages.error(request, _('Failed to export Excel'))
         return HttpResponseRedirect(next_page)
 
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = 'attachment; filename=users.xlsx'
-    wb.save(response)
-    return response
+    # the file is downloaded once, like logs exported by seafevents
+    try:
+        shutil.rmtree(os.path.dirname(export_file))
+    except OSError:
+        pass
+
+    return FileResponse(f, as_attachment=True, filename=USER_EXPORT_FILENAME,
+                        content_type='application/ms-excel')
 
 @login_required_ajax
 @sys_staff_required
@@ -641,20 +572,17 @@ def sys_group_admin_export_excel(request):
         return HttpResponseRedirect(next_page)
 
     head = [_("Name"), _("Creator"), _("Create At")]
-    data_list = []
-    for grp in groups:
-        create_at = tsstr_sec(grp.timestamp) if grp.timestamp else ''
-        row = [grp.group_name, grp.creator_name, create_at]
-        data_list.append(row)
 
-    wb = write_xls('groups', head, data_list)
-    if not wb:
+    def gen_rows():
+        for grp in groups:
+            create_at = tsstr_sec(grp.timestamp) if grp.timestamp else ''
+            yield [grp.group_name, grp.creator_name, create_at]
+
+    response = export_response(request, 'groups', head, gen_rows(), 'groups')
+    if not response:
         messages.error(request, _('Failed to export Excel'))
         return HttpResponseRedirect(next_page)
 
-    response = HttpResponse(content_type='application/ms-excel')
-    response['Content-Disposition'] = 'attachment; filename=groups.xlsx'
-    wb.save(response)
     return response
 
 @login_required_ajax
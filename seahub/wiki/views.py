@@ -2,7 +2,6 @@
 import os
 import re
 import logging
-import urllib.request
 import posixpath
 from datetime import datetime
 
@@ -23,8 +22,9 @@ from seahub.share.models import FileShare
 from seahub.wiki.models import Wiki
 from seahub.views import check_folder_permission
 from seahub.utils import get_file_type_and_ext, render_permission_error, \
-     gen_inner_file_get_url, render_error, get_service_url
+     render_error, get_service_url
 from seahub.views.file import send_file_access_msg
+from seahub.utils.preview_content import get_preview_content
 from seahub.utils.file_types import IMAGE, MARKDOWN, SEADOC
 from seahub.seadoc.utils import get_seadoc_file_uuid
 
@@ -204,18 +204,18 @@ def slug(request, slug, file_path="home.md"):
         send_file_access_msg(request, repo, file_path, 'web')
 
         file_name = os.path.basename(file_path)
-        token = seafile_api.get_fileserver_access_token(
-            repo.repo_id, file_id, 'download', request.user.username, 'False')
-        if not token:
-            return render_error(request, _('Internal Server Error'))
-
-        url = gen_inner_file_get_url(token, file_name)
         try:
-            file_response = urllib.request.urlopen(url).read().decode()
+            err_msg, file_response, encoding = get_preview_content(file_id,
+                    repo_id=repo.repo_id, file_name=file_name,
+                    username=request.user.username)
         except Exception as e:
             logger.error(e)
             return render_error(request, _('Internal Server Error'))
 
+        if err_msg:
+            logger.error(err_msg)
+            return render_error(request, _('Internal Server Error'))
+
         err_msg = None
         if file_response:
             file_content, h1_head_content, outlines, err_msg = format_markdown_file_content(
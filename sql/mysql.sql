@@ -1625,3 +1625,12 @@ CREATE TABLE `org_last_active_time` (
   UNIQUE KEY `org_id` (`org_id`),
   KEY `ix_org_last_active_time_org_id` (`org_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE TABLE `user_quota_usage` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `email` varchar(255) NOT NULL,
+  `quota_usage` bigint(20) NOT NULL,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `email` (`email`),
+  KEY `ix_user_quota_usage_quota_usage` (`quota_usage`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
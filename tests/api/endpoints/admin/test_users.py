@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 import json
 
+from mock import patch
 from seaserv import ccnet_api, seafile_api
 from tests.common.utils import randstring
 from django.urls import reverse
 from seahub.constants import DEFAULT_USER, GUEST_USER
 from seahub.test_utils import BaseTestCase
+from seahub.base.models import UserQuotaUsage
 from seahub.base.templatetags.seahub_tags import email2nickname, \
         email2contact_email
 from seahub.profile.models import DetailedProfile
@@ -53,6 +55,32 @@ class AdminUsersTest(BaseTestCase):
         assert 'quota_total' in json_resp['data'][0]
         assert 'quota_usage' in json_resp['data'][0]
 
+    def test_get_users_order_by_quota_usage(self):
+        self.login_as(self.admin)
+
+        resp = self.client.get(self.url + '?order_by=quota_usage&direction=desc&per_page=2')
+        self.assertEqual(200, resp.status_code)
+
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['data']) == 2
+        assert json_resp['total_count'] >= 2
+        assert json_resp['data'][0]['quota_usage'] >= json_resp['data'][1]['quota_usage']
+        assert 'last_access_time' in json_resp['data'][0]
+
+    def test_get_users_order_by_quota_usage_not_refreshed(self):
+        # users created since the last refresh are listed too
+        self.login_as(self.admin)
+        UserQuotaUsage.objects.all().delete()
+
+        with patch('seahub.utils.user_quota_usage._refresh_if_stale'):
+            resp = self.client.get(self.url + '?order_by=quota_usage&direction=asc')
+        self.assertEqual(200, resp.status_code)
+
+        json_resp = json.loads(resp.content)
+        emails = [u['email'] for u in json_resp['data']]
+        assert self.user.username in emails
+        assert json_resp['total_count'] >= 2
+
     def test_get_with_invalid_user_permission(self):
         self.login_as(self.user)
 
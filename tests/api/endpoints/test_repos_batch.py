@@ -100,6 +100,33 @@ class ReposBatchViewTest(BaseTestCase):
 
         self.remove_repo(tmp_repo_id)
 
+    def test_can_unshare_repos_from_user(self):
+        self.login_as(self.user)
+        not_exist_repo_id = '00000000-0000-0000-0000-000000000000'
+
+        data = {
+            'operation': 'share',
+            'share_type': 'user',
+            'username': self.admin_name,
+            'repo_id': [self.repo_id, not_exist_repo_id]
+        }
+        resp = self.client.post(self.url, data)
+        json_resp = json.loads(resp.content)
+        assert [e['repo_id'] for e in json_resp['success']] == [self.repo_id]
+        assert [e['repo_id'] for e in json_resp['failed']] == [not_exist_repo_id]
+
+        data['operation'] = 'unshare'
+        resp = self.client.post(self.url, data)
+        self.assertEqual(200, resp.status_code)
+        json_resp = json.loads(resp.content)
+        assert [e['repo_id'] for e in json_resp['success']] == [self.repo_id]
+
+        # unshare again will failed
+        resp = self.client.post(self.url, data)
+        json_resp = json.loads(resp.content)
+        assert len(json_resp['success']) == 0
+        assert len(json_resp['failed']) == 2
+
     def test_share_with_invalid_operation(self):
         self.login_as(self.user)
 
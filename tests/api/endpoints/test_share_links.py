@@ -479,3 +479,51 @@ class ShareLinkTest(BaseTestCase):
         self.assertEqual(200, resp.status_code)
 
         assert not FileShare.objects.filter(token=token)
+
+
+class ShareLinksCleanInvalidTest(BaseTestCase):
+
+    def setUp(self):
+        self.url = reverse('api-v2.1-share-links-clean-invalid')
+
+    def tearDown(self):
+        self.remove_repo()
+
+    def test_clean_invalid(self):
+        self.login_as(self.user)
+
+        valid_file = FileShare.objects.create_file_link(
+            self.user.username, self.repo.id, self.file)
+        valid_dir = FileShare.objects.create_dir_link(
+            self.user.username, self.repo.id, self.folder)
+        valid_root = FileShare.objects.create_dir_link(
+            self.user.username, self.repo.id, '/')
+        FileShare.objects.create_file_link(
+            self.user.username, self.repo.id, '/not-exist.md')
+        FileShare.objects.create_file_link(
+            self.user.username, '00000000-0000-0000-0000-000000000000', self.file)
+
+        resp = self.client.delete(self.url)
+        self.assertEqual(200, resp.status_code)
+
+        tokens = set(FileShare.objects.values_list('token', flat=True))
+        assert tokens == {valid_file.token, valid_dir.token, valid_root.token}
+
+    def test_clean_invalid_keeps_links_on_rpc_error(self):
+        self.login_as(self.user)
+
+        FileShare.objects.create_file_link(
+            self.user.username, self.repo.id, self.file)
+        FileShare.objects.create_dir_link(
+            self.user.username, self.repo.id, self.folder)
+
+        with patch('seahub.share.link_batch.seafile_api') as mock_api:
+            mock_api.get_dirent_by_path.side_effect = Exception('rpc error')
+            mock_api.list_dir_by_path.side_effect = Exception('rpc error')
+            mock_api.get_file_id_by_path.side_effect = Exception('rpc error')
+            mock_api.get_dir_id_by_path.side_effect = Exception('rpc error')
+
+            resp = self.client.delete(self.url)
+
+        self.assertEqual(500, resp.status_code)
+        assert FileShare.objects.count() == 2
@@ -0,0 +1,59 @@
+import json
+
+from django.urls import reverse
+from seaserv import seafile_api
+
+from seahub.test_utils import BaseTestCase
+
+
+class TaggedFilesViewTest(BaseTestCase):
+
+    def setUp(self):
+        self.login_as(self.user)
+
+        resp = self.client.post(reverse('api-v2.1-repo-tags', args=[self.repo.id]),
+                                {'name': 'tag', 'color': '#fff'})
+        self.repo_tag_id = json.loads(resp.content)['repo_tag']['repo_tag_id']
+
+        self.file_names = []
+        for i in range(3):
+            file_name = 'tagged_%d.md' % i
+            self.create_file(repo_id=self.repo.id, parent_dir=self.folder,
+                             filename=file_name, username=self.user.username)
+            self.client.post(reverse('api-v2.1-file-tags', args=[self.repo.id]),
+                             {'file_path': self.folder + '/' + file_name,
+                              'repo_tag_id': self.repo_tag_id})
+            self.file_names.append(file_name)
+
+        self.url = reverse('api-v2.1-tagged-files',
+                           args=[self.repo.id, self.repo_tag_id])
+
+    def test_can_list(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(200, resp.status_code)
+
+        json_resp = json.loads(resp.content)
+        assert [f['filename'] for f in json_resp['tagged_files']] == self.file_names
+        assert json_resp['tagged_files'][0]['parent_path'] == self.folder
+        assert json_resp['tagged_files'][0]['modifier_email'] == self.user.username
+        assert 'has_next_page' not in json_resp
+
+    def test_can_paginate(self):
+        resp = self.client.get(self.url + '?page=1&per_page=2')
+        json_resp = json.loads(resp.content)
+        assert [f['filename'] for f in json_resp['tagged_files']] == self.file_names[:2]
+        assert json_resp['has_next_page'] is True
+
+        resp = self.client.get(self.url + '?page=2&per_page=2')
+        json_resp = json.loads(resp.content)
+        assert [f['filename'] for f in json_resp['tagged_files']] == self.file_names[2:]
+        assert json_resp['has_next_page'] is False
+
+    def test_deleted_file(self):
+        seafile_api.del_file(self.repo.id, self.folder,
+                             json.dumps([self.file_names[0]]), self.user.username)
+
+        resp = self.client.get(self.url)
+        json_resp = json.loads(resp.content)
+        assert json_resp['tagged_files'][0]['file_deleted'] is True
+        assert json_resp['tagged_files'][1]['filename'] == self.file_names[1]
@@ -39,3 +39,16 @@ class ThrottingsTest(BaseTestCase):
             assert res.status_code == 200
 
             time.sleep(0.1)
+
+    @patch.object(SimpleRateThrottle, 'get_rate')
+    def test_window_engine(self, mock_get_rate):
+        mock_get_rate.return_value = 'window:10/hour'
+
+        for i in range(12):
+            res = self.client.get(reverse('api2-pub-repos'))
+            if i >= 10:
+                assert res.status_code == 429
+            else:
+                assert res.status_code == 200
+
+            time.sleep(0.1)
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from seahub.api2.authentication import TokenAuthentication, \
+    DeviceRemoteWipedException
+from seahub.api2.models import TokenV2, get_token_auth_cache_key
+from seahub.base.accounts import User
+from seahub.constants import DEFAULT_USER, GUEST_USER
+from seahub.test_utils import BaseTestCase
+
+
+class TokenAuthCacheTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        self.token = TokenV2.objects.get_or_create_token(
+            self.user.username, 'ios', 'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa',
+            'fake device name', '1.0.0', '0.0.1', '127.0.0.1')
+        self.request = RequestFactory().get(
+            '/foo/', HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def tearDown(self):
+        TokenV2.objects.all().delete()
+        User.objects.update_role(self.user.username, DEFAULT_USER)
+        user = User.objects.get(email=self.user.username)
+        user.is_staff = False
+        user.save()
+
+    def test_auth_info_is_cached(self):
+        user, token = TokenAuthentication().authenticate(self.request)
+        assert user.username == self.user.username
+        assert token.key == self.token.key
+
+        auth_info = cache.get(get_token_auth_cache_key(self.token.key))
+        assert auth_info['version'] == 2
+        assert auth_info['user']['email'] == self.user.username
+
+    def test_cache_is_cleared_when_token_deleted(self):
+        TokenAuthentication().authenticate(self.request)
+
+        TokenV2.objects.delete_device_token(
+            self.token.user, self.token.platform, self.token.device_id)
+        assert cache.get(get_token_auth_cache_key(self.token.key)) is None
+
+    def test_cache_is_cleared_when_remote_wiped(self):
+        TokenAuthentication().authenticate(self.request)
+
+        TokenV2.objects.mark_device_to_be_remote_wiped(
+            self.token.user, self.token.platform, self.token.device_id)
+        assert cache.get(get_token_auth_cache_key(self.token.key)) is None
+
+        with self.assertRaises(DeviceRemoteWipedException):
+            TokenAuthentication().authenticate(self.request)
+
+    def test_password_hash_is_not_cached(self):
+        user, _ = TokenAuthentication().authenticate(self.request)
+
+        auth_info = cache.get(get_token_auth_cache_key(self.token.key))
+        assert 'enc_password' not in auth_info['user']
+        assert user.enc_password == User.objects.get(email=self.user.username).enc_password
+
+    def test_cache_is_cleared_when_user_updated(self):
+        TokenAuthentication().authenticate(self.request)
+
+        user = User.objects.get(email=self.user.username)
+        user.is_staff = True
+        user.save()
+        assert cache.get(get_token_auth_cache_key(self.token.key)) is None
+
+        user, _ = TokenAuthentication().authenticate(self.request)
+        assert user.is_staff
+
+        User.objects.update_role(self.user.username, GUEST_USER)
+        assert cache.get(get_token_auth_cache_key(self.token.key)) is None
+
+        user, _ = TokenAuthentication().authenticate(self.request)
+        assert user.role == GUEST_USER
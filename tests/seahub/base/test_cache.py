@@ -0,0 +1,76 @@
+import time
+
+from django.test import SimpleTestCase
+
+from seahub.base.cache import TieredCache, LocalLRUCache
+
+
+def make_cache(**options):
+    options.setdefault('L2', {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-cache-test-%s' % time.time(),
+    })
+    return TieredCache('', {'OPTIONS': options})
+
+
+class LocalLRUCacheTest(SimpleTestCase):
+
+    def test_evict_least_recently_used(self):
+        lru = LocalLRUCache(2)
+        lru.set('a', 1, 10)
+        lru.set('b', 2, 10)
+        assert lru.get('a') == (True, 1)
+
+        lru.set('c', 3, 10)
+        assert lru.get('b') == (False, None)
+        assert lru.get('a') == (True, 1)
+        assert len(lru) == 2
+
+    def test_expire(self):
+        lru = LocalLRUCache(2)
+        lru.set('a', 1, 0.01)
+        time.sleep(0.02)
+        assert lru.get('a') == (False, None)
+
+
+class TieredCacheTest(SimpleTestCase):
+
+    def test_get_from_l1_and_l2(self):
+        cache = make_cache()
+        cache.set('NICKNAME_a', 'a')
+        assert cache.get('NICKNAME_a') == 'a'
+
+        # value set by another worker is read from L2
+        cache.l2.set('NICKNAME_b', 'b')
+        assert cache.get_many(['NICKNAME_a', 'NICKNAME_b', 'x']) == \
+            {'NICKNAME_a': 'a', 'NICKNAME_b': 'b'}
+        assert cache.l1.get(cache.make_key('NICKNAME_b'))[0] is True
+
+        cache.delete('NICKNAME_a')
+        assert cache.get('NICKNAME_a') is None
+
+    def test_throttle_keys_not_in_l1(self):
+        cache = make_cache()
+        cache.set('throttle_user_1', [1])
+        assert len(cache.l1) == 0
+        assert cache.get('throttle_user_1') == [1]
+
+    def test_prefix_timeouts(self):
+        cache = make_cache(PREFIX_TIMEOUTS={'CONTACT_': 0})
+        cache.set('CONTACT_a', 'a', 60)
+        assert cache.get('CONTACT_a') is None
+
+        assert cache.set_many({'CONTACT_b': 'b', 'NICKNAME_b': 'b'}, 60) == []
+        assert cache.get_many(['CONTACT_b', 'NICKNAME_b']) == {'NICKNAME_b': 'b'}
+
+    def test_incr(self):
+        cache = make_cache()
+        cache.set('counter', 1)
+        assert cache.incr('counter') == 2
+        assert cache.get('counter') == 2
+
+    def test_add(self):
+        cache = make_cache()
+        assert cache.add('a', 1) is True
+        assert cache.add('a', 2) is False
+        assert cache.get('a') == 1
@@ -1,6 +1,6 @@
 import hashlib
 
-from seahub.base.models import FileComment, ClientSSOToken
+from seahub.base.models import FileComment, ClientSSOToken, UserQuotaUsage
 from seahub.test_utils import BaseTestCase
 from seahub.tags.models import FileUUIDMap
 
@@ -97,3 +97,15 @@ class ClientSSOTokenManagerTest(BaseTestCase):
         assert len(t.token) == 60
         assert t.created_at is not None
         assert t.api_key is None
+
+
+class UserQuotaUsageManagerTest(BaseTestCase):
+    def test_update_usages(self):
+        assert UserQuotaUsage.objects.update_usages(
+            {'a@test.com': 10, 'b@test.com': -1, 'c@test.com': 30}) == (3, 0, 0)
+
+        assert UserQuotaUsage.objects.update_usages(
+            {'a@test.com': 10, 'b@test.com': 20, 'd@test.com': 0}) == (1, 1, 1)
+
+        usages = dict(UserQuotaUsage.objects.values_list('email', 'quota_usage'))
+        assert usages == {'a@test.com': 10, 'b@test.com': 20, 'd@test.com': 0}
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from mock import patch
+
+from seahub.avatar.settings import AVATAR_DEFAULT_SIZE
+from seahub.avatar.util import get_cache_key
+from seahub.profile.models import Profile
+from seahub.profile.settings import NICKNAME_CACHE_PREFIX
+from seahub.profile.utils import UserInfoResolver
+from seahub.test_utils import BaseTestCase
+from seahub.utils import normalize_cache_key
+
+
+class UserInfoResolverTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        Profile.objects.add_or_update(self.user.username, nickname='test nickname',
+                                      contact_email='contact@test.com')
+
+    def test_resolve(self):
+        resolver = UserInfoResolver()
+        result = resolver.resolve([self.user.username, self.admin.username, ''],
+                                  with_id=True, with_avatar=True)
+
+        assert len(result) == 2
+        assert result[self.user.username]['name'] == 'test nickname'
+        assert result[self.user.username]['contact_email'] == 'contact@test.com'
+        assert result[self.user.username]['id'] == self.user.id
+        assert 'avatar_url' in result[self.user.username]
+        assert result[self.admin.username]['name'] == self.admin.username.split('@')[0]
+        assert result[self.admin.username]['contact_email'] == self.admin.username
+
+        key = normalize_cache_key(self.user.username, NICKNAME_CACHE_PREFIX)
+        assert cache.get(key) == 'test nickname'
+
+    def test_memo(self):
+        resolver = UserInfoResolver()
+        assert resolver.get_nickname(self.user.username) == 'test nickname'
+
+        Profile.objects.add_or_update(self.user.username, nickname='new nickname')
+        assert resolver.get_nickname(self.user.username) == 'test nickname'
+
+    def test_for_request(self):
+        resolver = UserInfoResolver.for_request(self.fake_request)
+        assert UserInfoResolver.for_request(self.fake_request) is resolver
+
+    @patch('seahub.profile.utils.CcnetDB.get_user_ids', side_effect=Exception('db error'))
+    def test_resolve_id_if_ccnet_db_failed(self, mock_get_user_ids):
+        resolver = UserInfoResolver()
+        assert resolver.get_id(self.user.username) == self.user.id
+        assert resolver.get_id('not-exist@test.com') == -1
+
+    def test_avatar_url_is_cached(self):
+        resolver = UserInfoResolver()
+        resolver.resolve([self.user.username, self.admin.username], with_avatar=True)
+
+        key = get_cache_key(self.user.username, AVATAR_DEFAULT_SIZE, 'api_avatar_url')
+        assert cache.get(key)[0] == resolver.get_avatar_url(self.user.username)
@@ -0,0 +1,45 @@
+"""Fake seafevents modules, for tests of metadata code to run where
+seafevents is not installed.
+"""
+import sys
+from types import ModuleType, SimpleNamespace
+
+from mock import patch, MagicMock
+
+
+def _column(name):
+    return SimpleNamespace(name=name, key=name, to_dict=lambda: {'name': name})
+
+
+METADATA_TABLE = SimpleNamespace(id='0001', name='Table1', columns=SimpleNamespace(
+    id=_column('_id'),
+    parent_dir=_column('_parent_dir'),
+    is_dir=_column('_is_dir'),
+    file_name=_column('_name'),
+    face_vectors=_column('_face_vectors'),
+    ocr=_column('_ocr'),
+))
+
+
+def patch_seafevents(testcase):
+    """Fake seafevents modules until the end of ``testcase``. Return the
+    fake ``seafevents.repo_metadata.utils``, whose functions are mocks.
+    """
+    constants = ModuleType('seafevents.repo_metadata.constants')
+    constants.METADATA_TABLE = METADATA_TABLE
+    constants.TAGS_TABLE = SimpleNamespace()
+    constants.PrivatePropertyKeys = SimpleNamespace(TAGS='_tags')
+    constants.PropertyTypes = SimpleNamespace(DATE='date', SINGLE_SELECT='single-select')
+
+    utils = ModuleType('seafevents.repo_metadata.utils')
+    utils.gen_view_data_sql = MagicMock()
+
+    modules = patch.dict(sys.modules, {
+        'seafevents': ModuleType('seafevents'),
+        'seafevents.repo_metadata': ModuleType('seafevents.repo_metadata'),
+        'seafevents.repo_metadata.constants': constants,
+        'seafevents.repo_metadata.utils': utils,
+    })
+    modules.start()
+    testcase.addCleanup(modules.stop)
+    return utils
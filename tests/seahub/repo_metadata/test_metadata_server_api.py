@@ -0,0 +1,186 @@
+from concurrent.futures import Future
+
+import jwt
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from mock import patch
+
+from seahub.repo_metadata import metadata_server_api
+from seahub.repo_metadata.metadata_server_api import MetadataServerAPI, \
+    gen_jwt_token, get_session, encode_cursor, decode_cursor, get_next_cursor, \
+    split_view_sql, list_metadata_view_records_by_cursor
+from tests.seahub.repo_metadata.fake_seafevents import patch_seafevents
+
+
+class MetadataServerAPITest(SimpleTestCase):
+    def test_jwt_is_reused(self):
+        token = gen_jwt_token('base-1', 'a@a.com')
+        assert gen_jwt_token('base-1', 'a@a.com') == token
+        assert gen_jwt_token('base-1', 'b@b.com') != token
+        assert MetadataServerAPI('base-1', 'a@a.com').headers == \
+            {'Authorization': 'Bearer %s' % token}
+
+        payload = jwt.decode(token, options={'verify_signature': False})
+        assert payload['base_id'] == 'base-1'
+        assert payload['user'] == 'a@a.com'
+
+    def test_jwt_is_renewed_before_expiration(self):
+        token = gen_jwt_token('base-2', 'a@a.com')
+        exp = int(metadata_server_api.time.time()) + \
+            metadata_server_api.JWT_RENEW_MARGIN - 1
+        metadata_server_api._jwt_cache[('base-2', 'a@a.com')] = (token, exp)
+
+        gen_jwt_token('base-2', 'a@a.com')
+        _, new_exp = metadata_server_api._jwt_cache[('base-2', 'a@a.com')]
+        assert new_exp > exp
+
+    def test_session_is_shared(self):
+        assert get_session() is get_session()
+        assert MetadataServerAPI('base-1', 'a@a.com').session is get_session()
+
+
+class TableSchemaCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.api = MetadataServerAPI('base-3', 'a@a.com')
+        self.columns = [{'key': '_name', 'name': '_name', 'type': 'text'}]
+
+    @patch.object(MetadataServerAPI, 'list_columns')
+    def test_columns_are_cached(self, mock_list_columns):
+        mock_list_columns.return_value = {'columns': self.columns}
+        with patch('seahub.repo_metadata.metadata_server_api.gen_query_projection',
+                   return_value='`_name`'):
+            assert self.api.get_table_schema('0001')['columns'] == self.columns
+            schema = self.api.get_table_schema('0001')
+
+        assert schema['projection'] == '`_name`'
+        assert mock_list_columns.call_count == 1
+
+    @patch.object(MetadataServerAPI, 'list_columns')
+    def test_cache_is_cleared_when_schema_changed(self, mock_list_columns):
+        mock_list_columns.return_value = {'columns': self.columns}
+        with patch('seahub.repo_metadata.metadata_server_api.gen_query_projection',
+                   return_value='`_name`'):
+            self.api.get_table_schema('0001')
+            version = self.api.get_schema_version()
+            self.api.bump_schema_version()
+            assert self.api.get_schema_version() > version
+
+            self.api.get_table_schema('0001')
+
+        assert mock_list_columns.call_count == 2
+
+
+class CursorTest(SimpleTestCase):
+    def test_decode_cursor(self):
+        assert decode_cursor('') == {}
+        assert decode_cursor(encode_cursor({'offset': 10})) == {'offset': 10}
+        assert decode_cursor(encode_cursor({'key': ['/', True, 'a']})) == \
+            {'key': ['/', True, 'a']}
+
+        assert decode_cursor('not a cursor') is None
+        assert decode_cursor(encode_cursor([1, 2])) is None
+        assert decode_cursor(encode_cursor({'offset': -1})) is None
+        assert decode_cursor(encode_cursor({'key': ['/']})) is None
+
+    def test_next_cursor_by_offset(self):
+        results = [{'_id': str(i)} for i in range(10)]
+        assert decode_cursor(get_next_cursor(results, 10, {'offset': 20})) == \
+            {'offset': 30}
+
+        # last page
+        assert get_next_cursor(results[:5], 10, {'offset': 20}) is None
+        assert get_next_cursor([], 10, {}) is None
+
+
+class FakeViewMetadataServerAPI(object):
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def submit(self, method_name, *args):
+        future = Future()
+        future.set_result({'columns': [], 'projection': '`_id`, `_name`'})
+        return future
+
+    def query_rows(self, sql, parameters=[]):
+        self.queries.append((sql, parameters))
+        return {'results': self.results}
+
+
+class ViewRecordsByCursorTest(SimpleTestCase):
+    def setUp(self):
+        self.gen_view_data_sql = patch_seafevents(self).gen_view_data_sql
+
+        self.results = [
+            {'_id': '1', '_parent_dir': '/', '_is_dir': True, '_name': 'a'},
+            {'_id': '2', '_parent_dir': '/a', '_is_dir': False, '_name': 'b.md'},
+        ]
+        self.api = FakeViewMetadataServerAPI(self.results)
+        api_patch = patch('seahub.repo_metadata.metadata_server_api.MetadataServerAPI',
+                          return_value=self.api)
+        api_patch.start()
+        self.addCleanup(api_patch.stop)
+
+        self.order_sql = ' ORDER BY `_parent_dir` ASC, `_is_dir` DESC, `_name` ASC'
+
+    def test_split_view_sql(self):
+        sql = 'SELECT * FROM `Table1` WHERE `_name` = "a ORDER BY b" ' \
+            'GROUP BY `_suffix` ORDER BY `_mtime` DESC LIMIT 0, 100;'
+        assert split_view_sql(sql) == {
+            'SELECT': 'SELECT * FROM `Table1`',
+            'WHERE': '`_name` = "a ORDER BY b"',
+            'GROUP BY': '`_suffix`',
+            'ORDER BY': '`_mtime` DESC',
+            'LIMIT': '0, 100',
+        }
+        assert split_view_sql('SELECT * FROM `Table1` LIMIT 0, 100') == {
+            'SELECT': 'SELECT * FROM `Table1`', 'LIMIT': '0, 100'}
+
+    def test_filtered_view(self):
+        view = {'basic_filters': [], 'filters': [{'column_key': '_name'}]}
+        self.gen_view_data_sql.return_value = \
+            'SELECT * FROM `Table1` WHERE `_name` like "%a LIMIT 1%" OR `_size` > 10 ' \
+            'ORDER BY `_ctime` ASC LIMIT 0, 2'
+
+        # first page
+        result = list_metadata_view_records_by_cursor('repo-1', 'a@a.com', view, False, {}, 2)
+        assert self.api.queries[-1] == (
+            'SELECT `_id`, `_name` FROM `Table1` '
+            'WHERE (`_name` like "%a LIMIT 1%" OR `_size` > 10)' + self.order_sql + ' LIMIT 0, 2;', [])
+        assert decode_cursor(result['next_cursor']) == {'key': ['/a', False, 'b.md']}
+
+        # next page, after the key in the cursor
+        result = list_metadata_view_records_by_cursor(
+            'repo-1', 'a@a.com', view, False, decode_cursor(result['next_cursor']), 2)
+        assert self.api.queries[-1] == (
+            'SELECT `_id`, `_name` FROM `Table1` '
+            'WHERE (`_parent_dir` > ? OR (`_parent_dir` = ? AND `_is_dir` = ? AND `_name` > ?)) '
+            'AND (`_name` like "%a LIMIT 1%" OR `_size` > 10)' + self.order_sql + ' LIMIT 0, 2;',
+            ['/a', '/a', False, 'b.md'])
+
+    def test_view_without_filters(self):
+        self.gen_view_data_sql.return_value = 'SELECT * FROM `Table1` LIMIT 0, 2'
+        list_metadata_view_records_by_cursor('repo-1', 'a@a.com', {}, False,
+                                             {'key': ['/', True, 'a']}, 2)
+        assert self.api.queries[-1] == (
+            'SELECT `_id`, `_name` FROM `Table1` '
+            'WHERE (`_parent_dir` > ? OR (`_parent_dir` = ? AND '
+            '(`_is_dir` = ? OR (`_is_dir` = ? AND `_name` > ?))))' + self.order_sql + ' LIMIT 0, 2;',
+            ['/', '/', False, True, 'a'])
+
+    def test_sorted_view(self):
+        view = {'sorts': [{'column_key': '_mtime', 'sort_type': 'down'}]}
+        sql = 'SELECT * FROM `Table1` WHERE `_name` = "a" ORDER BY `_mtime` DESC LIMIT 2, 2'
+        self.gen_view_data_sql.return_value = sql
+
+        result = list_metadata_view_records_by_cursor('repo-1', 'a@a.com', view, False,
+                                                      {'offset': 2}, 2)
+        assert self.gen_view_data_sql.call_args[0][3:5] == (2, 2)
+        assert self.api.queries[-1] == (sql.replace('*', '`_id`, `_name`'), [])
+        assert decode_cursor(result['next_cursor']) == {'offset': 4}
+
+        # a key of a view whose sorts are changed is not used
+        list_metadata_view_records_by_cursor('repo-1', 'a@a.com', view, False,
+                                             {'key': ['/', True, 'a']}, 2)
+        assert self.gen_view_data_sql.call_args[0][3:5] == (0, 2)
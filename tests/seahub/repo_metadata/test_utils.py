@@ -0,0 +1,65 @@
+from django.test import SimpleTestCase
+from mock import patch
+
+from seahub.repo_metadata.utils import update_records, RECORD_UPDATED, \
+    RECORD_UNCHANGED, RECORD_NOT_FOUND, RECORD_FAILED
+from tests.seahub.repo_metadata.fake_seafevents import patch_seafevents
+
+
+class FakeMetadataServerAPI(object):
+    def __init__(self, existing_ids, fail_on=None):
+        self.existing_ids = existing_ids
+        self.fail_on = fail_on
+        self.queries = []
+        self.updated_rows = []
+
+    def query_rows(self, sql, params=[]):
+        self.queries.append((sql, params))
+        return {'results': [{'_id': i} for i in params if i in self.existing_ids]}
+
+    def update_rows(self, table_id, rows):
+        if self.fail_on and any(row['_id'] == self.fail_on for row in rows):
+            raise ConnectionError(500, 'error')
+        self.updated_rows.extend(rows)
+
+
+class UpdateRecordsTest(SimpleTestCase):
+    def setUp(self):
+        patch_seafevents(self)
+        columns_patch = patch('seahub.repo_metadata.utils.get_unmodifiable_columns',
+                              return_value=[])
+        columns_patch.start()
+        self.addCleanup(columns_patch.stop)
+        self.columns = [{'key': '0001', 'name': 'note', 'type': 'text'}]
+
+    @patch('seahub.repo_metadata.utils.RECORDS_CHUNK_SIZE', 2)
+    def test_update_records(self):
+        api = FakeMetadataServerAPI({'a', 'b', 'c'})
+        record_status = update_records(api, {
+            'a': {'note': 'a'},
+            'b': {'note': 'b'},
+            'c': {'unknown': 'c'},
+            'd': {'note': 'd'},
+        }, self.columns)
+
+        assert record_status == {
+            'a': RECORD_UPDATED,
+            'b': RECORD_UPDATED,
+            'c': RECORD_UNCHANGED,
+            'd': RECORD_NOT_FOUND,
+        }
+        # looked up by chunks of IN (...) queries
+        assert len(api.queries) == 2
+        assert 'IN (?, ?)' in api.queries[0][0]
+        assert {row['_id']: row['note'] for row in api.updated_rows} == \
+            {'a': 'a', 'b': 'b'}
+
+    @patch('seahub.repo_metadata.utils.RECORDS_CHUNK_SIZE', 1)
+    def test_failed_chunk(self):
+        api = FakeMetadataServerAPI({'a', 'b'}, fail_on='b')
+        record_status = update_records(api, {
+            'a': {'note': 'a'},
+            'b': {'note': 'b'},
+        }, self.columns)
+
+        assert record_status == {'a': RECORD_UPDATED, 'b': RECORD_FAILED}
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+from mock import patch
+
+from seahub.seadoc import asset_cache
+
+
+class AssetCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        patchers = [
+            patch.object(asset_cache, 'SEADOC_ASSET_CACHE_ROOT', self.root),
+            # 1MB
+            patch.object(asset_cache, 'SEADOC_ASSET_CACHE_SIZE', 1),
+            patch.object(asset_cache, 'stream_asset',
+                         lambda repo_id, obj_id, filename, username: [b'x' * 300 * 1024]),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def set_mtime(self, obj_id, mtime):
+        os.utime(asset_cache.get_asset_cache_path(obj_id), (mtime, mtime))
+
+    def test_fetch_and_open(self):
+        assert asset_cache.open_cached_asset('a' * 40) is None
+
+        with asset_cache.fetch_asset('repo_id', 'a' * 40, 'a.png', 'user') as f:
+            assert len(f.read()) == 300 * 1024
+
+        with asset_cache.open_cached_asset('a' * 40) as f:
+            assert len(f.read()) == 300 * 1024
+
+    def test_fetch_closes_file_on_failure(self):
+        opened = []
+
+        def fake_open(*args, **kwargs):
+            f = open(*args, **kwargs)
+            opened.append(f)
+            return f
+
+        with patch('seahub.seadoc.asset_cache.open', fake_open, create=True), \
+                patch.object(asset_cache.os, 'replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                asset_cache.fetch_asset('repo_id', 'a' * 40, 'a.png', 'user')
+
+        assert opened and all(f.closed for f in opened)
+        # the temporary file is removed
+        assert not os.listdir(os.path.dirname(asset_cache.get_asset_cache_path('a' * 40)))
+
+    def test_evict_least_recently_used(self):
+        for i, obj_id in enumerate(['a' * 40, 'b' * 40, 'c' * 40, 'd' * 40]):
+            asset_cache.fetch_asset('repo_id', obj_id, 'a.png', 'user').close()
+            self.set_mtime(obj_id, 1000 + i)
+
+        # reading "a" makes it the most recently used
+        asset_cache.open_cached_asset('a' * 40).close()
+        asset_cache.evict_assets()
+
+        assert os.path.exists(asset_cache.get_asset_cache_path('a' * 40))
+        assert not os.path.exists(asset_cache.get_asset_cache_path('b' * 40))
+        assert os.path.exists(asset_cache.get_asset_cache_path('c' * 40))
+        assert os.path.exists(asset_cache.get_asset_cache_path('d' * 40))
+
+    def test_can_cache_asset(self):
+        assert asset_cache.can_cache_asset(100 * 1024)
+        assert not asset_cache.can_cache_asset(200 * 1024)
+        assert not asset_cache.can_cache_asset(0)
@@ -1,4 +1,9 @@
-from seahub.share.models import FileShare
+from django.core.cache import cache
+from mock import patch
+
+from seahub.share import models as share_models
+from seahub.share.models import FileShare, UploadLinkShare, \
+    get_share_link_by_token, get_share_link_token_cache_key
 from seahub.test_utils import BaseTestCase
 from seahub.utils import gen_token
 
@@ -52,3 +57,39 @@ class FileShareTest(BaseTestCase):
             token=gen_token(10))
 
         assert fs.is_file_share_link() is True
+
+
+@patch.object(share_models, 'SHARE_LINK_TOKEN_CACHE_TIMEOUT', 60)
+class GetShareLinkByTokenTest(BaseTestCase):
+
+    def setUp(self):
+        self.fs = FileShare.objects.create_file_link(
+            self.user.username, self.repo.id, self.file)
+        self.uls = UploadLinkShare.objects.create_upload_link_share(
+            self.user.username, self.repo.id, self.folder)
+
+    def tearDown(self):
+        cache.delete_many([get_share_link_token_cache_key(t)
+                           for t in ('unknown', self.fs.token, self.uls.token)])
+
+    def test_resolve(self):
+        link, is_upload_link = get_share_link_by_token(self.fs.token)
+        assert link.pk == self.fs.pk and is_upload_link is False
+
+        link, is_upload_link = get_share_link_by_token(self.uls.token)
+        assert link.pk == self.uls.pk and is_upload_link is True
+
+        assert get_share_link_by_token('unknown') == (None, False)
+
+    def test_cleared_on_change(self):
+        get_share_link_by_token(self.fs.token)
+        with self.assertNumQueries(0):
+            get_share_link_by_token(self.fs.token)
+
+        self.fs.permission = FileShare.PERM_VIEW_ONLY
+        self.fs.save()
+        link, _ = get_share_link_by_token(self.fs.token)
+        assert link.permission == FileShare.PERM_VIEW_ONLY
+
+        self.fs.delete()
+        assert get_share_link_by_token(self.fs.token) == (None, False)
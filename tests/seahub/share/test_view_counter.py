@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from mock import patch
+
+from seahub.share import view_counter
+from seahub.share.models import FileShare, UploadLinkShare
+from seahub.share.view_counter import incr_view_cnt, get_view_cnt, \
+    get_view_cnts, flush_view_cnts
+from seahub.test_utils import BaseTestCase
+
+
+@patch.object(view_counter, 'SHARE_LINK_VIEW_CNT_FLUSH_INTERVAL', 30)
+@patch.object(view_counter, '_ensure_flusher', lambda: None)
+@patch.object(view_counter, 'has_atomic_counters', lambda: True)
+class ViewCounterTest(BaseTestCase):
+
+    def setUp(self):
+        self.fs = FileShare.objects.create_file_link(self.user.username,
+                                                     self.repo.id, self.file)
+        self.uls = UploadLinkShare.objects.create_upload_link_share(
+            self.user.username, self.repo.id, self.folder)
+
+    def tearDown(self):
+        flush_view_cnts()
+        cache.delete_many([view_counter._cache_key(FileShare, self.fs.pk),
+                           view_counter._cache_key(UploadLinkShare, self.uls.pk)])
+
+    def test_buffered_until_flushed(self):
+        for i in range(3):
+            incr_view_cnt(self.fs)
+        incr_view_cnt(self.uls)
+
+        assert FileShare.objects.get(pk=self.fs.pk).view_cnt == 0
+        assert get_view_cnt(FileShare.objects.get(pk=self.fs.pk)) == 3
+        assert get_view_cnts(UploadLinkShare.objects.filter(pk=self.uls.pk)) == \
+            {self.uls.pk: 1}
+
+        flush_view_cnts()
+
+        fs = FileShare.objects.get(pk=self.fs.pk)
+        assert fs.view_cnt == 3
+        assert get_view_cnt(fs) == 3
+        uls = UploadLinkShare.objects.get(pk=self.uls.pk)
+        assert uls.view_cnt == 1
+        assert get_view_cnt(uls) == 1
+
+    def test_pending_counter_expires(self):
+        incr_view_cnt(self.fs)
+
+        key = view_counter._cache_key(FileShare, self.fs.pk)
+        with patch.object(view_counter, 'cache') as mock_cache:
+            mock_cache.incr.return_value = 2
+            incr_view_cnt(self.fs)
+            mock_cache.touch.assert_called_once_with(
+                key, 30 * view_counter.PENDING_TIMEOUT_INTERVALS)
+
+    def test_negative_pending_counter_is_ignored(self):
+        cache.set(view_counter._cache_key(FileShare, self.fs.pk), -2)
+        assert get_view_cnt(FileShare.objects.get(pk=self.fs.pk)) == 0
+
+    def test_not_buffered_without_atomic_counters(self):
+        with patch.object(view_counter, 'has_atomic_counters', lambda: False):
+            incr_view_cnt(self.fs)
+            assert FileShare.objects.get(pk=self.fs.pk).view_cnt == 1
+            assert get_view_cnt(FileShare.objects.get(pk=self.fs.pk)) == 1
+
+    def test_has_atomic_counters(self):
+        from django.core.cache.backends.filebased import FileBasedCache
+        from django.core.cache.backends.locmem import LocMemCache
+        from django.core.cache.backends.redis import RedisCache
+        from seahub.base.cache import TieredCache
+
+        assert not view_counter.has_atomic_counters(FileBasedCache('/tmp/x', {}))
+        assert not view_counter.has_atomic_counters(LocMemCache('x', {}))
+        assert not view_counter.has_atomic_counters(TieredCache('x', {}))
+        assert view_counter.has_atomic_counters(RedisCache('redis://127.0.0.1:6379', {}))
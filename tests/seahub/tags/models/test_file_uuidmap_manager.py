@@ -28,4 +28,22 @@ class FileUUIDMapManagerTest(BaseTestCase):
         assert None == FileUUIDMap.objects.get_fileuuidmap_by_path(*args)
         uuidmap_obj = FileUUIDMap.objects.get_or_create_fileuuidmap(*args)
         assert uuidmap_obj == FileUUIDMap.objects.get_fileuuidmap_by_path(*args)
-        
+
+    def test_bulk_get_or_create(self):
+        existing = FileUUIDMap.objects.get_or_create_fileuuidmap(
+            self.repo.id, '/sub', 'a.sdoc', False)
+
+        dirents = [('/sub', 'a.sdoc', False), ('/sub/', 'b.sdoc', False),
+                   ('/', 'sub', True), ('/sub', 'b.sdoc', False)]
+        with self.assertNumQueries(2):
+            uuid_maps = FileUUIDMap.objects.bulk_get_or_create(self.repo.id, dirents)
+
+        assert set(uuid_maps.keys()) == {'/sub/a.sdoc', '/sub/b.sdoc', '/sub'}
+        assert uuid_maps['/sub/a.sdoc'] == existing
+        assert uuid_maps['/sub/b.sdoc'] == FileUUIDMap.objects.get_fileuuidmap_by_path(
+            self.repo.id, '/sub', 'b.sdoc', False)
+        assert uuid_maps['/sub'].is_dir
+
+        with self.assertNumQueries(1):
+            again = FileUUIDMap.objects.bulk_get_or_create(self.repo.id, dirents)
+        assert again == uuid_maps
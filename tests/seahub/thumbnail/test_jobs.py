@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import Future
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from mock import patch, MagicMock
+
+from seahub.thumbnail import jobs
+
+
+class ThumbnailJobTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.thumbnail_dir = os.path.join(self.root, '48')
+        os.makedirs(self.thumbnail_dir)
+        self.thumbnail_file = os.path.join(self.thumbnail_dir, 'obj_id')
+        self.cache_key = jobs._get_job_cache_key('obj_id', 48)
+
+        self.pool = MagicMock()
+        patchers = [
+            patch.object(jobs, 'THUMBNAIL_ROOT', self.root),
+            patch.object(jobs, 'get_pool', return_value=self.pool),
+        ]
+        for p in patchers:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        cache.delete(self.cache_key)
+        shutil.rmtree(self.root)
+
+    def test_run(self):
+        with patch.object(jobs, 'generate_thumbnail', return_value=(True, 200)) as generate_thumbnail:
+            assert jobs.run_thumbnail_job('repo_id', 48, '/a.jpg', 'obj_id') == (True, 200)
+        assert generate_thumbnail.called
+
+    def test_submit_holds_lock_until_done(self):
+        future = Future()
+        self.pool.submit.return_value = future
+
+        assert jobs.submit_thumbnail_job('repo_id', 48, '/a.jpg', 'obj_id') is future
+        assert cache.get(self.cache_key) is not None
+        # shared in this process
+        assert jobs.submit_thumbnail_job('repo_id', 48, '/a.jpg', 'obj_id') is future
+
+        future.set_result((True, 200))
+        assert cache.get(self.cache_key) is None
+        assert self.pool.submit.call_count == 1
+
+    def test_wait_for_other_process(self):
+        cache.set(self.cache_key, 1, jobs.THUMBNAIL_JOB_TIMEOUT)
+
+        def other_process_done(seconds):
+            open(self.thumbnail_file, 'w').close()
+            cache.delete(self.cache_key)
+
+        with patch.object(jobs.time, 'sleep', other_process_done):
+            assert jobs.create_thumbnail('repo_id', 48, '/a.jpg', 'obj_id') == (True, 200)
+
+        assert not self.pool.submit.called
+
+    def test_other_process_failed(self):
+        cache.set(self.cache_key, 1, jobs.THUMBNAIL_JOB_TIMEOUT)
+
+        with patch.object(jobs.time, 'sleep', lambda seconds: cache.delete(self.cache_key)):
+            assert jobs.create_thumbnail('repo_id', 48, '/a.jpg', 'obj_id') == (False, 500)
+
+        assert not self.pool.submit.called
+
+    @patch.object(jobs, 'THUMBNAIL_PREFETCH_LIMIT', 10)
+    @patch.object(jobs, 'seafile_api')
+    def test_prefetch_lists_folder_once(self, mock_seafile_api):
+        prefetch_cache_key = jobs.normalize_cache_key('repo_id_/photos',
+                                                      jobs.PREFETCH_CACHE_PREFIX)
+        self.addCleanup(cache.delete, prefetch_cache_key)
+        mock_seafile_api.list_dir_by_path.return_value = []
+
+        jobs.prefetch_dir_thumbnails('repo_id', 48, '/photos')
+        jobs.prefetch_dir_thumbnails('repo_id', 256, '/photos')
+
+        assert mock_seafile_api.list_dir_by_path.call_count == 1
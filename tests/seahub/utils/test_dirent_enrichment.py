@@ -0,0 +1,28 @@
+from collections import namedtuple
+
+from seahub.base.models import UserStarredFiles
+from seahub.test_utils import BaseTestCase
+from seahub.utils.dirent_enrichment import enrich_dirents, StarredEnricher
+
+FakeDirent = namedtuple('FakeDirent', ['obj_id', 'obj_name', 'modifier', 'lock_owner'])
+
+
+class EnrichDirentsTest(BaseTestCase):
+    def setUp(self):
+        self.clear_cache()
+        UserStarredFiles.objects.add_starred_item(self.user.username,
+                                                  self.repo.id, '/a.md', False)
+
+    def test_can_enrich(self):
+        entries = []
+        for name in ('a.md', 'b.md'):
+            dirent = FakeDirent(name, name, self.user.username, None)
+            entries.append(({'name': name}, dirent, '/' + name))
+
+        info_list = enrich_dirents([
+            StarredEnricher(self.user.username, self.repo.id, '/'),
+        ], entries)
+
+        assert len(info_list) == 2
+        assert info_list[0]['starred'] is True
+        assert info_list[1]['starred'] is False
@@ -0,0 +1,71 @@
+import random
+
+from django.test import SimpleTestCase
+
+from seahub.utils.line_diff import intern_lines, get_opcodes, \
+    make_diff_table, count_changes
+
+
+def lcs_length(a, b):
+    prev = [0] * (len(b) + 1)
+    for x in a:
+        cur = [0]
+        for j, y in enumerate(b):
+            cur.append(prev[j] + 1 if x == y else max(prev[j + 1], cur[j]))
+        prev = cur
+    return prev[-1]
+
+
+class LineDiffTest(SimpleTestCase):
+
+    def check_opcodes(self, a, b, opcodes):
+        i = j = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            assert (i1, j1) == (i, j)
+            if tag == 'equal':
+                assert a[i1:i2] == b[j1:j2]
+            i, j = i2, j2
+        assert (i, j) == (len(a), len(b))
+
+    def test_shortest_diff(self):
+        rand = random.Random(0)
+        for _ in range(500):
+            a = [rand.randint(0, 3) for _ in range(rand.randint(0, 12))]
+            b = [rand.randint(0, 3) for _ in range(rand.randint(0, 12))]
+            opcodes = get_opcodes(a, b)
+            self.check_opcodes(a, b, opcodes)
+
+            matched = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == 'equal')
+            assert matched == lcs_length(a, b)
+
+    def test_bounded_cost(self):
+        rand = random.Random(1)
+        a = [rand.randint(0, 20) for _ in range(300)]
+        b = [rand.randint(0, 20) for _ in range(300)]
+        self.check_opcodes(a, b, get_opcodes(a, b, max_cost=2))
+
+    def test_count_changes(self):
+        a, b = intern_lines(['a', 'b', 'c', 'd'], ['a', 'x', 'c', 'd', 'e'])
+        assert count_changes(get_opcodes(a, b)) == (1, 2)
+
+    def test_make_diff_table(self):
+        old = ['line %d' % i for i in range(20)]
+        new = list(old)
+        new[10] = 'line ten'
+        table, removed, added = make_diff_table(old, new)
+
+        assert (removed, added) == (1, 1)
+        assert '<td class=diff-chg>line&nbsp;ten</td>' in table
+        # 5 lines of context around the change
+        assert '<td class="diff-header">5</td>' not in table
+        assert '<td class="diff-header">6</td>' in table
+        assert '<td class="diff-header">16</td>' in table
+        assert '<td class="diff-header">17</td>' not in table
+
+    def test_make_diff_table_too_many_changes(self):
+        old = ['line %d' % i for i in range(20)]
+        new = ['new line %d' % i for i in range(20)]
+        table, removed, added = make_diff_table(old, new, max_changed_lines=10)
+
+        assert table is None
+        assert (removed, added) == (20, 20)
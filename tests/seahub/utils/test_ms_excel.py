@@ -0,0 +1,64 @@
+import io
+
+import openpyxl
+from django.test import RequestFactory, SimpleTestCase
+
+from seahub.utils.ms_excel import write_xls, export_response
+
+
+def gen_rows(n):
+    for i in range(n):
+        yield ['user%d@example.com' % i, i]
+
+
+class MsExcelTest(SimpleTestCase):
+
+    def test_write_xls_from_generator(self):
+        wb = write_xls('users', ['Email', 'Num'], gen_rows(3))
+        f = io.BytesIO()
+        wb.save(f)
+
+        ws = openpyxl.load_workbook(f)['users']
+        assert list(ws.values) == [
+            ('Email', 'Num'),
+            ('user0@example.com', 0),
+            ('user1@example.com', 1),
+            ('user2@example.com', 2),
+        ]
+
+    def test_export_xlsx(self):
+        request = RequestFactory().get('/export/')
+        resp = export_response(request, 'users', ['Email', 'Num'], gen_rows(2), 'users')
+
+        assert 'users.xlsx' in resp['Content-Disposition']
+        ws = openpyxl.load_workbook(io.BytesIO(b''.join(resp.streaming_content))).active
+        assert ws.max_row == 3
+
+    def test_export_csv(self):
+        request = RequestFactory().get('/export/', {'format': 'csv'})
+        resp = export_response(request, 'users', ['Email', 'Num'], gen_rows(2), 'users')
+
+        assert 'users.csv' in resp['Content-Disposition']
+        content = b''.join(resp.streaming_content).decode('utf-8-sig')
+        assert content.splitlines() == [
+            'Email,Num', 'user0@example.com,0', 'user1@example.com,1']
+
+    def test_export_failed(self):
+        def gen_failed_rows():
+            yield ['user0@example.com', 0]
+            raise ValueError('rows failed')
+
+        assert write_xls('users', ['Email', 'Num'], gen_failed_rows()) is None
+
+        request = RequestFactory().get('/export/')
+        assert export_response(request, 'users', ['Email', 'Num'],
+                               gen_failed_rows(), 'users') is None
+
+    def test_export_csv_failed(self):
+        def gen_failed_rows():
+            raise ValueError('rows failed')
+            yield
+
+        request = RequestFactory().get('/export/', {'format': 'csv'})
+        assert export_response(request, 'users', ['Email', 'Num'],
+                               gen_failed_rows(), 'users') is None
@@ -0,0 +1,89 @@
+import io
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from mock import patch
+
+from seahub.utils import preview_content
+from seahub.utils.preview_content import read_file_content, \
+    get_preview_content
+
+
+def fake_urlopen(content):
+    return lambda url: io.BytesIO(content)
+
+
+class ReadFileContentTest(SimpleTestCase):
+
+    def read(self, content, file_enc='auto', max_size=1024 * 1024):
+        with patch.object(preview_content.urllib.request, 'urlopen',
+                          fake_urlopen(content)):
+            return read_file_content('http://fileserver/files/a.txt',
+                                     file_enc, max_size)
+
+    def test_utf8_cut_between_chunks(self):
+        text = 'é' * preview_content.READ_CHUNK_SIZE
+        err, content, encoding, size = self.read(text.encode('utf-8'))
+
+        assert err == ''
+        assert content == text
+        assert encoding == 'utf-8'
+        assert size == len(text.encode('utf-8'))
+
+    def test_gbk(self):
+        text = '中文内容' * 10
+        err, content, encoding, size = self.read(text.encode('gbk'))
+
+        assert err == ''
+        assert content == text
+        assert encoding == 'gbk'
+
+    def test_misleading_sample(self):
+        text = 'a' * preview_content.ENCODING_SAMPLE_SIZE * 2 + '中文'
+        err, content, encoding, size = self.read(text.encode('gbk'))
+
+        assert err == ''
+        assert content == text
+        assert encoding == 'gbk'
+
+    def test_chosen_encoding_not_proper(self):
+        err, content, encoding, size = self.read('中文'.encode('gbk'), 'utf-8')
+
+        assert err
+        assert content == ''
+
+    def test_too_large(self):
+        err, content, encoding, size = self.read(b'a' * 2048, max_size=1024)
+
+        assert err
+        assert content == ''
+
+    def test_empty(self):
+        assert self.read(b'') == ('', '', 'utf-8', 0)
+
+
+class GetPreviewContentTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    @patch('seahub.utils.preview_content.read_file_content')
+    def test_cached_by_obj_id(self, mock_read):
+        mock_read.return_value = ('', 'content', 'utf-8', 7)
+        obj_id = '1' * 40
+
+        for i in range(3):
+            assert get_preview_content(obj_id, 'auto', 'http://fileserver/a') == \
+                ('', 'content', 'utf-8')
+
+        assert mock_read.call_count == 1
+
+    @patch('seahub.utils.preview_content.read_file_content')
+    def test_error_not_cached(self, mock_read):
+        mock_read.return_value = ('Unknown file encoding', '', '', 7)
+        obj_id = '2' * 40
+
+        get_preview_content(obj_id, 'auto', 'http://fileserver/a')
+        get_preview_content(obj_id, 'auto', 'http://fileserver/a')
+
+        assert mock_read.call_count == 2
@@ -2,9 +2,13 @@ from seahub.constants import (
     PERMISSION_PREVIEW, PERMISSION_PREVIEW_EDIT,
     PERMISSION_READ, PERMISSION_READ_WRITE, PERMISSION_ADMIN
 )
-from seahub.utils.repo import get_repo_shared_users, get_repo_owner, parse_repo_perm
+from seahub.utils.repo import get_repo_shared_users, get_repo_owner, parse_repo_perm, \
+    BatchPrecheck
 from seahub.test_utils import BaseTestCase
 
+import stat
+from mock import patch, MagicMock
+
 import seaserv
 from seaserv import seafile_api, ccnet_api
 
@@ -80,3 +84,44 @@ class TestParseRepoPerm(BaseTestCase):
             assert False
         except AttributeError:
             assert True
+
+
+class BatchPrecheckTest(BaseTestCase):
+
+    def dirent(self, name, is_dir=False, lock_owner=None, permission='rw'):
+        return MagicMock(obj_name=name, is_locked=lock_owner is not None,
+                         lock_owner=lock_owner, permission=permission,
+                         mode=stat.S_IFDIR if is_dir else stat.S_IFREG)
+
+    @patch('seahub.utils.repo.seafile_api')
+    def test_check(self, mock_api):
+        mock_api.list_dir_with_perm.return_value = [
+            self.dirent('mine.md', lock_owner=self.user.username),
+            self.dirent('other.md', lock_owner='other@test.com'),
+            self.dirent('readonly', is_dir=True, permission='r'),
+            self.dirent('writable', is_dir=True),
+        ]
+        precheck = BatchPrecheck(self.fake_request, self.repo.id)
+        dirents = ['mine.md', 'other.md', 'readonly', 'writable', 'new.md']
+
+        failures = precheck.check('/', dirents,
+                                  can_change_folder=lambda perm: perm == 'rw')
+        assert failures == [
+            {'parent_dir': '/', 'name': 'other.md', 'error': BatchPrecheck.LOCKED},
+            {'parent_dir': '/', 'name': 'readonly',
+             'error': BatchPrecheck.FOLDER_PERMISSION_DENIED},
+        ]
+        assert precheck.check('/', dirents, check_lock=False) == []
+        # parent folder is listed once
+        assert mock_api.list_dir_with_perm.call_count == 1
+
+    @patch('seahub.utils.repo.seafile_api')
+    def test_check_paths(self, mock_api):
+        mock_api.list_dir_with_perm.return_value = [
+            self.dirent('other.md', lock_owner='other@test.com')]
+        precheck = BatchPrecheck(self.fake_request, self.repo.id)
+
+        failures = precheck.check_paths(['/a/other.md', '/a/b.md', '/c/other.md'])
+        assert [f['parent_dir'] for f in failures] == ['/a', '/c']
+        assert mock_api.list_dir_with_perm.call_count == 2
+
@@ -0,0 +1,128 @@
+from django.test import SimpleTestCase
+from mock import patch, MagicMock
+
+from seahub.signals import repo_renamed, repo_deleted
+from seahub.utils import repo_cache
+from seahub.utils.repo_cache import get_repo_meta, invalidate_repo_meta, \
+    start_request_cache, end_request_cache
+
+REPO_ID = '7e1c6ab3-4b8c-4e5c-9f3a-2f6b1c2d3e4f'
+
+
+class RepoCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        invalidate_repo_meta(REPO_ID)
+        self.token = start_request_cache()
+
+    def tearDown(self):
+        end_request_cache(self.token)
+        invalidate_repo_meta(REPO_ID)
+
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_fetched_once_per_request(self, mock_api):
+        mock_api.get_repo.return_value = MagicMock(is_virtual=False)
+        mock_api.get_repo_status.return_value = 0
+
+        for i in range(3):
+            assert get_repo_meta(REPO_ID).repo is mock_api.get_repo.return_value
+            assert get_repo_meta(REPO_ID).status == 0
+            assert get_repo_meta(REPO_ID).origin == (REPO_ID, None)
+
+        assert mock_api.get_repo.call_count == 1
+        assert mock_api.get_repo_status.call_count == 1
+        # 2 rpcs made, 7 saved: 2 + 2 for repo and status, 3 for origin
+        assert end_request_cache(self.token) == (2, 7)
+        self.token = start_request_cache()
+
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_virtual_origin(self, mock_api):
+        mock_api.get_repo.return_value = MagicMock(
+            is_virtual=True, origin_repo_id='origin', origin_path='/sub')
+
+        assert get_repo_meta(REPO_ID).origin == ('origin', '/sub')
+
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_missing_repo_cached(self, mock_api):
+        mock_api.get_repo.return_value = None
+
+        assert get_repo_meta(REPO_ID).repo is None
+        assert get_repo_meta(REPO_ID).repo is None
+        assert mock_api.get_repo.call_count == 1
+
+    def _next_request(self):
+        end_request_cache(self.token)
+        self.token = start_request_cache()
+
+    @patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 10)
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_repo_shared_by_next_request(self, mock_api):
+        mock_api.get_repo.return_value = MagicMock(is_virtual=False)
+        get_repo_meta(REPO_ID).repo
+
+        self._next_request()
+
+        assert get_repo_meta(REPO_ID).repo is mock_api.get_repo.return_value
+        assert mock_api.get_repo.call_count == 1
+
+    @patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 10)
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_owner_and_status_not_shared_by_next_request(self, mock_api):
+        mock_api.get_repo_owner.return_value = 'a@a.com'
+        mock_api.get_repo_status.return_value = 0
+        assert get_repo_meta(REPO_ID).owner == 'a@a.com'
+        assert get_repo_meta(REPO_ID).status == 0
+
+        # changed by another process
+        mock_api.get_repo_owner.return_value = 'b@b.com'
+        mock_api.get_repo_status.return_value = 1
+        self._next_request()
+
+        assert get_repo_meta(REPO_ID).owner == 'b@b.com'
+        assert get_repo_meta(REPO_ID).status == 1
+
+    @patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 10)
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_missing_repo_not_shared_by_next_request(self, mock_api):
+        mock_api.get_repo.return_value = None
+        get_repo_meta(REPO_ID).repo
+
+        self._next_request()
+        get_repo_meta(REPO_ID).repo
+
+        assert mock_api.get_repo.call_count == 2
+
+    @patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 10)
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_invalidated_in_request(self, mock_api):
+        mock_api.get_repo_owner.return_value = 'a@a.com'
+        get_repo_meta(REPO_ID).owner
+
+        # e.g. transferred by this request
+        mock_api.get_repo_owner.return_value = 'b@b.com'
+        invalidate_repo_meta(REPO_ID)
+
+        assert get_repo_meta(REPO_ID).owner == 'b@b.com'
+
+    @patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 10)
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_invalidated_by_signals(self, mock_api):
+        get_repo_meta(REPO_ID).repo
+        for signal in (repo_renamed, repo_deleted):
+            signal.send(sender=None, repo_id=REPO_ID)
+            self._next_request()
+            get_repo_meta(REPO_ID).repo
+
+        assert mock_api.get_repo.call_count == 3
+
+    @patch('seahub.utils.repo_cache.seafile_api')
+    def test_request_only(self, mock_api):
+        with patch.object(repo_cache, 'REPO_META_CACHE_TIMEOUT', 0):
+            get_repo_meta(REPO_ID).repo
+            get_repo_meta(REPO_ID).repo
+
+            end_request_cache(self.token)
+            self.token = start_request_cache()
+            get_repo_meta(REPO_ID).repo
+
+        assert mock_api.get_repo.call_count == 2
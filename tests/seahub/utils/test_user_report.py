@@ -0,0 +1,103 @@
+import time
+
+from mock import patch, MagicMock
+
+from seahub.base.models import UserLastLogin
+from seahub.profile.models import Profile
+from seahub.test_utils import BaseTestCase
+from seahub.utils import user_report
+from seahub.utils.user_report import iter_user_report, gen_user_storage_rows, \
+    get_user_export_status, _set_user_export_status
+
+
+class FakeUser(object):
+    def __init__(self, email, role=''):
+        self.email = email
+        self.role = role
+
+
+class IterUserReportTest(BaseTestCase):
+
+    def setUp(self):
+        self.users = [FakeUser('a@example.com'), FakeUser('b@example.com'),
+                      FakeUser('c@example.com')]
+        Profile.objects.add_or_update('a@example.com', nickname='A',
+                                      contact_email='a@contact.com')
+        UserLastLogin.objects.create(username='b@example.com')
+
+    def usage(self, email, usage):
+        user = MagicMock()
+        user.user = email
+        user.usage = usage
+        return user
+
+    @patch.object(user_report, 'REPORT_CHUNK_SIZE', 2)
+    @patch('seahub.utils.user_report.SeafileDB')
+    @patch('seahub.utils.user_report._get_users_org_id_map')
+    @patch('seahub.utils.user_report.seafile_api')
+    def test_iter_user_report(self, mock_seafile_api, mock_org_id_map,
+                              mock_seafile_db):
+        # no access to seafile database, quota is fetched per user
+        mock_seafile_db.return_value.get_users_quota_map.side_effect = Exception
+        mock_org_id_map.side_effect = lambda emails: \
+            {'c@example.com': 1} if 'c@example.com' in emails else {}
+        mock_seafile_api.list_user_quota_usage.return_value = [
+            self.usage('a@example.com', 10)]
+        mock_seafile_api.list_org_user_quota_usage.return_value = [
+            self.usage('c@example.com', 30)]
+        mock_seafile_api.get_user_quota.return_value = 100
+        mock_seafile_api.get_org_user_quota.return_value = 300
+
+        progress = []
+        report = list(iter_user_report(self.users,
+                                       lambda done, total: progress.append((done, total))))
+
+        assert [u.space_usage for u in report] == [10, 0, 30]
+        assert [u.space_quota for u in report] == [100, 100, 300]
+        assert report[0].name == 'A'
+        assert report[0].contact_email == 'a@contact.com'
+        assert report[1].last_login is not None
+        assert report[2].last_login is None
+        assert progress == [(2, 3), (3, 3)]
+
+        # usage is listed once, not per user
+        assert mock_seafile_api.list_user_quota_usage.call_count == 1
+        assert mock_seafile_api.list_org_user_quota_usage.call_count == 1
+
+        rows = list(gen_user_storage_rows(report))
+        assert rows[0][1:3] == ['A', 'a@contact.com']
+        assert rows[1][1:3] == ['b', 'b@example.com']
+
+    @patch('seahub.utils.user_report.SeafileDB')
+    @patch('seahub.utils.user_report._get_users_org_id_map')
+    @patch('seahub.utils.user_report.seafile_api')
+    def test_quota_is_fetched_once_per_role(self, mock_seafile_api,
+                                            mock_org_id_map, mock_seafile_db):
+        users = [FakeUser('a@example.com'), FakeUser('b@example.com'),
+                 FakeUser('c@example.com'), FakeUser('d@example.com', 'guest')]
+        mock_org_id_map.return_value = {}
+        mock_seafile_db.return_value.get_users_quota_map.return_value = {
+            (None, 'a@example.com'): 1000}
+        mock_seafile_api.list_user_quota_usage.return_value = []
+        mock_seafile_api.get_user_quota.side_effect = \
+            lambda email: 10 if email == 'd@example.com' else 100
+
+        report = list(iter_user_report(users))
+
+        assert [u.space_quota for u in report] == [1000, 100, 100, 10]
+        assert mock_seafile_api.get_user_quota.call_count == 2
+
+
+class UserExportStatusTest(BaseTestCase):
+
+    def test_stalled_export_is_failed(self):
+        task_id = 'a' * 32
+        _set_user_export_status(task_id, is_finished=False, failed=False,
+                                done=0, total=10)
+        assert get_user_export_status(task_id)['failed'] is False
+
+        with patch('seahub.utils.user_report.time.time',
+                   return_value=time.time() + user_report.USER_EXPORT_STALL_TIMEOUT + 1):
+            status = get_user_export_status(task_id)
+        assert status['is_finished'] is True
+        assert status['failed'] is True
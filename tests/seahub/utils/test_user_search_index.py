@@ -0,0 +1,118 @@
+# Copyright (c) 2012-2016 Seafile Ltd.
+from django.test import SimpleTestCase
+from mock import patch
+
+from seahub.utils import user_search_index
+from seahub.utils.user_search_index import UserSearchIndex, \
+    get_search_tokens, get_user_search_index, search_users, profile_saved_cb
+
+
+def make_user(email, nickname='', contact_email='', login_id='', listed=True):
+    return (email, get_search_tokens(email, nickname, contact_email, login_id),
+            listed)
+
+
+class GetSearchTokensTest(SimpleTestCase):
+
+    def test_fields_and_words(self):
+        tokens = get_search_tokens('carl.smith@test.com', 'Carl Smith',
+                                   'carl@mail.com', 'csmith')
+        assert 'carl.smith@test.com' in tokens
+        assert 'carl smith' in tokens
+        assert 'smith' in tokens
+        assert 'csmith' in tokens
+        assert 'mail' in tokens
+
+    def test_chinese_nickname(self):
+        tokens = get_search_tokens('zs@test.com', '张三丰')
+        assert '张三丰' in tokens
+        assert '三丰' in tokens
+        assert 'zhangsanfeng' in tokens
+
+
+class UserSearchIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        self.index = UserSearchIndex.build([
+            make_user('carl@test.com', 'Carl Smith', listed=False),
+            make_user('smithers@test.com', 'Waylon'),
+            make_user('zs@test.com', '张三丰'),
+        ])
+
+    def test_search(self):
+        assert self.index.search('carl') == ['carl@test.com']
+        assert self.index.search('CARL SM') == ['carl@test.com']
+        assert sorted(self.index.search('smith')) == \
+            ['carl@test.com', 'smithers@test.com']
+        assert self.index.search('zhang') == ['zs@test.com']
+        assert self.index.search('三') == ['zs@test.com']
+        assert self.index.search('arl') == []
+        assert self.index.search('  ') == []
+
+    def test_search_limit_and_listed_only(self):
+        assert len(self.index.search('test', limit=2)) == 2
+        assert self.index.search('smith', listed_only=True) == \
+            ['smithers@test.com']
+
+    def test_update_and_remove(self):
+        self.index.update('carl@test.com',
+                          get_search_tokens('carl@test.com', 'Lenny'), True)
+        assert self.index.search('smith') == ['smithers@test.com']
+        assert self.index.search('lenny', listed_only=True) == ['carl@test.com']
+
+        self.index.remove('smithers@test.com')
+        assert self.index.search('smith') == []
+        assert self.index.search('way') == []
+        assert 'smithers@test.com' not in self.index
+        assert len(self.index) == 2
+
+
+class GetUserSearchIndexTest(SimpleTestCase):
+
+    def tearDown(self):
+        user_search_index._indexes = None
+
+    @patch.object(user_search_index, 'USER_SEARCH_INDEX_TIMEOUT', 300)
+    @patch.object(user_search_index, 'Profile')
+    @patch.object(user_search_index, 'CcnetDB')
+    def test_built_once_per_org(self, mock_ccnet_db, mock_profile):
+        mock_ccnet_db.return_value.get_active_users_org_id.return_value = {
+            'a@test.com': None, 'b@test.com': 1, 'c@test.com': 2}
+        mock_profile.objects.values_list.return_value.iterator.return_value = [
+            ('b@test.com', 'Bob', '', '', True)]
+        user_search_index._indexes = None
+
+        assert get_user_search_index().search('bob') == ['b@test.com']
+        assert get_user_search_index(1).search('test') == ['b@test.com']
+        assert get_user_search_index(2).search('bob') == []
+        assert get_user_search_index(3).search('test') == []
+        assert mock_ccnet_db.return_value.get_active_users_org_id.call_count == 1
+
+    @patch.object(user_search_index, 'USER_SEARCH_INDEX_TIMEOUT', 300)
+    @patch.object(user_search_index, 'Profile')
+    @patch.object(user_search_index, 'CcnetDB')
+    def test_search_users_checked_in_ccnet(self, mock_ccnet_db, mock_profile):
+        mock_ccnet_db.return_value.get_active_users_org_id.return_value = {
+            'a1@test.com': 1, 'a2@test.com': 1}
+        mock_profile.objects.values_list.return_value.iterator.return_value = []
+        # a2 deactivated or moved out of org 1 since the index was built
+        mock_ccnet_db.return_value.get_active_emails.side_effect = \
+            lambda emails, org_id=None: [e for e in emails if e != 'a2@test.com']
+        user_search_index._indexes = None
+
+        assert search_users('a', 10, 1) == ['a1@test.com']
+        mock_ccnet_db.return_value.get_active_emails.assert_called_with(
+            ['a1@test.com', 'a2@test.com'], 1)
+
+    @patch.object(user_search_index, 'CcnetDB')
+    def test_profile_saved_on_ccnet_error(self, mock_ccnet_db):
+        mock_ccnet_db.return_value.get_users_org_id_map.side_effect = Exception('db error')
+        user_search_index._indexes = user_search_index._Indexes(
+            UserSearchIndex(), {}, {})
+
+        profile = type('Profile', (), {
+            'user': 'new@test.com', 'nickname': 'Newton', 'contact_email': '',
+            'login_id': '', 'list_in_address_book': False})()
+        profile_saved_cb(None, profile)
+
+        assert user_search_index._indexes.get().search('newton') == ['new@test.com']
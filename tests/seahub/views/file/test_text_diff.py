@@ -0,0 +1,95 @@
+import os
+from tempfile import mkstemp
+
+from django.core.cache import cache
+from django.urls import reverse
+from mock import patch
+
+from seaserv import seafile_api
+
+from seahub.test_utils import BaseTestCase
+from seahub.utils import normalize_cache_key
+from seahub.views import file as file_views
+
+
+class TextDiffTest(BaseTestCase):
+
+    def setUp(self):
+        self.login_as(self.user)
+        self.diff_file = self.create_file_with_content(
+            'diff.txt', content='line 1\nline 2\n', username=self.user.username)
+        self.update_file('line 1\nline 3\n')
+
+        head_commit_id = seafile_api.get_repo(self.repo.id).head_cmmt_id
+        current_commit = seafile_api.get_commit(self.repo.id, self.repo.version,
+                                                head_commit_id)
+        self.current_obj_id = seafile_api.get_file_id_by_commit_and_path(
+            self.repo.id, current_commit.id, self.diff_file)
+        self.prev_obj_id = seafile_api.get_file_id_by_commit_and_path(
+            self.repo.id, current_commit.parent_id, self.diff_file)
+        self.cache_key = normalize_cache_key(
+            '%s_%s_auto' % (self.prev_obj_id, self.current_obj_id),
+            file_views.TEXT_DIFF_CACHE_PREFIX)
+        cache.delete(self.cache_key)
+
+        self.url = reverse('text_diff', args=[self.repo.id]) + \
+            '?commit=%s&p=%s' % (head_commit_id, self.diff_file)
+
+    def tearDown(self):
+        cache.delete(self.cache_key)
+        self.remove_repo()
+
+    def update_file(self, content):
+        fd, tmp_file = mkstemp()
+        try:
+            os.write(fd, content.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+        seafile_api.put_file(self.repo.id, tmp_file, '/', 'diff.txt',
+                             self.user.username, None)
+        os.unlink(tmp_file)
+
+    def test_can_render(self):
+        assert self.prev_obj_id != self.current_obj_id
+
+        resp = self.client.get(self.url)
+        self.assertEqual(200, resp.status_code)
+        self.assertTemplateUsed(resp, 'text_diff.html')
+        assert resp.context['removed_lines'] == 1
+        assert resp.context['added_lines'] == 1
+        assert 'line 2' in resp.context['diff_result_table']
+        assert 'line 3' in resp.context['diff_result_table']
+
+        # cached by the object ids of both revisions
+        assert cache.get(self.cache_key)['table'] == resp.context['diff_result_table']
+
+    def test_cache_hit(self):
+        self.client.get(self.url)
+
+        with patch.object(file_views, 'get_text_diff') as mock_get_text_diff:
+            resp = self.client.get(self.url)
+
+        self.assertEqual(200, resp.status_code)
+        assert not mock_get_text_diff.called
+        assert 'line 3' in resp.context['diff_result_table']
+
+    @patch.object(file_views, 'TEXT_DIFF_MAX_LINES', 1)
+    def test_too_large_file(self):
+        resp = self.client.get(self.url)
+
+        self.assertEqual(200, resp.status_code)
+        assert resp.context['diff_result_table'] is None
+        assert resp.context['removed_lines'] is None
+        self.assertContains(resp, 'too large to show its changes')
+
+    def test_permission_denied(self):
+        self.logout()
+        self.login_as(self.admin)
+
+        with patch.object(file_views, 'get_text_diff') as mock_get_text_diff:
+            resp = self.client.get(self.url)
+
+        self.assertTemplateNotUsed(resp, 'text_diff.html')
+        assert resp.context['error_msg'] == 'permission denied'
+        assert not mock_get_text_diff.called
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Compare ``FileBasedCache`` with ``seahub.base.cache.TieredCache`` under
+concurrent worker processes, the way gunicorn workers share a cache.
+
+Each worker runs a mix of nickname/contact email reads (``get_many`` and
+``get``), a few writes and a throttle update per "request".
+
+Usage:
+
+    python tools/benchmarks/cache_backends.py [--workers 8] [--requests 2000]
+        [--users 5000] [--l2 BACKEND LOCATION]
+
+Without ``--l2``, the tiered cache uses a ``FileBasedCache`` as L2, which
+shows the benefit of L1 alone. Pass e.g.
+``--l2 django.core.cache.backends.memcached.PyMemcacheCache 127.0.0.1:11211``
+to measure against a real shared cache.
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+SEAHUB_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def load_tiered_cache():
+    # load the module file directly, importing ``seahub`` needs a running
+    # seafile server
+    path = os.path.join(SEAHUB_ROOT, 'seahub', 'base', 'cache.py')
+    spec = importlib.util.spec_from_file_location('seahub_tiered_cache', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['seahub_tiered_cache'] = module
+    spec.loader.exec_module(module)
+
+
+def make_caches(cache_dir, l2):
+    l2_conf = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(cache_dir, 'l2'),
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
+    }
+    if l2:
+        l2_conf = {'BACKEND': l2[0], 'LOCATION': l2[1]}
+
+    return {
+        'file': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(cache_dir, 'file'),
+            'OPTIONS': {'MAX_ENTRIES': 1000000},
+        },
+        'tiered': {
+            'BACKEND': 'seahub_tiered_cache.TieredCache',
+            'OPTIONS': {
+                'L2': l2_conf,
+                'L1_MAX_ENTRIES': 10000,
+                'L1_TIMEOUT': 10,
+            },
+        },
+    }
+
+
+def worker(alias, caches_conf, n_requests, n_users, seed, result_queue):
+    load_tiered_cache()
+
+    from django.conf import settings
+    settings.configure(CACHES=dict(caches_conf, default=caches_conf[alias]))
+    import django
+    django.setup()
+    from django.core.cache import caches
+
+    cache = caches[alias]
+    rand = random.Random(seed)
+    # a few users are much more active than the others
+    users = ['user%d@example.com' % i for i in range(n_users)]
+    weights = [1.0 / (i + 1) for i in range(n_users)]
+
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        emails = rand.choices(users, weights, k=20)
+        keys = ['NICKNAME_' + e for e in emails] + ['CONTACT_' + e for e in emails]
+        found = cache.get_many(keys)
+        missing = {k: k.split('_', 1)[1] for k in keys if k not in found}
+        if missing:
+            cache.set_many(missing, 24 * 60 * 60)
+
+        cache.get('NICKNAME_' + emails[0])
+
+        throttle_key = 'throttle_user_%s' % emails[0]
+        history = cache.get(throttle_key, [])
+        history.insert(0, time.time())
+        cache.set(throttle_key, history[:100], 60)
+
+    result_queue.put(time.perf_counter() - start)
+
+
+def run(alias, caches_conf, args):
+    result_queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker,
+                                     args=(alias, caches_conf, args.requests,
+                                           args.users, i, result_queue))
+             for i in range(args.workers)]
+
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - start
+
+    total = args.workers * args.requests
+    per_worker = [result_queue.get() for _ in procs]
+    print('%-8s %8d requests  wall %7.2fs  %9.0f req/s  %7.3f ms/req (worker avg)' % (
+        alias, total, wall, total / wall,
+        1000.0 * sum(per_worker) / total))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--l2', nargs=2, metavar=('BACKEND', 'LOCATION'))
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='seahub_cache_bench_')
+    try:
+        caches_conf = make_caches(cache_dir, args.l2)
+        for alias in ('file', 'tiered'):
+            run(alias, caches_conf, args)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
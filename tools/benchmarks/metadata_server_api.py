@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Measure the cost of requests to metadata server made by
+seahub/repo_metadata/metadata_server_api.py against a local stand-in
+server, which answers every request after ``--latency`` milliseconds.
+
+Compared are:
+
+* one-shot: a new connection and a new jwt per call, as before
+* pooled: the process wide session and cached jwt
+* pipelined: ``list_columns`` and ``query_rows`` sent at the same time
+
+Run it in a configured seahub environment:
+
+    DJANGO_SETTINGS_MODULE=seahub.settings python tools/benchmarks/metadata_server_api.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import django
+django.setup()
+
+import jwt
+import requests
+
+from seahub.repo_metadata import metadata_server_api
+from seahub.repo_metadata.metadata_server_api import MetadataServerAPI
+
+BASE_ID = 'c5b2a1f4-3c6e-4c47-9d53-1d1b8a4f6a10'
+USER = 'bench@example.com'
+
+
+def make_handler(latency):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body are written separately, don't let them wait for
+        # a delayed ack on kept alive connections
+        disable_nagle_algorithm = True
+
+        def _reply(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(latency)
+            if self.path.endswith('/columns'):
+                body = {'columns': [{'key': '_name', 'name': '_name', 'type': 'text'}]}
+            else:
+                body = {'metadata': [], 'results': [{'_id': 'a', '_name': 'a.md'}]}
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def one_shot(url, n_calls):
+    # what every call did before: encode a jwt, open a new connection
+    for _ in range(n_calls):
+        payload = {'exp': int(time.time()) + 3600, 'base_id': BASE_ID, 'user': USER}
+        token = jwt.encode(payload, 'secret', algorithm='HS256')
+        headers = {'Authorization': 'Bearer %s' % token}
+        requests.get('%s/api/v1/base/%s/columns' % (url, BASE_ID),
+                     json={'table_id': '0001'}, headers=headers).json()
+        requests.post('%s/api/v1/base/%s/query' % (url, BASE_ID),
+                      json={'sql': 'SELECT 1'}, headers=headers).json()
+
+
+def pooled(url, n_calls):
+    for _ in range(n_calls):
+        api = MetadataServerAPI(BASE_ID, USER)
+        api.list_columns('0001')
+        api.query_rows('SELECT 1')
+
+
+def pipelined(url, n_calls):
+    for _ in range(n_calls):
+        api = MetadataServerAPI(BASE_ID, USER)
+        columns_future = api.submit('list_columns', '0001')
+        api.query_rows('SELECT 1')
+        columns_future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=2.0,
+                        help='milliseconds the stand-in server waits per request')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency / 1000.0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    metadata_server_api.METADATA_SERVER_URL = url
+    metadata_server_api.METADATA_SERVER_SECRET_KEY = 'secret'
+
+    try:
+        for name, func in (('one-shot', one_shot), ('pooled', pooled),
+                           ('pipelined', pipelined)):
+            start = time.perf_counter()
+            func(url, args.calls)
+            elapsed = time.perf_counter() - start
+            print('%-10s %6d x (list_columns + query_rows)  %7.3f ms each' % (
+                name, args.calls, 1000.0 * elapsed / args.calls))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
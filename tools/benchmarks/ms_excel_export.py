@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Measure peak RSS and time of exporting rows like the ones of the user
+export of system admin, with:
+
+* workbook: a whole ``openpyxl.Workbook`` filled in memory, as before
+* xlsx: ``seahub.utils.ms_excel.write_xls`` with rows from a generator,
+  saved by ``xls_response``
+* csv: ``seahub.utils.ms_excel.csv_response``
+
+Each run is done in a new process, so that peak RSS is its own.
+
+Usage:
+
+    python tools/benchmarks/ms_excel_export.py [--rows 10000 100000 ...]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+SEAHUB_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+HEAD = ['Email', 'Name', 'Contact Email', 'Login ID', 'Status', 'Role',
+        'Space Usage(MB)', 'Space Quota(MB)', 'Create At', 'Last Login',
+        'Admin', 'LDAP(imported)']
+
+
+def load_ms_excel():
+    # load the module file directly, importing ``seahub`` needs a running
+    # seafile server
+    from django.conf import settings
+    settings.configure(DEFAULT_CHARSET='utf-8')
+    path = os.path.join(SEAHUB_ROOT, 'seahub', 'utils', 'ms_excel.py')
+    spec = importlib.util.spec_from_file_location('seahub_ms_excel', path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['seahub_ms_excel'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def gen_rows(n_rows):
+    for i in range(n_rows):
+        yield ['user%d@example.com' % i, 'user %d' % i, 'user%d@contact.com' % i,
+               'login%d' % i, 'Active', 'Default', round(i * 1.5, 2), 1024.0,
+               '2024-01-01 00:00:00', '2024-06-01 12:00:00', '', '']
+
+
+def export_workbook(ms_excel, n_rows, out):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for col_num, value in enumerate(HEAD):
+        ws.cell(row=1, column=col_num + 1).value = value
+    for row_num, row in enumerate(gen_rows(n_rows)):
+        for col_num, value in enumerate(row):
+            ws.cell(row=row_num + 2, column=col_num + 1).value = value
+    wb.save(out)
+
+
+def export_xlsx(ms_excel, n_rows, out):
+    wb = ms_excel.write_xls('users', HEAD, gen_rows(n_rows))
+    response = ms_excel.xls_response(wb, 'users.xlsx')
+    for chunk in response:
+        out.write(chunk)
+    response.close()
+
+
+def export_csv(ms_excel, n_rows, out):
+    response = ms_excel.csv_response(HEAD, gen_rows(n_rows), 'users.csv')
+    for chunk in response:
+        out.write(chunk)
+
+
+def worker(name, n_rows, result_queue):
+    ms_excel = load_ms_excel()
+    func = {'workbook': export_workbook, 'xlsx': export_xlsx, 'csv': export_csv}[name]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with open(os.devnull, 'wb') as out:
+        func(ms_excel, n_rows, out)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on linux
+    result_queue.put((elapsed, (peak - baseline) / 1024.0, peak / 1024.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    for n_rows in args.rows:
+        for name in ('workbook', 'xlsx', 'csv'):
+            result_queue = ctx.Queue()
+            p = ctx.Process(target=worker, args=(name, n_rows, result_queue))
+            p.start()
+            elapsed, grown, peak = result_queue.get()
+            p.join()
+            print('%-8s %8d rows  %7.2fs  peak RSS %7.1f MB (+%.1f MB)' % (
+                name, n_rows, elapsed, peak, grown))
+
+
+if __name__ == '__main__':
+    main()
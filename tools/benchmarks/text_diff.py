@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Measure time of the diff table of the text diff page, with:
+
+* htmldiff: ``HtmlDiff().make_table`` of ``seahub.utils.htmldiff``, as before
+* line_diff: ``LineHtmlDiff().make_table`` of ``seahub.utils.line_diff``
+
+on log like files where some lines are changed, inserted and removed.
+htmldiff is skipped above ``--htmldiff-max-lines`` lines, being too slow.
+
+Usage:
+
+    python tools/benchmarks/text_diff.py [--lines 10000 100000 ...] [--changes 100]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+
+SEAHUB_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def load_module(name, *path):
+    # load the module file directly, importing ``seahub`` needs a running
+    # seafile server
+    for package in ('seahub', 'seahub.utils'):
+        sys.modules.setdefault(package, types.ModuleType(package))
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(SEAHUB_ROOT, *path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def gen_revisions(n_lines, n_changes, seed=0):
+    rand = random.Random(seed)
+    old = ['2024-01-01 00:%02d:%02d INFO worker-%d handled request %d in %d ms' % (
+        i // 60 % 60, i % 60, i % 8, i, rand.randint(1, 500)) for i in range(n_lines)]
+    new = list(old)
+    for _ in range(n_changes):
+        i = rand.randrange(len(new))
+        op = rand.choice(('change', 'insert', 'remove'))
+        if op == 'change':
+            new[i] = new[i].replace('INFO', 'WARNING')
+        elif op == 'insert':
+            new.insert(i, 'Traceback (most recent call last): %d' % rand.randint(0, 1 << 30))
+        else:
+            del new[i]
+    return old, new
+
+
+def measure(diff, old, new):
+    start = time.perf_counter()
+    table = diff.make_table(old, new, True)
+    return time.perf_counter() - start, len(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--changes', type=int, default=100)
+    parser.add_argument('--htmldiff-max-lines', type=int, default=10000)
+    args = parser.parse_args()
+
+    htmldiff = load_module('seahub.utils.htmldiff', 'seahub', 'utils', 'htmldiff.py')
+    line_diff = load_module('seahub.utils.line_diff', 'seahub', 'utils', 'line_diff.py')
+
+    for n_lines in args.lines:
+        old, new = gen_revisions(n_lines, args.changes)
+        # a file rewritten from scratch
+        rewritten = ['%s rewritten' % line for line in old]
+
+        cases = [('line_diff', line_diff.LineHtmlDiff(), new),
+                 ('line_diff rewritten', line_diff.LineHtmlDiff(), rewritten)]
+        if n_lines <= args.htmldiff_max_lines:
+            cases.insert(0, ('htmldiff', htmldiff.HtmlDiff(), new))
+
+        for name, diff, to_lines in cases:
+            elapsed, size = measure(diff, old, to_lines)
+            print('%-20s %8d lines %5d changes  %8.2fs  table %6.1f KB' % (
+                name, n_lines, args.changes, elapsed, size / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Measure the per-request cost of the throttle engines in
+seahub/api2/throttling.py for growing rates.
+
+The 'history' engine stores the timestamp of every request in the period,
+so its cost grows with the rate. The 'window' engine stores two counters.
+
+Run it in a configured seahub environment, it uses the configured cache:
+
+    DJANGO_SETTINGS_MODULE=seahub.settings python tools/benchmarks/throttle_engines.py
+"""
+import argparse
+import pickle
+import time
+
+import django
+django.setup()
+
+from django.core.cache import cache
+
+from seahub.api2.throttling import UserRateThrottle
+
+
+class FakeUser(object):
+    is_authenticated = True
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeRequest(object):
+    META = {'REMOTE_ADDR': '127.0.0.1'}
+    headers = {}
+
+    def __init__(self, user_id):
+        self.user = FakeUser(user_id)
+
+
+def bench(engine, num_requests, n_calls):
+    rate = '%s:%d/hour' % (engine, num_requests)
+
+    class Throttle(UserRateThrottle):
+        scope = 'bench_%s_%d' % (engine, num_requests)
+
+        def get_rate(self):
+            return rate
+
+    request = FakeRequest('bench')
+    # fill the period, so that the history engine stores `num_requests`
+    # timestamps like a busy client does
+    for _ in range(num_requests):
+        Throttle().allow_request(request, None)
+
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        Throttle().allow_request(request, None)
+    elapsed = time.perf_counter() - start
+
+    key = Throttle().get_cache_key(request, None)
+    window = int(time.time() // 3600)
+    keys = [key, '%s_%d' % (key, window), '%s_%d' % (key, window - 1)]
+    stored_size = sum(len(pickle.dumps(v)) for v in cache.get_many(keys).values())
+
+    cache.delete_many(keys)
+    return 1000000.0 * elapsed / n_calls, stored_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    print('%-8s %10s %14s %14s' % ('engine', 'rate/hour', 'us/request', 'stored bytes'))
+    for num_requests in (100, 1000, 10000, 50000):
+        for engine in ('history', 'window'):
+            cost, size = bench(engine, num_requests, args.calls)
+            print('%-8s %10d %14.1f %14d' % (engine, num_requests, cost, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# Copyright (c) 2012-2016 Seafile Ltd.
+"""
+Measure the search user endpoint's lookup on generated users, with:
+
+* scan: substring match of email, nickname, contact email and login id of
+  every user in Python, like the org branch of ``SearchUser.get`` did
+* index: ``UserSearchIndex.search`` of ``seahub.utils.user_search_index``
+
+Build time of the index, and latency of queries typed character by
+character, as the share dialog sends them, are printed.
+
+Usage:
+
+    python tools/benchmarks/user_search_index.py [--users 200000] [--queries 200]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import string
+import sys
+import time
+import types
+
+SEAHUB_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+FIRST_NAMES = ['Carl', 'Lenny', 'Homer', 'Marge', 'Waylon', 'Ned', 'Edna',
+               'Selma', 'Patty', 'Moe', 'Barney', 'Apu', 'Otto', 'Seymour']
+CHINESE_NAMES = ['张三丰', '李小龙', '王大锤', '赵云', '刘备', '陈静', '周杰']
+
+
+def load_module(name, *path):
+    # load the module file directly, importing ``seahub`` needs a running
+    # seafile server
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(SEAHUB_ROOT, *path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def stub_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def load_user_search_index():
+    from django.conf import settings
+    settings.configure()
+    from django.dispatch import Signal
+
+    for package in ('seahub', 'seahub.utils', 'seahub.base',
+                    'seahub.base.templatetags', 'seahub.profile', 'registration'):
+        stub_module(package)
+
+    cconvert = load_module('seahub.cconvert', 'seahub', 'cconvert.py')
+    cc = cconvert.CConvert()
+    cc.spliter = ''
+
+    stub_module('registration.signals', user_registered=Signal(),
+                user_deleted=Signal())
+    stub_module('seahub.base.templatetags.seahub_tags', char2pinyin=cc.convert)
+    stub_module('seahub.profile.models', Profile=type('Profile', (), {}))
+    stub_module('seahub.settings', USER_SEARCH_INDEX_TIMEOUT=300)
+    stub_module('seahub.utils.ccnet_db', CcnetDB=object)
+    return load_module('seahub.utils.user_search_index',
+                       'seahub', 'utils', 'user_search_index.py')
+
+
+def gen_users(n_users, seed=0):
+    rand = random.Random(seed)
+    users = []
+    for i in range(n_users):
+        if rand.random() < 0.2:
+            nickname = rand.choice(CHINESE_NAMES) + str(i % 100)
+        else:
+            nickname = '%s %s' % (rand.choice(FIRST_NAMES), ''.join(
+                rand.choice(string.ascii_lowercase) for _ in range(6)).title())
+        login_id = 'u%07d' % i if rand.random() < 0.3 else ''
+        users.append(('user%d@example%d.com' % (i, i % 50), nickname,
+                      'contact%d@mail.com' % i, login_id))
+    return users
+
+
+def gen_queries(users, n_queries, seed=0):
+    rand = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        email, nickname, contact_email, login_id = rand.choice(users)
+        word = rand.choice([w for w in (email, nickname.split()[-1], login_id) if w])
+        # each prefix, as typed
+        queries.extend(word[:i] for i in range(1, min(len(word), 8) + 1))
+    return queries
+
+
+def scan(users, q, limit):
+    q = q.lower()
+    result = []
+    for email, nickname, contact_email, login_id in users:
+        if q in email or q in nickname.lower() or q in contact_email \
+                or q in login_id:
+            result.append(email)
+            if len(result) >= limit:
+                break
+    return result
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def measure(search, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        search(q)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    module = load_user_search_index()
+    users = gen_users(args.users)
+    queries = gen_queries(users, args.queries)
+
+    start = time.perf_counter()
+    index = module.UserSearchIndex.build(
+        (email, module.get_search_tokens(email, nickname, contact_email, login_id), True)
+        for email, nickname, contact_email, login_id in users)
+    print('index build %8d users  %8.2fs' % (args.users, time.perf_counter() - start))
+
+    # the scan is slow, run it on a part of the queries
+    cases = [('scan', lambda q: scan(users, q, args.limit), queries[:len(queries) // 10 or 1]),
+             ('index', lambda q: index.search(q, args.limit), queries)]
+    for name, search, case_queries in cases:
+        latencies = measure(search, case_queries)
+        print('%-6s %6d queries  p50 %9.3f ms  p99 %9.3f ms  max %9.3f ms' % (
+            name, len(case_queries), percentile(latencies, 50) * 1000,
+            percentile(latencies, 99) * 1000, max(latencies) * 1000))
+
+
+if __name__ == '__main__':
+    main()